@@ -0,0 +1,143 @@
+"""
+Comparativa de la capa de rendimiento de la base de datos
+Genera una tabla `conversions` sintética (1M filas por defecto) y mide, sin y
+con la capa de rendimiento (WAL + synchronous=NORMAL + índices compuestos):
+- las consultas de /stats (tres count() + agrupación frente a una sola agrupación)
+- la primera página de /history de un usuario
+- escrituras pequeñas en transacciones independientes, como las de /convert
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from src.models.db_performance import SQLITE_PRAGMAS
+from src.models.user import Conversion
+
+STATUSES = ['completed'] * 8 + ['failed', 'pending']
+TYPES = [f'{s}-{t}' for s in ('txt', 'md', 'docx', 'pdf', 'html') for t in ('pdf', 'html', 'txt', 'png')]
+
+LEGACY_STATS = [
+    "SELECT count(*) FROM conversions WHERE user_id = ?",
+    "SELECT count(*) FROM conversions WHERE user_id = ? AND status = 'completed'",
+    "SELECT count(*) FROM conversions WHERE user_id = ? AND status = 'failed'",
+    "SELECT conversion_type, count(id) FROM conversions WHERE user_id = ? AND status = 'completed' "
+    "GROUP BY conversion_type",
+]
+GROUPED_STATS = [
+    "SELECT status, conversion_type, count(*) FROM conversions WHERE user_id = ? "
+    "GROUP BY status, conversion_type",
+]
+HISTORY = [
+    "SELECT * FROM conversions WHERE user_id = ? ORDER BY created_at DESC LIMIT 10",
+]
+INSERT = (
+    "INSERT INTO conversions (user_id, original_filename, original_format, target_format, file_size, "
+    "conversion_type, credits_used, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def build(path: str, rows: int, users: int):
+    table = Conversion.__table__
+    conn = sqlite3.connect(path)
+    conn.execute(str(CreateTable(table).compile(dialect=sqlite.dialect())))
+    rng = random.Random(42)
+    start = datetime(2025, 1, 1)
+
+    def generate():
+        for i in range(rows):
+            conv_type = rng.choice(TYPES)
+            source, target = conv_type.split('-')
+            created = start + timedelta(seconds=rng.randrange(365 * 86400))
+            yield (rng.randrange(1, users + 1), f'doc{i}.{source}', source, target, rng.randrange(1, 10 ** 7),
+                   conv_type, 2, rng.choice(STATUSES), created.isoformat(sep=' '))
+
+    with conn:
+        conn.executemany(INSERT, generate())
+    conn.close()
+
+
+def connect(path: str, tuned: bool) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, isolation_level=None)
+    if tuned:
+        for pragma, value in SQLITE_PRAGMAS.items():
+            conn.execute(f"PRAGMA {pragma}={value}")
+    return conn
+
+
+def add_indexes(conn: sqlite3.Connection) -> float:
+    start = time.perf_counter()
+    for index in Conversion.__table__.indexes:
+        conn.execute(str(CreateIndex(index).compile(dialect=sqlite.dialect())))
+    conn.execute("ANALYZE")
+    return time.perf_counter() - start
+
+
+def time_queries(conn, queries, user_ids):
+    start = time.perf_counter()
+    for user_id in user_ids:
+        for sql in queries:
+            conn.execute(sql, (user_id,)).fetchall()
+    return (time.perf_counter() - start) / len(user_ids) * 1000
+
+
+def time_writes(conn, count: int):
+    row = (1, 'nuevo.txt', 'txt', 'pdf', 100, 'txt-pdf', 1, 'pending', datetime.now().isoformat(sep=' '))
+    start = time.perf_counter()
+    for _ in range(count):
+        conn.execute("BEGIN")
+        conn.execute(INSERT, row)
+        conn.execute("COMMIT")
+    return (time.perf_counter() - start) / count * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Comparativa de la capa de rendimiento de la base de datos')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=2_000)
+    parser.add_argument('--samples', type=int, default=50, help='Usuarios consultados por medición')
+    parser.add_argument('--writes', type=int, default=500)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='anclora_db_bench_')
+    try:
+        baseline = os.path.join(workdir, 'baseline.db')
+        start = time.perf_counter()
+        build(baseline, args.rows, args.users)
+        print(f"{args.rows} filas generadas en {time.perf_counter() - start:.1f}s")
+        tuned_path = os.path.join(workdir, 'tuned.db')
+        shutil.copyfile(baseline, tuned_path)
+
+        users = random.Random(7).sample(range(1, args.users + 1), min(args.samples, args.users))
+        legacy = connect(baseline, tuned=False)
+        tuned = connect(tuned_path, tuned=True)
+        print(f"Índices creados en {add_indexes(tuned):.1f}s")
+
+        results = [
+            ('/stats (4 consultas, sin índices)', time_queries(legacy, LEGACY_STATS, users)),
+            ('/stats (1 agrupada, con índices)', time_queries(tuned, GROUPED_STATS, users)),
+            ('/history página 1 (sin índices)', time_queries(legacy, HISTORY, users)),
+            ('/history página 1 (con índices)', time_queries(tuned, HISTORY, users)),
+            ('escritura por transacción (rollback journal, FULL)', time_writes(legacy, args.writes)),
+            ('escritura por transacción (WAL, NORMAL)', time_writes(tuned, args.writes)),
+        ]
+        width = max(len(name) for name, _ in results)
+        for name, ms in results:
+            print(f"{name:<{width}}  {ms:9.3f} ms")
+        legacy.close()
+        tuned.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
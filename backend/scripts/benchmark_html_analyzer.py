@@ -0,0 +1,70 @@
+"""
+Comparativa del analizador de complejidad HTML
+Mide el modo 'soup' (BeautifulSoup + búsquedas sueltas) frente al modo
+'single_pass' (autómata combinado + tokenizador en streaming) sobre los
+archivos indicados o sobre exportaciones HTML sintéticas de varios tamaños,
+y comprueba que ambos producen el mismo resultado.
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.conversions.html_complexity_analyzer import HTMLComplexityAnalyzer
+
+HEAD = '''<!DOCTYPE html><html><head><meta charset="utf-8">
+<link rel="stylesheet" href="https://fonts.googleapis.com/css?family=Roboto">
+<style>
+body { font-family: "Roboto", sans-serif; }
+.card { box-shadow: 0 1px 2px #0003; border-radius: 4px; transition: all .2s; }
+@media print { .no-print { display: none; } }
+</style></head><body>
+'''
+
+ROW = '''<div class="row grid-item" style="display: flex; padding: 4px">
+  <div class="col-6"><h3>Registro {i}</h3><p>Texto exportado del informe número {i}, con
+  <b>negritas</b>, <a href="#r{i}">enlaces</a> y datos tabulares.</p></div>
+  <table><tr><td>{i}</td><td>valor</td><td>{i}.50 €</td></tr></table>
+  <img src="img/{i}.png" alt="figura {i}">
+</div>
+'''
+
+
+def synthetic_export(rows: int) -> str:
+    return HEAD + ''.join(ROW.format(i=i) for i in range(rows)) + '</body></html>'
+
+
+def timed(mode: str, html: str, repeat: int):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = HTMLComplexityAnalyzer(mode).analyze_html_content(html)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Comparativa del analizador de complejidad HTML')
+    parser.add_argument('paths', nargs='*', help='Archivos HTML (por defecto, exportaciones sintéticas)')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 40000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.paths:
+        samples = [(path, open(path, encoding='utf-8').read()) for path in args.paths]
+    else:
+        samples = [(f'sintético {rows} filas', synthetic_export(rows)) for rows in args.rows]
+
+    print(f"{'documento':<28} {'MB':>7} {'soup (s)':>10} {'1 pasada (s)':>13} {'mejora':>8}  iguales")
+    for name, html in samples:
+        soup_time, soup_result = timed('soup', html, args.repeat)
+        fast_time, fast_result = timed('single_pass', html, args.repeat)
+        size_mb = len(html.encode('utf-8')) / (1024 * 1024)
+        print(f"{name[:28]:<28} {size_mb:>7.2f} {soup_time:>10.3f} {fast_time:>13.3f} "
+              f"{soup_time / fast_time:>7.1f}x  {soup_result == fast_result}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Comparativa de JSON→CSV: json.load + DataFrame completo frente a lectura
+elemento a elemento + aplanado por bloques con esquema inferido
+Cada medición se ejecuta en un proceso nuevo para aislar el pico de memoria.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MODES = ['memoria', 'streaming']
+
+
+def synthetic_json(path: str, rows: int, depth: int):
+    """Array de objetos anidados como los de una exportación de API"""
+    rng = random.Random(42)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for i in range(rows):
+            nested = {'valor': round(rng.uniform(1, 10 ** 4), 2)}
+            for level in range(depth):
+                nested = {f'nivel{level}': nested, 'etiquetas': ['a', 'b'] if level % 2 else None}
+            record = {
+                'id': i, 'cliente': {'nombre': f'Cliente {rng.randrange(10 ** 5)}',
+                                     'ciudad': rng.choice(['Madrid', 'Málaga', 'A Coruña', 'Palma'])},
+                'pedido': nested, 'notas': '' if i % 7 else 'revisar "urgente"',
+            }
+            f.write((',' if i else '') + json.dumps(record, ensure_ascii=False))
+        f.write(']')
+
+
+def _rss_mb() -> float:
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+
+
+def _measure(mode: str, input_path: str, output_path: str, queue):
+    import logging
+    logging.disable(logging.WARNING)
+    from src.models.conversions import json_to_csv
+    # El umbral decide el camino: infinito fuerza la conversión en memoria
+    json_to_csv.STREAMING_THRESHOLD_MB = float('inf') if mode == 'memoria' else 0
+    before = _rss_mb()
+    start = time.perf_counter()
+    success, message = json_to_csv.convert(input_path, output_path)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put((success, message, elapsed, peak - before))
+
+
+def measure(mode: str, input_path: str, output_path: str):
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(mode, input_path, output_path, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Comparativa de JSON→CSV en memoria y en streaming')
+    parser.add_argument('--rows', type=int, nargs='*', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--depth', type=int, default=6, help='Niveles de anidamiento de cada registro')
+    parser.add_argument('--max-memory-rows', type=int, default=1_000_000,
+                        help='No medir el modo en memoria por encima de este número de filas')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='anclora_json_csv_bench_') as workdir:
+        print(f"{'filas':>9}  {'JSON MB':>7}  {'modo':<10} {'tiempo':>9}  {'memoria extra':>13}  {'CSV MB':>7}")
+        for rows in args.rows:
+            input_path = os.path.join(workdir, f'{rows}.json')
+            synthetic_json(input_path, rows, args.depth)
+            json_mb = os.path.getsize(input_path) / 1024 / 1024
+            for mode in MODES:
+                if mode == 'memoria' and rows > args.max_memory_rows:
+                    continue
+                output_path = os.path.join(workdir, f'{rows}_{mode}.csv')
+                success, message, elapsed, extra_mb = measure(mode, input_path, output_path)
+                if not success:
+                    print(f"{rows:>9}  {json_mb:7.1f}  {mode:<10} error: {message}")
+                    continue
+                csv_mb = os.path.getsize(output_path) / 1024 / 1024
+                print(f"{rows:>9}  {json_mb:7.1f}  {mode:<10} {elapsed:8.2f}s  {extra_mb:10.0f} MB  {csv_mb:7.1f}")
+                os.remove(output_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Comparativa de PDF→TXT: concatenación de pypdf en un proceso frente a la
+extracción por tramos de páginas repartidos entre procesos (PyMuPDF o pypdf)
+El pool de procesos se reutiliza entre conversiones, así que su arranque no se mide.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fpdf import FPDF
+from pypdf import PdfReader
+
+WORDS = ['conversión', 'documento', 'página', 'texto', 'archivo', 'Anclora', 'Nexus', 'formato', 'calidad']
+
+
+def synthetic_pdf(path: str, pages: int):
+    rng = random.Random(42)
+    pdf = FPDF()
+    pdf.set_font('Helvetica', size=9)
+    for number in range(pages):
+        pdf.add_page()
+        for line in range(60):
+            words = ' '.join(rng.choice(WORDS) for _ in range(14))
+            pdf.cell(0, 4, f'{number + 1}.{line + 1} {words}'.encode('latin-1', 'replace').decode('latin-1'),
+                     new_x='LMARGIN', new_y='NEXT')
+    pdf.output(path)
+
+
+def legacy(input_path: str, output_path: str):
+    """Implementación anterior: una cadena que crece página a página"""
+    text = ''
+    for page in PdfReader(input_path).pages:
+        text += page.extract_text() or ''
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Comparativa de extracción de texto de PDF')
+    parser.add_argument('--pages', type=int, default=1000)
+    parser.add_argument('--workers', type=int, nargs='*', default=sorted({1, 2, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.WARNING)
+    from src.models.conversions import pdf_to_txt
+
+    with tempfile.TemporaryDirectory(prefix='anclora_pdf_bench_') as workdir:
+        input_path = os.path.join(workdir, 'documento.pdf')
+        synthetic_pdf(input_path, args.pages)
+        output_path = os.path.join(workdir, 'documento.txt')
+        print(f"{args.pages} páginas, {os.path.getsize(input_path) / 1024 / 1024:.1f} MB, "
+              f"{os.cpu_count()} CPU")
+
+        start = time.perf_counter()
+        legacy(input_path, output_path)
+        print(f"{'pypdf, concatenación (anterior)':<36} {time.perf_counter() - start:8.2f}s")
+
+        engines = [False, True] if pdf_to_txt.PYMUPDF_AVAILABLE else [False]
+        for use_pymupdf in engines:
+            pdf_to_txt.PYMUPDF_AVAILABLE = use_pymupdf
+            for workers in args.workers:
+                if workers > 1:
+                    # Arranque del pool (importaciones de cada proceso) fuera de la medición
+                    pdf_to_txt.extract_text(input_path, output_path, workers=workers)
+                start = time.perf_counter()
+                engine, used, timings = pdf_to_txt.extract_text(input_path, output_path, workers=workers)
+                elapsed = time.perf_counter() - start
+                print(f"{engine + ', ' + str(used) + ' proceso(s)':<36} {elapsed:8.2f}s  "
+                      f"(media {sum(timings) / len(timings) * 1000:.1f} ms/página)")
+
+
+if __name__ == '__main__':
+    main()
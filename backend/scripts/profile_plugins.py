@@ -0,0 +1,42 @@
+"""
+Perfil de arranque de los plugins de conversión
+Importa cada plugin del manifiesto y muestra su tiempo de importación y la
+memoria que añade al proceso. Las dependencias compartidas (pandas, PyMuPDF...)
+se atribuyen al primer plugin que las importa; usa --order para cambiarlo.
+"""
+import argparse
+import json
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.plugin_manifest import (
+    PluginManifest, import_plugin, get_import_profile, format_import_profile
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Perfil de importación de plugins')
+    parser.add_argument('--order', choices=['manifest', 'reverse'], default='manifest')
+    parser.add_argument('--json', action='store_true', help='Salida en JSON')
+    args = parser.parse_args()
+
+    modules = [entry['module'] for entry in PluginManifest().load()]
+    if args.order == 'reverse':
+        modules.reverse()
+
+    for module in modules:
+        try:
+            import_plugin(module)
+        except Exception as e:
+            print(f"Error importando {module}: {e}", file=sys.stderr)
+
+    profile = get_import_profile()
+    if args.json:
+        print(json.dumps(profile, indent=2))
+    else:
+        print(format_import_profile(profile))
+
+
+if __name__ == '__main__':
+    main()
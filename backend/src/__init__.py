@@ -2,10 +2,12 @@ from flask import Flask
 from flask_jwt_extended import JWTManager
 
 from src.models.user import db
+from src.models import db_performance
 from src.routes.user import user_bp
 from src.routes.auth import auth_bp
 from src.routes.conversion import conversion_bp
 from src.routes.credits import credits_bp
+from src.services.conversion_queue import conversion_queue
 
 
 def create_app(config=None):
@@ -20,8 +22,11 @@ def create_app(config=None):
     if config:
         app.config.update(config)
 
+    db_performance.configure_app(app)
     db.init_app(app)
+    db_performance.init_app(app, db)
     JWTManager(app)
+    conversion_queue.init_app(app)
 
     app.register_blueprint(user_bp, url_prefix="/api")
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
@@ -141,9 +141,9 @@ async def get_metrics_dashboard():
                 "last_24h": last_24h if "error" not in last_24h else None,
                 "last_week": last_week if "error" not in last_week else None
             },
-            "alerts": self._get_recent_alerts(),
-            "top_conversions": self._get_top_conversion_types(monitor),
-            "performance_trends": self._calculate_performance_trends(monitor)
+            "alerts": _get_recent_alerts(),
+            "top_conversions": _get_top_conversion_types(monitor),
+            "performance_trends": _calculate_performance_trends(monitor)
         }
         
         return {
@@ -198,23 +198,11 @@ async def get_conversion_statistics(
     try:
         monitor = get_monitor()
         
-        # Filtrar eventos por período
-        from datetime import timedelta
-        cutoff_time = datetime.now() - timedelta(hours=hours)
+        # Combinar las cubetas del período (filtradas por formato si se especifica)
+        window = monitor.aggregator.summary(hours * 3600, format_pair=format_filter)
+        total = window["total"]
         
-        filtered_events = [
-            event for event in monitor.recent_events
-            if datetime.fromisoformat(event.timestamp) >= cutoff_time
-        ]
-        
-        # Aplicar filtro de formato si se especifica
-        if format_filter:
-            filtered_events = [
-                event for event in filtered_events
-                if f"{event.input_format}→{event.output_format}" == format_filter
-            ]
-        
-        if not filtered_events:
+        if not total["count"]:
             return {
                 "success": True,
                 "stats": {
@@ -223,47 +211,19 @@ async def get_conversion_statistics(
                 }
             }
         
-        # Calcular estadísticas
-        total = len(filtered_events)
-        successful = sum(1 for e in filtered_events if e.success)
-        
         # Estadísticas por método
-        method_stats = {}
-        for event in filtered_events:
-            method = event.method_used
-            if method not in method_stats:
-                method_stats[method] = {
-                    "count": 0,
-                    "success": 0,
-                    "total_time": 0,
-                    "avg_file_size": 0
-                }
-            
-            stats = method_stats[method]
-            stats["count"] += 1
-            if event.success:
-                stats["success"] += 1
-            stats["total_time"] += event.duration_seconds
-            stats["avg_file_size"] += event.file_size_mb
-        
-        # Finalizar cálculos
-        for method, stats in method_stats.items():
-            stats["success_rate"] = (stats["success"] / stats["count"]) * 100
-            stats["avg_time"] = stats["total_time"] / stats["count"]
-            stats["avg_file_size"] /= stats["count"]
-        
-        # Distribución por tamaño de archivo
-        size_distribution = {
-            "small": sum(1 for e in filtered_events if e.file_size_mb < 1),
-            "medium": sum(1 for e in filtered_events if 1 <= e.file_size_mb < 10),
-            "large": sum(1 for e in filtered_events if e.file_size_mb >= 10)
-        }
-        
-        # Distribución por tiempo de respuesta
-        time_distribution = {
-            "fast": sum(1 for e in filtered_events if e.duration_seconds < 5),
-            "normal": sum(1 for e in filtered_events if 5 <= e.duration_seconds < 30),
-            "slow": sum(1 for e in filtered_events if e.duration_seconds >= 30)
+        method_stats = {
+            method: {
+                "count": stats["count"],
+                "success": stats["success"],
+                "success_rate": stats["success_rate"],
+                "avg_time": stats["avg_time"],
+                "p50": stats["p50"],
+                "p95": stats["p95"],
+                "p99": stats["p99"],
+                "avg_file_size": stats["bytes"] / stats["count"] / (1024 * 1024)
+            }
+            for method, stats in window["by_method"].items()
         }
         
         return {
@@ -271,13 +231,14 @@ async def get_conversion_statistics(
             "stats": {
                 "period_hours": hours,
                 "format_filter": format_filter,
-                "total_conversions": total,
-                "success_rate": (successful / total) * 100,
+                "total_conversions": total["count"],
+                "success_rate": total["success_rate"],
                 "method_performance": method_stats,
-                "size_distribution": size_distribution,
-                "time_distribution": time_distribution,
-                "avg_duration": sum(e.duration_seconds for e in filtered_events) / total,
-                "avg_file_size": sum(e.file_size_mb for e in filtered_events) / total
+                "size_distribution": total["size_distribution"],
+                "time_distribution": total["time_distribution"],
+                "avg_duration": total["avg_time"],
+                "latency_percentiles": {"p50": total["p50"], "p95": total["p95"], "p99": total["p99"]},
+                "avg_file_size": total["bytes"] / total["count"] / (1024 * 1024)
             }
         }
         
@@ -291,7 +252,7 @@ async def get_recent_alerts(limit: int = Query(50, ge=1, le=100)):
     Obtiene alertas recientes del sistema
     """
     try:
-        alerts = self._get_recent_alerts(limit)
+        alerts = _get_recent_alerts(limit)
         return {
             "success": True,
             "alerts": alerts,
@@ -324,82 +285,36 @@ def _get_recent_alerts(limit: int = 10) -> List[Dict]:
         logger.error(f"Error leyendo alertas: {e}")
         return []
 
-def _get_top_conversion_types(monitor) -> List[Dict]:
+def _get_top_conversion_types(monitor, hours: int = 24) -> List[Dict]:
     """Obtiene tipos de conversión más populares"""
     try:
-        conversion_counts = {}
-        
-        for event in monitor.recent_events:
-            conv_type = f"{event.input_format}→{event.output_format}"
-            if conv_type not in conversion_counts:
-                conversion_counts[conv_type] = {
-                    "count": 0,
-                    "success": 0,
-                    "avg_time": 0,
-                    "total_time": 0
-                }
-            
-            stats = conversion_counts[conv_type]
-            stats["count"] += 1
-            if event.success:
-                stats["success"] += 1
-            stats["total_time"] += event.duration_seconds
-        
-        # Calcular promedios y ordenar
-        for conv_type, stats in conversion_counts.items():
-            stats["success_rate"] = (stats["success"] / stats["count"]) * 100
-            stats["avg_time"] = stats["total_time"] / stats["count"]
-            del stats["total_time"]  # No necesario en respuesta
-        
-        # Ordenar por popularidad
-        sorted_conversions = sorted(
-            conversion_counts.items(),
-            key=lambda x: x[1]["count"],
-            reverse=True
-        )
-        
         return [
-            {"type": conv_type, **stats}
-            for conv_type, stats in sorted_conversions[:10]
+            {key: entry[key] for key in ("type", "count", "success", "success_rate", "avg_time", "p50", "p95", "p99")}
+            for entry in monitor.aggregator.top_format_pairs(hours * 3600, limit=10)
         ]
-        
     except Exception as e:
         logger.error(f"Error calculando top conversiones: {e}")
         return []
 
-def _calculate_performance_trends(monitor) -> Dict:
-    """Calcula tendencias de rendimiento"""
+def _calculate_performance_trends(monitor, hours: int = 24) -> Dict:
+    """Calcula tendencias comparando la mitad reciente del período con la anterior"""
     try:
-        if len(monitor.recent_events) < 10:
-            return {"insufficient_data": True}
-        
-        # Dividir eventos en dos mitades para comparar
-        events = list(monitor.recent_events)
-        mid_point = len(events) // 2
-        
-        first_half = events[:mid_point]
-        second_half = events[mid_point:]
+        half = hours * 3600 / 2
+        now = datetime.now().timestamp()
+        first = monitor.aggregator.summary(half, end=now - half)["total"]
+        second = monitor.aggregator.summary(half, end=now)["total"]
         
-        # Calcular métricas para cada mitad
-        def calc_metrics(event_list):
-            if not event_list:
-                return {"success_rate": 0, "avg_time": 0}
-            
-            success_rate = (sum(1 for e in event_list if e.success) / len(event_list)) * 100
-            avg_time = sum(e.duration_seconds for e in event_list) / len(event_list)
-            
-            return {"success_rate": success_rate, "avg_time": avg_time}
-        
-        first_metrics = calc_metrics(first_half)
-        second_metrics = calc_metrics(second_half)
+        if first["count"] + second["count"] < 10 or not first["count"] or not second["count"]:
+            return {"insufficient_data": True}
         
         # Calcular tendencias
-        success_trend = second_metrics["success_rate"] - first_metrics["success_rate"]
-        time_trend = second_metrics["avg_time"] - first_metrics["avg_time"]
+        success_trend = second["success_rate"] - first["success_rate"]
+        time_trend = second["avg_time"] - first["avg_time"]
         
         return {
             "success_rate_trend": success_trend,
             "response_time_trend": time_trend,
+            "p95_trend": second["p95"] - first["p95"],
             "trend_direction": "improving" if success_trend > 0 and time_trend < 0 else "declining" if success_trend < 0 or time_trend > 0 else "stable"
         }
         
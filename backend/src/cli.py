@@ -33,8 +33,11 @@ def main():
                 print("  (mojibake repaired)")
             continue
 
-        normalize_to_utf8(path, bom=args.bom)
-        print(f"Normalized {path}")
+        entry = normalize_to_utf8(path, bom=args.bom)
+        if entry.get("action") == "unchanged":
+            print(f"Unchanged {path}")
+        else:
+            print(f"Normalized {path}")
 
 
 if __name__ == "__main__":  # pragma: no cover
@@ -56,6 +56,10 @@ class Config:
     
     # File uploads
     MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB max file size
+
+    # Conversion queue (pool de procesos independiente de los workers HTTP)
+    CONVERSION_QUEUE_ENABLED = os.environ.get('CONVERSION_QUEUE_ENABLED', 'false').lower() == 'true'
+    CONVERSION_WORKERS = int(os.environ.get('CONVERSION_WORKERS', 0)) or None
     
     # External services
     SUPABASE_URL = os.environ.get('SUPABASE_URL')
@@ -77,6 +81,7 @@ class TestingConfig(Config):
     DEBUG = True
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    CONVERSION_QUEUE_ENABLED = False
 
 # === CONFIGURATION SELECTOR ===
 config = {
@@ -1,5 +1,10 @@
+import codecs
+import filecmp
 import json
+import os
 import re
+import shutil
+import tempfile
 from pathlib import Path
 from datetime import datetime, timezone
 
@@ -12,6 +17,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 LOG_DIR = BASE_DIR / "logs" / "encoding"
 LOG_FILE = LOG_DIR / "encoding_normalizer.log"
 
+# Tamaño de la muestra para detectar la codificación y de los bloques de transcodificación
+SAMPLE_SIZE = 64 * 1024
+CHUNK_SIZE = 1024 * 1024
+
 
 def detect_encoding(raw_bytes: bytes) -> str:
     """Detect the encoding of the given raw bytes using chardet with fallbacks."""
@@ -147,15 +156,83 @@ def _log_entry(entry: dict) -> None:
         fh.write(json.dumps(entry) + "\n")
 
 
-def normalize_to_utf8(path, bom: bool = False) -> dict:
+def _read_sample(file_path: Path) -> bytes:
+    """Read a bounded sample from the start of the file for encoding detection."""
+    with file_path.open("rb") as fh:
+        sample = fh.read(SAMPLE_SIZE)
+    if len(sample) == SAMPLE_SIZE:
+        # Recortar una secuencia UTF-8 partida al final de la muestra
+        for cut in range(1, 5):
+            if sample[-cut] & 0xC0 != 0x80:
+                if sample[-cut] >= 0xC0:
+                    sample = sample[:-cut]
+                break
+    return sample
+
+
+def _iter_text(fh, encoding: str, chunk_size: int, errors: str = "strict"):
+    """Decode ``fh`` incrementally, yielding pieces that end on a line break when possible."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+    pending = ""
+    while True:
+        raw = fh.read(chunk_size)
+        if not raw:
+            break
+        text = pending + decoder.decode(raw)
+        # Cortar en fin de línea para no partir secuencias de mojibake entre bloques
+        cut = text.rfind("\n") + 1
+        if not cut and len(text) >= chunk_size:
+            cut = len(text)
+        if cut:
+            yield text[:cut]
+        pending = text[cut:]
+    tail = pending + decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def _is_clean_utf8(file_path: Path, chunk_size: int) -> bool:
+    """True if the file is valid UTF-8 and mojibake repair would not change it."""
+    try:
+        with file_path.open("rb") as fh:
+            for piece in _iter_text(fh, "utf-8-sig", chunk_size):
+                if repair_mojibake(piece) != piece:
+                    return False
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _entry(file_path: Path, backup, source: str, target: str, action: str = None) -> dict:
+    entry = {
+        "path": str(file_path),
+        "backup": backup,
+        "from": source,
+        "to": target,
+        "timestamp": datetime.now(timezone.utc).isoformat() + "Z",
+    }
+    if action:
+        entry["action"] = action
+    _log_entry(entry)
+    return entry
+
+
+def normalize_to_utf8(path, bom: bool = False, chunk_size: int = CHUNK_SIZE) -> dict:
     """Normalize the file at ``path`` to UTF-8 encoding.
 
+    The encoding is detected from a bounded sample and the file is transcoded
+    in chunks, so memory use does not grow with the file size. Files that are
+    already clean UTF-8 are left untouched, and a ``.bak`` backup is only kept
+    when the bytes actually change.
+
     Parameters
     ----------
     path: str or Path
         Path to the file to normalize.
     bom: bool
         If True, write a UTF-8 BOM.
+    chunk_size: int
+        Size in bytes of the blocks read while transcoding.
 
     Returns
     -------
@@ -163,40 +240,59 @@ def normalize_to_utf8(path, bom: bool = False) -> dict:
         The log entry describing the normalization.
     """
     file_path = Path(path)
-    raw = file_path.read_bytes()
-    detected = detect_encoding(raw)
+    sample = _read_sample(file_path)
+    detected = detect_encoding(sample)
+    target = "utf-8-sig" if bom else "utf-8"
 
     # CRÍTICO: No normalizar archivos binarios
     if detected == "binary":
-        entry = {
-            "path": str(file_path),
-            "backup": None,
-            "from": "binary",
-            "to": "binary",
-            "timestamp": datetime.now(timezone.utc).isoformat() + "Z",
-            "action": "skipped_binary"
-        }
-        _log_entry(entry)
-        return entry
-
-    # Proceder con normalización solo para archivos de texto
-    text = raw.decode(detected or "utf-8", errors="replace")
-    repaired = repair_mojibake(text)
-    encoded = repaired.encode("utf-8-sig" if bom else "utf-8")
-
-    backup_path = file_path.with_suffix(file_path.suffix + ".bak")
-    backup_path.write_bytes(raw)
-    file_path.write_bytes(encoded)
+        return _entry(file_path, None, "binary", "binary", "skipped_binary")
 
-    entry = {
-        "path": str(file_path),
-        "backup": str(backup_path),
-        "from": detected,
-        "to": "utf-8-sig" if bom else "utf-8",
-        "timestamp": datetime.now(timezone.utc).isoformat() + "Z",
-    }
-    _log_entry(entry)
-    return entry
+    # Sin reescritura si ya es UTF-8 limpio con el BOM deseado
+    has_bom = sample.startswith(codecs.BOM_UTF8)
+    if has_bom == bom and not detected.lower().startswith(("utf-16", "utf-32")):
+        try:
+            sample.decode("utf-8")
+            maybe_utf8 = True
+        except UnicodeDecodeError:
+            maybe_utf8 = False
+        if maybe_utf8 and _is_clean_utf8(file_path, chunk_size):
+            return _entry(file_path, None, detected, target, "unchanged")
+
+    source = detected
+    if source.lower() == "ascii":
+        # La muestra puede ser ASCII y el resto no: windows-1252 es un superconjunto
+        source = "windows-1252"
+    try:
+        codecs.lookup(source)
+    except LookupError:
+        source = "utf-8"
+
+    fd, tmp_name = tempfile.mkstemp(
+        dir=file_path.parent, prefix=f".{file_path.name}.", suffix=".tmp"
+    )
+    try:
+        with file_path.open("rb") as src, os.fdopen(fd, "wb") as dst:
+            if bom:
+                dst.write(codecs.BOM_UTF8)
+            for piece in _iter_text(src, source, chunk_size, errors="replace"):
+                dst.write(repair_mojibake(piece).encode("utf-8"))
+        shutil.copymode(file_path, tmp_name)
+
+        if filecmp.cmp(tmp_name, file_path, shallow=False):
+            os.unlink(tmp_name)
+            return _entry(file_path, None, detected, target, "unchanged")
+
+        # El original pasa a ser el backup sin copiarlo
+        backup_path = file_path.with_suffix(file_path.suffix + ".bak")
+        os.replace(file_path, backup_path)
+        os.replace(tmp_name, file_path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+    return _entry(file_path, str(backup_path), detected, target)
 
 
 def undo_normalization(path) -> bool:
@@ -205,9 +301,7 @@ def undo_normalization(path) -> bool:
     backup_path = file_path.with_suffix(file_path.suffix + ".bak")
     if not backup_path.exists():
         return False
-    original = backup_path.read_bytes()
-    file_path.write_bytes(original)
-    backup_path.unlink()
+    os.replace(backup_path, file_path)
     entry = {
         "path": str(file_path),
         "action": "undo",
@@ -15,10 +15,13 @@ from prometheus_flask_exporter import PrometheusMetrics
 
 from src.config import get_config
 from src.models.user import db
+from src.models import db_performance
 from src.routes.auth import auth_bp
 from src.routes.conversion import conversion_bp
 from src.routes.credits import credits_bp
 from src.routes.user import user_bp
+from src.services.conversion_queue import conversion_queue
+from src.services.intelligent_cache import intelligent_cache
 from src.ws import socketio
 
 # Cargar variables de entorno tanto desde la raÃ­z del proyecto como desde backend/
@@ -39,6 +42,7 @@ logging.basicConfig(level=getattr(logging, log_level, logging.INFO))
 logging.getLogger("werkzeug").setLevel(logging.WARNING)
 metrics = PrometheusMetrics(app)
 metrics.info("app_info", "Anclora Nexus API", version="2.0.0")
+intelligent_cache.register_metrics(metrics.registry)
 
 # Validar configuraciÃ³n crÃ­tica
 if not app.config.get("SECRET_KEY") or not app.config.get("JWT_SECRET_KEY"):
@@ -76,9 +80,13 @@ app.config["SQLALCHEMY_DATABASE_URI"] = (
 )
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
-# Inicializar base de datos
+# Inicializar base de datos (pool, WAL e índices)
+db_performance.configure_app(app)
 db.init_app(app)
 
+# Cola de conversiones en segundo plano
+conversion_queue.init_app(app)
+
 # Registrar blueprints
 app.register_blueprint(user_bp, url_prefix="/api")
 app.register_blueprint(auth_bp, url_prefix="/api/auth")
@@ -88,6 +96,7 @@ app.register_blueprint(credits_bp, url_prefix="/api/credits")
 # Crear tablas de base de datos
 with app.app_context():
     db.create_all()
+db_performance.init_app(app, db)
 
 
 # Registro de solicitudes
@@ -1,13 +1,16 @@
 import os
-import importlib
-import pkgutil
+import shutil
 import tempfile
-from collections import deque
-from pathlib import Path
+import time
 
-from src.ws import emit_progress, Phase
 from src.encoding_normalizer import normalize_to_utf8
 from src.models.user import Conversion, CreditTransaction
+from src.services.intelligent_cache import intelligent_cache
+from src.services.artifact_store import artifact_store
+from src.services.route_index import RouteIndex
+from src.models.plugin_manifest import PluginManifest, LazyConverter, get_import_profile
+from src.services.batch_executor import BatchExecutor, BatchPolicy
+from src.services.fanout_executor import FanOutExecutor
 
 
 TEXT_EXTENSIONS = {
@@ -88,6 +91,7 @@ class ConversionEngine:
                 'html': 1,
                 'pdf': 2,
                 'json': 1,
+                'jsonl': 1,
                 'txt': 1
             },
             'json': {
@@ -134,23 +138,72 @@ class ConversionEngine:
 
         # Registro dinÃ¡mico de plugins
         self.conversion_methods = {}
+        self.converter_versions = {}
+        self.converter_policies = {}
+        self.route_index = RouteIndex(max_steps=3)
         self.load_plugins()
 
+        # Cache de resultados direccionado por contenido
+        self.result_cache = intelligent_cache
+        self.result_cache_enabled = os.environ.get('CONVERSION_CACHE_ENABLED', 'true').lower() == 'true'
+
+        # Artefactos intermedios de las rutas por pasos
+        self.artifact_store = artifact_store
+        self.artifact_store_enabled = os.environ.get('ARTIFACT_STORE_ENABLED', 'true').lower() == 'true'
+
         # Integración con servicios de IA
         self.ai_enabled = True
         self.quality_threshold = 0.8  # Umbral mínimo de calidad IA
         self.enable_intelligent_sequences = True
 
     def load_plugins(self):
-        """Carga todos los plugins de conversiÃ³n disponibles."""
-        package = importlib.import_module('src.models.conversions')
-        package_path = Path(package.__file__).parent
-        for _, name, _ in pkgutil.iter_modules([str(package_path)]):
-            module = importlib.import_module(f'{package.__name__}.{name}')
-            conv = getattr(module, 'CONVERSION', None)
-            func = getattr(module, 'convert', None)
-            if conv and func:
-                self.conversion_methods[tuple(map(str.lower, conv))] = func
+        """Registra los plugins de conversión a partir del manifiesto.
+
+        Los módulos no se importan aquí: cada conversor se carga en su primer
+        uso salvo que CONVERSION_PLUGINS_EAGER pida precargarlos todos.
+        """
+        self.plugin_manifest = PluginManifest()
+        for entry in self.plugin_manifest.load():
+            key = tuple(entry['conversion'])
+            self.conversion_methods[key] = LazyConverter(entry['module'], key)
+            self.converter_versions[key] = entry['version']
+            self.converter_policies[key] = (entry.get('concurrency'), entry.get('max_concurrency'))
+        if os.environ.get('CONVERSION_PLUGINS_EAGER', 'false').lower() == 'true':
+            self.preload_plugins()
+        self.rebuild_route_index()
+
+    def preload_plugins(self):
+        """Importa todos los conversores registrados (p. ej. antes de hacer fork)"""
+        for converter in self.conversion_methods.values():
+            if isinstance(converter, LazyConverter):
+                try:
+                    converter.load()
+                except Exception as e:
+                    print(f"Error cargando plugin {converter.module_name}: {e}")
+
+    def get_plugin_report(self):
+        """Estado de carga de los plugins y coste de importación de los ya cargados"""
+        lazy = [c for c in self.conversion_methods.values() if isinstance(c, LazyConverter)]
+        return {
+            'registered': len(self.conversion_methods),
+            'loaded': sum(1 for c in lazy if c.loaded),
+            'pending': sorted({c.module_name for c in lazy if not c.loaded}),
+            'manifest_build_ms': self.plugin_manifest.build_time * 1000,
+            'manifest_cached_entries': self.plugin_manifest.from_cache,
+            'import_profile': get_import_profile()
+        }
+
+    def rebuild_route_index(self):
+        """Recalcula la tabla de rutas tras cambiar el grafo de conversiones"""
+        self.route_index.build(self.supported_conversions)
+
+    def get_converter_version(self, path):
+        """Versión combinada de los conversores que recorren una ruta de formatos"""
+        hops = [
+            f"{path[i]}-{path[i + 1]}@{self.converter_versions.get((path[i], path[i + 1]), '0')}"
+            for i in range(len(path) - 1)
+        ]
+        return f"{self.version}:{'+'.join(hops)}"
 
     def get_supported_formats(self, source_format):
         """Obtiene los formatos de destino soportados para un formato origen"""
@@ -217,51 +270,85 @@ class ConversionEngine:
         return analysis
 
     def find_conversion_path(self, src_format: str, dst_format: str):
-        """Busca una ruta de conversiÃ³n usando BFS con hasta dos intermediarios.
+        """Busca una ruta de conversión con hasta dos intermediarios.
 
         Devuelve una lista de formatos que representa el camino desde src_format
-        hasta dst_format, inclusive. Si no se encuentra una ruta vÃ¡lida dentro
-        del lÃ­mite de profundidad, devuelve None.
+        hasta dst_format, inclusive, consultando el índice de rutas precalculado
+        (BFS por origen al cargar los plugins). Si no existe una ruta válida
+        dentro del límite de profundidad, devuelve None.
+        """
+        return self.route_index.shortest_path(src_format.lower(), dst_format.lower())
+
+    def convert_file(self, input_path, output_path, source_format, target_format,
+                     parameters=None, use_cache=None, file_hash=None):
+        """Realiza la conversiÃ³n de archivo
+
+        `file_hash` es el SHA-256 de la entrada si ya se calculó al recibirla.
         """
-        src = src_format.lower()
-        dst = dst_format.lower()
-
-        if src == dst:
-            return [src]
-
-        max_depth = 3  # nÃºmero mÃ¡ximo de pasos (edges): src -> a -> b -> dst
-        queue = deque([(src, [src])])
-        visited = {src}
-
-        while queue:
-            current, path = queue.popleft()
-            depth = len(path) - 1
-            if depth >= max_depth:
-                continue
-            for neighbor in self.supported_conversions.get(current, {}):
-                if neighbor in visited:
-                    continue
-                new_path = path + [neighbor]
-                if neighbor == dst:
-                    return new_path
-                visited.add(neighbor)
-                queue.append((neighbor, new_path))
-
-        return None
-
-    def convert_file(self, input_path, output_path, source_format, target_format):
-        """Realiza la conversiÃ³n de archivo"""
         try:
             source = source_format.lower().replace('.', '')
+            target = target_format.lower()
+
+            if use_cache is None:
+                use_cache = self.result_cache_enabled
+            if not use_cache:
+                return self._convert_uncached(input_path, output_path, source, target, source_format, target_format,
+                                              file_hash=file_hash)
+
+            if (source, target) in self.conversion_methods:
+                path = [source, target]
+            else:
+                path = self.find_conversion_path(source, target)
+            if not path:
+                return False, f"ConversiÃ³n {source_format} â†’ {target_format} no implementada aÃºn"
+
+            # La clave se calcula sobre los bytes originales, antes de normalizar
+            if not file_hash:
+                file_hash = self.result_cache._calculate_file_hash(input_path)
+            converter_version = self.get_converter_version(path)
+            entry = self.result_cache.lookup(
+                input_path, source, target, parameters, converter_version, file_hash
+            )
+            if entry:
+                method = self.result_cache.materialize(entry['cached_file_path'], output_path)
+                original_message = entry['metadata'].get('custom_metadata', {}).get('message', '')
+                return True, f"cache_hit:{entry['cache_key'][:12]} ({method}) | {original_message}"
+
+            start_time = time.time()
+            success, message = self._convert_uncached(
+                input_path, output_path, source, target, source_format, target_format,
+                file_hash=file_hash
+            )
+            if success and file_hash and os.path.exists(output_path):
+                self.result_cache.cache_conversion(
+                    input_path, output_path, source, target,
+                    conversion_time=time.time() - start_time,
+                    parameters=parameters,
+                    metadata={'message': message},
+                    converter_version=converter_version,
+                    file_hash=file_hash
+                )
+            return success, message
+        except Exception as e:
+            return False, f"Error durante la conversiÃ³n: {str(e)}"
+
+    def _convert_uncached(self, input_path, output_path, source, target, source_format, target_format,
+                          file_hash=None):
+        """Ejecuta la conversión directa o por pasos sin consultar el cache de resultados"""
+        try:
             logs = []
 
+            use_artifacts = self.artifact_store_enabled and (source, target) not in self.conversion_methods
+            if use_artifacts and file_hash is None:
+                # Igual que en el cache de resultados: hash de los bytes originales
+                file_hash = self.result_cache._calculate_file_hash(input_path)
+
             if source in TEXT_EXTENSIONS:
                 log_entry = normalize_to_utf8(input_path)
                 logs.append(
                     f"normalized:{log_entry.get('from')}->{log_entry.get('to')}"
                 )
 
-            target = target_format.lower()
             method = self.conversion_methods.get((source, target))
             if method:
                 success, msg = method(input_path, output_path)
@@ -274,9 +361,22 @@ class ConversionEngine:
 
             temp_files = []
             current_input = input_path
+            versions = [self.converter_versions.get((path[i], path[i + 1]), '0') for i in range(len(path) - 1)]
+            use_artifacts = use_artifacts and bool(file_hash)
 
             try:
-                for i in range(len(path) - 1):
+                start_index = 0
+                if use_artifacts:
+                    start_index, artifact = self.artifact_store.find_deepest_prefix(file_hash, path, versions)
+                    if artifact:
+                        # Copia de trabajo: los pasos de texto normalizan su entrada en sitio
+                        fd, current_input = tempfile.mkstemp(suffix=f'.{path[start_index]}')
+                        os.close(fd)
+                        temp_files.append(current_input)
+                        shutil.copyfile(artifact, current_input)
+                        logs.append(f"reused:{'->'.join(path[:start_index + 1])}")
+
+                for i in range(start_index, len(path) - 1):
                     src_fmt = path[i]
                     dst_fmt = path[i + 1]
                     step_method = self.conversion_methods.get((src_fmt, dst_fmt))
@@ -301,6 +401,11 @@ class ConversionEngine:
                     if not success:
                         return False, f"Fallo en {src_fmt}->{dst_fmt}: {msg}"
 
+                    if use_artifacts and i < len(path) - 2:
+                        self.artifact_store.record_miss((src_fmt, dst_fmt))
+                        key = self.artifact_store.prefix_key(file_hash, path[:i + 2], versions[:i + 1])
+                        self.artifact_store.put(key, (src_fmt, dst_fmt), current_output)
+
                     current_input = current_output
 
                 return True, " | ".join(logs)
@@ -311,35 +416,56 @@ class ConversionEngine:
         except Exception as e:
             return False, f"Error durante la conversiÃ³n: {str(e)}"
 
-    def convert_batch(self, tasks):
-        """Procesa un lote de conversiones."""
-        results = []
-        for task in tasks:
-            conversion_id = task.get('conversion_id')
-            if conversion_id is not None:
-                emit_progress(conversion_id, Phase.PREPROCESS, 0)
-                emit_progress(conversion_id, Phase.PREPROCESS, 100)
-                emit_progress(conversion_id, Phase.CONVERT, 0)
-
-            success, message = self.convert_file(
-                task['input_path'],
-                task['output_path'],
-                task.get('source_format') or task['input_path'].split('.')[-1],
-                task['target_format']
+    def convert_batch(self, tasks, policy=None, **policy_options):
+        """Procesa un lote de conversiones.
+
+        Sin política se ejecuta en secuencia como siempre. `policy` puede ser un
+        BatchPolicy o un modo ('threads', 'processes', 'auto') con opciones
+        max_workers, timeout y converter_limits. Los resultados conservan el
+        orden de las tareas.
+        """
+        return list(self.iter_batch(tasks, policy, **policy_options))
+
+    def iter_batch(self, tasks, policy=None, **policy_options):
+        """Como convert_batch, pero genera cada resultado en orden en cuanto está listo"""
+        if not isinstance(policy, BatchPolicy):
+            policy = BatchPolicy(mode=policy or 'sequential', **policy_options)
+        return BatchExecutor(self, policy).run(tasks)
+
+    def convert_multi(self, input_path, outputs, source_format, parameters=None, use_cache=None,
+                      file_hash=None, max_workers=None):
+        """Convierte una entrada a varios formatos destino en una sola pasada
+
+        `outputs` asocia cada formato destino con su ruta de salida. Los pasos
+        intermedios comunes a varias rutas se ejecutan una vez y las ramas
+        independientes en paralelo. Devuelve {formato: (éxito, mensaje)}.
+        """
+        source = source_format.lower().replace('.', '')
+        outputs = {target.lower(): path for target, path in outputs.items()}
+        if use_cache is None:
+            use_cache = self.result_cache_enabled
+        try:
+            return FanOutExecutor(self, TEXT_EXTENSIONS, max_workers).run(
+                input_path, source, outputs, parameters=parameters, use_cache=use_cache, file_hash=file_hash
             )
+        except Exception as e:
+            message = f"Error durante la conversión: {str(e)}"
+            return {target: (False, message) for target in outputs}
 
-            if conversion_id is not None:
-                emit_progress(conversion_id, Phase.CONVERT, 100)
-                emit_progress(conversion_id, Phase.POSTPROCESS, 0)
-                emit_progress(conversion_id, Phase.POSTPROCESS, 100)
-
-            results.append({
-                'input_path': task['input_path'],
-                'output_path': task['output_path'],
-                'success': success,
-                'message': message
-            })
-        return results
+    def get_converter_policy(self, source, target):
+        """Modo de ejecución ('threads' o 'processes') y límite declarados para una conversión
+
+        En rutas por pasos se usan procesos si algún paso los pide y el límite más estricto.
+        """
+        path = [source, target] if (source, target) in self.conversion_methods else \
+            self.find_conversion_path(source, target)
+        if not path:
+            return 'threads', None
+        hops = [self.converter_policies.get((path[i], path[i + 1]), (None, None))
+                for i in range(len(path) - 1)]
+        mode = 'processes' if any(m == 'processes' for m, _ in hops) else 'threads'
+        limits = [limit for _, limit in hops if limit]
+        return mode, min(limits) if limits else None
 
     async def convert_with_ai_optimization(self, input_path, output_path, source_format, target_format,
                                          optimization_type='balanced'):
@@ -3,15 +3,13 @@ Motor de Conversión Mejorado para Anclora Nexus
 Integra Pandoc, sistema de créditos avanzado y formatos expandidos
 """
 import os
-import importlib
-import pkgutil
 import tempfile
 from collections import deque
-from pathlib import Path
 
 from src.ws import emit_progress, Phase
 from src.encoding_normalizer import normalize_to_utf8
 from src.models.user import Conversion, CreditTransaction
+from src.models.plugin_manifest import PluginManifest, LazyConverter
 
 # Importar sistema de créditos
 try:
@@ -110,20 +108,12 @@ class EnhancedConversionEngine:
 
     def load_plugins(self):
         """Carga todos los plugins de conversión disponibles incluyendo Pandoc"""
-        # Cargar plugins tradicionales
-        package = importlib.import_module('src.models.conversions')
-        package_path = Path(package.__file__).parent
-        for _, name, _ in pkgutil.iter_modules([str(package_path)]):
-            if name == 'pandoc_engine':  # Saltar el motor Pandoc
+        # Cargar plugins tradicionales desde el manifiesto (importación bajo demanda)
+        for entry in PluginManifest().load():
+            if entry['module'] == 'pandoc_engine':  # Saltar el motor Pandoc
                 continue
-            try:
-                module = importlib.import_module(f'{package.__name__}.{name}')
-                conv = getattr(module, 'CONVERSION', None)
-                func = getattr(module, 'convert', None)
-                if conv and func:
-                    self.conversion_methods[tuple(map(str.lower, conv))] = func
-            except Exception as e:
-                print(f"Error cargando plugin {name}: {e}")
+            key = tuple(entry['conversion'])
+            self.conversion_methods[key] = LazyConverter(entry['module'], key)
 
         # Cargar conversiones Pandoc si está disponible
         if PANDOC_AVAILABLE:
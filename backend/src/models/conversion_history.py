@@ -3,6 +3,10 @@ from .user import db
 
 class ConversionHistory(db.Model):
     __tablename__ = 'conversion_history'
+    __table_args__ = (
+        db.Index('ix_conversion_history_user_created', 'user_id', 'created_at'),
+        db.Index('ix_conversion_history_user_type_created', 'user_id', 'conversion_type', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     conversion_id = db.Column(db.Integer, db.ForeignKey('conversions.id'), nullable=False)
@@ -1,70 +1,20 @@
 """
 Módulo de conversiones de Anclora Nexus
-Carga automática de todos los plugins de conversión
+Carga bajo demanda de los plugins de conversión
 """
 
-# Importar TODAS las conversiones para asegurar que se carguen
-try:
-    # Conversiones de imágenes
-    from . import jpg_to_png
-    from . import png_to_jpg
-    from . import jpg_to_gif
-    from . import jpg_to_pdf
-    from . import png_to_gif
-    from . import png_to_pdf
-    from . import png_to_docx  # ✅ NUEVO: PNG→DOCX
-    from . import png_to_webp
-    from . import gif_to_jpg
-    from . import gif_to_png
-    from . import gif_to_pdf
-    from . import gif_to_mp4
-    from . import webp_to_jpg
-    from . import tiff_to_jpg
-    from . import svg_to_png
-    from . import pdf_to_jpg
-    from . import pdf_to_png
-    from . import pdf_to_gif
-
-    # Conversiones de documentos
-    from . import txt_to_pdf
-    from . import txt_to_docx
-    from . import txt_to_html
-    from . import txt_to_doc
-    from . import txt_to_markdown
-    from . import txt_to_md
-    from . import txt_to_odt
-    from . import txt_to_rtf
-    from . import txt_to_tex
-    from . import doc_to_pdf
-    from . import doc_to_html
-    from . import doc_to_txt
-    from . import docx_to_pdf
-    from . import docx_to_html
-    from . import docx_to_txt
-    from . import html_to_pdf
-    from . import html_to_txt
-    from . import html_to_md
-    from . import md_to_html
-    from . import md_to_pdf
-    from . import md_to_docx
-    from . import md_to_txt
-    from . import pdf_to_txt
-    from . import rtf_to_docx
-    from . import odt_to_pdf
+# Los plugins se importan bajo demanda: importar el paquete no carga pandas,
+# PyMuPDF, Playwright, WeasyPrint... hasta que se usa el conversor correspondiente.
+# El motor descubre las conversiones con el manifiesto (src.models.plugin_manifest).
+import importlib
 
-    # Conversiones de datos
-    from . import csv_to_html
-    from . import csv_to_pdf
-    from . import json_to_html
-    from . import epub_to_html
-
-    # Motor Pandoc
-    from . import pandoc_engine
 
-    print("✅ Todos los módulos de conversión cargados correctamente")
+def __getattr__(name):
+    """Importa un submódulo de conversión la primera vez que se accede a él"""
+    if name in __all__:
+        return importlib.import_module(f'{__name__}.{name}')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-except ImportError as e:
-    print(f"⚠️  Warning: No se pudieron cargar algunas conversiones: {e}")
 
 __all__ = [
     # Conversiones de imágenes
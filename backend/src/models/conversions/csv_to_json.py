@@ -1,14 +1,39 @@
 import os
 import logging
+import shutil
+import tempfile
 import pandas as pd
 import json
 from pathlib import Path
 
+from . import dataframe_cleaning
+
+# Codificador JSON rápido (opcional)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    logging.warning("orjson no disponible para CSV→JSON en streaming, se usará json")
+
 CONVERSION = ('csv', 'json')
 
+# A partir de este tamaño se convierte por bloques, sin sangría
+STREAMING_THRESHOLD_MB = float(os.environ.get('CSV_JSON_STREAMING_THRESHOLD_MB', 5))
+CHUNK_ROWS = int(os.environ.get('CSV_JSON_CHUNK_ROWS', 50000))
+# Filas con las que se elige la estructura del JSON en streaming
+SAMPLE_ROWS = int(os.environ.get('CSV_JSON_SAMPLE_ROWS', 1000))
+# Extensiones de salida que se escriben como JSON Lines (un registro por línea)
+JSON_LINES_SUFFIXES = ('.jsonl', '.ndjson')
+
 def convert(input_path, output_path):
     """Convierte CSV a JSON usando pandas con múltiples formatos de salida"""
     
+    # Archivos grandes o salida JSON Lines: lectura por bloques y escritura incremental
+    if (Path(output_path).suffix.lower() in JSON_LINES_SUFFIXES
+            or os.path.getsize(input_path) >= STREAMING_THRESHOLD_MB * 1024 * 1024):
+        return convert_streaming(input_path, output_path)
+
     try:
         # Detectar encoding del CSV
         encoding = detect_csv_encoding(input_path)
@@ -42,6 +67,127 @@ def convert(input_path, output_path):
     except Exception as e:
         return False, f"Error en conversión CSV→JSON: {str(e)}"
 
+def convert_streaming(input_path, output_path, lines=None, chunk_rows=None):
+    """Conversión por bloques: la memoria depende del tamaño de bloque, no del archivo
+
+    La estructura del JSON se decide con las primeras filas. Con `lines` (por
+    defecto, según la extensión de salida) se escribe JSON Lines.
+    """
+    try:
+        if lines is None:
+            lines = Path(output_path).suffix.lower() in JSON_LINES_SUFFIXES
+        encoding = detect_csv_encoding(input_path)
+        reader = pd.read_csv(input_path, encoding=encoding, chunksize=chunk_rows or CHUNK_ROWS)
+
+        total_rows, columns, json_format = 0, [], 'records'
+        with open(output_path, 'wb') as f, tempfile.TemporaryDirectory(prefix='anclora_csv_json_') as workdir:
+            writer, pending = None, []
+
+            def start_writer():
+                # La estructura se decide con las primeras SAMPLE_ROWS filas ya limpias
+                nonlocal writer, columns, json_format
+                sample = pd.concat(pending) if len(pending) > 1 else pending[0]
+                columns = list(sample.columns)
+                if not lines:
+                    json_format = determine_best_json_format(sample.head(SAMPLE_ROWS))
+                writer = _stream_writer(f, json_format, lines, columns, workdir)
+                next(writer)
+                for block in pending:
+                    if len(block):
+                        writer.send(block)
+                pending.clear()
+
+            for chunk in reader:
+                # No se descartan columnas vacías: podrían tener datos en otros bloques
+                chunk = chunk.dropna(how='all')
+                chunk.columns = [clean_json_key(str(col)) for col in chunk.columns]
+                chunk = dataframe_cleaning.clean_frame(chunk, dataframe_cleaning.json_column)
+                total_rows += len(chunk)
+                if writer is None:
+                    pending.append(chunk)
+                    if total_rows >= SAMPLE_ROWS:
+                        start_writer()
+                elif len(chunk):
+                    writer.send(chunk)
+            if writer is None and pending:
+                start_writer()
+            if writer is not None:
+                writer.close()
+
+        if not total_rows:
+            os.remove(output_path)
+            return False, "CSV vacío o sin datos válidos"
+
+        if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+            label = 'JSON Lines' if lines else json_format
+            return True, (f"JSON generado en streaming: {total_rows} registros, {len(columns)} campos "
+                          f"(formato: {label})")
+        else:
+            return False, "Error: JSON no se generó correctamente"
+
+    except Exception as e:
+        return False, f"Error en conversión CSV→JSON en streaming: {str(e)}"
+
+def _dumps(value):
+    """Serializa a bytes UTF-8 compactos; json cubre lo que orjson no admite (enteros > 64 bits)"""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(value, default=str)
+        except TypeError:
+            pass
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+def _chunk_records(chunk):
+    columns = list(chunk.columns)
+    return [dict(zip(columns, row)) for row in chunk.itertuples(index=False, name=None)]
+
+def _stream_writer(f, json_format, lines, columns, workdir):
+    """Corrutina que recibe bloques limpios y los escribe en `f` según el formato"""
+    if lines:
+        while True:
+            chunk = yield
+            f.write(b'\n'.join(_dumps(record) for record in _chunk_records(chunk)) + b'\n')
+
+    if json_format == 'columns':
+        # Cada columna se acumula en un archivo temporal y se une al final
+        parts = [open(os.path.join(workdir, f'{i}.part'), 'w+b') for i in range(len(columns))]
+        try:
+            while True:
+                try:
+                    chunk = yield
+                except GeneratorExit:
+                    break
+                for i, part in enumerate(parts):
+                    body = _dumps(chunk.iloc[:, i].tolist())[1:-1]
+                    part.write((b',' if part.tell() else b'') + body)
+            f.write(b'{')
+            for i, (name, part) in enumerate(zip(columns, parts)):
+                f.write((b',' if i else b'') + _dumps(name) + b':[')
+                part.seek(0)
+                shutil.copyfileobj(part, f)
+                f.write(b']')
+            f.write(b'}')
+        finally:
+            for part in parts:
+                part.close()
+        return
+
+    # records: [{...}, ...]   index: {"0": {...}, ...}
+    opening, closing = (b'{', b'}') if json_format == 'index' else (b'[', b']')
+    f.write(opening)
+    first = True
+    try:
+        while True:
+            chunk = yield
+            if json_format == 'index':
+                body = _dumps({str(key): record for key, record in zip(chunk.index, _chunk_records(chunk))})
+            else:
+                body = _dumps(_chunk_records(chunk))
+            f.write((b'' if first else b',') + body[1:-1])
+            first = False
+    except GeneratorExit:
+        f.write(closing)
+
 def detect_csv_encoding(file_path):
     """Detectar encoding del archivo CSV"""
     try:
@@ -78,22 +224,9 @@ def detect_csv_encoding(file_path):
 def clean_dataframe_for_json(df):
     """Limpiar DataFrame para exportación JSON"""
     try:
-        # Crear copia para no modificar original
-        df_clean = df.copy()
-        
-        # Eliminar filas completamente vacías
-        df_clean = df_clean.dropna(how='all')
-        
-        # Eliminar columnas completamente vacías
-        df_clean = df_clean.dropna(axis=1, how='all')
-        
-        # Limpiar nombres de columnas para JSON
-        df_clean.columns = [clean_json_key(str(col)) for col in df_clean.columns]
-        
-        # Convertir tipos de datos apropiados
-        for column in df_clean.columns:
-            df_clean[column] = df_clean[column].apply(convert_to_json_value)
-        
+        # Columnas limpiadas de forma vectorizada según su dtype
+        df_clean = dataframe_cleaning.prepare_frame(df, clean_json_key)
+        df_clean = dataframe_cleaning.clean_frame(df_clean, dataframe_cleaning.json_column)
         return df_clean
         
     except Exception as e:
@@ -135,47 +268,6 @@ def clean_json_key(key):
     except Exception:
         return 'campo_error'
 
-def convert_to_json_value(value):
-    """Convertir valor a tipo apropiado para JSON"""
-    try:
-        # Manejar valores nulos
-        if pd.isna(value) or value is None:
-            return None
-        
-        # Convertir a string primero
-        str_value = str(value).strip()
-        
-        if str_value == '':
-            return None
-        
-        # Intentar convertir a número
-        try:
-            # Verificar si es entero
-            if str_value.isdigit() or (str_value.startswith('-') and str_value[1:].isdigit()):
-                return int(str_value)
-            
-            # Verificar si es float
-            float_val = float(str_value)
-            # Si es un entero representado como float, convertir a int
-            if float_val.is_integer():
-                return int(float_val)
-            return float_val
-            
-        except ValueError:
-            pass
-        
-        # Intentar convertir a booleano
-        if str_value.lower() in ['true', 'verdadero', 'sí', 'si', 'yes', '1']:
-            return True
-        elif str_value.lower() in ['false', 'falso', 'no', '0']:
-            return False
-        
-        # Mantener como string
-        return str_value
-        
-    except Exception:
-        return str(value) if value is not None else None
-
 def determine_best_json_format(df):
     """Determinar el mejor formato JSON basado en los datos"""
     try:
@@ -0,0 +1,7 @@
+from .csv_to_json import convert_streaming
+
+CONVERSION = ('csv', 'jsonl')
+
+def convert(input_path, output_path):
+    """Convierte CSV a JSON Lines (un registro por línea) leyendo por bloques"""
+    return convert_streaming(input_path, output_path, lines=True)
@@ -10,6 +10,7 @@ except ImportError:
     PANDOC_AVAILABLE = False
 
 CONVERSION = ('csv', 'pdf')
+CONCURRENCY = 'processes'
 
 def convert(input_path, output_path):
     """Convierte CSV a PDF con tabla formateada"""
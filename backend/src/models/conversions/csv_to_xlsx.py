@@ -6,7 +6,9 @@ from pathlib import Path
 # Importar librerías para Excel de alta calidad
 try:
     import openpyxl
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+    from openpyxl.utils import get_column_letter
     from openpyxl.utils.dataframe import dataframe_to_rows
     OPENPYXL_AVAILABLE = True
 except ImportError:
@@ -22,9 +24,28 @@ except ImportError:
 
 CONVERSION = ('csv', 'xlsx')
 
+# A partir de este tamaño se escribe en streaming con memoria constante
+STREAMING_THRESHOLD_MB = float(os.environ.get('CSV_XLSX_STREAMING_THRESHOLD_MB', 5))
+CHUNK_ROWS = int(os.environ.get('CSV_XLSX_CHUNK_ROWS', 50000))
+# Límite de Excel (1.048.576 filas) menos la cabecera; el resto pasa a otra hoja
+MAX_DATA_ROWS_PER_SHEET = 1048575
+SHEET_TITLE = "Datos CSV"
+
 def convert(input_path, output_path):
     """Convierte CSV a XLSX usando la mejor librería disponible"""
     
+    # Archivos grandes: lectura por bloques y escritura en streaming
+    if os.path.getsize(input_path) >= STREAMING_THRESHOLD_MB * 1024 * 1024:
+        for name, method, available in (('openpyxl write_only', convert_streaming_with_openpyxl, OPENPYXL_AVAILABLE),
+                                        ('xlsxwriter constant_memory', convert_streaming_with_xlsxwriter,
+                                         XLSXWRITER_AVAILABLE)):
+            if not available:
+                continue
+            success, message = method(input_path, output_path)
+            if success:
+                return True, f"Conversión CSV→XLSX exitosa con {name} - {message}"
+            logging.warning(f"{name} falló: {message}")
+
     # Método 1: pandas + openpyxl (RECOMENDADO - mejor calidad y formato)
     if OPENPYXL_AVAILABLE:
         try:
@@ -83,6 +104,163 @@ def convert_with_openpyxl(input_path, output_path):
     except Exception as e:
         return False, f"Error con openpyxl: {str(e)}"
 
+def read_csv_chunks(input_path, chunk_rows=None):
+    """Lee el CSV por bloques; los valores nulos se devuelven como None"""
+    encoding = detect_csv_encoding(input_path)
+    reader = pd.read_csv(input_path, encoding=encoding, chunksize=chunk_rows or CHUNK_ROWS)
+    for chunk in reader:
+        yield chunk.astype(object).where(chunk.notna(), None)
+
+
+def column_widths(chunk):
+    """Ancho de columna a partir de la cabecera y del primer bloque (máximo 50 caracteres)"""
+    widths = []
+    for column in chunk.columns:
+        lengths = chunk[column].astype(str).str.len()
+        longest = max(len(str(column)), int(lengths.max()) if len(lengths) else 0)
+        widths.append(min(longest + 2, 50))
+    return widths
+
+
+def professional_named_styles():
+    """Estilos con nombre compartidos por todas las celdas de cabecera y de datos"""
+    border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    header = NamedStyle(
+        name='anclora_header',
+        font=Font(name='Calibri', size=11, bold=True, color='FFFFFF'),
+        fill=PatternFill(start_color='366092', end_color='366092', fill_type='solid'),
+        alignment=Alignment(horizontal='center', vertical='center'),
+        border=border
+    )
+    data = NamedStyle(
+        name='anclora_data',
+        font=Font(name='Calibri', size=10),
+        alignment=Alignment(horizontal='left', vertical='center'),
+        border=border
+    )
+    return header, data
+
+
+def convert_streaming_with_openpyxl(input_path, output_path, chunk_rows=None):
+    """Conversión en streaming con openpyxl en modo write_only
+
+    La memoria no depende del número de filas: cada bloque se serializa al
+    escribirse. Todas las celdas referencian los mismos estilos con nombre y
+    se reutiliza una celda por columna en lugar de crear objetos por celda.
+    """
+    try:
+        wb = openpyxl.Workbook(write_only=True)
+        header_style, data_style = professional_named_styles()
+        wb.add_named_style(header_style)
+        wb.add_named_style(data_style)
+
+        ws, cells, sheet_rows = None, [], 0
+        total_rows, columns, sheets = 0, [], 0
+        for chunk in read_csv_chunks(input_path, chunk_rows):
+            if ws is None:
+                columns = [str(column) for column in chunk.columns]
+                widths = column_widths(chunk)
+            values = chunk.itertuples(index=False, name=None)
+            remaining = len(chunk)
+            while remaining:
+                if ws is None or sheet_rows == MAX_DATA_ROWS_PER_SHEET:
+                    sheets += 1
+                    ws = wb.create_sheet(SHEET_TITLE if sheets == 1 else f"{SHEET_TITLE} ({sheets})")
+                    # Anchos y paneles deben fijarse antes de la primera fila
+                    for index, width in enumerate(widths, start=1):
+                        ws.column_dimensions[get_column_letter(index)].width = width
+                    ws.freeze_panes = 'A2'
+                    header = []
+                    for name in columns:
+                        cell = WriteOnlyCell(ws, value=name)
+                        cell.style = header_style.name
+                        header.append(cell)
+                    ws.append(header)
+                    cells = [WriteOnlyCell(ws) for _ in columns]
+                    for cell in cells:
+                        cell.style = data_style.name
+                    sheet_rows = 0
+
+                batch = min(remaining, MAX_DATA_ROWS_PER_SHEET - sheet_rows)
+                for _ in range(batch):
+                    for cell, value in zip(cells, next(values)):
+                        cell.value = value
+                    ws.append(cells)
+                sheet_rows += batch
+                remaining -= batch
+                total_rows += batch
+
+        if not total_rows:
+            return False, "CSV vacío o sin datos válidos"
+
+        wb.save(output_path)
+
+        if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+            return True, f"Excel generado en streaming: {total_rows} filas, {len(columns)} columnas, {sheets} hoja(s)"
+        else:
+            return False, "Error: XLSX no se generó correctamente"
+
+    except Exception as e:
+        return False, f"Error con openpyxl en streaming: {str(e)}"
+
+
+def convert_streaming_with_xlsxwriter(input_path, output_path, chunk_rows=None):
+    """Conversión en streaming con xlsxwriter en modo constant_memory
+
+    Cada fila se escribe con los formatos compartidos de cabecera y datos.
+    """
+    try:
+        workbook = xlsxwriter.Workbook(output_path, {'constant_memory': True, 'nan_inf_to_errors': True})
+        header_format = workbook.add_format({
+            'bold': True,
+            'font_color': 'white',
+            'bg_color': '#366092',
+            'align': 'center',
+            'valign': 'vcenter',
+            'border': 1
+        })
+        data_format = workbook.add_format({
+            'align': 'left',
+            'valign': 'vcenter',
+            'border': 1
+        })
+
+        worksheet, sheet_rows = None, 0
+        total_rows, columns, sheets = 0, [], 0
+        try:
+            for chunk in read_csv_chunks(input_path, chunk_rows):
+                if worksheet is None:
+                    columns = [str(column) for column in chunk.columns]
+                    widths = column_widths(chunk)
+                for row in chunk.itertuples(index=False, name=None):
+                    if worksheet is None or sheet_rows == MAX_DATA_ROWS_PER_SHEET:
+                        sheets += 1
+                        worksheet = workbook.add_worksheet(SHEET_TITLE if sheets == 1 else f"{SHEET_TITLE} ({sheets})")
+                        for index, width in enumerate(widths):
+                            worksheet.set_column(index, index, width)
+                        worksheet.freeze_panes(1, 0)
+                        worksheet.write_row(0, 0, columns, header_format)
+                        sheet_rows = 0
+                    sheet_rows += 1
+                    worksheet.write_row(sheet_rows, 0, row, data_format)
+                    total_rows += 1
+        finally:
+            workbook.close()
+
+        if not total_rows:
+            os.remove(output_path)
+            return False, "CSV vacío o sin datos válidos"
+
+        return True, f"Excel generado en streaming: {total_rows} filas, {len(columns)} columnas, {sheets} hoja(s)"
+
+    except Exception as e:
+        return False, f"Error con xlsxwriter en streaming: {str(e)}"
+
 def convert_with_xlsxwriter(input_path, output_path):
     """Conversión usando pandas + xlsxwriter"""
     try:
@@ -0,0 +1,313 @@
+"""
+Limpieza de DataFrames compartida por los conversores de datos (CSV, JSON, XLSX)
+Cada columna se limpia con operaciones vectorizadas de pandas/NumPy según su
+dtype. Las columnas object con tipos mezclados (diccionarios, listas, fechas
+sueltas...) se pasan antes a texto; en JSON se recorren celda a celda con
+`json_cell`. Las funciones `*_cell` son la referencia de cada resultado.
+"""
+
+import json
+import re
+
+import numpy as np
+import pandas as pd
+from pandas.api import types as ptypes
+
+TRUE_WORDS = {'true', 'verdadero', 'sí', 'si', 'yes', '1'}
+FALSE_WORDS = {'false', 'falso', 'no', '0'}
+
+# Límite de Excel por celda
+EXCEL_MAX_CELL_CHARS = 32767
+# Caracteres de control que Excel (openpyxl) no admite en una celda
+ILLEGAL_CHARACTERS_RE = re.compile(r'[\000-\010]|[\013-\014]|[\016-\037]')
+
+INTEGER_RE = r'-?[0-9]+'
+# Subconjunto de la sintaxis de float(): lo que no encaja se trata como texto
+NUMBER_RE = r'[-+]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][-+]?[0-9]+)?|[-+]?(?:[iI][nN][fF](?:[iI][nN][iI][tT][yY])?)'
+DECIMAL_LIKE_RE = r'[-.0-9]*[0-9][-.0-9]*'
+
+# Tablas para str.translate: saltos de línea, comillas y caracteres de control en una sola pasada
+EXCEL_TRANSLATION = {ord('\n'): ' ', ord('\r'): ' ',
+                     **{code: None for code in range(32) if ILLEGAL_CHARACTERS_RE.match(chr(code))}}
+CSV_TRANSLATION = str.maketrans({'\n': ' ', '\r': ' ', '"': "'"})
+
+
+def prepare_frame(df, column_name):
+    """Copia sin filas ni columnas completamente vacías y con nombres de columna limpios"""
+    df_clean = df.dropna(how='all').dropna(axis=1, how='all').copy()
+    df_clean.columns = [column_name(str(col)) for col in df_clean.columns]
+    return df_clean
+
+
+def clean_frame(df, column_cleaner, **options):
+    """Aplica `column_cleaner` a cada columna (por posición: admite nombres repetidos)"""
+    if df.shape[1] == 0:
+        return df
+    columns = [column_cleaner(df.iloc[:, i], **options) for i in range(df.shape[1])]
+    cleaned = pd.concat(columns, axis=1)
+    cleaned.columns = df.columns
+    return cleaned
+
+
+def _is_text(series) -> bool:
+    return ptypes.is_object_dtype(series.dtype) or ptypes.is_string_dtype(series.dtype)
+
+
+def _needs_cell_fallback(series) -> bool:
+    """Columnas object cuyos valores no son todos cadenas"""
+    if not _is_text(series):
+        return False
+    return pd.api.types.infer_dtype(series, skipna=True) not in ('string', 'empty')
+
+
+def _datetime_strings(series, sep=' '):
+    """Texto de una columna datetime igual al de str()/isoformat() de cada Timestamp"""
+    values = series.dropna()
+    if getattr(series.dt, 'tz', None) is not None or (
+            len(values) and ((values.dt.microsecond != 0) | (values.dt.nanosecond != 0)).any()):
+        formatter = str if sep == ' ' else pd.Timestamp.isoformat
+        return series.map(lambda value: formatter(value) if not pd.isna(value) else None)
+    return series.dt.strftime(f'%Y-%m-%d{sep}%H:%M:%S')
+
+
+def _as_strings(series):
+    """Texto de cada celda (como str(valor)) para columnas sin tipos mezclados"""
+    if ptypes.is_datetime64_any_dtype(series.dtype):
+        return _datetime_strings(series)
+    return series.astype(str)
+
+
+def _object_result(values, index, name):
+    return pd.Series(values, index=index, name=name, dtype=object)
+
+
+def _mixed_as_text(series, nested_as_json=True):
+    """Texto de una columna con tipos mezclados: str(valor), o JSON compacto para dict/list
+
+    Devuelve la columna de texto (nulos conservados) y la máscara de celdas JSON.
+    """
+    values = series.to_numpy(dtype=object)
+    missing = series.isna().to_numpy()
+    nested = np.fromiter((isinstance(v, (dict, list)) for v in values), dtype=bool, count=len(values))
+    nested &= ~missing & nested_as_json
+    text = [None if na else (json.dumps(v, ensure_ascii=False, separators=(',', ':')) if is_json else str(v))
+            for v, na, is_json in zip(values, missing, nested)]
+    return _object_result(text, series.index, series.name), nested
+
+
+# --- JSON -------------------------------------------------------------------
+
+def json_cell(value, timestamps_iso=False):
+    """Convertir valor a tipo apropiado para JSON"""
+    try:
+        # Manejar valores nulos
+        if value is None or pd.isna(value):
+            return None
+
+        # Manejar fechas de Excel
+        if timestamps_iso and isinstance(value, pd.Timestamp):
+            return value.isoformat()
+
+        # Convertir a string primero
+        str_value = str(value).strip()
+
+        if str_value == '':
+            return None
+
+        # Intentar convertir a número
+        try:
+            # Verificar si es entero
+            if str_value.isdigit() or (str_value.startswith('-') and str_value[1:].isdigit()):
+                return int(str_value)
+
+            # Verificar si es float
+            float_val = float(str_value)
+            # Si es un entero representado como float, convertir a int
+            if float_val.is_integer():
+                return int(float_val)
+            return float_val
+
+        except ValueError:
+            pass
+
+        # Intentar convertir a booleano
+        if str_value.lower() in TRUE_WORDS:
+            return True
+        elif str_value.lower() in FALSE_WORDS:
+            return False
+
+        # Mantener como string
+        return str_value
+
+    except Exception:
+        return str(value) if value is not None else None
+
+
+def _json_floats(values):
+    """Floats a int cuando son enteros y finitos; NaN a None"""
+    if isinstance(values, pd.Series):
+        values = values.to_numpy(dtype=float, na_value=np.nan)
+    array = np.asarray(values, dtype=float)
+    result = array.astype(object)
+    integral = np.isfinite(array) & (np.floor(array) == array)
+    result[integral] = [int(v) for v in array[integral]]
+    result[np.isnan(array)] = None
+    return result
+
+
+def json_column(series, timestamps_iso=False):
+    """Columna con los mismos valores que `json_cell` aplicada celda a celda"""
+    index, name = series.index, series.name
+    if ptypes.is_bool_dtype(series.dtype):
+        return series.astype(object)
+    if ptypes.is_integer_dtype(series.dtype) and not series.hasnans:
+        return _object_result(series.tolist(), index, name)
+    if ptypes.is_numeric_dtype(series.dtype):
+        return _object_result(_json_floats(series), index, name)
+    if ptypes.is_datetime64_any_dtype(series.dtype):
+        text = _datetime_strings(series, sep='T' if timestamps_iso else ' ')
+        return text.astype(object).where(series.notna(), None)
+    if _needs_cell_fallback(series):
+        return _object_result([json_cell(v, timestamps_iso) for v in series], index, name)
+
+    text = series.str.strip()
+    values = text.to_numpy(dtype=object, na_value=None)
+    result = values.copy()
+    empty = (text.isna() | (text == '')).to_numpy(dtype=bool, na_value=True)
+    result[empty] = None
+
+    number = text.str.fullmatch(NUMBER_RE).to_numpy(dtype=bool, na_value=False)
+    integer = number & text.str.fullmatch(INTEGER_RE).to_numpy(dtype=bool, na_value=False)
+    result[integer] = [int(v) for v in values[integer]]
+    decimal = number & ~integer
+    result[decimal] = _json_floats(values[decimal].astype(float))
+
+    words = ~empty & ~number
+    lowered = pd.Series(values[words], dtype=object).str.lower()
+    positions = np.flatnonzero(words)
+    result[positions[lowered.isin(TRUE_WORDS).to_numpy()]] = True
+    result[positions[lowered.isin(FALSE_WORDS).to_numpy()]] = False
+    return _object_result(result, index, name)
+
+
+# --- Excel ------------------------------------------------------------------
+
+def excel_cell(value):
+    """Limpiar valor de celda para Excel"""
+    try:
+        # Manejar valores nulos
+        if value is None or pd.isna(value):
+            return ''
+    except (TypeError, ValueError):
+        pass  # Listas y arrays: pd.isna devuelve un array
+    try:
+        # Si es un diccionario o lista, convertir a JSON string
+        if isinstance(value, (dict, list)):
+            str_value = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+        else:
+            str_value = str(value)
+
+        # Limpiar caracteres problemáticos
+        str_value = ILLEGAL_CHARACTERS_RE.sub('', str_value.replace('\n', ' ').replace('\r', ' '))
+
+        # Excel tiene límite de 32,767 caracteres por celda
+        if len(str_value) > EXCEL_MAX_CELL_CHARS:
+            str_value = str_value[:EXCEL_MAX_CELL_CHARS - 3] + '...'
+
+        return str_value.strip()
+
+    except Exception:
+        return str(value) if value is not None else ''
+
+
+def excel_column(series):
+    """Columna de texto para Excel: nulos vacíos, sin saltos de línea ni caracteres de control"""
+    if _needs_cell_fallback(series):
+        # Mismo resultado que excel_cell: los dict/list se limpian ya como JSON
+        text, _ = _mixed_as_text(series)
+        return excel_column(text)
+    if not _is_text(series):
+        # Números, booleanos y fechas no contienen saltos de línea ni caracteres de control
+        result = _as_strings(series).to_numpy(dtype=object, copy=True)
+    else:
+        text = series.str.translate(EXCEL_TRANSLATION)
+        too_long = (text.str.len() > EXCEL_MAX_CELL_CHARS).to_numpy(dtype=bool, na_value=False)
+        result = text.str.strip().to_numpy(dtype=object, copy=True)
+        if too_long.any():
+            # Se recorta antes de quitar espacios, como en excel_cell
+            result[too_long] = (text[too_long].str.slice(0, EXCEL_MAX_CELL_CHARS - 3) + '...').str.strip()
+    result[series.isna().to_numpy()] = ''
+    return _object_result(result, series.index, series.name)
+
+
+# --- CSV --------------------------------------------------------------------
+
+def csv_cell(value, nested_as_json=False, trim_integral_floats=False):
+    """Limpiar valor de celda para CSV"""
+    try:
+        # Manejar valores nulos
+        if value is None or pd.isna(value):
+            return ''
+    except (TypeError, ValueError):
+        pass
+    try:
+        # Si es un diccionario o lista, convertir a JSON string
+        if nested_as_json and isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+        # Convertir a string
+        str_value = str(value)
+
+        # Limpiar caracteres problemáticos
+        str_value = str_value.replace('\n', ' ').replace('\r', ' ')
+        str_value = str_value.replace('"', "'")
+
+        # Manejar valores numéricos con decimales innecesarios
+        if trim_integral_floats:
+            try:
+                if '.' in str_value and str_value.replace('.', '').replace('-', '').isdigit():
+                    float_val = float(str_value)
+                    if float_val.is_integer():
+                        return str(int(float_val))
+            except ValueError:
+                pass
+
+        return str_value.strip()
+
+    except Exception:
+        return str(value) if value is not None else ''
+
+
+def _trimmed_float_strings(series):
+    """str() de cada float, sin '.0' en los enteros que str() no escribe en notación científica"""
+    array = series.to_numpy(dtype=float, na_value=np.nan)
+    result = series.astype(str).to_numpy(dtype=object, copy=True)
+    integral = np.isfinite(array) & (np.floor(array) == array) & (np.abs(array) < 1e16)
+    result[integral] = array[integral].astype(np.int64).astype(str)
+    return result
+
+
+def csv_column(series, nested_as_json=False, trim_integral_floats=False):
+    """Columna de texto para CSV: nulos vacíos, sin saltos de línea ni comillas dobles"""
+    if _needs_cell_fallback(series):
+        # Mismo resultado que csv_cell: el JSON de dict/list se escribe sin limpiar
+        text, nested = _mixed_as_text(series, nested_as_json)
+        result = csv_column(text, trim_integral_floats=trim_integral_floats).to_numpy(dtype=object, copy=True)
+        result[nested] = text.to_numpy(dtype=object)[nested]
+        return _object_result(result, series.index, series.name)
+    if trim_integral_floats and ptypes.is_float_dtype(series.dtype):
+        result = _trimmed_float_strings(series)
+    elif not _is_text(series):
+        result = _as_strings(series).to_numpy(dtype=object, copy=True)
+    else:
+        text = series.str.translate(CSV_TRANSLATION)
+        result = text.str.strip().to_numpy(dtype=object, copy=True)
+        if trim_integral_floats:
+            candidates = (text.str.contains('.', regex=False) & text.str.fullmatch(DECIMAL_LIKE_RE))
+            positions = np.flatnonzero(candidates.to_numpy(dtype=bool, na_value=False))
+            numbers = pd.to_numeric(pd.Series(text.to_numpy(dtype=object)[positions], dtype=object),
+                                    errors='coerce').to_numpy(dtype=float)
+            integral = np.isfinite(numbers) & (np.floor(numbers) == numbers)
+            result[positions[integral]] = [str(int(v)) for v in numbers[integral]]
+    result[series.isna().to_numpy()] = ''
+    return _object_result(result, series.index, series.name)
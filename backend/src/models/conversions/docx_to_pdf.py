@@ -4,6 +4,7 @@ from fpdf import FPDF
 from docx import Document
 
 CONVERSION = ('docx', 'pdf')
+CONCURRENCY = 'processes'
 
 def convert(input_path, output_path):
     """Convierte DOCX a PDF con validación mejorada"""
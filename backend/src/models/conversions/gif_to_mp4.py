@@ -12,6 +12,8 @@ except ImportError:
     logging.warning("MoviePy no disponible para GIF→MP4 de alta calidad")
 
 CONVERSION = ('gif', 'mp4')
+CONCURRENCY = 'threads'
+MAX_CONCURRENCY = 2
 
 def convert(input_path, output_path):
     """Convierte GIF a MP4 usando la mejor librería disponible"""
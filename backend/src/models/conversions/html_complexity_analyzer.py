@@ -5,10 +5,18 @@ Analiza el contenido HTML y recomienda la biblioteca más adecuada
 
 import re
 import os
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
 from bs4 import BeautifulSoup
-from typing import Dict, List, Tuple
+from typing import Dict, List, Set, Tuple
 import logging
 
+try:
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
 # Import optimization system
 try:
     from ...services.intelligent_optimization import get_cached_analysis, cache_analysis, record_performance
@@ -19,10 +27,165 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Modo por defecto: 'single_pass' (escáner combinado) o 'soup' (BeautifulSoup + búsquedas sueltas)
+DEFAULT_ANALYZER_MODE = os.environ.get('HTML_ANALYZER_MODE', 'single_pass')
+
+ADVANCED_CSS = [
+    'transform:', 'transition:', 'animation:', '@keyframes',
+    'box-shadow:', 'text-shadow:', 'border-radius:',
+    'backdrop-filter:', 'filter:', 'clip-path:'
+]
+
+# Un único autómata con todos los marcadores de texto, factorizado por primer
+# carácter para descartar rápido cada posición. Las colas de font-family e
+# @import se comprueban aparte para no consumir el resto de la línea.
+_TEXT_TOKENS = (
+    r'-(?:moz-linear-gradient|webkit-gradient)'
+    r'|@(?:font-face|import|media\s+print|page|keyframes)'
+    r'|f(?:onts\.(?:googleapis|gstatic)\.com|ont-family|ilter:)'
+    r'|(?:linear|radial|conic)-gradient'
+    r'|clip-path:'
+    r'|t(?:ransform:|ransition:|ext-shadow:)'
+    r'|animation:'
+    r'|b(?:ox-shadow:|order-radius:|ackdrop-filter:)'
+)
+FEATURE_SCANNER = re.compile(r'(?=[-@flrctab])(?:' + _TEXT_TOKENS + ')')
+FEATURE_SCANNER_I = re.compile(_TEXT_TOKENS, re.IGNORECASE)
+FONT_FAMILY_TAIL = re.compile(r'\s*:\s*["\'][^"\']*["\']')
+FONT_IMPORT_TAIL = re.compile(r'.*font', re.IGNORECASE)
+
+# Marcadores que el análisis original busca respetando mayúsculas
+CASE_SENSITIVE_TOKENS = {'fonts.googleapis.com': 'google_fonts', 'fonts.gstatic.com': 'google_fonts',
+                         '@font-face': 'font_face'}
+
+# Letras no ASCII que IGNORECASE equipara a letras ASCII; sin ellas basta con lower()
+_ASCII_CASEFOLD_EXCEPTIONS = ('İ', 'ı', 'ſ', 'K')
+
+BACKGROUND_IMAGE_STYLE = re.compile(r'background.*image', re.I)
+GRID_FLEX_STYLE = re.compile(r'display:\s*(grid|flex)', re.I)
+LAYOUT_CLASS = re.compile(r'col|grid|flex', re.I)
+POSITIONED_STYLE = re.compile(r'position:\s*(absolute|fixed|sticky)', re.I)
+
+
+@dataclass
+class FeatureScan:
+    """Observaciones de una pasada sobre el HTML, antes de puntuar"""
+    google_fonts: bool = False
+    font_face: bool = False
+    font_declaration: bool = False
+    gradient: bool = False
+    advanced_css: Set[str] = field(default_factory=set)
+    print_styles: bool = False
+    background_image: bool = False
+    svg: bool = False
+    media_elements: int = 0
+    grid_flex_style: bool = False
+    layout_class: bool = False
+    positioned: int = 0
+    script: bool = False
+    external_resources: bool = False
+
+    def scan_text(self, html_content: str):
+        """Recorre el texto una sola vez con el autómata combinado"""
+        lowered = html_content.lower()
+        if len(lowered) == len(html_content) and \
+                not any(ch in html_content for ch in _ASCII_CASEFOLD_EXCEPTIONS):
+            text, scanner = lowered, FEATURE_SCANNER
+        else:
+            text, scanner = html_content, FEATURE_SCANNER_I
+
+        for match in scanner.finditer(text):
+            token = match.group().lower()
+            if token in CASE_SENSITIVE_TOKENS:
+                if html_content[match.start():match.end()] == token:
+                    setattr(self, CASE_SENSITIVE_TOKENS[token], True)
+            elif token.endswith('-gradient'):
+                self.gradient = True
+            elif token == 'font-family':
+                if not self.font_declaration and FONT_FAMILY_TAIL.match(text, match.end()):
+                    self.font_declaration = True
+            elif token == '@import':
+                if not self.font_declaration and FONT_IMPORT_TAIL.match(text, match.end()):
+                    self.font_declaration = True
+            elif token == '@page' or token.startswith('@media'):
+                self.print_styles = True
+            else:
+                self.advanced_css.add(token)
+                if token == 'backdrop-filter:':
+                    # 'filter:' queda dentro de la coincidencia
+                    self.advanced_css.add('filter:')
+
+    def start_tag(self, tag: str, attrs: Dict[str, str]):
+        """Registra una etiqueta de apertura del tokenizador"""
+        style = attrs.get('style')
+        if style:
+            if not self.background_image and BACKGROUND_IMAGE_STYLE.search(style):
+                self.background_image = True
+            if not self.grid_flex_style and GRID_FLEX_STYLE.search(style):
+                self.grid_flex_style = True
+            if POSITIONED_STYLE.search(style):
+                self.positioned += 1
+        css_class = attrs.get('class')
+        if css_class and not self.layout_class and LAYOUT_CLASS.search(css_class):
+            self.layout_class = True
+
+        if tag == 'svg':
+            self.svg = True
+        elif tag in ('img', 'picture', 'source'):
+            self.media_elements += 1
+        elif tag == 'script':
+            self.script = True
+            if 'src' in attrs:
+                self.external_resources = True
+        elif tag == 'link' and 'href' in attrs:
+            self.external_resources = True
+
+
+class _LxmlTarget:
+    """Destino SAX para el parser HTML de lxml (no construye árbol)"""
+
+    def __init__(self, scan: FeatureScan):
+        self.scan = scan
+
+    def start(self, tag, attrib):
+        self.scan.start_tag(tag, attrib)
+
+    def close(self):
+        return self.scan
+
+
+class _StdlibTagScanner(HTMLParser):
+    """Tokenizador de la librería estándar, el mismo que usa BeautifulSoup con 'html.parser'"""
+
+    def __init__(self, scan: FeatureScan):
+        super().__init__(convert_charrefs=True)
+        self.scan = scan
+
+    def handle_starttag(self, tag, attrs):
+        self.scan.start_tag(tag, {name: value or '' for name, value in attrs})
+
+
+def scan_html(html_content: str, chunk_size: int = 1024 * 1024) -> FeatureScan:
+    """Obtiene las observaciones con un escaneo de texto y un tokenizador en streaming"""
+    scan = FeatureScan()
+    scan.scan_text(html_content)
+    if LXML_AVAILABLE and html_content:
+        parser = etree.HTMLParser(target=_LxmlTarget(scan))
+        for start in range(0, len(html_content), chunk_size):
+            parser.feed(html_content[start:start + chunk_size])
+        parser.close()
+    else:
+        tokenizer = _StdlibTagScanner(scan)
+        tokenizer.feed(html_content)
+        tokenizer.close()
+    return scan
+
+
 class HTMLComplexityAnalyzer:
     """Analiza la complejidad de un archivo HTML para recomendar el mejor método de conversión"""
     
-    def __init__(self):
+    def __init__(self, mode: str = None):
+        self.mode = mode or DEFAULT_ANALYZER_MODE
         self.complexity_score = 0
         self.features = {
             'custom_fonts': False,
@@ -69,17 +232,20 @@ class HTMLComplexityAnalyzer:
         self.complexity_score = 0
         self._reset_features()
         
-        # Parsear HTML
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Analizar diferentes aspectos
-        self._analyze_fonts(html_content, soup)
-        self._analyze_css_complexity(html_content, soup)
-        self._analyze_images_and_media(soup, base_path)
-        self._analyze_layout_complexity(soup)
-        self._analyze_javascript(soup)
-        self._analyze_external_resources(soup)
-        self._analyze_print_styles(html_content)
+        if self.mode == 'single_pass':
+            self._score_scan(scan_html(html_content))
+        else:
+            # Parsear HTML
+            soup = BeautifulSoup(html_content, 'html.parser')
+            
+            # Analizar diferentes aspectos
+            self._analyze_fonts(html_content, soup)
+            self._analyze_css_complexity(html_content, soup)
+            self._analyze_images_and_media(soup, base_path)
+            self._analyze_layout_complexity(soup)
+            self._analyze_javascript(soup)
+            self._analyze_external_resources(soup)
+            self._analyze_print_styles(html_content)
         
         # Calcular puntuación final
         total_score = self._calculate_total_score()
@@ -103,6 +269,62 @@ class HTMLComplexityAnalyzer:
         for key in self.features:
             self.features[key] = False
     
+    def _score_scan(self, scan: FeatureScan):
+        """Aplica a una pasada única las mismas reglas que los análisis por separado"""
+        # Fuentes
+        if scan.google_fonts:
+            self.features['custom_fonts'] = True
+            self.complexity_score += 15
+        if scan.font_face:
+            self.features['custom_fonts'] = True
+            self.complexity_score += 20
+        if scan.font_declaration:
+            self.features['custom_fonts'] = True
+            self.complexity_score += 10
+        
+        # CSS
+        if scan.gradient:
+            self.features['gradients'] = True
+            self.complexity_score += 25
+        if scan.advanced_css:
+            self.features['complex_css'] = True
+            self.complexity_score += min(len(scan.advanced_css) * 8, 40)
+        if scan.advanced_css & {'@keyframes', 'animation:'}:
+            self.features['animations'] = True
+            self.complexity_score += 20
+        
+        # Imágenes y multimedia
+        if scan.background_image:
+            self.features['background_images'] = True
+            self.complexity_score += 15
+        if scan.svg:
+            self.features['svg_content'] = True
+            self.complexity_score += 20
+        if scan.media_elements > 5:
+            self.complexity_score += min(scan.media_elements * 2, 30)
+        
+        # Layout
+        if scan.grid_flex_style:
+            self.features['advanced_layout'] = True
+            self.complexity_score += 15
+        if scan.layout_class:
+            self.features['advanced_layout'] = True
+            self.complexity_score += 10
+        self.complexity_score += scan.positioned * 5
+        
+        # JavaScript y recursos externos
+        if scan.script:
+            self.features['javascript'] = True
+            self.complexity_score += 10
+        if scan.external_resources:
+            self.features['external_resources'] = True
+            self.complexity_score += 10
+        
+        # Estilos de impresión
+        if scan.print_styles:
+            self.features['print_styles'] = True
+            self.complexity_score += 15
+    
     def _analyze_fonts(self, html_content: str, soup: BeautifulSoup):
         """Analiza el uso de fuentes personalizadas"""
         # Google Fonts
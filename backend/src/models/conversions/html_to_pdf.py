@@ -1,5 +1,7 @@
 import os, shutil, tempfile, uuid
+import queue
 import re
+import threading
 import time
 from html import unescape
 import logging
@@ -30,11 +32,12 @@ except ImportError:
     logging.warning("Pandoc engine no disponible para HTML→PDF")
 
 # Try to import Playwright for browser-based HTML to PDF conversion
+# (pool de navegadores calientes compartido por proceso)
 try:
-    from playwright.sync_api import sync_playwright
-    PLAYWRIGHT_AVAILABLE = True
+    from ...services.browser_pool import browser_pool, PLAYWRIGHT_AVAILABLE
 except ImportError:
     PLAYWRIGHT_AVAILABLE = False
+if not PLAYWRIGHT_AVAILABLE:
     logging.warning("Playwright no disponible para HTML→PDF")
 
 # Try to import pdfkit (wkhtmltopdf wrapper) for high-quality HTML to PDF
@@ -53,6 +56,14 @@ except ImportError:
     COMPLEXITY_ANALYZER_AVAILABLE = False
     logging.warning("Analizador de complejidad HTML no disponible")
 
+# Import adaptive method selector (learns per-complexity success rates and latencies)
+try:
+    from ...services.method_selector import method_selector
+    SELECTOR_AVAILABLE = True
+except ImportError:
+    SELECTOR_AVAILABLE = False
+    logging.warning("Selector adaptativo de métodos no disponible")
+
 # Import essential converter for budget-friendly conversions
 try:
     from .essential_converter import EssentialConverter
@@ -65,6 +76,20 @@ except ImportError:
 from fpdf import FPDF
 
 CONVERSION = ('html', 'pdf')
+CONCURRENCY = 'threads'
+MAX_CONCURRENCY = 2
+
+# Plazo máximo por método (segundos): un fallo lento no consume el tiempo de los demás
+METHOD_DEADLINES = {
+    'playwright': 30,
+    'wkhtmltopdf': 30,
+    'pandoc': 60,
+    'weasyprint': 30,
+    'fpdf': 15
+}
+
+# sequential: un método tras otro; race: los dos primeros candidatos en paralelo
+EXECUTION_MODE = os.environ.get('HTML_PDF_EXECUTION_MODE', 'sequential')
 
 def convert(input_path, output_path):
     """Convierte HTML a PDF usando selección inteligente de método basada en complejidad"""
@@ -89,31 +114,42 @@ def convert(input_path, output_path):
             logging.info(f"Método recomendado: {analysis['recommended_method']}")
             logging.info(f"Razón: {analysis['reasoning']}")
 
-            # Intentar conversión con métodos en orden de prioridad recomendado
-            method_used = None
-            for method in analysis['method_priority']:
-                success, message = try_conversion_method(method, input_path, output_path)
-                method_used = method
-                if success:
-                    duration = time.time() - start_time
-                    final_message = f"{message} | Análisis: {analysis['complexity_level']} | Tiempo estimado: {analysis['estimated_time']}"
-
-                    # Log de monitoreo para conversión exitosa
-                    if MONITORING_AVAILABLE:
-                        log_conversion(
-                            conversion_id=conversion_id,
-                            input_format="html",
-                            output_format="pdf",
-                            file_size_mb=input_size_mb,
-                            duration_seconds=duration,
-                            method_used=method,
-                            success=True,
-                            user_id=None
-                        )
-
-                    return True, final_message
-                else:
-                    logging.warning(f"Método {method} falló: {message}")
+            # Prioridad recomendada (solo métodos instalados), reordenada con lo aprendido
+            method_priority = [m for m in analysis['method_priority'] if is_method_available(m)]
+            if SELECTOR_AVAILABLE:
+                method_priority = method_selector.order_methods(analysis['complexity_level'], method_priority)
+
+                def record_attempt(method, duration, success, message, produced_path):
+                    method_selector.record_attempt(
+                        method, analysis['complexity_level'], analysis['complexity_score'],
+                        analysis['recommended_method'], input_path, produced_path,
+                        duration, success, None if success else message
+                    )
+            else:
+                record_attempt = None
+
+            # Intentar conversión con plazos por método (y en carrera si está activado)
+            success, message, method = convert_with_methods(
+                method_priority, input_path, output_path, on_attempt=record_attempt
+            )
+            if success:
+                duration = time.time() - start_time
+                final_message = f"{message} | Análisis: {analysis['complexity_level']} | Tiempo estimado: {analysis['estimated_time']}"
+
+                # Log de monitoreo para conversión exitosa
+                if MONITORING_AVAILABLE:
+                    log_conversion(
+                        conversion_id=conversion_id,
+                        input_format="html",
+                        output_format="pdf",
+                        file_size_mb=input_size_mb,
+                        duration_seconds=duration,
+                        method_used=method,
+                        success=True,
+                        user_id=None
+                    )
+
+                return True, final_message
 
             # Si todos los métodos recomendados fallan, usar fallback
             success, message = convert_with_fpdf_enhanced(input_path, output_path)
@@ -179,6 +215,16 @@ def convert(input_path, output_path):
 
         return False, error_message
 
+def is_method_available(method: str) -> bool:
+    """Indica si la dependencia del método está instalada"""
+    return {
+        'playwright': PLAYWRIGHT_AVAILABLE,
+        'wkhtmltopdf': PDFKIT_AVAILABLE,
+        'pandoc': PANDOC_HTML_PDF_AVAILABLE,
+        'weasyprint': WEASYPRINT_AVAILABLE,
+        'fpdf': True
+    }.get(method, False)
+
 def try_conversion_method(method: str, input_path: str, output_path: str) -> tuple:
     """Intenta conversión con un método específico"""
     try:
@@ -197,6 +243,123 @@ def try_conversion_method(method: str, input_path: str, output_path: str) -> tup
     except Exception as e:
         return False, f"Error en método {method}: {str(e)}"
 
+def _is_valid_pdf(path: str) -> bool:
+    try:
+        with open(path, 'rb') as f:
+            return f.read(5) == b'%PDF-'
+    except OSError:
+        return False
+
+
+class _MethodAttempt:
+    """Intento de un método en su propio hilo, escribiendo en un archivo temporal"""
+
+    def __init__(self, method: str, input_path: str, output_path: str, results: queue.Queue):
+        root, ext = os.path.splitext(output_path)
+        self.method = method
+        self.temp_path = f"{root}.{method}-part{ext}"
+        self.start_time = time.time()
+        self.deadline = self.start_time + METHOD_DEADLINES.get(method, 30)
+        self.duration = None
+        self.success = False
+        self.message = ''
+        self._finished = False
+        self._abandoned = False
+        self._lock = threading.Lock()
+        self._results = results
+        threading.Thread(target=self._run, args=(input_path,), daemon=True,
+                         name=f'html-pdf-{method}').start()
+
+    def _run(self, input_path):
+        success, message = try_conversion_method(self.method, input_path, self.temp_path)
+        if success and not _is_valid_pdf(self.temp_path):
+            success, message = False, f"Método {self.method} no generó un PDF válido"
+        with self._lock:
+            self.duration = time.time() - self.start_time
+            self.success, self.message = success, message
+            self._finished = True
+            if self._abandoned:
+                self._discard()
+        self._results.put(self)
+
+    def _discard(self):
+        if os.path.exists(self.temp_path):
+            try:
+                os.remove(self.temp_path)
+            except OSError:
+                pass
+
+    def abandon(self):
+        """Descarta el resultado; si el método sigue en curso, se borra al terminar"""
+        with self._lock:
+            self._abandoned = True
+            if self._finished:
+                self._discard()
+
+    def accept(self, output_path: str):
+        os.replace(self.temp_path, output_path)
+
+
+def _wait_first_valid(attempts, results: queue.Queue, on_attempt=None):
+    """Espera al primer intento válido respetando el plazo de cada uno"""
+    remaining = set(attempts)
+    while remaining:
+        timeout = max(0.0, min(a.deadline for a in remaining) - time.time())
+        try:
+            attempt = results.get(timeout=timeout)
+        except queue.Empty:
+            now = time.time()
+            for attempt in [a for a in remaining if a.deadline <= now]:
+                remaining.discard(attempt)
+                attempt.abandon()
+                attempt.message = f"Método {attempt.method} superó su plazo de {METHOD_DEADLINES.get(attempt.method, 30)}s"
+                logging.warning(attempt.message)
+                if on_attempt:
+                    on_attempt(attempt.method, now - attempt.start_time, False, attempt.message,
+                               attempt.temp_path)
+            continue
+
+        if attempt not in remaining:
+            continue
+        remaining.discard(attempt)
+        if on_attempt:
+            on_attempt(attempt.method, attempt.duration, attempt.success, attempt.message,
+                       attempt.temp_path)
+        if attempt.success:
+            return attempt
+        logging.warning(f"Método {attempt.method} falló: {attempt.message}")
+    return None
+
+
+def convert_with_methods(methods, input_path: str, output_path: str, mode: str = None,
+                         on_attempt=None) -> tuple:
+    """Prueba los métodos en orden con plazo por método
+
+    En modo 'race' los dos primeros candidatos de cada tanda compiten en
+    paralelo y gana el primer PDF válido; el resto se abandona. Devuelve
+    (éxito, mensaje, método ganador).
+    """
+    mode = mode or EXECUTION_MODE
+    width = 2 if mode == 'race' else 1
+    pending = list(methods)
+    messages = []
+
+    while pending:
+        batch, pending = pending[:width], pending[width:]
+        results = queue.Queue()
+        attempts = [_MethodAttempt(method, input_path, output_path, results) for method in batch]
+        winner = _wait_first_valid(attempts, results, on_attempt)
+        for attempt in attempts:
+            if attempt is not winner:
+                attempt.abandon()
+                if attempt.message:
+                    messages.append(attempt.message)
+        if winner:
+            winner.accept(output_path)
+            return True, winner.message, winner.method
+
+    return False, '; '.join(messages) or "Ningún método disponible", None
+
 def convert_with_fixed_priority(input_path: str, output_path: str) -> tuple:
     """Sistema de conversión con prioridad fija (fallback)"""
     methods = [
@@ -223,36 +386,8 @@ def convert_with_fixed_priority(input_path: str, output_path: str) -> tuple:
 def convert_with_playwright(input_path, output_path):
     """Conversión HTML a PDF usando Playwright (máxima fidelidad para HTML moderno)"""
     try:
-        with sync_playwright() as p:
-            # Usar Chromium para mejor compatibilidad CSS
-            browser = p.chromium.launch()
-            page = browser.new_page()
-
-            # Configurar viewport para A4
-            page.set_viewport_size({"width": 794, "height": 1123})  # A4 en pixels a 96 DPI
-
-            # Cargar el archivo HTML
-            page.goto(f"file://{os.path.abspath(input_path)}")
-
-            # Esperar a que se carguen todos los recursos
-            page.wait_for_load_state("networkidle")
-
-            # Generar PDF con configuraciones optimizadas
-            page.pdf(
-                path=output_path,
-                format="A4",
-                margin={
-                    "top": "20mm",
-                    "bottom": "20mm",
-                    "left": "20mm",
-                    "right": "20mm"
-                },
-                print_background=True,  # Incluir fondos CSS
-                prefer_css_page_size=True,  # Respetar CSS @page
-                display_header_footer=False
-            )
-
-            browser.close()
+        # Chromium ya arrancado en el pool; cada trabajo usa un contexto aislado
+        browser_pool.render_pdf(input_path, output_path)
 
         return True, "Conversión exitosa con Playwright (máxima fidelidad HTML moderno)"
 
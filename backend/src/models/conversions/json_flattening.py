@@ -0,0 +1,230 @@
+"""
+Aplanado de JSON para los conversores tabulares
+Los objetos anidados se recorren con una pila explícita (sin recursión) y cada
+registro se escribe directamente en columnas preasignadas según un esquema
+(FlatSchema) inferido de una muestra y ampliado si aparecen claves nuevas. Los
+arrays de primer nivel se pueden leer elemento a elemento (ijson si está
+instalado, si no `json.JSONDecoder.raw_decode`).
+"""
+
+import json
+import os
+import re
+from itertools import islice
+
+import pandas as pd
+
+# Parser JSON en streaming (opcional)
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# Registros con los que se infiere el esquema de columnas
+SCHEMA_SAMPLE_RECORDS = int(os.environ.get('JSON_FLATTEN_SAMPLE_RECORDS', 1000))
+READ_SIZE = 1 << 16
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# Resto de búfer que podría ser la continuación de un número cortado ("22." + "5e3")
+_NUMBER_TAIL = re.compile(r'[-+.eE0-9]*\Z')
+
+
+def iter_leaves(obj, sep='.', expand_lists=False, parent_key=''):
+    """(clave, valor) de cada hoja en orden de aparición
+
+    Los objetos se aplanan uniendo claves con `sep`; las listas solo con
+    `expand_lists` (por índice). Los contenedores vacíos son hojas.
+    """
+    if not isinstance(obj, (dict, list)) or (isinstance(obj, list) and not expand_lists):
+        yield parent_key, obj
+        return
+    stack = [(parent_key, iter(obj.items() if isinstance(obj, dict) else enumerate(obj)))]
+    while stack:
+        prefix, items = stack[-1]
+        for key, value in items:
+            name = f"{prefix}{sep}{key}" if prefix else str(key)
+            if value and (isinstance(value, dict) or (expand_lists and isinstance(value, list))):
+                stack.append((name, iter(value.items() if isinstance(value, dict) else enumerate(value))))
+                break
+            yield name, value
+        else:
+            stack.pop()
+
+
+def flatten(obj, parent_key='', sep='_', expand_lists=True):
+    """Diccionario plano con las hojas de `obj`"""
+    return dict(iter_leaves(obj, sep, expand_lists, parent_key))
+
+
+class FlatSchema:
+    """Columnas aplanadas y árbol de claves para rellenarlas sin reconstruir nombres
+
+    Cada nodo del árbol asocia una clave a [posición de la columna si es hoja,
+    subárbol si es objeto]; una misma clave puede ser ambas cosas en registros
+    distintos.
+    """
+
+    def __init__(self, sep='.'):
+        self.sep = sep
+        self.columns = []
+        self._positions = {}
+        self._tree = {}
+
+    def infer(self, records):
+        """Añade las columnas de los registros de muestra"""
+        for record in records:
+            self.add(record)
+        return self
+
+    def add(self, record) -> bool:
+        """Añade las hojas de `record` que falten (en orden de aparición); True si hay columnas nuevas"""
+        if not isinstance(record, dict):
+            raise TypeError("El registro no es un objeto JSON")
+        grew = False
+        stack = [('', self._tree, iter(record.items()))]
+        while stack:
+            prefix, node, items = stack[-1]
+            for key, value in items:
+                entry = node.setdefault(key, [None, None])
+                name = f"{prefix}{self.sep}{key}" if prefix else str(key)
+                if value and isinstance(value, dict):
+                    if entry[1] is None:
+                        entry[1] = {}
+                    stack.append((name, entry[1], iter(value.items())))
+                    break
+                if entry[0] is None:
+                    position = self._positions.get(name)
+                    if position is None:
+                        position = self._positions[name] = len(self.columns)
+                        self.columns.append(name)
+                        grew = True
+                    entry[0] = position
+            else:
+                stack.pop()
+        return grew
+
+    def _fill(self, record, arrays, row) -> bool:
+        """Escribe las hojas de `record` en la fila `row`; False si tiene claves fuera del esquema"""
+        stack = [(record, self._tree)]
+        while stack:
+            obj, node = stack.pop()
+            for key, value in obj.items():
+                entry = node.get(key)
+                if entry is None:
+                    return False
+                if value and isinstance(value, dict):
+                    if entry[1] is None:
+                        return False
+                    stack.append((value, entry[1]))
+                elif entry[0] is None:
+                    return False
+                else:
+                    arrays[entry[0]][row] = value
+        return True
+
+    def flatten(self, records):
+        """Aplana una lista de objetos en columnas preasignadas
+
+        Las claves que no estaban en el esquema se añaden al final. Devuelve el
+        DataFrame (dtype object, valores originales) y si el esquema ha crecido.
+        """
+        arrays = [[None] * len(records) for _ in self.columns]
+        grew = False
+        for row, record in enumerate(records):
+            if not isinstance(record, dict):
+                raise TypeError(f"El elemento {row} no es un objeto JSON")
+            if not self._fill(record, arrays, row):
+                grew = self.add(record) or grew
+                arrays.extend([None] * len(records) for _ in range(len(self.columns) - len(arrays)))
+                self._fill(record, arrays, row)
+        frame = pd.DataFrame({i: pd.Series(array, dtype=object) for i, array in enumerate(arrays)})
+        frame.columns = list(self.columns)
+        return frame, grew
+
+
+def infer_schema(records, sep='.'):
+    """Columnas en orden de primera aparición dentro de los registros de muestra"""
+    return FlatSchema(sep).infer(records).columns
+
+
+def records_to_frame(records, sep='.'):
+    """DataFrame de una lista de objetos con todas sus columnas"""
+    schema = FlatSchema(sep).infer(records[:SCHEMA_SAMPLE_RECORDS])
+    frame, _ = schema.flatten(records)
+    return frame
+
+
+def batched(items, size):
+    """Listas de hasta `size` elementos"""
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+def is_top_level_array(path, encoding='utf-8'):
+    """True si el primer carácter significativo del archivo es '['"""
+    with open(path, 'r', encoding=encoding) as f:
+        while True:
+            block = f.read(READ_SIZE)
+            if not block:
+                return False
+            stripped = block.lstrip(' \t\n\r')
+            if stripped:
+                return stripped[0] == '['
+
+
+def iter_array_items(path, encoding='utf-8', read_size=READ_SIZE):
+    """Elementos de un array JSON de primer nivel sin cargar el archivo completo"""
+    if IJSON_AVAILABLE:
+        with open(path, 'rb') as f:
+            yield from ijson.items(f, 'item', use_float=True)
+        return
+
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding=encoding) as f:
+        buffer, pos, eof = '', 0, False
+        state = 'start'  # start -> first -> (after -> value)* -> fin
+        while True:
+            if pos > read_size:
+                buffer, pos = buffer[pos:], 0
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos == len(buffer):
+                if eof:
+                    raise ValueError("JSON incompleto: falta el cierre del array")
+                more = f.read(read_size)
+                eof = not more
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+
+            char = buffer[pos]
+            if state == 'start':
+                if char != '[':
+                    raise ValueError("El JSON no es un array de primer nivel")
+                pos, state = pos + 1, 'first'
+            elif char == ']' and state in ('first', 'after'):
+                return
+            elif state == 'after':
+                if char != ',':
+                    raise ValueError(f"JSON inválido: se esperaba ',' o ']' y se encontró {char!r}")
+                pos, state = pos + 1, 'value'
+            else:
+                # Un valor al final del búfer puede estar cortado (números, literales)
+                size = read_size
+                while True:
+                    try:
+                        value, end = decoder.raw_decode(buffer, pos)
+                        if eof or not _NUMBER_TAIL.match(buffer, end):
+                            break
+                    except json.JSONDecodeError:
+                        if eof:
+                            raise
+                    more = f.read(size)
+                    size *= 2
+                    eof = not more
+                    buffer, pos = buffer[pos:] + more, 0
+                yield value
+                pos, state = end, 'after'
@@ -4,11 +4,25 @@ import pandas as pd
 import json
 from pathlib import Path
 
+from . import dataframe_cleaning, json_flattening
+
 CONVERSION = ('json', 'csv')
 
+# A partir de este tamaño los arrays de objetos se convierten por bloques
+STREAMING_THRESHOLD_MB = float(os.environ.get('JSON_CSV_STREAMING_THRESHOLD_MB', 5))
+CHUNK_RECORDS = int(os.environ.get('JSON_CSV_CHUNK_RECORDS', 50000))
+
 def convert(input_path, output_path):
     """Convierte JSON a CSV usando pandas con normalización inteligente"""
     
+    # Arrays de objetos grandes: lectura elemento a elemento y escritura por bloques
+    if (os.path.getsize(input_path) >= STREAMING_THRESHOLD_MB * 1024 * 1024
+            and json_flattening.is_top_level_array(input_path)):
+        success, message = convert_streaming(input_path, output_path)
+        if success:
+            return True, message
+        logging.warning(f"JSON→CSV en streaming falló, se carga el JSON completo: {message}")
+
     try:
         # Leer y validar JSON
         with open(input_path, 'r', encoding='utf-8') as f:
@@ -41,6 +55,52 @@ def convert(input_path, output_path):
     except Exception as e:
         return False, f"Error en conversión JSON→CSV: {str(e)}"
 
+def convert_streaming(input_path, output_path, chunk_records=None):
+    """Conversión por bloques de un array de objetos de primer nivel
+
+    El esquema de columnas se infiere de los primeros registros. Si más
+    adelante aparecen claves nuevas, se repite la escritura con el esquema
+    completo (ya conocido), de modo que la memoria sigue acotada al bloque.
+    """
+    try:
+        schema = json_flattening.FlatSchema()
+        rows, grew = _write_csv_stream(input_path, output_path, chunk_records or CHUNK_RECORDS, schema)
+        if grew:
+            logging.info("JSON→CSV: columnas fuera de la muestra, segunda pasada con el esquema completo")
+            rows, _ = _write_csv_stream(input_path, output_path, chunk_records or CHUNK_RECORDS, schema)
+
+        if not rows:
+            return False, "JSON vacío o sin datos válidos"
+
+        if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+            return True, f"CSV generado en streaming: {rows} filas, {len(schema.columns)} columnas desde JSON"
+        else:
+            return False, "Error: CSV no se generó correctamente"
+
+    except Exception as e:
+        return False, f"Error en conversión JSON→CSV en streaming: {str(e)}"
+
+def _write_csv_stream(input_path, output_path, chunk_records, schema):
+    """Escribe el CSV con las columnas de `schema`; devuelve (filas, si el esquema ha crecido)"""
+    rows, grew, width = 0, False, None
+    with open(output_path, 'w', encoding='utf-8-sig', newline='') as f:
+        for batch in json_flattening.batched(json_flattening.iter_array_items(input_path), chunk_records):
+            header = width is None
+            if header:
+                if not schema.columns:
+                    schema.infer(batch[:json_flattening.SCHEMA_SAMPLE_RECORDS])
+                width = len(schema.columns)
+            frame, batch_grew = schema.flatten(batch)
+            grew = grew or batch_grew
+            # Solo las columnas de la cabecera; no se descartan columnas vacías
+            # porque podrían tener datos en otros bloques
+            frame = frame.iloc[:, :width].dropna(how='all')
+            frame.columns = [clean_column_name(column) for column in frame.columns]
+            frame = dataframe_cleaning.clean_frame(frame, dataframe_cleaning.csv_column, nested_as_json=True)
+            frame.to_csv(f, index=False, header=header)
+            rows += len(frame)
+    return rows, grew
+
 def json_to_dataframe(json_data):
     """Convertir JSON a DataFrame detectando automáticamente la estructura"""
     try:
@@ -68,9 +128,8 @@ def handle_json_list(json_list):
         
         # Si todos los elementos son objetos/diccionarios
         if all(isinstance(item, dict) for item in json_list):
-            # Usar pandas.json_normalize para aplanar objetos anidados
-            df = pd.json_normalize(json_list)
-            return df
+            # Aplanar objetos anidados (claves unidas con '.', como json_normalize)
+            return json_flattening.records_to_frame(json_list)
         
         # Si todos los elementos son listas
         elif all(isinstance(item, list) for item in json_list):
@@ -112,7 +171,7 @@ def handle_json_dict(json_dict):
         if all(isinstance(value, dict) for value in json_dict.values()):
             # Intentar convertir a lista de objetos
             records = list(json_dict.values())
-            return pd.json_normalize(records)
+            return json_flattening.records_to_frame(records)
         
         # Si es un objeto plano, convertir a una fila
         df = pd.json_normalize([json_dict])
@@ -125,22 +184,9 @@ def handle_json_dict(json_dict):
 def clean_dataframe_for_csv(df):
     """Limpiar DataFrame para exportación CSV"""
     try:
-        # Crear copia para no modificar original
-        df_clean = df.copy()
-        
-        # Eliminar filas completamente vacías
-        df_clean = df_clean.dropna(how='all')
-        
-        # Eliminar columnas completamente vacías
-        df_clean = df_clean.dropna(axis=1, how='all')
-        
-        # Limpiar nombres de columnas
-        df_clean.columns = [clean_column_name(str(col)) for col in df_clean.columns]
-        
-        # Limpiar datos de celdas
-        for column in df_clean.columns:
-            df_clean[column] = df_clean[column].apply(clean_cell_value)
-        
+        # Columnas limpiadas de forma vectorizada según su dtype
+        df_clean = dataframe_cleaning.prepare_frame(df, clean_column_name)
+        df_clean = dataframe_cleaning.clean_frame(df_clean, dataframe_cleaning.csv_column, nested_as_json=True)
         return df_clean
         
     except Exception as e:
@@ -173,29 +219,6 @@ def clean_column_name(column_name):
     except Exception:
         return 'Columna_Error'
 
-def clean_cell_value(value):
-    """Limpiar valor de celda para CSV"""
-    try:
-        # Manejar valores nulos
-        if pd.isna(value) or value is None:
-            return ''
-        
-        # Si es un diccionario o lista, convertir a JSON string
-        if isinstance(value, (dict, list)):
-            return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
-        
-        # Convertir a string
-        str_value = str(value)
-        
-        # Limpiar caracteres problemáticos
-        str_value = str_value.replace('\n', ' ').replace('\r', ' ')
-        str_value = str_value.replace('"', "'")
-        
-        return str_value.strip()
-        
-    except Exception:
-        return str(value) if value is not None else ''
-
 def detect_json_structure(json_data):
     """Detectar y describir la estructura del JSON"""
     try:
@@ -255,32 +278,9 @@ def detect_json_structure(json_data):
         }
 
 def flatten_nested_json(obj, parent_key='', sep='_'):
-    """Aplanar JSON anidado recursivamente"""
+    """Aplanar JSON anidado (objetos y listas) sin recursión"""
     try:
-        items = []
-        
-        if isinstance(obj, dict):
-            for k, v in obj.items():
-                new_key = f"{parent_key}{sep}{k}" if parent_key else k
-                
-                if isinstance(v, (dict, list)) and v:
-                    items.extend(flatten_nested_json(v, new_key, sep=sep).items())
-                else:
-                    items.append((new_key, v))
-        
-        elif isinstance(obj, list):
-            for i, v in enumerate(obj):
-                new_key = f"{parent_key}{sep}{i}" if parent_key else str(i)
-                
-                if isinstance(v, (dict, list)) and v:
-                    items.extend(flatten_nested_json(v, new_key, sep=sep).items())
-                else:
-                    items.append((new_key, v))
-        
-        else:
-            return {parent_key: obj}
-        
-        return dict(items)
+        return json_flattening.flatten(obj, parent_key, sep=sep)
         
     except Exception as e:
         logging.error(f"Error aplanando JSON: {e}")
@@ -4,6 +4,8 @@ import pandas as pd
 import json
 from pathlib import Path
 
+from . import dataframe_cleaning
+
 # Importar librerías para Excel de alta calidad
 try:
     import openpyxl
@@ -200,22 +202,9 @@ def create_excel_basic(dataframes, output_path):
 def clean_dataframe_for_excel(df):
     """Limpiar DataFrame para exportación Excel"""
     try:
-        # Crear copia para no modificar original
-        df_clean = df.copy()
-        
-        # Eliminar filas completamente vacías
-        df_clean = df_clean.dropna(how='all')
-        
-        # Eliminar columnas completamente vacías
-        df_clean = df_clean.dropna(axis=1, how='all')
-        
-        # Limpiar nombres de columnas
-        df_clean.columns = [clean_column_name(str(col)) for col in df_clean.columns]
-        
-        # Limpiar datos de celdas
-        for column in df_clean.columns:
-            df_clean[column] = df_clean[column].apply(clean_cell_value_for_excel)
-        
+        # Columnas limpiadas de forma vectorizada según su dtype
+        df_clean = dataframe_cleaning.prepare_frame(df, clean_column_name)
+        df_clean = dataframe_cleaning.clean_frame(df_clean, dataframe_cleaning.excel_column)
         return df_clean
         
     except Exception as e:
@@ -271,32 +260,6 @@ def clean_column_name(column_name):
     except Exception:
         return 'Columna_Error'
 
-def clean_cell_value_for_excel(value):
-    """Limpiar valor de celda para Excel"""
-    try:
-        # Manejar valores nulos
-        if pd.isna(value) or value is None:
-            return ''
-        
-        # Si es un diccionario o lista, convertir a JSON string
-        if isinstance(value, (dict, list)):
-            return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
-        
-        # Convertir a string
-        str_value = str(value)
-        
-        # Limpiar caracteres problemáticos
-        str_value = str_value.replace('\n', ' ').replace('\r', ' ')
-        
-        # Excel tiene límite de 32,767 caracteres por celda
-        if len(str_value) > 32767:
-            str_value = str_value[:32764] + '...'
-        
-        return str_value.strip()
-        
-    except Exception:
-        return str(value) if value is not None else ''
-
 def apply_professional_formatting(worksheet, dataframe):
     """Aplicar formato profesional al worksheet con openpyxl"""
     try:
@@ -15,6 +15,7 @@ except ImportError:
     logging.warning("Pandoc engine no disponible para MD→PDF")
 
 CONVERSION = ('md', 'pdf')
+CONCURRENCY = 'processes'
 
 def convert(input_path, output_path):
     """Convierte Markdown a PDF usando Pandoc (preserva Unicode) con fallback FPDF"""
@@ -1,21 +1,163 @@
 import os, shutil, tempfile, uuid
+import logging
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from fpdf import FPDF
 from PIL import Image, ImageDraw
 from docx import Document
 from pypdf import PdfReader
 
+# Importar PyMuPDF para extracción de texto más rápida
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+    logging.warning("PyMuPDF no disponible para PDF→TXT, se usará pypdf")
+
 CONVERSION = ('pdf', 'txt')
+CONCURRENCY = 'processes'
+
+# Procesos que reparten las páginas de un documento; 1 extrae en el proceso actual.
+# Dentro de un proceso trabajador (cola, lotes) siempre se extrae en el propio
+# proceso: cada trabajador con su pool multiplicaría los procesos por cpu_count
+PDF_TEXT_WORKERS = int(os.environ.get('PDF_TEXT_WORKERS', os.cpu_count() or 1))
+# Por debajo de estas páginas no compensa arrancar el pool
+PARALLEL_MIN_PAGES = int(os.environ.get('PDF_TEXT_PARALLEL_MIN_PAGES', 32))
+# Mínimo de páginas contiguas por tarea (cada tarea abre el PDF una vez);
+# los documentos grandes se reparten en unas cuatro tareas por proceso
+PAGES_PER_TASK = int(os.environ.get('PDF_TEXT_PAGES_PER_TASK', 16))
+TASKS_PER_WORKER = 4
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
 
 def convert(input_path, output_path):
     """Convierte PDF a TXT"""
     try:
-        reader = PdfReader(input_path)
-        text = ''
-        for page in reader.pages:
-            text += page.extract_text() or ''
-        with open(output_path, 'w', encoding='utf-8') as f_out:
-            f_out.write(text)
-        return True, "ConversiÃ³n exitosa"
+        engine, workers, timings = extract_text(input_path, output_path)
+        if not timings:
+            return True, "Conversión exitosa: PDF sin páginas"
+        slowest = max(range(len(timings)), key=timings.__getitem__)
+        return True, (f"Conversión exitosa: {len(timings)} páginas con {engine} en {workers} proceso(s), "
+                      f"página más lenta {slowest + 1} ({timings[slowest]:.3f}s)")
+    except Exception as e:
+        return False, f"Error en conversión PDF→TXT: {str(e)}"
+
+def extract_text(input_path, output_path, workers=None):
+    """Extrae el texto página a página y lo escribe en orden en `output_path`
+
+    Con varios procesos, los tramos de páginas se reparten en un pool y el
+    texto de cada tramo se escribe en cuanto están escritos los anteriores,
+    sin concatenar el documento completo en memoria. Devuelve (motor,
+    procesos, segundos por página).
+    """
+    engine = 'PyMuPDF' if PYMUPDF_AVAILABLE else 'pypdf'
+    try:
+        page_count = _page_count(input_path, engine)
     except Exception as e:
-        return False, f"Error en conversiÃ³n PDFâ†’TXT: {str(e)}"
+        if engine == 'pypdf':
+            raise
+        logging.warning(f"PyMuPDF no pudo abrir el PDF, se usará pypdf: {e}")
+        engine = 'pypdf'
+        page_count = _page_count(input_path, engine)
+
+    if workers is None:
+        workers = 1 if multiprocessing.parent_process() is not None else PDF_TEXT_WORKERS
+    workers = max(1, workers)
+    if page_count < PARALLEL_MIN_PAGES:
+        workers = 1
+
+    timings = []
+    with open(output_path, 'w', encoding='utf-8') as f_out:
+        if workers > 1:
+            size = max(PAGES_PER_TASK, -(-page_count // (workers * TASKS_PER_WORKER)))
+            ranges = [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+            pool = _get_pool(workers)
+            try:
+                _extract_in_pool(pool, input_path, ranges, engine, workers, f_out, timings)
+            except BrokenProcessPool as e:
+                logging.warning(f"Pool de extracción de PDF caído, se continúa en este proceso: {e}")
+                _reset_pool(pool)
+                workers = 1
+        if workers == 1:
+            # También retoma tras un fallo del pool: los tramos escritos son completos
+            _write_pages(f_out, iter_page_text(input_path, len(timings), page_count, engine), timings)
+
+    logging.debug(f"PDF→TXT {os.path.basename(input_path)}: segundos por página {timings}")
+    return engine, workers, timings
+
+def iter_page_text(input_path, start, stop, engine):
+    """(texto, segundos de extracción) de cada página de [start, stop)"""
+    if engine == 'PyMuPDF':
+        with fitz.open(input_path) as doc:
+            for number in range(start, stop):
+                began = time.perf_counter()
+                text = doc.load_page(number).get_text()
+                yield text, time.perf_counter() - began
+    else:
+        reader = PdfReader(input_path)
+        for number in range(start, stop):
+            began = time.perf_counter()
+            text = reader.pages[number].extract_text() or ''
+            yield text, time.perf_counter() - began
+
+def extract_page_range(input_path, start, stop, engine):
+    """Tarea del pool: páginas [start, stop) como lista"""
+    return list(iter_page_text(input_path, start, stop, engine))
+
+def _page_count(input_path, engine):
+    if engine == 'PyMuPDF':
+        with fitz.open(input_path) as doc:
+            return doc.page_count
+    return len(PdfReader(input_path).pages)
+
+def _write_pages(f_out, pages, timings):
+    for text, seconds in pages:
+        # Cada página termina en salto de línea (pypdf no lo añade)
+        f_out.write(text if not text or text.endswith('\n') else text + '\n')
+        timings.append(seconds)
+
+def _extract_in_pool(pool, input_path, ranges, engine, workers, f_out, timings):
+    """Mantiene como mucho dos tramos por proceso en vuelo y escribe los resultados en orden"""
+    pending = deque()
+    remaining = iter(ranges)
+    for start, stop in remaining:
+        pending.append(pool.submit(extract_page_range, input_path, start, stop, engine))
+        if len(pending) >= workers * 2:
+            break
+    while pending:
+        _write_pages(f_out, pending.popleft().result(), timings)
+        for start, stop in remaining:
+            pending.append(pool.submit(extract_page_range, input_path, start, stop, engine))
+            break
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # 'spawn' como en la cola de conversiones: no hereda locks de otros hilos
+            context = multiprocessing.get_context(os.environ.get('CONVERSION_WORKER_START_METHOD', 'spawn'))
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            _pool_workers = workers
+        return _pool
+
+def _reset_pool(pool=None):
+    """Descarta el pool compartido si sigue siendo `pool` (o el actual si no se indica)
 
+    Sin cancelar tareas: otras conversiones que lo estén usando terminan o
+    reciben BrokenProcessPool y siguen en su propio proceso.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or (pool is not None and _pool is not pool):
+            return
+        _pool.shutdown(wait=False)
+        _pool = None
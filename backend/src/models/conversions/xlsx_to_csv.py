@@ -3,6 +3,8 @@ import logging
 import pandas as pd
 from pathlib import Path
 
+from . import dataframe_cleaning
+
 # Importar librerías para Excel
 try:
     import openpyxl
@@ -140,21 +142,9 @@ def determine_best_sheet(excel_file, sheet_names):
 def clean_dataframe_for_csv(df):
     """Limpiar DataFrame para exportación CSV"""
     try:
-        # Crear copia para no modificar original
-        df_clean = df.copy()
-        
-        # Eliminar filas completamente vacías
-        df_clean = df_clean.dropna(how='all')
-        
-        # Eliminar columnas completamente vacías
-        df_clean = df_clean.dropna(axis=1, how='all')
-        
-        # Limpiar nombres de columnas
-        df_clean.columns = [clean_column_name(str(col)) for col in df_clean.columns]
-        
-        # Limpiar datos de celdas
-        for column in df_clean.columns:
-            df_clean[column] = df_clean[column].apply(clean_cell_value)
+        # Columnas limpiadas de forma vectorizada según su dtype
+        df_clean = dataframe_cleaning.prepare_frame(df, clean_column_name)
+        df_clean = dataframe_cleaning.clean_frame(df_clean, dataframe_cleaning.csv_column, trim_integral_floats=True)
         
         # Eliminar filas duplicadas si existen muchas
         if len(df_clean) > 10:
@@ -194,34 +184,6 @@ def clean_column_name(column_name):
     except Exception:
         return 'Columna_Error'
 
-def clean_cell_value(value):
-    """Limpiar valor de celda"""
-    try:
-        # Manejar valores nulos
-        if pd.isna(value) or value is None:
-            return ''
-        
-        # Convertir a string
-        str_value = str(value)
-        
-        # Limpiar caracteres problemáticos
-        str_value = str_value.replace('\n', ' ').replace('\r', ' ')
-        str_value = str_value.replace('"', "'")
-        
-        # Manejar valores numéricos con decimales innecesarios
-        try:
-            if '.' in str_value and str_value.replace('.', '').replace('-', '').isdigit():
-                float_val = float(str_value)
-                if float_val.is_integer():
-                    return str(int(float_val))
-        except:
-            pass
-        
-        return str_value.strip()
-        
-    except Exception:
-        return str(value) if value is not None else ''
-
 def get_excel_info(input_path):
     """Obtener información del archivo Excel"""
     try:
@@ -4,6 +4,8 @@ import pandas as pd
 import json
 from pathlib import Path
 
+from . import dataframe_cleaning
+
 # Importar librerías para Excel
 try:
     import openpyxl
@@ -126,22 +128,9 @@ def convert_multiple_sheets(excel_file, sheet_names):
 def clean_dataframe_for_json(df):
     """Limpiar DataFrame para exportación JSON"""
     try:
-        # Crear copia para no modificar original
-        df_clean = df.copy()
-        
-        # Eliminar filas completamente vacías
-        df_clean = df_clean.dropna(how='all')
-        
-        # Eliminar columnas completamente vacías
-        df_clean = df_clean.dropna(axis=1, how='all')
-        
-        # Limpiar nombres de columnas para JSON
-        df_clean.columns = [clean_json_key(str(col)) for col in df_clean.columns]
-        
-        # Convertir tipos de datos apropiados
-        for column in df_clean.columns:
-            df_clean[column] = df_clean[column].apply(convert_excel_value_to_json)
-        
+        # Columnas limpiadas de forma vectorizada según su dtype
+        df_clean = dataframe_cleaning.prepare_frame(df, clean_json_key)
+        df_clean = dataframe_cleaning.clean_frame(df_clean, dataframe_cleaning.json_column, timestamps_iso=True)
         return df_clean
         
     except Exception as e:
@@ -183,51 +172,6 @@ def clean_json_key(key):
     except Exception:
         return 'campo_error'
 
-def convert_excel_value_to_json(value):
-    """Convertir valor de Excel a tipo apropiado para JSON"""
-    try:
-        # Manejar valores nulos
-        if pd.isna(value) or value is None:
-            return None
-        
-        # Manejar fechas de Excel
-        if isinstance(value, pd.Timestamp):
-            return value.isoformat()
-        
-        # Convertir a string primero
-        str_value = str(value).strip()
-        
-        if str_value == '':
-            return None
-        
-        # Intentar convertir a número
-        try:
-            # Verificar si es entero
-            if str_value.isdigit() or (str_value.startswith('-') and str_value[1:].isdigit()):
-                return int(str_value)
-            
-            # Verificar si es float
-            float_val = float(str_value)
-            # Si es un entero representado como float, convertir a int
-            if float_val.is_integer():
-                return int(float_val)
-            return float_val
-            
-        except ValueError:
-            pass
-        
-        # Intentar convertir a booleano
-        if str_value.lower() in ['true', 'verdadero', 'sí', 'si', 'yes', '1']:
-            return True
-        elif str_value.lower() in ['false', 'falso', 'no', '0']:
-            return False
-        
-        # Mantener como string
-        return str_value
-        
-    except Exception:
-        return str(value) if value is not None else None
-
 def determine_best_json_format(df):
     """Determinar el mejor formato JSON basado en los datos"""
     try:
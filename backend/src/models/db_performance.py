@@ -0,0 +1,109 @@
+"""
+Capa de rendimiento de la base de datos de Anclora Nexus
+Ajusta el pool de conexiones y los PRAGMA de SQLite (WAL, synchronous=NORMAL)
+y crea en bases de datos ya existentes los índices declarados en los modelos.
+"""
+
+import logging
+import os
+
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import make_url
+
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    # Con WAL, NORMAL solo arriesga la última transacción ante un corte de corriente
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'cache_size': -int(os.environ.get('SQLITE_CACHE_KB', 64 * 1024)),  # Negativo: en KiB
+    'temp_store': 'MEMORY',
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_MB', 256)) * 1024 * 1024,
+}
+
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+
+
+def _is_sqlite_file(uri: str) -> bool:
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def engine_options(uri: str) -> dict:
+    """Opciones de create_engine según el motor de la URI
+
+    SQLite en memoria mantiene el pool por defecto de SQLAlchemy: cada conexión
+    nueva sería una base de datos distinta.
+    """
+    url = make_url(uri)
+    if url.get_backend_name() != 'sqlite':
+        return {
+            'pool_size': DB_POOL_SIZE,
+            'max_overflow': DB_MAX_OVERFLOW,
+            'pool_recycle': DB_POOL_RECYCLE,
+            'pool_pre_ping': True,
+        }
+    if not _is_sqlite_file(uri):
+        return {}
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'connect_args': {
+            # Las conexiones del pool pasan de un hilo a otro (cola, SSE, lotes)
+            'check_same_thread': False,
+            'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+        },
+    }
+
+
+def configure_app(app):
+    """Añade las opciones del motor a la configuración antes de db.init_app"""
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI')
+    if not uri:
+        return
+    options = engine_options(uri)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+    finally:
+        cursor.close()
+
+
+def init_app(app, db):
+    """Registra los PRAGMA de SQLite en el motor de la aplicación y crea los índices que falten"""
+    with app.app_context():
+        engine = db.engine
+        sqlite_file = engine.dialect.name == 'sqlite' and _is_sqlite_file(str(engine.url))
+        if sqlite_file and not event.contains(engine, 'connect', _apply_sqlite_pragmas):
+            event.listen(engine, 'connect', _apply_sqlite_pragmas)
+            # Las conexiones ya abiertas no pasan por el evento
+            engine.dispose()
+        ensure_indexes(db)
+
+
+def ensure_indexes(db) -> list:
+    """Crea los índices de los modelos que no existan en tablas creadas antes de declararlos"""
+    created = []
+    try:
+        inspector = inspect(db.engine)
+        tables = set(inspector.get_table_names())
+        for table in db.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(db.engine, checkfirst=True)
+                    created.append(index.name)
+    except Exception as e:
+        logging.warning(f"No se pudieron crear los índices de la base de datos: {e}")
+    if created:
+        logging.info(f"Índices creados: {', '.join(created)}")
+    return created
@@ -0,0 +1,226 @@
+"""
+Manifiesto de plugins de conversión para Anclora Nexus
+Relaciona cada tupla `CONVERSION` con su módulo sin importarlo: el código fuente
+se analiza estáticamente y el resultado se guarda en disco. Cada conversor se
+importa la primera vez que se usa y se registra su coste de importación.
+"""
+
+import ast
+import hashlib
+import importlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+PLUGIN_PACKAGE = 'src.models.conversions'
+PLUGIN_DIR = Path(__file__).resolve().parent / 'conversions'
+DEFAULT_MANIFEST_CACHE = Path(__file__).resolve().parents[2] / 'instance' / 'plugin_manifest.json'
+# Se incrementa al añadir campos al manifiesto para invalidar las caches en disco
+MANIFEST_FORMAT = 2
+
+# Coste de importación de cada plugin cargado en este proceso
+_import_profile: Dict[str, Dict[str, Any]] = {}
+_profile_lock = threading.Lock()
+
+
+def _memory_usage() -> int:
+    """Memoria residente del proceso en bytes (aproximada sin psutil)"""
+    if PSUTIL_AVAILABLE:
+        return psutil.Process().memory_info().rss
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except Exception:
+        return 0
+
+
+def _parse_plugin(path: Path) -> Optional[Dict[str, Any]]:
+    """Extrae `CONVERSION`, `VERSION`, las pistas de concurrencia y la presencia de
+    `convert` sin ejecutar el módulo"""
+    source = path.read_bytes()
+    tree = ast.parse(source, filename=str(path))
+    conversion = None
+    version = None
+    concurrency = None
+    max_concurrency = None
+    has_convert = False
+
+    for node in tree.body:
+        if isinstance(node, ast.Assign):
+            names = [t.id for t in node.targets if isinstance(t, ast.Name)]
+            try:
+                value = ast.literal_eval(node.value)
+            except (ValueError, TypeError, SyntaxError):
+                continue
+            if 'CONVERSION' in names:
+                conversion = value
+            elif 'VERSION' in names:
+                version = value
+            elif 'CONCURRENCY' in names:
+                concurrency = value
+            elif 'MAX_CONCURRENCY' in names:
+                max_concurrency = value
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == 'convert':
+            has_convert = True
+        elif isinstance(node, ast.ImportFrom) and any(
+                (alias.asname or alias.name) == 'convert' for alias in node.names):
+            has_convert = True
+
+    if not (conversion and has_convert):
+        return None
+
+    return {
+        'module': path.stem,
+        'conversion': [str(fmt).lower() for fmt in conversion],
+        # Igual que la versión calculada al importar: VERSION o huella del código
+        'version': str(version) if version else hashlib.sha256(source).hexdigest()[:12],
+        # 'threads' para conversores de E/S o subprocesos, 'processes' para CPU en Python puro
+        'concurrency': concurrency,
+        'max_concurrency': max_concurrency,
+    }
+
+
+class PluginManifest:
+    """Manifiesto de plugins construido por análisis estático y cacheado en disco"""
+
+    def __init__(self, plugin_dir: Path = PLUGIN_DIR, cache_path: Optional[str] = None):
+        self.plugin_dir = Path(plugin_dir)
+        self.cache_path = Path(cache_path or os.environ.get('PLUGIN_MANIFEST_CACHE', DEFAULT_MANIFEST_CACHE))
+        self.build_time = 0.0
+        self.from_cache = 0
+
+    def load(self) -> List[Dict[str, Any]]:
+        """Devuelve las entradas del manifiesto en el orden de descubrimiento de pkgutil"""
+        start = time.time()
+        cached = self._read_cache()
+        entries = []
+        changed = False
+        self.from_cache = 0
+
+        for path in sorted(self.plugin_dir.glob('*.py')):
+            if path.name.startswith('__'):
+                continue
+            stat = path.stat()
+            signature = [stat.st_mtime_ns, stat.st_size]
+            record = cached.get(path.stem)
+            if record and record.get('signature') == signature:
+                self.from_cache += 1
+            else:
+                try:
+                    record = {'signature': signature, 'entry': _parse_plugin(path)}
+                except (SyntaxError, OSError) as e:
+                    logging.warning(f"No se pudo analizar el plugin {path.name}: {e}")
+                    record = {'signature': signature, 'entry': None}
+                cached[path.stem] = record
+                changed = True
+            if record['entry']:
+                entries.append(record['entry'])
+
+        stale = set(cached) - {p.stem for p in self.plugin_dir.glob('*.py')}
+        for name in stale:
+            del cached[name]
+        if changed or stale:
+            self._write_cache(cached)
+
+        self.build_time = time.time() - start
+        return entries
+
+    def _read_cache(self) -> Dict[str, Any]:
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format') != MANIFEST_FORMAT:
+                return {}
+            return data.get('plugins', {})
+        except (OSError, ValueError):
+            return {}
+
+    def _write_cache(self, plugins: Dict[str, Any]):
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'format': MANIFEST_FORMAT, 'plugins': plugins}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logging.warning(f"No se pudo guardar el manifiesto de plugins: {e}")
+
+
+class LazyConverter:
+    """Función `convert` de un plugin que se importa en la primera llamada"""
+
+    def __init__(self, module_name: str, conversion):
+        self.module_name = module_name
+        self.conversion = tuple(conversion)
+        self._func = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._func is not None
+
+    def load(self):
+        """Importa el módulo del plugin y devuelve su función `convert`"""
+        if self._func is None:
+            with self._lock:
+                if self._func is None:
+                    module = import_plugin(self.module_name)
+                    self._func = getattr(module, 'convert')
+        return self._func
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+    def __repr__(self):
+        state = 'cargado' if self.loaded else 'pendiente'
+        return f"<LazyConverter {self.module_name} {state}>"
+
+
+def import_plugin(module_name: str):
+    """Importa un plugin registrando su tiempo de importación y la memoria añadida"""
+    full_name = f'{PLUGIN_PACKAGE}.{module_name}'
+    memory_before = _memory_usage()
+    start = time.perf_counter()
+    module = importlib.import_module(full_name)
+    elapsed = time.perf_counter() - start
+
+    with _profile_lock:
+        # Solo cuenta la primera importación; las siguientes salen de sys.modules
+        if module_name not in _import_profile:
+            _import_profile[module_name] = {
+                'module': module_name,
+                'import_time_ms': elapsed * 1000,
+                'memory_delta_kb': max(_memory_usage() - memory_before, 0) // 1024,
+                'loaded_at': time.time(),
+            }
+    return module
+
+
+def get_import_profile() -> List[Dict[str, Any]]:
+    """Plugins importados en este proceso, del más lento al más rápido"""
+    with _profile_lock:
+        profile = [dict(item) for item in _import_profile.values()]
+    return sorted(profile, key=lambda item: item['import_time_ms'], reverse=True)
+
+
+def format_import_profile(profile: List[Dict[str, Any]]) -> str:
+    """Informe de texto del perfil de importación"""
+    lines = [f"{'plugin':<28} {'tiempo (ms)':>12} {'memoria (KB)':>13}"]
+    for item in profile:
+        lines.append(
+            f"{item['module']:<28} {item['import_time_ms']:>12.1f} {item['memory_delta_kb']:>13}"
+        )
+    total_time = sum(item['import_time_ms'] for item in profile)
+    total_memory = sum(item['memory_delta_kb'] for item in profile)
+    lines.append(f"{'TOTAL':<28} {total_time:>12.1f} {total_memory:>13}")
+    return '\n'.join(lines)
@@ -121,6 +121,11 @@ class User(db.Model):
 
 class Conversion(db.Model):
     __tablename__ = 'conversions'
+    __table_args__ = (
+        # /stats agrupa por estado y tipo; /history y las descargas ordenan por fecha
+        db.Index('ix_conversions_user_status_type', 'user_id', 'status', 'conversion_type'),
+        db.Index('ix_conversions_user_created', 'user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -169,6 +174,10 @@ class Conversion(db.Model):
 
 class CreditTransaction(db.Model):
     __tablename__ = 'credit_transactions'
+    __table_args__ = (
+        db.Index('ix_credit_transactions_user_created', 'user_id', 'created_at'),
+        db.Index('ix_credit_transactions_user_type_created', 'user_id', 'transaction_type', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
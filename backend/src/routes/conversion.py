@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
 from src.models.user import User, Conversion, CreditTransaction, db
@@ -22,6 +22,7 @@ except ImportError:
 try:
     from src.services.file_validator import file_validator
     from src.services.integrity_checker import integrity_checker
+    from src.services.validation_pipeline import validation_pipeline
     from src.services.error_messages import error_translator
     VALIDATION_SYSTEMS_AVAILABLE = True
 except ImportError:
@@ -35,6 +36,7 @@ except ImportError:
     OPTIMIZER_AVAILABLE = False, validate_and_classify
 from src.models.conversion_history import ConversionHistory
 from src.models.conversion_log import ConversionLog
+import json
 import os
 import uuid
 from datetime import datetime
@@ -64,6 +66,8 @@ from src.services.intelligent_conversion_sequences import intelligent_sequences
 from src.services.ai_quality_assessment import ai_quality_assessor
 from src.services.file_preview_service import file_preview_service
 from src.services.batch_download_service import batch_download_service
+from src.services.conversion_queue import conversion_queue
+from src.services.upload_ingest import upload_ingestor, UploadTooLargeError
 
 conversion_bp = Blueprint('conversion', __name__)
 
@@ -304,52 +308,45 @@ def guest_convert_file():
         if target_format not in conversion_engine.supported_conversions.get(source_format, {}):
             return jsonify({'error': f'Conversión {source_format} → {target_format} no soportada'}), 400
 
-        # Guardar archivo de entrada
+        # Guardar archivo de entrada calculando digests y cabecera en la misma pasada
         input_path = os.path.join(UPLOAD_FOLDER, f"guest_{uuid.uuid4()}_{filename}")
-        file.save(input_path)
+        try:
+            file_info = upload_ingestor.ingest(file, input_path, max_size=max_size)
+        except UploadTooLargeError:
+            return jsonify({'error': 'Archivo demasiado grande. Máximo 10MB para invitados'}), 400
 
         try:
-            # VALIDACIÓN ESTRICTA INTEGRADA
+            # VALIDACIÓN ESTRICTA INTEGRADA (firma, estructura, integridad y encoding en una pasada)
+            validation_report = None
             if VALIDATION_SYSTEMS_AVAILABLE:
-                # 1. Validación completa del archivo
-                is_valid, validation_message, validation_details = file_validator.validate_file_comprehensive(
-                    input_path, source_format
+                validation_report = validation_pipeline.validate(
+                    input_path, source_format, target_format, file_info=file_info
                 )
 
-                if not is_valid:
+                if not validation_report.valid:
                     # Limpiar archivo temporal
                     if os.path.exists(input_path):
                         os.remove(input_path)
 
-                    # Generar mensaje de error amigable
-                    error_info = error_translator.get_validation_error_message(validation_message, source_format)
+                    if validation_report.failed_stage == 'validation':
+                        # Generar mensaje de error amigable
+                        error_info = error_translator.get_validation_error_message(
+                            validation_report.message, source_format
+                        )
+                        details_key, details = 'validation_details', validation_report.validation_details
+                    else:
+                        error_info = error_translator.translate_error(
+                            validation_report.message, source_format, target_format
+                        )
+                        details_key, details = 'integrity_details', validation_report.integrity_details
                     formatted_error = error_translator.format_error_response(error_info)
 
                     return jsonify({
                         'success': False,
                         'error': formatted_error,
                         'error_code': error_info['error_code'],
-                        'validation_details': validation_details
-                    }), 400
-
-                # 2. Verificación de integridad pre-conversión
-                integrity_valid, integrity_message, integrity_details = integrity_checker.pre_conversion_check(
-                    input_path, source_format, target_format
-                )
-
-                if not integrity_valid:
-                    # Limpiar archivo temporal
-                    if os.path.exists(input_path):
-                        os.remove(input_path)
-
-                    error_info = error_translator.translate_error(integrity_message, source_format, target_format)
-                    formatted_error = error_translator.format_error_response(error_info)
-
-                    return jsonify({
-                        'success': False,
-                        'error': formatted_error,
-                        'error_code': error_info['error_code'],
-                        'integrity_details': integrity_details
+                        details_key: details,
+                        'validation': validation_report.to_dict()
                     }), 400
             # Preparar archivo de salida
             output_filename = f"{filename.rsplit('.', 1)[0]}.{target_format}"
@@ -373,18 +370,21 @@ def guest_convert_file():
                     # Por ahora, usar conversión directa pero registrar la secuencia
                     # TODO: Implementar conversión por pasos en el futuro
                     success, message = conversion_engine.convert_file(
-                        input_path, output_path, source_format, target_format
+                        input_path, output_path, source_format, target_format,
+                        file_hash=file_info.sha256
                     )
                 except json.JSONDecodeError:
                     # Si hay error en JSON, usar conversión directa
                     conversion_info['type'] = 'direct'
                     success, message = conversion_engine.convert_file(
-                        input_path, output_path, source_format, target_format
+                        input_path, output_path, source_format, target_format,
+                        file_hash=file_info.sha256
                     )
             else:
                 # Conversión directa
                 success, message = conversion_engine.convert_file(
-                    input_path, output_path, source_format, target_format
+                    input_path, output_path, source_format, target_format,
+                    file_hash=file_info.sha256
                 )
 
             processing_time = time.time() - start_time
@@ -409,7 +409,8 @@ def guest_convert_file():
                     'file_size': os.path.getsize(output_path),
                     'download_url': f'/api/conversion/guest-download/{download_id}',
                     'conversion_type': conversion_info['type'],
-                    'conversion_sequence': conversion_info['sequence']
+                    'conversion_sequence': conversion_info['sequence'],
+                    'validation': validation_report.to_dict() if validation_report else None
                 }), 200
             else:
                 # Usar traductor de errores si está disponible
@@ -516,6 +517,133 @@ def analyze_file():
     except Exception as e:
         return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
 
+def _charge_conversion(conversion, user):
+    """Descuenta los créditos de una conversión y registra la transacción; False si no alcanzan"""
+    if not user.consume_credits(conversion.credits_used):
+        return False
+    db.session.add(CreditTransaction(
+        user_id=user.id,
+        amount=-conversion.credits_used,
+        transaction_type='conversion',
+        description=f'ConversiÃ³n {conversion.original_format} â†’ {conversion.target_format}',
+        conversion_id=conversion.id
+    ))
+    return True
+
+
+def _refund_conversion(conversion, user):
+    """Devuelve los créditos reservados de una conversión que no se completó"""
+    user.add_credits(conversion.credits_used)
+    db.session.add(CreditTransaction(
+        user_id=user.id,
+        amount=conversion.credits_used,
+        transaction_type='refund',
+        description=f'Reembolso conversión fallida {conversion.original_format} → {conversion.target_format}',
+        conversion_id=conversion.id
+    ))
+
+
+def _finalize_conversion(conversion, user, input_path, output_path, output_filename,
+                         success, message, processing_time, file_hash=None, backup_path=None,
+                         credits_reserved=False):
+    """Registra el resultado de una conversión (síncrona o encolada) en la base de datos
+
+    `file_hash` es el SHA-256 calculado en la ingesta; solo si falta se relee la entrada.
+    Si se indica `backup_path`, la entrada ya está respaldada allí (conversiones de una
+    misma subida a varios formatos) y no se vuelve a mover. Devuelve la ruta del backup.
+    Con `credits_reserved` los créditos se cobraron al encolar: se devuelven si falla.
+    Sin reserva, una conversión que el usuario ya no puede pagar se registra como fallida.
+    """
+    if success and not credits_reserved and not _charge_conversion(conversion, user):
+        success, message = False, 'Créditos insuficientes'
+        if output_path and os.path.exists(output_path):
+            os.remove(output_path)
+
+    if success:
+        # Guardar hash del archivo original y crear backup
+        if file_hash:
+            original_hash = file_hash
+        else:
+            with open(input_path, 'rb') as f:
+                original_hash = hashlib.sha256(f.read()).hexdigest()
+        if backup_path is None:
+            backup_filename = f"{conversion.id}_{conversion.original_filename}"
+            backup_path = BACKUP_FOLDER / backup_filename
+            # La entrada se descarta al terminar: se mueve (renombrado si es el mismo disco)
+            shutil.move(input_path, backup_path)
+
+        # Registrar log de conversiÃ³n
+        log = ConversionLog(
+            conversion_id=conversion.id,
+            file_hash=original_hash,
+            output_path=output_path,
+            backup_path=str(backup_path)
+        )
+        db.session.add(log)
+
+        # Actualizar conversiÃ³n
+        conversion.status = 'completed'
+        conversion.output_filename = output_filename
+    else:
+        # Error en conversiÃ³n
+        if credits_reserved:
+            _refund_conversion(conversion, user)
+        conversion.status = 'failed'
+        conversion.error_message = message
+
+    conversion.processing_time = processing_time
+    conversion.completed_at = datetime.utcnow()
+    db.session.commit()
+    emit_progress(conversion.id, Phase.POSTPROCESS, 100)
+    return backup_path
+
+
+def _complete_queued_conversion(job):
+    """Finaliza el registro `Conversion` cuando termina un trabajo de la cola"""
+    try:
+        conversion = Conversion.query.get(job.conversion_id)
+        if not conversion:
+            return
+        user = User.query.get(conversion.user_id)
+        emit_progress(conversion.id, Phase.POSTPROCESS, 0)
+        try:
+            _finalize_conversion(
+                conversion, user, job.input_path, job.output_path,
+                job.payload.get('output_filename'), job.success,
+                job.message, job.processing_time,
+                file_hash=job.payload.get('file_hash'),
+                credits_reserved=job.payload.get('credits_reserved', False)
+            )
+        except Exception as e:
+            db.session.rollback()
+            if job.payload.get('credits_reserved') and conversion.status == 'pending':
+                _refund_conversion(conversion, user)
+            conversion.status = 'failed'
+            conversion.error_message = str(e)
+            conversion.completed_at = datetime.utcnow()
+            db.session.commit()
+            emit_progress(conversion.id, Phase.POSTPROCESS, 100)
+    finally:
+        if os.path.exists(job.input_path):
+            os.remove(job.input_path)
+
+
+conversion_queue.register_completion_handler(_complete_queued_conversion)
+
+
+def _use_conversion_queue():
+    """Determina si la petición debe encolarse en lugar de convertirse en línea
+
+    Solo con CONVERSION_QUEUE_ENABLED; en ese caso `async=false` fuerza la conversión en línea.
+    """
+    if not current_app.config.get('CONVERSION_QUEUE_ENABLED', False):
+        return False
+    requested = request.form.get('async')
+    if requested is not None:
+        return requested.lower() in ('1', 'true', 'yes')
+    return True
+
+
 @conversion_bp.route('/convert', methods=['POST'])
 @jwt_required()
 def convert_file():
@@ -559,9 +687,9 @@ def convert_file():
                 'credits_available': user.credits
             }), 402
         
-        # Guardar archivo de entrada
+        # Guardar archivo de entrada calculando digests y cabecera en la misma pasada
         input_path = os.path.join(UPLOAD_FOLDER, f"{uuid.uuid4()}_{filename}")
-        file.save(input_path)
+        file_info = upload_ingestor.ingest(file, input_path)
         
         # Crear registro de conversiÃ³n
         conversion = Conversion(
@@ -569,7 +697,7 @@ def convert_file():
             original_filename=filename,
             original_format=source_format,
             target_format=target_format,
-            file_size=os.path.getsize(input_path),
+            file_size=file_info.size,
             conversion_type=f"{source_format}-{target_format}",
             credits_used=credits_needed,
             status='pending'
@@ -579,61 +707,66 @@ def convert_file():
         db.session.flush()  # Para obtener el ID
         emit_progress(conversion.id, Phase.PREPROCESS, 0)
 
+        # Preparar archivo de salida
+        output_filename = f"{filename.rsplit('.', 1)[0]}.{target_format}"
+        output_path = os.path.join(OUTPUT_FOLDER, f"{uuid.uuid4()}_{output_filename}")
+
+        if _use_conversion_queue():
+            # Los créditos se cobran al encolar (se devuelven si el trabajo falla): varias
+            # peticiones en cola no pueden gastar los mismos créditos
+            if not _charge_conversion(conversion, user):
+                db.session.rollback()
+                os.remove(input_path)
+                return jsonify({
+                    'error': 'CrÃ©ditos insuficientes',
+                    'credits_needed': credits_needed,
+                    'credits_available': user.credits
+                }), 402
+            # Encolar y responder de inmediato; el pool de procesos completa el registro
+            db.session.commit()
+            try:
+                job_id = conversion_queue.submit(
+                    input_path, output_path, source_format, target_format,
+                    conversion_id=conversion.id,
+                    payload={'output_filename': output_filename, 'file_hash': file_info.sha256,
+                             'credits_reserved': True}
+                )
+            except Exception:
+                _refund_conversion(conversion, user)
+                conversion.status = 'failed'
+                conversion.error_message = 'No se pudo encolar la conversión'
+                conversion.completed_at = datetime.utcnow()
+                db.session.commit()
+                if os.path.exists(input_path):
+                    os.remove(input_path)
+                raise
+            return jsonify({
+                'message': 'Conversión encolada',
+                'job_id': job_id,
+                'conversion': conversion.to_dict(),
+                'status_url': f'/api/conversion/jobs/{job_id}'
+            }), 202
+
         try:
             emit_progress(conversion.id, Phase.PREPROCESS, 100)
             emit_progress(conversion.id, Phase.CONVERT, 0)
 
-            # Preparar archivo de salida
-            output_filename = f"{filename.rsplit('.', 1)[0]}.{target_format}"
-            output_path = os.path.join(OUTPUT_FOLDER, f"{uuid.uuid4()}_{output_filename}")
-
             # Realizar conversiÃ³n
             start_time = time.time()
             success, message = conversion_engine.convert_file(
-                input_path, output_path, source_format, target_format
+                input_path, output_path, source_format, target_format,
+                file_hash=file_info.sha256
             )
             emit_progress(conversion.id, Phase.CONVERT, 100)
             emit_progress(conversion.id, Phase.POSTPROCESS, 0)
             processing_time = time.time() - start_time
-            
-            if success:
-                # Guardar hash del archivo original y crear backup
-                with open(input_path, 'rb') as f:
-                    original_hash = hashlib.sha256(f.read()).hexdigest()
-                backup_filename = f"{conversion.id}_{filename}"
-                backup_path = BACKUP_FOLDER / backup_filename
-                shutil.copy(input_path, backup_path)
-
-                # Consumir crÃ©ditos
-                user.consume_credits(credits_needed)
-
-                # Registrar transacciÃ³n de crÃ©ditos
-                transaction = CreditTransaction(
-                    user_id=user.id,
-                    amount=-credits_needed,
-                    transaction_type='conversion',
-                    description=f'ConversiÃ³n {source_format} â†’ {target_format}',
-                    conversion_id=conversion.id
-                )
-                db.session.add(transaction)
 
-                # Registrar log de conversiÃ³n
-                log = ConversionLog(
-                    conversion_id=conversion.id,
-                    file_hash=original_hash,
-                    output_path=output_path,
-                    backup_path=str(backup_path)
-                )
-                db.session.add(log)
-
-                # Actualizar conversiÃ³n
-                conversion.status = 'completed'
-                conversion.processing_time = processing_time
-                conversion.completed_at = datetime.utcnow()
-                conversion.output_filename = output_filename
-                db.session.commit()
-                emit_progress(conversion.id, Phase.POSTPROCESS, 100)
+            _finalize_conversion(
+                conversion, user, input_path, output_path, output_filename,
+                success, message, processing_time, file_hash=file_info.sha256
+            )
 
+            if success:
                 return jsonify({
                     'message': 'ConversiÃ³n completada exitosamente',
                     'conversion': conversion.to_dict(),
@@ -642,14 +775,6 @@ def convert_file():
                 }), 200
                 
             else:
-                # Error en conversiÃ³n
-                conversion.status = 'failed'
-                conversion.error_message = message
-                conversion.processing_time = processing_time
-                conversion.completed_at = datetime.utcnow()
-                db.session.commit()
-                emit_progress(conversion.id, Phase.POSTPROCESS, 100)
-
                 return jsonify({
                     'error': f'Error en la conversiÃ³n: {message}',
                     'conversion': conversion.to_dict()
@@ -680,6 +805,181 @@ def convert_file():
         return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
 
 
+@conversion_bp.route('/convert-multi', methods=['POST'])
+@jwt_required()
+def convert_file_multi():
+    """Convierte un archivo a varios formatos destino con una sola subida
+
+    `target_formats` admite una lista separada por comas o el campo repetido.
+    La entrada se ingesta, valida y normaliza una vez; los pasos intermedios
+    comunes se ejecutan una sola vez y el resto de ramas en paralelo.
+    """
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+
+        if not user:
+            return jsonify({'error': 'Usuario no encontrado'}), 404
+
+        if 'file' not in request.files:
+            return jsonify({'error': 'No se proporcionó ningún archivo'}), 400
+
+        file = request.files['file']
+        target_formats = []
+        for value in request.form.getlist('target_formats'):
+            for target in value.split(','):
+                target = target.strip().lower()
+                if target and target not in target_formats:
+                    target_formats.append(target)
+
+        if not file.filename or not target_formats:
+            return jsonify({'error': 'Archivo y formatos destino son requeridos'}), 400
+
+        if not allowed_file(file.filename):
+            return jsonify({'error': 'Tipo de archivo no soportado'}), 400
+
+        filename = secure_filename(file.filename)
+        source_format = filename.rsplit('.', 1)[1].lower()
+
+        supported = conversion_engine.get_supported_formats(source_format)
+        unsupported = [target for target in target_formats if target not in supported]
+        if unsupported:
+            return jsonify({
+                'error': f"Conversión {source_format} → {', '.join(unsupported)} no soportada"
+            }), 400
+
+        costs = {target: conversion_engine.get_conversion_cost(source_format, target) for target in target_formats}
+        credits_needed = sum(costs.values())
+        if user.credits < credits_needed:
+            return jsonify({
+                'error': 'Créditos insuficientes',
+                'credits_needed': credits_needed,
+                'credits_available': user.credits
+            }), 402
+
+        input_path = os.path.join(UPLOAD_FOLDER, f"{uuid.uuid4()}_{filename}")
+        file_info = upload_ingestor.ingest(file, input_path)
+
+        base_name = filename.rsplit('.', 1)[0]
+        conversions = {}
+        outputs = {}
+        for target in target_formats:
+            conversion = Conversion(
+                user_id=user.id,
+                original_filename=filename,
+                original_format=source_format,
+                target_format=target,
+                file_size=file_info.size,
+                conversion_type=f"{source_format}-{target}",
+                credits_used=costs[target],
+                status='pending'
+            )
+            db.session.add(conversion)
+            conversions[target] = conversion
+            outputs[target] = os.path.join(OUTPUT_FOLDER, f"{uuid.uuid4()}_{base_name}.{target}")
+        db.session.flush()
+
+        try:
+            for conversion in conversions.values():
+                emit_progress(conversion.id, Phase.PREPROCESS, 100)
+                emit_progress(conversion.id, Phase.CONVERT, 0)
+
+            start_time = time.time()
+            results = conversion_engine.convert_multi(
+                input_path, outputs, source_format, file_hash=file_info.sha256
+            )
+            processing_time = time.time() - start_time
+
+            backup_path = None
+            response = []
+            for target, conversion in conversions.items():
+                success, message = results[target]
+                emit_progress(conversion.id, Phase.CONVERT, 100)
+                emit_progress(conversion.id, Phase.POSTPROCESS, 0)
+                backup_path = _finalize_conversion(
+                    conversion, user, input_path, outputs[target], f"{base_name}.{target}",
+                    success, message, processing_time, file_hash=file_info.sha256,
+                    backup_path=backup_path
+                )
+                entry = {'target_format': target, 'success': success, 'conversion': conversion.to_dict()}
+                if success:
+                    entry['download_url'] = f'/api/download/{conversion.id}'
+                else:
+                    entry['error'] = f'Error en la conversión: {message}'
+                response.append(entry)
+
+            completed = sum(1 for entry in response if entry['success'])
+            if not completed:
+                status_code = 500
+            elif completed < len(response):
+                status_code = 207
+            else:
+                status_code = 200
+            return jsonify({
+                'message': f'{completed} de {len(response)} conversiones completadas',
+                'results': response,
+                'processing_time': processing_time,
+                'user_credits_remaining': user.credits
+            }), status_code
+
+        except Exception as e:
+            for conversion in conversions.values():
+                if conversion.status == 'pending':
+                    conversion.status = 'failed'
+                    conversion.error_message = str(e)
+                    conversion.completed_at = datetime.utcnow()
+            db.session.commit()
+            return jsonify({'error': f'Error durante la conversión: {str(e)}'}), 500
+
+        finally:
+            if os.path.exists(input_path):
+                os.remove(input_path)
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
+
+
+@conversion_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_conversion_job(job_id):
+    """Obtiene el estado de un trabajo de conversión encolado"""
+    try:
+        user_id = get_jwt_identity()
+        job = conversion_queue.get_job(job_id)
+        if not job:
+            return jsonify({'error': 'Trabajo no encontrado'}), 404
+
+        conversion = Conversion.query.filter_by(id=job.conversion_id, user_id=user_id).first()
+        if not conversion:
+            return jsonify({'error': 'Trabajo no encontrado'}), 404
+
+        return jsonify({
+            'job_id': job.job_id,
+            'status': job.status,
+            'created_at': job.created_at,
+            'started_at': job.started_at,
+            'finished_at': job.finished_at,
+            'processing_time': job.processing_time,
+            'message': job.message,
+            'conversion': conversion.to_dict(),
+            'download_url': f'/api/download/{conversion.id}' if conversion.status == 'completed' else None
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Error obteniendo trabajo: {str(e)}'}), 500
+
+
+@conversion_bp.route('/jobs/stats', methods=['GET'])
+@jwt_required()
+def get_conversion_queue_stats():
+    """Estadísticas de la cola de conversiones"""
+    try:
+        return jsonify({'success': True, 'queue_stats': conversion_queue.get_queue_stats()}), 200
+    except Exception as e:
+        return jsonify({'error': f'Error obteniendo estadísticas de la cola: {str(e)}'}), 500
+
+
 @conversion_bp.route('/conversions/<int:conversion_id>', methods=['DELETE'])
 @jwt_required()
 def undo_conversion(conversion_id):
@@ -694,6 +994,9 @@ def undo_conversion(conversion_id):
         if not log or not os.path.exists(log.backup_path):
             return jsonify({'error': 'Backup no disponible'}), 404
 
+        # La salida puede ser un enlace al cache de resultados: no escribir sobre ella
+        if os.path.exists(log.output_path):
+            os.remove(log.output_path)
         shutil.copy(log.backup_path, log.output_path)
 
         return jsonify({'message': 'ConversiÃ³n revertida', 'conversion_id': conversion_id}), 200
@@ -1088,33 +1391,22 @@ def generate_file_preview():
         try:
             # Obtener capacidades de preview
             capabilities = file_preview_service.get_preview_capabilities(filename)
+            preview_key = file_preview_service.preview_key(temp_path, filename)
 
-            # Generar preview (usando asyncio)
+            # Generar preview (usando asyncio); se sirve de la caché si el contenido ya se vio
             import asyncio
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
 
             try:
                 preview_data = loop.run_until_complete(
-                    file_preview_service.generate_preview(temp_path, filename, preview_quality)
+                    file_preview_service.generate_preview(temp_path, filename, preview_quality,
+                                                          cache_key=preview_key)
                 )
             finally:
                 loop.close()
 
-            return jsonify({
-                'success': True,
-                'preview': {
-                    'type': preview_data.preview_type,
-                    'content': preview_data.content,
-                    'metadata': preview_data.metadata,
-                    'page_count': preview_data.page_count,
-                    'dimensions': preview_data.dimensions,
-                    'quality': preview_data.preview_quality
-                },
-                'file_info': preview_data.file_info,
-                'capabilities': capabilities,
-                'message': 'Preview generado exitosamente'
-            }), 200
+            return _preview_response(preview_data, capabilities)
 
         finally:
             # Limpiar archivo temporal
@@ -1124,6 +1416,43 @@ def generate_file_preview():
     except Exception as e:
         return jsonify({'error': f'Error generando preview: {str(e)}'}), 500
 
+@conversion_bp.route('/preview/<preview_key>', methods=['GET'])
+def get_cached_preview(preview_key):
+    """Devuelve una preview ya generada por su clave, con soporte de GET condicional (ETag)"""
+    try:
+        preview_quality = request.args.get('quality', 'medium')
+        preview_data = file_preview_service.get_cached_preview(preview_key, preview_quality)
+        if preview_data is None:
+            return jsonify({'error': 'Preview no disponible; vuelve a enviar el archivo'}), 404
+
+        capabilities = file_preview_service.get_preview_capabilities(preview_data.file_info['extension'])
+        return _preview_response(preview_data, capabilities).make_conditional(request)
+
+    except Exception as e:
+        return jsonify({'error': f'Error obteniendo preview: {str(e)}'}), 500
+
+def _preview_response(preview_data, capabilities):
+    """Respuesta JSON de una preview con ETag derivado del contenido y la calidad"""
+    response = jsonify({
+        'success': True,
+        'preview': {
+            'type': preview_data.preview_type,
+            'content': preview_data.content,
+            'metadata': preview_data.metadata,
+            'page_count': preview_data.page_count,
+            'dimensions': preview_data.dimensions,
+            'quality': preview_data.preview_quality
+        },
+        'preview_key': preview_data.cache_key,
+        'file_info': preview_data.file_info,
+        'capabilities': capabilities,
+        'message': 'Preview generado exitosamente'
+    })
+    if preview_data.cache_key:
+        response.set_etag(f"{preview_data.cache_key}-{preview_data.preview_quality}")
+        response.headers['Cache-Control'] = 'private, max-age=3600'
+    return response
+
 @conversion_bp.route('/batch/create', methods=['POST'])
 def create_batch_download():
     """Crea un nuevo lote de descarga"""
@@ -1200,13 +1529,22 @@ def download_batch_zip(batch_id):
     try:
         zip_path = batch_download_service.get_batch_zip_path(batch_id)
 
-        if not zip_path:
+        if zip_path:
+            return send_file(
+                zip_path,
+                as_attachment=True,
+                download_name=f"anclora_batch_{batch_id}.zip"
+            )
+
+        # Sin ZIP preparado: se transmite a la respuesta a medida que se genera
+        chunks = batch_download_service.stream_batch_zip(batch_id)
+        if chunks is None:
             return jsonify({'error': 'Lote no encontrado, no está listo o ha expirado'}), 404
 
-        return send_file(
-            zip_path,
-            as_attachment=True,
-            download_name=f"anclora_batch_{batch_id}.zip"
+        return Response(
+            stream_with_context(chunks),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename="anclora_batch_{batch_id}.zip"'}
         )
 
     except Exception as e:
@@ -1305,23 +1643,22 @@ def get_conversion_stats():
         if not user:
             return jsonify({'error': 'Usuario no encontrado'}), 404
         
-        # EstadÃ­sticas bÃ¡sicas
-        total_conversions = Conversion.query.filter_by(user_id=user_id).count()
-        successful_conversions = Conversion.query.filter_by(
-            user_id=user_id, status='completed'
-        ).count()
-        failed_conversions = Conversion.query.filter_by(
-            user_id=user_id, status='failed'
-        ).count()
-        
-        # Conversiones por formato
+        # Una sola consulta agrupada (cubierta por ix_conversions_user_status_type)
         from sqlalchemy import func
-        format_stats = db.session.query(
+        grouped = db.session.query(
+            Conversion.status,
             Conversion.conversion_type,
-            func.count(Conversion.id).label('count')
-        ).filter_by(user_id=user_id, status='completed')\
-         .group_by(Conversion.conversion_type)\
+            func.count()
+        ).filter(Conversion.user_id == user_id)\
+         .group_by(Conversion.status, Conversion.conversion_type)\
          .all()
+
+        total_conversions = sum(count for _, _, count in grouped)
+        successful_conversions = sum(count for status, _, count in grouped if status == 'completed')
+        failed_conversions = sum(count for status, _, count in grouped if status == 'failed')
+
+        # Conversiones por formato
+        format_stats = [(conv_type, count) for status, conv_type, count in grouped if status == 'completed']
         
         return jsonify({
             'user_stats': {
@@ -1483,6 +1820,15 @@ def pandoc_status():
         return jsonify({'error': f'Error verificando Pandoc: {str(e)}'}), 500
 
 
+@conversion_bp.route('/system/plugins', methods=['GET'])
+def plugins_status():
+    """Plugins registrados, cargados y coste de importación en este proceso"""
+    try:
+        return jsonify(conversion_engine.get_plugin_report()), 200
+    except Exception as e:
+        return jsonify({'error': f'Error obteniendo estado de plugins: {str(e)}'}), 500
+
+
 # ============================================================================
 # ENDPOINTS DE SECUENCIAS INTELIGENTES - FASE 2
 # ============================================================================
@@ -1509,10 +1855,11 @@ def find_intelligent_route():
         if not source_format or not target_format:
             return jsonify({'error': 'source_format y target_format son requeridos'}), 400
 
-        # Encontrar la mejor ruta
-        route = intelligent_router.find_best_route(
+        # Mejores rutas desde el índice precalculado (la primera es la recomendada)
+        routes = intelligent_router.find_routes(
             source_format, target_format, max_steps, prefer_quality
         )
+        route = routes[0] if routes else None
 
         if not route:
             return jsonify({
@@ -1530,7 +1877,16 @@ def find_intelligent_route():
                 'quality_score': route.quality_score,
                 'complexity': route.complexity,
                 'description': route.description
-            }
+            },
+            'alternatives': [
+                {
+                    'steps': [{'from': step[0], 'to': step[1]} for step in alternative.steps],
+                    'estimated_time': alternative.estimated_time,
+                    'quality_score': alternative.quality_score,
+                    'description': alternative.description
+                }
+                for alternative in routes[1:]
+            ]
         })
 
     except Exception as e:
@@ -1561,7 +1917,11 @@ def get_possible_targets(source_format):
 @conversion_bp.route('/sequence/create', methods=['POST'])
 @jwt_required()
 def create_conversion_sequence():
-    """Crear una nueva secuencia de conversión inteligente"""
+    """Crear una nueva secuencia de conversión inteligente
+
+    `extra_formats` (lista separada por comas o campo repetido) añade destinos
+    a la secuencia; los pasos comunes se ejecutan una sola vez.
+    """
     try:
         if not INTELLIGENT_SEQUENCES_AVAILABLE:
             return jsonify({
@@ -1580,12 +1940,18 @@ def create_conversion_sequence():
         target_format = request.form.get('target_format', '').lower().strip()
         prefer_quality = request.form.get('prefer_quality', 'true').lower() == 'true'
         max_steps = int(request.form.get('max_steps', 4))
+        extra_formats = []
+        for value in request.form.getlist('extra_formats'):
+            for extra_format in value.split(','):
+                extra_format = extra_format.strip().lower()
+                if extra_format and extra_format != target_format and extra_format not in extra_formats:
+                    extra_formats.append(extra_format)
 
         if not target_format:
             return jsonify({'error': 'target_format es requerido'}), 400
 
         # Determinar formato de origen
-        source_format = get_file_extension(file.filename).lower()
+        source_format = Path(file.filename).suffix.lstrip('.').lower()
 
         # Guardar archivo temporal
         temp_dir = tempfile.mkdtemp(prefix="anclora_sequence_")
@@ -1596,17 +1962,22 @@ def create_conversion_sequence():
         # Crear archivo de salida
         output_filename = f"{Path(input_filename).stem}.{target_format}"
         output_path = os.path.join(temp_dir, output_filename)
+        extra_targets = {
+            extra_format: os.path.join(temp_dir, f"{Path(input_filename).stem}.{extra_format}")
+            for extra_format in extra_formats
+        }
 
         # Crear secuencia
         sequence = sequence_processor.create_sequence(
             source_format, target_format, input_path, output_path,
-            prefer_quality, max_steps
+            prefer_quality, max_steps, extra_targets=extra_targets
         )
 
         if not sequence:
+            requested = ', '.join(fmt.upper() for fmt in [target_format] + extra_formats)
             return jsonify({
                 'error': 'No se pudo crear la secuencia',
-                'message': f'No existe ruta de conversión de {source_format.upper()} a {target_format.upper()}'
+                'message': f'No existe ruta de conversión de {source_format.upper()} a {requested}'
             }), 400
 
         return jsonify({
@@ -1618,6 +1989,7 @@ def create_conversion_sequence():
                 'estimated_time': sequence.route.estimated_time,
                 'quality_score': sequence.route.quality_score
             },
+            'outputs': list(sequence.outputs),
             'message': 'Secuencia creada exitosamente. Use /sequence/execute para iniciar la conversión.'
         })
 
@@ -1634,25 +2006,68 @@ def execute_conversion_sequence(sequence_id):
                 'error': 'Secuencias inteligentes no disponibles'
             }), 503
 
-        # Ejecutar secuencia
-        success = sequence_processor.execute_sequence(sequence_id)
+        # ?wait=true conserva la ejecución síncrona
+        if request.args.get('wait', 'false').lower() == 'true':
+            success = sequence_processor.execute_sequence(sequence_id)
 
-        if success:
-            return jsonify({
-                'success': True,
-                'sequence_id': sequence_id,
-                'message': 'Secuencia ejecutada exitosamente'
-            })
-        else:
+            if success:
+                return jsonify({
+                    'success': True,
+                    'sequence_id': sequence_id,
+                    'message': 'Secuencia ejecutada exitosamente'
+                })
+            else:
+                return jsonify({
+                    'success': False,
+                    'sequence_id': sequence_id,
+                    'message': 'Error ejecutando la secuencia'
+                }), 500
+
+        # Ejecutar secuencia en segundo plano
+        if not sequence_processor.start_sequence(sequence_id):
             return jsonify({
                 'success': False,
                 'sequence_id': sequence_id,
-                'message': 'Error ejecutando la secuencia'
-            }), 500
+                'message': 'La secuencia no existe o ya se ha iniciado'
+            }), 409
+
+        return jsonify({
+            'success': True,
+            'sequence_id': sequence_id,
+            'status_url': f'/api/conversion/sequence/status/{sequence_id}',
+            'stream_url': f'/api/conversion/sequence/stream/{sequence_id}',
+            'message': 'Secuencia iniciada'
+        }), 202
 
     except Exception as e:
         return jsonify({'error': f'Error ejecutando secuencia: {str(e)}'}), 500
 
+@conversion_bp.route('/sequence/stream/<sequence_id>', methods=['GET'])
+@jwt_required()
+def stream_sequence_status(sequence_id):
+    """Emite el estado de una secuencia (Server-Sent Events) cada vez que cambia"""
+    try:
+        if not INTELLIGENT_SEQUENCES_AVAILABLE:
+            return jsonify({
+                'error': 'Secuencias inteligentes no disponibles'
+            }), 503
+
+        if not sequence_processor.get_sequence_status(sequence_id):
+            return jsonify({'error': 'Secuencia no encontrada'}), 404
+
+        def events():
+            for status in sequence_processor.iter_status(sequence_id):
+                if status is None:
+                    yield ': keep-alive\n\n'
+                else:
+                    yield f"event: status\ndata: {json.dumps(status)}\n\n"
+
+        return Response(stream_with_context(events()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    except Exception as e:
+        return jsonify({'error': f'Error obteniendo estado: {str(e)}'}), 500
+
 @conversion_bp.route('/sequence/status/<sequence_id>', methods=['GET'])
 @jwt_required()
 def get_sequence_status(sequence_id):
@@ -1823,6 +2238,18 @@ def clear_cache():
     except Exception as e:
         return jsonify({'error': f'Error limpiando cache: {str(e)}'}), 500
 
+@conversion_bp.route('/cache/intermediates', methods=['GET'])
+@jwt_required()
+def get_intermediate_artifact_stats():
+    """Estadísticas de reutilización de artefactos intermedios por paso"""
+    try:
+        return jsonify({
+            'success': True,
+            'artifact_stats': conversion_engine.artifact_store.get_stats()
+        }), 200
+    except Exception as e:
+        return jsonify({'error': f'Error obteniendo artefactos intermedios: {str(e)}'}), 500
+
 @conversion_bp.route('/smart-convert', methods=['POST'])
 @jwt_required()
 def smart_convert():
@@ -1850,7 +2277,7 @@ def smart_convert():
             return jsonify({'error': 'target_format es requerido'}), 400
 
         # Determinar formato de origen
-        source_format = get_file_extension(file.filename).lower()
+        source_format = Path(file.filename).suffix.lstrip('.').lower()
 
         # Guardar archivo temporal
         temp_dir = tempfile.mkdtemp(prefix="anclora_smart_")
@@ -0,0 +1,200 @@
+"""
+Almacén de artefactos intermedios para Anclora Nexus
+Memoriza los resultados de cada paso de las conversiones encadenadas para que
+una ruta posterior pueda arrancar desde el prefijo más profundo ya calculado
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+@dataclass
+class ArtifactEntry:
+    """Artefacto intermedio almacenado"""
+    key: str
+    path: str
+    size: int
+    hop: Tuple[str, str]
+
+
+class IntermediateArtifactStore:
+    """Almacén acotado (LRU por número de entradas y tamaño) de artefactos intermedios"""
+
+    def __init__(self, store_dir: Optional[str] = None, max_size_mb: float = 1024,
+                 max_entries: int = 500):
+        self.store_dir = Path(store_dir or os.path.join(tempfile.gettempdir(), 'anclora_artifacts'))
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, ArtifactEntry]' = OrderedDict()
+        self._total_size = 0
+        self._hop_stats: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._lock = threading.RLock()
+
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self._load_existing()
+
+    def _load_existing(self):
+        """Registrar los artefactos que ya existen en disco, del más antiguo al más reciente"""
+        try:
+            files = sorted(
+                (p for p in self.store_dir.iterdir() if p.is_file()),
+                key=lambda p: p.stat().st_mtime
+            )
+            for path in files:
+                key, _, fmt = path.name.partition('.')
+                self._register(ArtifactEntry(key, str(path), path.stat().st_size, ('', fmt)))
+            self._evict()
+        except Exception as e:
+            logging.warning(f"Error cargando artefactos intermedios: {e}")
+
+    @staticmethod
+    def prefix_key(file_hash: str, path: Sequence[str], versions: Sequence[str]) -> str:
+        """Clave de un prefijo de ruta: hash de la entrada + formatos + versiones de cada paso"""
+        data = f"{file_hash}:{'>'.join(path)}:{'+'.join(versions)}"
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def _artifact_path(self, key: str, fmt: str) -> Path:
+        return self.store_dir / f"{key}.{fmt}"
+
+    def get(self, key: str, hop: Tuple[str, str]) -> Optional[str]:
+        """Devuelve la ruta del artefacto si existe y lo marca como usado recientemente"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                # Otro proceso pudo haberlo generado en el directorio compartido
+                candidate = self._artifact_path(key, hop[1])
+                if candidate.exists():
+                    entry = ArtifactEntry(key, str(candidate), candidate.stat().st_size, hop)
+                    self._register(entry)
+            elif not os.path.exists(entry.path):
+                self._forget(key)
+                entry = None
+
+            if entry is None:
+                return None
+
+            self._entries.move_to_end(key)
+            try:
+                os.utime(entry.path)
+            except OSError:
+                pass
+            stats = self._stats_for(hop)
+            stats['reused'] += 1
+            stats['bytes_reused'] += entry.size
+            return entry.path
+
+    def put(self, key: str, hop: Tuple[str, str], source_path: str) -> Optional[str]:
+        """Copia un resultado intermedio al almacén y aplica los límites"""
+        try:
+            with self._lock:
+                if key in self._entries:
+                    return self._entries[key].path
+                target = self._artifact_path(key, hop[1])
+                shutil.copyfile(source_path, target)
+                entry = ArtifactEntry(key, str(target), target.stat().st_size, hop)
+                self._register(entry)
+                self._stats_for(hop)['stored'] += 1
+                self._evict()
+                return entry.path if key in self._entries else None
+        except Exception as e:
+            logging.warning(f"No se pudo almacenar el artefacto {hop[0]}→{hop[1]}: {e}")
+            return None
+
+    def record_miss(self, hop: Tuple[str, str]):
+        """Registra que un paso tuvo que calcularse"""
+        with self._lock:
+            self._stats_for(hop)['computed'] += 1
+
+    def find_deepest_prefix(self, file_hash: str, path: Sequence[str],
+                            versions: Sequence[str]) -> Tuple[int, Optional[str]]:
+        """
+        Busca el prefijo intermedio más largo disponible para una ruta
+
+        Args:
+            file_hash: SHA-256 del archivo original
+            path: Formatos de la ruta, de origen a destino
+            versions: Versión del conversor de cada paso (len(path) - 1)
+
+        Returns:
+            (índice del formato alcanzado, ruta del artefacto) o (0, None)
+        """
+        # El último formato es el resultado final: no se considera intermedio
+        for index in range(len(path) - 2, 0, -1):
+            key = self.prefix_key(file_hash, path[:index + 1], versions[:index])
+            artifact = self.get(key, (path[index - 1], path[index]))
+            if artifact:
+                return index, artifact
+        return 0, None
+
+    def _register(self, entry: ArtifactEntry):
+        previous = self._entries.pop(entry.key, None)
+        if previous:
+            self._total_size -= previous.size
+        self._entries[entry.key] = entry
+        self._total_size += entry.size
+
+    def _forget(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._total_size -= entry.size
+
+    def _evict(self):
+        """Elimina los artefactos menos usados hasta cumplir tamaño y número de entradas"""
+        while self._entries and (self._total_size > self.max_size_bytes
+                                 or len(self._entries) > self.max_entries):
+            key, entry = self._entries.popitem(last=False)
+            self._total_size -= entry.size
+            try:
+                if os.path.exists(entry.path):
+                    os.remove(entry.path)
+            except OSError as e:
+                logging.warning(f"Error eliminando artefacto {key[:8]}: {e}")
+
+    def _stats_for(self, hop: Tuple[str, str]) -> Dict[str, int]:
+        return self._hop_stats.setdefault(
+            tuple(hop), {'reused': 0, 'computed': 0, 'stored': 0, 'bytes_reused': 0}
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas del almacén y de reutilización por paso"""
+        with self._lock:
+            hops: List[Dict[str, Any]] = []
+            for (source, target), stats in sorted(self._hop_stats.items()):
+                total = stats['reused'] + stats['computed']
+                hops.append({
+                    'hop': f"{source}→{target}",
+                    **stats,
+                    'reuse_rate': stats['reused'] / total if total else 0.0
+                })
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'total_size_mb': self._total_size / (1024 * 1024),
+                'max_size_mb': self.max_size_bytes / (1024 * 1024),
+                'hops': hops
+            }
+
+    def clear(self) -> int:
+        """Vacía el almacén y devuelve el número de artefactos eliminados"""
+        with self._lock:
+            removed = len(self._entries)
+            self.max_entries, max_entries = 0, self.max_entries
+            self._evict()
+            self.max_entries = max_entries
+            return removed
+
+
+# Instancia global del almacén de artefactos intermedios
+artifact_store = IntermediateArtifactStore(
+    store_dir=os.environ.get('ARTIFACT_STORE_DIR'),
+    max_size_mb=float(os.environ.get('ARTIFACT_STORE_MAX_MB', 1024)),
+    max_entries=int(os.environ.get('ARTIFACT_STORE_MAX_ENTRIES', 500))
+)
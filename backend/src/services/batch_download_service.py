@@ -9,11 +9,41 @@ import tempfile
 import uuid
 import time
 import json
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Iterator
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 from pathlib import Path
 
+# Formatos ya comprimidos: se guardan sin volver a comprimir (ZIP_STORED)
+STORED_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif',
+    '.mp4', '.webm', '.mp3', '.ogg',
+    '.docx', '.xlsx', '.pptx', '.odt', '.epub',
+    '.zip', '.gz', '.7z', '.rar'
+}
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class _ZipStreamBuffer:
+    """Destino no posicionable para ZipFile: acumula lo escrito hasta que se vacía"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
 @dataclass
 class BatchItem:
     """Elemento de descarga por lotes"""
@@ -105,6 +135,91 @@ class BatchDownloadService:
         
         return True
 
+    def iter_batch_zip(self, batch_id: str, progress_callback: Optional[callable] = None,
+                       chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        """Genera el ZIP del lote por fragmentos a medida que se leen los archivos
+
+        Las entradas se escriben con descriptor de datos (el destino no es
+        posicionable), así que el primer fragmento sale sin esperar al resto.
+        """
+        batch = self.active_batches[batch_id]
+        buffer = _ZipStreamBuffer()
+        total_files = len(batch.items)
+        used_names = set()
+
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for i, item in enumerate(batch.items):
+                if not os.path.exists(item.file_path):
+                    continue
+
+                # Evitar nombres duplicados
+                arcname = item.converted_filename
+                name, ext = os.path.splitext(arcname)
+                counter = 1
+                while arcname in used_names:
+                    arcname = f"{name}_{counter}{ext}"
+                    counter += 1
+                used_names.add(arcname)
+
+                zinfo = zipfile.ZipInfo.from_file(item.file_path, arcname)
+                zinfo.compress_type = zipfile.ZIP_STORED if ext.lower() in STORED_EXTENSIONS \
+                    else zipfile.ZIP_DEFLATED
+
+                with open(item.file_path, 'rb') as src, zipf.open(zinfo, 'w') as dst:
+                    while True:
+                        chunk = src.read(chunk_size)
+                        if not chunk:
+                            break
+                        dst.write(chunk)
+                        data = buffer.drain()
+                        if data:
+                            yield data
+                yield buffer.drain()
+
+                # Callback de progreso
+                if progress_callback:
+                    progress = ((i + 1) / total_files) * 100
+                    progress_callback(progress, f"Agregando {arcname} al ZIP")
+
+            # Agregar archivo de información del lote
+            zipf.writestr('ANCLORA_BATCH_INFO.json', json.dumps(self._batch_manifest(batch), indent=2))
+
+        yield buffer.drain()
+
+    def _batch_manifest(self, batch: BatchDownload) -> Dict[str, Any]:
+        return {
+            'batch_id': batch.batch_id,
+            'created_at': batch.created_at.isoformat(),
+            'total_files': len(batch.items),
+            'total_size_mb': batch.total_size / (1024 * 1024),
+            'conversions': [
+                {
+                    'original': item.original_filename,
+                    'converted': item.converted_filename,
+                    'conversion_info': item.conversion_info
+                } for item in batch.items
+            ],
+            'generated_by': 'Anclora Nexus - Tu Contenido, Reinventado',
+            'website': 'https://anclora.com'
+        }
+
+    def stream_batch_zip(self, batch_id: str) -> Optional[Iterator[bytes]]:
+        """Devuelve el generador del ZIP para enviarlo directamente en la respuesta"""
+
+        if batch_id not in self.active_batches:
+            return None
+
+        batch = self.active_batches[batch_id]
+
+        # Verificar estado y expiración
+        if batch.status in ('expired', 'error') or datetime.now() > batch.expires_at or not batch.items:
+            return None
+
+        # Incrementar contador de descargas
+        batch.download_count += 1
+
+        return self.iter_batch_zip(batch_id)
+
     async def prepare_batch_zip(self, batch_id: str, progress_callback: Optional[callable] = None) -> bool:
         """Prepara el archivo ZIP del lote"""
         
@@ -117,52 +232,13 @@ class BatchDownloadService:
             return False
         
         try:
-            # Crear archivo ZIP
+            # Crear archivo ZIP con el mismo generador que la descarga directa
             zip_filename = f"{batch_id}.zip"
             zip_path = os.path.join(self.batch_dir, zip_filename)
             
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                total_files = len(batch.items)
-                
-                # Agregar cada archivo al ZIP
-                for i, item in enumerate(batch.items):
-                    if os.path.exists(item.file_path):
-                        # Usar nombre convertido para el archivo en el ZIP
-                        arcname = item.converted_filename
-                        
-                        # Evitar nombres duplicados
-                        counter = 1
-                        original_arcname = arcname
-                        while arcname in [info.filename for info in zipf.filelist]:
-                            name, ext = os.path.splitext(original_arcname)
-                            arcname = f"{name}_{counter}{ext}"
-                            counter += 1
-                        
-                        zipf.write(item.file_path, arcname)
-                        
-                        # Callback de progreso
-                        if progress_callback:
-                            progress = ((i + 1) / total_files) * 100
-                            progress_callback(progress, f"Agregando {arcname} al ZIP")
-                
-                # Agregar archivo de información del lote
-                batch_info = {
-                    'batch_id': batch_id,
-                    'created_at': batch.created_at.isoformat(),
-                    'total_files': len(batch.items),
-                    'total_size_mb': batch.total_size / (1024 * 1024),
-                    'conversions': [
-                        {
-                            'original': item.original_filename,
-                            'converted': item.converted_filename,
-                            'conversion_info': item.conversion_info
-                        } for item in batch.items
-                    ],
-                    'generated_by': 'Anclora Nexus - Tu Contenido, Reinventado',
-                    'website': 'https://anclora.com'
-                }
-                
-                zipf.writestr('ANCLORA_BATCH_INFO.json', json.dumps(batch_info, indent=2))
+            with open(zip_path, 'wb') as zip_file:
+                for data in self.iter_batch_zip(batch_id, progress_callback):
+                    zip_file.write(data)
             
             # Actualizar estado del lote
             batch.zip_path = zip_path
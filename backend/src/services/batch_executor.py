@@ -0,0 +1,249 @@
+"""
+Ejecución concurrente de lotes de conversión para Anclora Nexus
+Aplica una política de concurrencia (hilos para conversores de E/S o
+subprocesos, procesos para conversores de CPU en Python puro), límites por
+conversor y timeouts por tarea, y devuelve los resultados en el orden de entrada
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.services.conversion_queue import _run_conversion_job
+from src.ws import emit_progress, Phase
+
+POLICY_MODES = ('sequential', 'threads', 'processes', 'auto')
+
+
+def _warm_worker():
+    """Inicializador del pool: carga el motor antes de aceptar tareas"""
+    from src.models import conversion  # noqa: F401
+    return os.getpid()
+
+
+def _partial_path(output_path: str) -> str:
+    """Ruta temporal junto a la salida, con la misma extensión"""
+    root, ext = os.path.splitext(output_path)
+    return f"{root}.partial-{uuid.uuid4().hex[:8]}{ext}"
+
+
+def _discard(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+@dataclass
+class BatchPolicy:
+    """Política de concurrencia de un lote"""
+    mode: str = 'sequential'  # sequential | threads | processes | auto (según el conversor)
+    max_workers: Optional[int] = None
+    timeout: Optional[float] = None  # Segundos por tarea, desde que empieza a ejecutarse
+    converter_limits: Dict[Tuple[str, str], int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if self.mode not in POLICY_MODES:
+            raise ValueError(f"Modo de concurrencia no soportado: {self.mode}")
+
+
+class BatchExecutor:
+    """Ejecuta un lote con la política indicada sobre un ConversionEngine"""
+
+    def __init__(self, engine, policy: BatchPolicy):
+        self.engine = engine
+        self.policy = policy
+        self.max_workers = policy.max_workers or min(32, (os.cpu_count() or 2) + 4)
+        self._limits: Dict[Tuple[str, str], threading.BoundedSemaphore] = {}
+        self._limits_lock = threading.Lock()
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._process_pool_lock = threading.Lock()
+        # Solo se envían al pool tantas tareas como procesos tiene: el timeout
+        # empieza a contar cuando hay un proceso libre que la ejecuta
+        self.process_workers = min(self.max_workers, os.cpu_count() or 2)
+        self._process_slots = threading.BoundedSemaphore(self.process_workers)
+
+    def run(self, tasks: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Genera los resultados en el orden de las tareas a medida que están listos"""
+        tasks = list(tasks)
+        if self.policy.mode == 'sequential':
+            for task in tasks:
+                yield self._execute(task)
+            return
+
+        orchestrator = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='batch')
+        try:
+            futures = [orchestrator.submit(self._execute, task) for task in tasks]
+            for future in futures:
+                yield future.result()
+        finally:
+            orchestrator.shutdown(wait=True)
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=False, cancel_futures=True)
+
+    def _execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """Ejecuta una tarea respetando el límite de su conversor"""
+        input_path = task['input_path']
+        output_path = task['output_path']
+        source = (task.get('source_format') or input_path.split('.')[-1]).lower()
+        target = task['target_format'].lower()
+        conversion_id = task.get('conversion_id')
+        mode, _ = self.engine.get_converter_policy(source, target)
+        if self.policy.mode in ('threads', 'processes'):
+            mode = self.policy.mode
+
+        if conversion_id is not None:
+            emit_progress(conversion_id, Phase.PREPROCESS, 0)
+            emit_progress(conversion_id, Phase.PREPROCESS, 100)
+
+        with self._limit_for(source, target):
+            if conversion_id is not None:
+                emit_progress(conversion_id, Phase.CONVERT, 0)
+            start_time = time.time()
+            if self.policy.mode == 'sequential':
+                success, message = self.engine.convert_file(input_path, output_path, source, target)
+                timed_out = False
+            elif mode == 'processes':
+                success, message, timed_out = self._run_in_process(input_path, output_path, source, target)
+            else:
+                success, message, timed_out = self._run_in_thread(input_path, output_path, source, target)
+            elapsed = time.time() - start_time
+
+        if conversion_id is not None:
+            emit_progress(conversion_id, Phase.CONVERT, 100)
+            emit_progress(conversion_id, Phase.POSTPROCESS, 0)
+            emit_progress(conversion_id, Phase.POSTPROCESS, 100)
+
+        result = {
+            'input_path': input_path,
+            'output_path': output_path,
+            'success': success,
+            'message': message
+        }
+        if self.policy.mode != 'sequential':
+            result.update({
+                'task_id': task.get('task_id'),
+                'mode': mode,
+                'duration': elapsed,
+                'timed_out': timed_out
+            })
+        return result
+
+    def _limit_for(self, source: str, target: str) -> threading.BoundedSemaphore:
+        """Semáforo del conversor: límite de la política, el declarado por el plugin o ninguno"""
+        key = (source, target)
+        with self._limits_lock:
+            if key not in self._limits:
+                _, declared = self.engine.get_converter_policy(source, target)
+                limit = self.policy.converter_limits.get(key) or declared or self.max_workers
+                self._limits[key] = threading.BoundedSemaphore(limit)
+            return self._limits[key]
+
+    def _timeout_message(self) -> str:
+        return f"Tiempo de conversión agotado ({self.policy.timeout:.0f}s)"
+
+    def _run_in_thread(self, input_path, output_path, source, target):
+        """Ejecuta en un hilo propio para poder abandonar la espera al vencer el timeout
+
+        La conversión escribe en una ruta temporal que solo se mueve a
+        `output_path` si termina a tiempo; un hilo abandonado no puede dejar
+        después una salida a medias en el destino.
+        """
+        if self.policy.timeout is None:
+            success, message = self.engine.convert_file(input_path, output_path, source, target)
+            return success, message, False
+
+        partial_path = _partial_path(output_path)
+        outcome: List[Tuple[bool, str]] = []
+        abandoned = threading.Event()
+
+        def target_fn():
+            try:
+                outcome.append(self.engine.convert_file(input_path, partial_path, source, target))
+            except Exception as e:
+                outcome.append((False, f"Error durante la conversión: {str(e)}"))
+            if abandoned.is_set():
+                _discard(partial_path)
+
+        worker = threading.Thread(target=target_fn, daemon=True, name=f'convert-{source}-{target}')
+        worker.start()
+        worker.join(self.policy.timeout)
+        if worker.is_alive():
+            # El hilo no puede interrumpirse: se abandona y descarta su salida al terminar
+            abandoned.set()
+            _discard(partial_path)
+            logging.warning(f"Timeout en conversión {source}→{target}: {input_path}")
+            return False, self._timeout_message(), True
+        success, message = outcome[0]
+        return self._publish(partial_path, output_path, success, message), message, False
+
+    def _run_in_process(self, input_path, output_path, source, target):
+        """Ejecuta en el pool de procesos compartido por el lote
+
+        Al vencer el timeout se terminan los procesos del pool (un proceso no
+        puede cancelarse desde el executor) y se descarta su salida; las tareas
+        que compartían ese pool se reenvían a uno nuevo.
+        """
+        partial_path = _partial_path(output_path)
+        with self._process_slots:
+            while True:
+                pool = self._get_process_pool()
+                future = pool.submit(_run_conversion_job, input_path, partial_path, source, target)
+                try:
+                    success, message, _ = future.result(timeout=self.policy.timeout)
+                    return self._publish(partial_path, output_path, success, message), message, False
+                except FutureTimeout:
+                    self._retire_process_pool(pool)
+                    _discard(partial_path)
+                    logging.warning(f"Timeout en conversión {source}→{target}: {input_path}")
+                    return False, self._timeout_message(), True
+                except BrokenProcessPool as e:
+                    _discard(partial_path)
+                    if self._process_pool is not pool:
+                        # Pool retirado por el timeout de otra tarea: se repite en el nuevo
+                        continue
+                    self._retire_process_pool(pool)
+                    return False, f"Error durante la conversión: {str(e)}", False
+                except Exception as e:
+                    _discard(partial_path)
+                    return False, f"Error durante la conversión: {str(e)}", False
+
+    @staticmethod
+    def _publish(partial_path: str, output_path: str, success: bool, message: str) -> bool:
+        """Mueve la salida temporal al destino si la conversión ha terminado bien"""
+        if success and os.path.exists(partial_path):
+            os.replace(partial_path, output_path)
+            return True
+        _discard(partial_path)
+        return success
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        with self._process_pool_lock:
+            if self._process_pool is None:
+                # 'spawn' como en la cola: no hereda locks de los hilos del lote
+                context = multiprocessing.get_context(
+                    os.environ.get('CONVERSION_WORKER_START_METHOD', 'spawn')
+                )
+                pool = ProcessPoolExecutor(max_workers=self.process_workers, mp_context=context,
+                                           initializer=_warm_worker)
+                # Arranque e importación del motor fuera del timeout de las tareas
+                for future in [pool.submit(os.getpid) for _ in range(self.process_workers)]:
+                    future.result()
+                self._process_pool = pool
+            return self._process_pool
+
+    def _retire_process_pool(self, pool: ProcessPoolExecutor):
+        """Sustituye el pool y termina sus procesos"""
+        with self._process_pool_lock:
+            if self._process_pool is pool:
+                self._process_pool = None
+        for process in list((getattr(pool, '_processes', None) or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,243 @@
+"""
+Pool de navegadores headless para Anclora Nexus
+Mantiene Chromium caliente por proceso y entrega un contexto aislado por trabajo,
+de modo que las conversiones HTML→PDF no pagan el arranque del navegador
+"""
+
+import asyncio
+import atexit
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+try:
+    from playwright.async_api import async_playwright
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+
+# Viewport A4 a 96 DPI y opciones de PDF por defecto
+A4_VIEWPORT = {"width": 794, "height": 1123}
+DEFAULT_PDF_OPTIONS = {
+    "format": "A4",
+    "margin": {"top": "20mm", "bottom": "20mm", "left": "20mm", "right": "20mm"},
+    "print_background": True,  # Incluir fondos CSS
+    "prefer_css_page_size": True,  # Respetar CSS @page
+    "display_header_footer": False
+}
+
+
+@dataclass
+class PooledBrowser:
+    """Navegador del pool y su uso"""
+    browser: Any
+    launched_at: float = field(default_factory=time.time)
+    pages_served: int = 0
+    active: int = 0
+    retiring: bool = False
+
+    def is_healthy(self) -> bool:
+        try:
+            return self.browser.is_connected()
+        except Exception:
+            return False
+
+
+class BrowserPool:
+    """Pool de navegadores compartido por proceso
+
+    Todo Playwright vive en un hilo propio con su bucle asyncio; las llamadas
+    de cualquier hilo se encolan en él y se renderizan de forma concurrente
+    con un contexto nuevo por trabajo. Cada navegador se recicla tras servir
+    `max_pages_per_browser` documentos o si deja de estar conectado.
+    """
+
+    def __init__(self, size: Optional[int] = None, max_pages_per_browser: Optional[int] = None,
+                 max_concurrency: Optional[int] = None):
+        self.size = size or int(os.environ.get('BROWSER_POOL_SIZE', '1'))
+        self.max_pages_per_browser = max_pages_per_browser or \
+            int(os.environ.get('BROWSER_POOL_MAX_PAGES', '100'))
+        self.max_concurrency = max_concurrency or int(os.environ.get('BROWSER_POOL_CONCURRENCY', '4'))
+
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._playwright = None
+        self._browsers: List[PooledBrowser] = []
+        self._acquire_lock: Optional[asyncio.Lock] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.stats = {'renders': 0, 'failures': 0, 'launches': 0, 'recycled': 0, 'unhealthy': 0}
+
+    # ------------------------------------------------------------------
+    # API síncrona
+
+    def render_pdf(self, input_path: str, output_path: str, pdf_options: Optional[Dict] = None,
+                   timeout: float = 60.0):
+        """Renderiza un HTML a PDF con un contexto aislado; lanza excepción si falla"""
+        future = asyncio.run_coroutine_threadsafe(
+            self._render(os.path.abspath(input_path), output_path, pdf_options), self._ensure_loop()
+        )
+        try:
+            return future.result(timeout)
+        except Exception:
+            # Cancelar cierra el contexto aunque el llamante ya no espere
+            future.cancel()
+            raise
+
+    def health_check(self, timeout: float = 10.0) -> Dict[str, Any]:
+        """Comprueba cada navegador y retira los que no responden"""
+        if self._loop is None or self._pid != os.getpid():
+            return {'running': False, 'browsers': []}
+        future = asyncio.run_coroutine_threadsafe(self._health_check(), self._loop)
+        return future.result(timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            'running': self._loop is not None and self._pid == os.getpid(),
+            'size': self.size,
+            'max_pages_per_browser': self.max_pages_per_browser,
+            'max_concurrency': self.max_concurrency,
+            'browsers': [
+                {'pages_served': b.pages_served, 'active': b.active, 'retiring': b.retiring,
+                 'age_seconds': round(time.time() - b.launched_at, 1)}
+                for b in self._browsers
+            ]
+        }
+
+    def shutdown(self, timeout: float = 10.0):
+        """Cierra navegadores y detiene el hilo del pool"""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                return
+            loop, thread = self._loop, self._thread
+            try:
+                asyncio.run_coroutine_threadsafe(self._close_all(), loop).result(timeout)
+            except Exception as e:
+                logging.warning(f"Error cerrando el pool de navegadores: {e}")
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            if not thread.is_alive():
+                loop.close()
+            self._reset()
+
+    # ------------------------------------------------------------------
+    # Bucle del pool
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._pid != os.getpid():
+                # Proceso hijo: el hilo y los navegadores del padre no existen aquí
+                self._reset()
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='browser-pool', daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+                asyncio.run_coroutine_threadsafe(self._init_primitives(), loop).result()
+            return self._loop
+
+    async def _init_primitives(self):
+        self._acquire_lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def _launch_browser(self):
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        return await self._playwright.chromium.launch()
+
+    async def _acquire(self) -> PooledBrowser:
+        async with self._acquire_lock:
+            for pooled in list(self._browsers):
+                if not pooled.is_healthy():
+                    self.stats['unhealthy'] += 1
+                    pooled.retiring = True
+                if pooled.retiring and pooled.active == 0:
+                    await self._close(pooled)
+
+            candidates = [b for b in self._browsers if not b.retiring]
+            if len(candidates) < self.size:
+                pooled = PooledBrowser(await self._launch_browser())
+                self.stats['launches'] += 1
+                self._browsers.append(pooled)
+                candidates.append(pooled)
+
+            pooled = min(candidates, key=lambda b: b.active)
+            pooled.active += 1
+            return pooled
+
+    async def _release(self, pooled: PooledBrowser):
+        pooled.active -= 1
+        pooled.pages_served += 1
+        if pooled.pages_served >= self.max_pages_per_browser:
+            pooled.retiring = True
+        if pooled.retiring and pooled.active == 0:
+            async with self._acquire_lock:
+                await self._close(pooled)
+
+    async def _close(self, pooled: PooledBrowser):
+        if pooled in self._browsers:
+            self._browsers.remove(pooled)
+            self.stats['recycled'] += 1
+        try:
+            await pooled.browser.close()
+        except Exception:
+            pass
+
+    async def _render(self, input_path: str, output_path: str, pdf_options: Optional[Dict]):
+        async with self._semaphore:
+            pooled = await self._acquire()
+            try:
+                context = await pooled.browser.new_context(viewport=A4_VIEWPORT)
+                try:
+                    page = await context.new_page()
+                    await page.goto(f"file://{input_path}")
+                    # Esperar a que se carguen todos los recursos
+                    await page.wait_for_load_state("networkidle")
+                    await page.pdf(path=output_path, **{**DEFAULT_PDF_OPTIONS, **(pdf_options or {})})
+                finally:
+                    await context.close()
+                self.stats['renders'] += 1
+            except BaseException:
+                self.stats['failures'] += 1
+                raise
+            finally:
+                await self._release(pooled)
+
+    async def _health_check(self) -> Dict[str, Any]:
+        browsers = []
+        async with self._acquire_lock:
+            for pooled in list(self._browsers):
+                healthy = pooled.is_healthy()
+                if healthy:
+                    try:
+                        context = await asyncio.wait_for(pooled.browser.new_context(), 5)
+                        await context.close()
+                    except Exception:
+                        healthy = False
+                browsers.append({'healthy': healthy, 'pages_served': pooled.pages_served})
+                if not healthy:
+                    self.stats['unhealthy'] += 1
+                    pooled.retiring = True
+                    if pooled.active == 0:
+                        await self._close(pooled)
+        return {'running': True, 'browsers': browsers}
+
+    async def _close_all(self):
+        for pooled in list(self._browsers):
+            await self._close(pooled)
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+# Instancia global del pool de navegadores (una por proceso)
+browser_pool = BrowserPool()
+atexit.register(browser_pool.shutdown)
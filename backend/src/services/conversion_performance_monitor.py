@@ -6,14 +6,19 @@ Recopila métricas de tiempo, calidad y uso de recursos
 import time
 import json
 import os
+import sqlite3
+import threading
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import logging
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, fields
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Intervalo mínimo (segundos) entre compactaciones automáticas
+COMPACTION_INTERVAL = 3600
+
 @dataclass
 class ConversionMetrics:
     """Métricas de una conversión individual"""
@@ -31,15 +36,93 @@ class ConversionMetrics:
     error_message: Optional[str] = None
     user_satisfaction: Optional[int] = None  # 1-5 rating if available
 
+
+METRIC_FIELDS = [f.name for f in fields(ConversionMetrics)]
+
 class ConversionPerformanceMonitor:
-    """Monitor de rendimiento del sistema de conversión"""
+    """Monitor de rendimiento del sistema de conversión
+
+    Las métricas se guardan en una tabla SQLite (WAL) de solo inserción,
+    particionada por día, junto a un resumen diario por método y nivel que
+    se actualiza en la misma transacción. Registrar una conversión es una
+    inserción y los informes agregan el resumen de cada día en lugar de
+    recorrer todo el histórico. La compactación elimina las particiones
+    diarias más antiguas que la retención y conserva sus resúmenes.
+    """
     
-    def __init__(self, metrics_file: str = "conversion_metrics.json"):
+    def __init__(self, metrics_file: str = "conversion_metrics.json",
+                 retention_days: Optional[int] = None, rollup_retention_days: Optional[int] = None):
         self.metrics_file = Path(metrics_file)
-        self.metrics_data = self._load_metrics()
+        # Los ficheros .json heredados se migran a una base de datos hermana
+        self.db_path = self.metrics_file.with_suffix('.db') if self.metrics_file.suffix == '.json' \
+            else self.metrics_file
+        self.retention_days = retention_days or int(os.environ.get('METRICS_RETENTION_DAYS', '90'))
+        self.rollup_retention_days = rollup_retention_days or \
+            int(os.environ.get('METRICS_ROLLUP_RETENTION_DAYS', '730'))
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self._last_compaction = 0.0
+        self._init_database()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _init_database(self):
+        """Crea las tablas y migra el JSON heredado si la base de datos es nueva"""
+        is_new = not self.db_path.exists()
+        with self._lock:
+            conn = self._connection()
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS conversion_metrics (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ts REAL NOT NULL,
+                    day TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    input_file TEXT,
+                    output_file TEXT,
+                    html_complexity_score INTEGER,
+                    html_complexity_level TEXT,
+                    recommended_method TEXT,
+                    actual_method_used TEXT,
+                    conversion_duration REAL,
+                    input_file_size INTEGER,
+                    output_file_size INTEGER,
+                    success INTEGER,
+                    error_message TEXT,
+                    user_satisfaction INTEGER
+                );
+                CREATE INDEX IF NOT EXISTS idx_metrics_day ON conversion_metrics(day, ts);
+                CREATE INDEX IF NOT EXISTS idx_metrics_level_method
+                    ON conversion_metrics(html_complexity_level, actual_method_used, id);
+                CREATE TABLE IF NOT EXISTS metrics_daily (
+                    day TEXT NOT NULL,
+                    actual_method_used TEXT NOT NULL,
+                    html_complexity_level TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    successes INTEGER NOT NULL,
+                    total_duration REAL NOT NULL,
+                    total_output_size INTEGER NOT NULL,
+                    total_complexity INTEGER NOT NULL,
+                    PRIMARY KEY (day, actual_method_used, html_complexity_level)
+                );
+            ''')
+            if is_new and self.metrics_file != self.db_path:
+                legacy = self._load_metrics()
+                if legacy:
+                    with conn:
+                        for metric in legacy:
+                            self._insert(conn, metric)
+                    logger.info(f"Migradas {len(legacy)} métricas desde {self.metrics_file}")
     
     def _load_metrics(self) -> List[Dict]:
-        """Carga métricas existentes desde archivo"""
+        """Carga métricas del archivo JSON heredado"""
         if self.metrics_file.exists():
             try:
                 with open(self.metrics_file, 'r', encoding='utf-8') as f:
@@ -48,86 +131,177 @@ class ConversionPerformanceMonitor:
                 logger.warning(f"Error cargando métricas: {e}")
                 return []
         return []
-    
-    def _save_metrics(self):
-        """Guarda métricas al archivo"""
-        try:
-            with open(self.metrics_file, 'w', encoding='utf-8') as f:
-                json.dump(self.metrics_data, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            logger.error(f"Error guardando métricas: {e}")
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, metric: Dict):
+        moment = datetime.fromisoformat(metric['timestamp'])
+        day = moment.date().isoformat()
+        success = 1 if metric['success'] else 0
+        conn.execute(
+            f"INSERT INTO conversion_metrics (ts, day, {', '.join(METRIC_FIELDS)}) "
+            f"VALUES (?, ?, {', '.join('?' * len(METRIC_FIELDS))})",
+            [moment.timestamp(), day] + [metric.get(name) for name in METRIC_FIELDS]
+        )
+        conn.execute('''
+            INSERT INTO metrics_daily VALUES (?, ?, ?, 1, ?, ?, ?, ?)
+            ON CONFLICT(day, actual_method_used, html_complexity_level) DO UPDATE SET
+                count = count + 1,
+                successes = successes + excluded.successes,
+                total_duration = total_duration + excluded.total_duration,
+                total_output_size = total_output_size + excluded.total_output_size,
+                total_complexity = total_complexity + excluded.total_complexity
+        ''', (day, metric['actual_method_used'], metric['html_complexity_level'], success,
+              metric['conversion_duration'], metric['output_file_size'], metric['html_complexity_score']))
     
     def record_conversion(self, metrics: ConversionMetrics):
         """Registra métricas de una conversión"""
-        self.metrics_data.append(asdict(metrics))
-        self._save_metrics()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                self._insert(conn, asdict(metrics))
+            if time.time() - self._last_compaction > COMPACTION_INTERVAL:
+                self._compact(conn)
         logger.info(f"Métricas registradas para {metrics.input_file}")
+
+    def compact(self) -> Dict[str, int]:
+        """Elimina particiones diarias fuera de la retención"""
+        with self._lock:
+            return self._compact(self._connection())
+
+    def _compact(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        self._last_compaction = time.time()
+        today = datetime.now().date()
+        raw_cutoff = (today - timedelta(days=self.retention_days)).isoformat()
+        rollup_cutoff = (today - timedelta(days=self.rollup_retention_days)).isoformat()
+        with conn:
+            raw = conn.execute('DELETE FROM conversion_metrics WHERE day < ?', (raw_cutoff,)).rowcount
+            rollups = conn.execute('DELETE FROM metrics_daily WHERE day < ?', (rollup_cutoff,)).rowcount
+        if raw or rollups:
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            logger.info(f"Métricas compactadas: {raw} registros y {rollups} resúmenes eliminados")
+        return {'metrics_removed': raw, 'rollups_removed': rollups}
+
+    @property
+    def metrics_data(self) -> List[Dict]:
+        """Todas las métricas retenidas como diccionarios (recorre la tabla)"""
+        return list(self.iter_metrics())
+
+    def iter_metrics(self, since: Optional[datetime] = None):
+        """Itera las métricas retenidas en orden de registro"""
+        query = f"SELECT {', '.join(METRIC_FIELDS)} FROM conversion_metrics"
+        params = ()
+        if since is not None:
+            query += ' WHERE ts >= ?'
+            params = (since.timestamp(),)
+        with self._lock:
+            rows = self._connection().execute(query + ' ORDER BY id', params).fetchall()
+        for row in rows:
+            metric = dict(zip(METRIC_FIELDS, row))
+            metric['success'] = bool(metric['success'])
+            yield metric
+
+    def recent_attempts(self, per_group: int) -> List[tuple]:
+        """Últimos intentos por (nivel, método): (nivel, método, éxito, duración), de antiguo a reciente"""
+        with self._lock:
+            rows = self._connection().execute('''
+                SELECT html_complexity_level, actual_method_used, success, conversion_duration FROM (
+                    SELECT id, html_complexity_level, actual_method_used, success, conversion_duration,
+                           ROW_NUMBER() OVER (PARTITION BY html_complexity_level, actual_method_used
+                                              ORDER BY id DESC) AS rn
+                    FROM conversion_metrics
+                ) WHERE rn <= ? ORDER BY id
+            ''', (per_group,)).fetchall()
+        return [(level, method, bool(success), float(duration)) for level, method, success, duration in rows]
+
+    def _window_rollups(self, cutoff_date: datetime) -> List[tuple]:
+        """Resúmenes (día, método, nivel, n, éxitos, duración, tamaño, complejidad) desde `cutoff_date`
+
+        Los días completos salen del resumen diario; el día del corte se
+        agrega desde las filas individuales si aún están retenidas.
+        """
+        cutoff_day = cutoff_date.date().isoformat()
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute('''
+                SELECT day, actual_method_used, html_complexity_level, count, successes,
+                       total_duration, total_output_size, total_complexity
+                FROM metrics_daily WHERE day > ? ORDER BY day
+            ''', (cutoff_day,)).fetchall()
+            if conn.execute('SELECT 1 FROM conversion_metrics WHERE day = ? LIMIT 1', (cutoff_day,)).fetchone():
+                edge = conn.execute('''
+                    SELECT day, actual_method_used, html_complexity_level, COUNT(*), SUM(success),
+                           SUM(conversion_duration), SUM(output_file_size), SUM(html_complexity_score)
+                    FROM conversion_metrics WHERE day = ? AND ts >= ?
+                    GROUP BY actual_method_used, html_complexity_level
+                ''', (cutoff_day, cutoff_date.timestamp())).fetchall()
+            else:
+                edge = conn.execute('''
+                    SELECT day, actual_method_used, html_complexity_level, count, successes,
+                           total_duration, total_output_size, total_complexity
+                    FROM metrics_daily WHERE day = ?
+                ''', (cutoff_day,)).fetchall()
+        return edge + rows
     
     def get_performance_report(self, days: int = 7) -> Dict:
         """Genera reporte de rendimiento de los últimos N días"""
         
         cutoff_date = datetime.now() - timedelta(days=days)
-        recent_metrics = [
-            m for m in self.metrics_data 
-            if datetime.fromisoformat(m['timestamp']) >= cutoff_date
-        ]
+        rollups = self._window_rollups(cutoff_date)
         
-        if not recent_metrics:
+        if not rollups:
             return {"error": "No hay datos suficientes para generar reporte"}
         
         # Calcular estadísticas generales
-        total_conversions = len(recent_metrics)
-        successful_conversions = sum(1 for m in recent_metrics if m['success'])
+        total_conversions = sum(r[3] for r in rollups)
+        successful_conversions = sum(r[4] for r in rollups)
         success_rate = (successful_conversions / total_conversions) * 100
         
-        # Estadísticas por método
+        # Estadísticas por método, por nivel de complejidad y tendencias diarias
         method_stats = {}
-        for metric in recent_metrics:
-            method = metric['actual_method_used']
-            if method not in method_stats:
-                method_stats[method] = {
-                    'count': 0,
-                    'success_count': 0,
-                    'total_duration': 0,
-                    'total_output_size': 0,
-                    'complexity_scores': []
-                }
-            
-            stats = method_stats[method]
-            stats['count'] += 1
-            if metric['success']:
-                stats['success_count'] += 1
-            stats['total_duration'] += metric['conversion_duration']
-            stats['total_output_size'] += metric['output_file_size']
-            stats['complexity_scores'].append(metric['html_complexity_score'])
+        complexity_stats = {}
+        daily_stats = {}
+        for day, method, level, count, successes, duration, output_size, complexity in rollups:
+            stats = method_stats.setdefault(method, {
+                'count': 0,
+                'success_count': 0,
+                'total_duration': 0,
+                'total_output_size': 0,
+                'total_complexity': 0
+            })
+            stats['count'] += count
+            stats['success_count'] += successes
+            stats['total_duration'] += duration
+            stats['total_output_size'] += output_size
+            stats['total_complexity'] += complexity
+
+            level_stats = complexity_stats.setdefault(level, {
+                'count': 0,
+                'avg_duration': 0,
+                'avg_output_size': 0,
+                'most_used_method': {}
+            })
+            level_stats['count'] += count
+            level_stats['avg_duration'] += duration
+            level_stats['avg_output_size'] += output_size
+            level_stats['most_used_method'][method] = level_stats['most_used_method'].get(method, 0) + count
+
+            day_stats = daily_stats.setdefault(day, {
+                'conversions': 0,
+                'successful': 0,
+                'total_duration': 0,
+                'avg_complexity': 0
+            })
+            day_stats['conversions'] += count
+            day_stats['successful'] += successes
+            day_stats['total_duration'] += duration
+            day_stats['avg_complexity'] += complexity
         
         # Calcular promedios por método
         for method, stats in method_stats.items():
             stats['success_rate'] = (stats['success_count'] / stats['count']) * 100
             stats['avg_duration'] = stats['total_duration'] / stats['count']
             stats['avg_output_size'] = stats['total_output_size'] / stats['count']
-            stats['avg_complexity'] = sum(stats['complexity_scores']) / len(stats['complexity_scores'])
-        
-        # Estadísticas por nivel de complejidad
-        complexity_stats = {}
-        for metric in recent_metrics:
-            level = metric['html_complexity_level']
-            if level not in complexity_stats:
-                complexity_stats[level] = {
-                    'count': 0,
-                    'avg_duration': 0,
-                    'avg_output_size': 0,
-                    'most_used_method': {}
-                }
-            
-            complexity_stats[level]['count'] += 1
-            complexity_stats[level]['avg_duration'] += metric['conversion_duration']
-            complexity_stats[level]['avg_output_size'] += metric['output_file_size']
-            
-            method = metric['actual_method_used']
-            if method not in complexity_stats[level]['most_used_method']:
-                complexity_stats[level]['most_used_method'][method] = 0
-            complexity_stats[level]['most_used_method'][method] += 1
+            stats['avg_complexity'] = stats['total_complexity'] / stats['count']
         
         # Finalizar cálculos de complejidad
         for level, stats in complexity_stats.items():
@@ -137,24 +311,6 @@ class ConversionPerformanceMonitor:
             most_used = max(stats['most_used_method'].items(), key=lambda x: x[1])
             stats['most_used_method'] = most_used[0]
         
-        # Tendencias de rendimiento
-        daily_stats = {}
-        for metric in recent_metrics:
-            date = datetime.fromisoformat(metric['timestamp']).date().isoformat()
-            if date not in daily_stats:
-                daily_stats[date] = {
-                    'conversions': 0,
-                    'successful': 0,
-                    'total_duration': 0,
-                    'avg_complexity': 0
-                }
-            
-            daily_stats[date]['conversions'] += 1
-            if metric['success']:
-                daily_stats[date]['successful'] += 1
-            daily_stats[date]['total_duration'] += metric['conversion_duration']
-            daily_stats[date]['avg_complexity'] += metric['html_complexity_score']
-        
         # Finalizar estadísticas diarias
         for date, stats in daily_stats.items():
             stats['success_rate'] = (stats['successful'] / stats['conversions']) * 100
@@ -168,8 +324,8 @@ class ConversionPerformanceMonitor:
                 'total_conversions': total_conversions,
                 'successful_conversions': successful_conversions,
                 'success_rate': round(success_rate, 2),
-                'avg_duration': round(sum(m['conversion_duration'] for m in recent_metrics) / total_conversions, 2),
-                'avg_output_size': round(sum(m['output_file_size'] for m in recent_metrics) / total_conversions, 0)
+                'avg_duration': round(sum(r[5] for r in rollups) / total_conversions, 2),
+                'avg_output_size': round(sum(r[6] for r in rollups) / total_conversions, 0)
             },
             'method_performance': {
                 method: {
@@ -190,13 +346,16 @@ class ConversionPerformanceMonitor:
                 }
                 for level, stats in complexity_stats.items()
             },
-            'daily_trends': daily_stats
+            'daily_trends': dict(sorted(daily_stats.items()))
         }
     
     def get_method_recommendations(self) -> Dict:
         """Analiza datos históricos para mejorar recomendaciones de métodos"""
         
-        if len(self.metrics_data) < 10:
+        with self._lock:
+            conn = self._connection()
+            total = conn.execute('SELECT COUNT(*) FROM conversion_metrics').fetchone()[0]
+        if total < 10:
             return {"error": "Datos insuficientes para análisis (mínimo 10 conversiones)"}
         
         # Analizar precisión de recomendaciones por rango de complejidad
@@ -210,33 +369,30 @@ class ConversionPerformanceMonitor:
         recommendations = {}
         
         for level, (min_score, max_score) in complexity_ranges.items():
-            relevant_metrics = [
-                m for m in self.metrics_data
-                if min_score <= m['html_complexity_score'] <= max_score
-                and m['success']
-            ]
+            # Analizar rendimiento por método en este rango
+            # (score de calidad basado en tamaño vs tiempo)
+            with self._lock:
+                rows = self._connection().execute('''
+                    SELECT actual_method_used, COUNT(*), SUM(conversion_duration), SUM(output_file_size),
+                           SUM(output_file_size / MAX(conversion_duration, 0.1))
+                    FROM conversion_metrics
+                    WHERE html_complexity_score BETWEEN ? AND ? AND success = 1
+                    GROUP BY actual_method_used ORDER BY MIN(id)
+                ''', (min_score, max_score)).fetchall()
             
-            if not relevant_metrics:
+            if not rows:
                 continue
             
-            # Analizar rendimiento por método en este rango
-            method_performance = {}
-            for metric in relevant_metrics:
-                method = metric['actual_method_used']
-                if method not in method_performance:
-                    method_performance[method] = {
-                        'count': 0,
-                        'total_duration': 0,
-                        'total_size': 0,
-                        'quality_score': 0
-                    }
-                
-                perf = method_performance[method]
-                perf['count'] += 1
-                perf['total_duration'] += metric['conversion_duration']
-                perf['total_size'] += metric['output_file_size']
-                # Calcular score de calidad basado en tamaño vs tiempo
-                perf['quality_score'] += metric['output_file_size'] / max(metric['conversion_duration'], 0.1)
+            method_performance = {
+                method: {
+                    'count': count,
+                    'total_duration': duration,
+                    'total_size': size,
+                    'quality_score': quality
+                }
+                for method, count, duration, size, quality in rows
+            }
+            relevant_count = sum(perf['count'] for perf in method_performance.values())
             
             # Calcular métricas finales y recomendar mejor método
             best_method = None
@@ -256,7 +412,7 @@ class ConversionPerformanceMonitor:
             
             recommendations[level] = {
                 'recommended_method': best_method,
-                'sample_size': len(relevant_metrics),
+                'sample_size': relevant_count,
                 'method_analysis': {
                     method: {
                         'count': perf['count'],
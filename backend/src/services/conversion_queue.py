@@ -0,0 +1,489 @@
+"""
+Cola persistente de trabajos de conversión para Anclora Nexus
+Desacopla las conversiones del hilo de la petición HTTP ejecutándolas en un
+pool de procesos configurable
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, asdict, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from src.ws import emit_progress, Phase
+
+DEFAULT_QUEUE_DB = Path(__file__).resolve().parents[2] / 'instance' / 'conversion_queue.db'
+
+# Cada proceso renueva el latido de sus trabajos 'running'; sin latido durante
+# STALE_AFTER segundos (o con el proceso dueño muerto) el trabajo vuelve a la cola
+HEARTBEAT_INTERVAL = float(os.environ.get('CONVERSION_QUEUE_HEARTBEAT_S', 10))
+STALE_AFTER = float(os.environ.get('CONVERSION_QUEUE_STALE_S', 120))
+# Intentos antes de dar por fallido un trabajo cuyo proceso trabajador muere
+MAX_ATTEMPTS = int(os.environ.get('CONVERSION_QUEUE_MAX_ATTEMPTS', 3))
+
+JOB_COLUMNS = ('job_id, conversion_id, input_path, output_path, source_format, target_format, status, '
+               'created_at, started_at, finished_at, processing_time, message, attempts, payload')
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat(timespec='microseconds')
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@dataclass
+class ConversionJob:
+    """Trabajo de conversión encolado"""
+    job_id: str
+    conversion_id: Optional[int]
+    input_path: str
+    output_path: str
+    source_format: str
+    target_format: str
+    status: str  # 'queued', 'running', 'completed', 'failed'
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    processing_time: Optional[float] = None
+    message: Optional[str] = None
+    attempts: int = 0
+    payload: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def success(self) -> bool:
+        return self.status == 'completed'
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _run_conversion_job(input_path: str, output_path: str,
+                        source_format: str, target_format: str,
+                        file_hash: Optional[str] = None):
+    """Ejecuta una conversión dentro de un proceso del pool"""
+    # Importación diferida: el motor se carga una vez por proceso trabajador
+    from src.models.conversion import conversion_engine
+
+    start_time = time.time()
+    try:
+        success, message = conversion_engine.convert_file(
+            input_path, output_path, source_format, target_format, file_hash=file_hash
+        )
+    except Exception as e:
+        success, message = False, f"Error durante la conversión: {str(e)}"
+    return success, message, time.time() - start_time
+
+
+class ConversionQueue:
+    """Cola de conversiones respaldada por SQLite con un pool de procesos"""
+
+    def __init__(self, db_path: Optional[str] = None, max_workers: Optional[int] = None,
+                 start_method: Optional[str] = None, poll_interval: float = 0.5):
+        self.db_path = Path(db_path or os.environ.get('CONVERSION_QUEUE_DB', DEFAULT_QUEUE_DB))
+        self.max_workers = max_workers or int(os.environ.get('CONVERSION_WORKERS', 0) or os.cpu_count() or 2)
+        # 'spawn' evita heredar locks de los hilos del servidor (SocketIO, despachador)
+        self.start_method = start_method or os.environ.get('CONVERSION_WORKER_START_METHOD', 'spawn')
+        self.poll_interval = poll_interval
+
+        self._app = None
+        self._completion_handler: Optional[Callable[[ConversionJob], None]] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._dispatcher: Optional[threading.Thread] = None
+        self._running = False
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._in_flight: Dict[str, Future] = {}
+        self.owner_id: Optional[str] = None
+        self._last_heartbeat = 0.0
+        # La base de datos se crea en el primer acceso, no al importar el módulo
+        self._initialized = False
+
+    def _connect(self):
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                    self._initialized = True
+                    self._init_database()
+        return sqlite3.connect(str(self.db_path), timeout=30)
+
+    def _init_database(self):
+        """Inicializar la tabla de trabajos"""
+        try:
+            with self._connect() as conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS conversion_jobs (
+                        job_id TEXT PRIMARY KEY,
+                        conversion_id INTEGER,
+                        input_path TEXT NOT NULL,
+                        output_path TEXT NOT NULL,
+                        source_format TEXT NOT NULL,
+                        target_format TEXT NOT NULL,
+                        status TEXT NOT NULL,
+                        created_at TEXT NOT NULL,
+                        started_at TEXT,
+                        finished_at TEXT,
+                        processing_time REAL,
+                        message TEXT,
+                        attempts INTEGER DEFAULT 0,
+                        payload TEXT DEFAULT '{}'
+                    )
+                ''')
+                # Dueño y latido de los trabajos en ejecución (columnas añadidas a colas existentes)
+                existing = {row[1] for row in conn.execute('PRAGMA table_info(conversion_jobs)')}
+                for column in ('owner', 'heartbeat_at'):
+                    if column not in existing:
+                        conn.execute(f'ALTER TABLE conversion_jobs ADD COLUMN {column} TEXT')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON conversion_jobs(status, created_at)')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_conversion ON conversion_jobs(conversion_id)')
+                conn.commit()
+        except Exception as e:
+            logging.error(f"Error inicializando cola de conversiones: {e}")
+
+    def init_app(self, app, completion_handler: Optional[Callable[[ConversionJob], None]] = None):
+        """Asocia la cola a la aplicación Flask para actualizar la base de datos al terminar"""
+        self._app = app
+        db_path = app.config.get('CONVERSION_QUEUE_DB')
+        if db_path and not self._initialized:
+            self.db_path = Path(db_path)
+        if completion_handler is not None:
+            self._completion_handler = completion_handler
+        workers = app.config.get('CONVERSION_WORKERS')
+        if workers:
+            self.max_workers = int(workers)
+
+    def register_completion_handler(self, handler: Callable[[ConversionJob], None]):
+        """Registra la función que finaliza el registro `Conversion` de cada trabajo"""
+        self._completion_handler = handler
+
+    def submit(self, input_path: str, output_path: str, source_format: str,
+               target_format: str, conversion_id: Optional[int] = None,
+               payload: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Encola una conversión y devuelve inmediatamente su identificador
+
+        Returns:
+            job_id del trabajo creado
+        """
+        job = ConversionJob(
+            job_id=str(uuid.uuid4()),
+            conversion_id=conversion_id,
+            input_path=input_path,
+            output_path=output_path,
+            source_format=source_format,
+            target_format=target_format,
+            status='queued',
+            created_at=datetime.utcnow().isoformat(),
+            payload=payload or {}
+        )
+
+        with self._lock, self._connect() as conn:
+            conn.execute('''
+                INSERT INTO conversion_jobs
+                (job_id, conversion_id, input_path, output_path, source_format, target_format,
+                 status, created_at, attempts, payload)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                job.job_id, job.conversion_id, job.input_path, job.output_path,
+                job.source_format, job.target_format, job.status, job.created_at,
+                job.attempts, json.dumps(job.payload)
+            ))
+            conn.commit()
+
+        if conversion_id is not None:
+            emit_progress(conversion_id, Phase.PREPROCESS, 100)
+
+        self.start()
+        self._wakeup.set()
+        logging.info(f"Trabajo encolado {job.job_id}: {source_format}→{target_format}")
+        return job.job_id
+
+    def get_job(self, job_id: str) -> Optional[ConversionJob]:
+        """Obtiene un trabajo por su identificador"""
+        with self._connect() as conn:
+            row = conn.execute(f'SELECT {JOB_COLUMNS} FROM conversion_jobs WHERE job_id = ?', (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def get_job_for_conversion(self, conversion_id: int) -> Optional[ConversionJob]:
+        """Obtiene el último trabajo asociado a una conversión"""
+        with self._connect() as conn:
+            row = conn.execute(
+                f'SELECT {JOB_COLUMNS} FROM conversion_jobs WHERE conversion_id = ? ORDER BY created_at DESC LIMIT 1',
+                (conversion_id,)
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def get_queue_stats(self) -> Dict[str, Any]:
+        """Estadísticas de la cola por estado"""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT status, COUNT(*) FROM conversion_jobs GROUP BY status').fetchall()
+        counts = {status: count for status, count in rows}
+        return {
+            'queued': counts.get('queued', 0),
+            'running': counts.get('running', 0),
+            'completed': counts.get('completed', 0),
+            'failed': counts.get('failed', 0),
+            'max_workers': self.max_workers,
+            'in_flight': len(self._in_flight),
+            'active': self._running
+        }
+
+    def start(self):
+        """Arranca el pool de procesos y el hilo despachador (idempotente)"""
+        with self._lock:
+            if self._running:
+                return
+            self._executor = self._create_executor()
+            self._running = True
+            # Identidad del proceso que reclama trabajos (tras un fork el PID cambia)
+            self.owner_id = f"{socket.gethostname()}:{os.getpid()}"
+            self._requeue_interrupted_jobs()
+            self._dispatcher = threading.Thread(
+                target=self._dispatch_loop, name='conversion-queue-dispatcher', daemon=True
+            )
+            self._dispatcher.start()
+            logging.info(f"Cola de conversiones iniciada con {self.max_workers} procesos")
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        context = multiprocessing.get_context(self.start_method)
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        """Sustituye el pool si un proceso trabajador ha muerto y lo ha dejado inservible"""
+        with self._lock:
+            if self._executor is not None and getattr(self._executor, '_broken', False):
+                logging.warning("Pool de conversiones roto por la caída de un proceso, se recrea")
+                self._executor.shutdown(wait=False)
+                self._executor = self._create_executor()
+            return self._executor
+
+    def shutdown(self, wait: bool = True):
+        """Detiene el despachador y el pool de procesos"""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            self._wakeup.set()
+            executor = self._executor
+            self._executor = None
+        if self._dispatcher and self._dispatcher is not threading.current_thread():
+            self._dispatcher.join(timeout=5)
+        if executor:
+            executor.shutdown(wait=wait)
+
+    def _requeue_interrupted_jobs(self):
+        """Devuelve a la cola los trabajos 'running' cuyo proceso dueño ya no existe
+
+        Un trabajo está abandonado si su dueño es un proceso de esta máquina que ha
+        terminado, o si su latido tiene más de STALE_AFTER segundos. Los trabajos
+        que otros procesos siguen convirtiendo no se tocan.
+        """
+        host = socket.gethostname()
+        cutoff = (datetime.utcnow() - timedelta(seconds=STALE_AFTER)).isoformat(timespec='microseconds')
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT job_id, owner FROM conversion_jobs WHERE status = 'running' AND owner LIKE ?",
+                (f'{host}:%',)
+            ).fetchall()
+            dead = [job_id for job_id, owner in rows
+                    if owner != self.owner_id and not _pid_alive(int(owner.rsplit(':', 1)[1]))]
+            requeued = 0
+            for job_id in dead:
+                requeued += conn.execute(
+                    "UPDATE conversion_jobs SET status = 'queued', started_at = NULL, owner = NULL, "
+                    "heartbeat_at = NULL WHERE job_id = ? AND status = 'running'", (job_id,)
+                ).rowcount
+            requeued += conn.execute(
+                "UPDATE conversion_jobs SET status = 'queued', started_at = NULL, owner = NULL, heartbeat_at = NULL "
+                "WHERE status = 'running' AND COALESCE(heartbeat_at, started_at, created_at) < ?",
+                (cutoff,)
+            ).rowcount
+            conn.commit()
+        if requeued:
+            logging.warning(f"Reencolados {requeued} trabajos interrumpidos")
+
+    def _heartbeat(self):
+        """Renueva el latido de los trabajos de este proceso y recupera los abandonados"""
+        now = time.monotonic()
+        if now - self._last_heartbeat < HEARTBEAT_INTERVAL:
+            return
+        self._last_heartbeat = now
+        if self._in_flight:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    "UPDATE conversion_jobs SET heartbeat_at = ? WHERE owner = ? AND status = 'running'",
+                    (_now(), self.owner_id)
+                )
+                conn.commit()
+        self._requeue_interrupted_jobs()
+
+    def _dispatch_loop(self):
+        """Envía trabajos pendientes al pool respetando el número de procesos"""
+        while self._running:
+            try:
+                self._heartbeat()
+                self._ensure_executor()
+                free_slots = self.max_workers - len(self._in_flight)
+                if free_slots > 0:
+                    for job in self._claim_jobs(free_slots):
+                        self._launch(job)
+            except Exception as e:
+                logging.error(f"Error en el despachador de conversiones: {e}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _claim_jobs(self, limit: int):
+        """Marca como 'running' los trabajos más antiguos en cola
+
+        Cada trabajo se reclama con un UPDATE condicionado a status = 'queued':
+        si otro proceso lo ha reclamado antes, rowcount es 0 y se descarta.
+        """
+        claimed = []
+        now = _now()
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {JOB_COLUMNS} FROM conversion_jobs WHERE status = 'queued' ORDER BY created_at LIMIT ?",
+                (limit,)
+            ).fetchall()
+            for row in rows:
+                job = self._row_to_job(row)
+                cursor = conn.execute(
+                    "UPDATE conversion_jobs SET status = 'running', started_at = ?, heartbeat_at = ?, owner = ?, "
+                    "attempts = attempts + 1 WHERE job_id = ? AND status = 'queued'",
+                    (now, now, self.owner_id, job.job_id)
+                )
+                conn.commit()
+                if cursor.rowcount != 1:
+                    continue
+                job.status = 'running'
+                job.started_at = now
+                job.attempts += 1
+                claimed.append(job)
+        return claimed
+
+    def _launch(self, job: ConversionJob):
+        if job.conversion_id is not None:
+            emit_progress(job.conversion_id, Phase.CONVERT, 0)
+        args = (_run_conversion_job, job.input_path, job.output_path,
+                job.source_format, job.target_format, job.payload.get('file_hash'))
+        try:
+            future = self._ensure_executor().submit(*args)
+        except BrokenProcessPool:
+            # El pool se rompió entre la comprobación y el envío: se recrea y se reintenta una vez
+            try:
+                future = self._ensure_executor().submit(*args)
+            except BrokenProcessPool as e:
+                logging.error(f"No se pudo lanzar el trabajo {job.job_id}: {e}")
+                self._requeue_job(job)
+                return
+        self._in_flight[job.job_id] = future
+        future.add_done_callback(lambda f, job=job: self._on_job_done(job, f))
+
+    def _requeue_job(self, job: ConversionJob):
+        """Devuelve a la cola un trabajo reclamado por este proceso"""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE conversion_jobs SET status = 'queued', started_at = NULL, owner = NULL, "
+                "heartbeat_at = NULL WHERE job_id = ? AND owner = ? AND status = 'running'",
+                (job.job_id, self.owner_id)
+            )
+            conn.commit()
+        self._in_flight.pop(job.job_id, None)
+        self._wakeup.set()
+
+    def _on_job_done(self, job: ConversionJob, future: Future):
+        """Persiste el resultado y finaliza la conversión asociada"""
+        try:
+            success, message, processing_time = future.result()
+        except BrokenProcessPool as e:
+            # Un proceso del pool ha muerto: el despachador recrea el pool y el trabajo
+            # se reintenta hasta MAX_ATTEMPTS veces antes de darlo por fallido
+            if job.attempts < MAX_ATTEMPTS:
+                logging.warning(f"Proceso trabajador caído durante {job.job_id}, se reencola")
+                self._requeue_job(job)
+                return
+            success, message, processing_time = False, f"Error en el proceso trabajador: {str(e)}", None
+        except Exception as e:
+            success, message, processing_time = False, f"Error en el proceso trabajador: {str(e)}", None
+
+        job.status = 'completed' if success and os.path.exists(job.output_path) else 'failed'
+        job.message = message
+        job.processing_time = processing_time
+        job.finished_at = datetime.utcnow().isoformat()
+
+        try:
+            with self._lock, self._connect() as conn:
+                cursor = conn.execute(
+                    'UPDATE conversion_jobs SET status = ?, message = ?, processing_time = ?, finished_at = ? '
+                    "WHERE job_id = ? AND owner = ? AND status = 'running'",
+                    (job.status, job.message, job.processing_time, job.finished_at, job.job_id, self.owner_id)
+                )
+                conn.commit()
+            if cursor.rowcount != 1:
+                # Se dio por abandonado y lo ha reclamado otro proceso: ese proceso lo finaliza
+                logging.warning(f"Trabajo {job.job_id} reclamado por otro proceso, se descarta este resultado")
+                self._in_flight.pop(job.job_id, None)
+                self._wakeup.set()
+                return
+        except Exception as e:
+            logging.error(f"Error guardando resultado del trabajo {job.job_id}: {e}")
+
+        if job.conversion_id is not None:
+            emit_progress(job.conversion_id, Phase.CONVERT, 100)
+
+        try:
+            if self._completion_handler:
+                if self._app is not None:
+                    with self._app.app_context():
+                        self._completion_handler(job)
+                else:
+                    self._completion_handler(job)
+        except Exception as e:
+            logging.error(f"Error finalizando el trabajo {job.job_id}: {e}")
+        finally:
+            self._in_flight.pop(job.job_id, None)
+            self._wakeup.set()
+
+    @staticmethod
+    def _row_to_job(row) -> ConversionJob:
+        (job_id, conversion_id, input_path, output_path, source_format, target_format,
+         status, created_at, started_at, finished_at, processing_time, message,
+         attempts, payload) = row
+        return ConversionJob(
+            job_id=job_id,
+            conversion_id=conversion_id,
+            input_path=input_path,
+            output_path=output_path,
+            source_format=source_format,
+            target_format=target_format,
+            status=status,
+            created_at=created_at,
+            started_at=started_at,
+            finished_at=finished_at,
+            processing_time=processing_time,
+            message=message,
+            attempts=attempts or 0,
+            payload=json.loads(payload or '{}')
+        )
+
+
+# Instancia global de la cola de conversiones
+conversion_queue = ConversionQueue()
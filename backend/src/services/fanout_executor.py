@@ -0,0 +1,287 @@
+"""
+Conversión de una entrada a varios formatos destino para Anclora Nexus
+Combina las rutas de find_conversion_path en un árbol de pasos: los prefijos
+comunes se convierten una sola vez y las ramas independientes se ejecutan en
+paralelo. El hash, la normalización y las consultas al cache se hacen una vez
+por entrada, no por destino.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.encoding_normalizer import normalize_to_utf8
+
+DEFAULT_FANOUT_WORKERS = int(os.environ.get('CONVERSION_FANOUT_WORKERS', '4'))
+
+
+@dataclass
+class FanOutNode:
+    """Paso del árbol: produce el último formato de `path` a partir del nodo padre"""
+    path: Tuple[str, ...]
+    parent: Optional['FanOutNode'] = None
+    children: List['FanOutNode'] = field(default_factory=list)
+    targets: List[str] = field(default_factory=list)  # Destinos que terminan en este nodo
+    output_path: Optional[str] = None
+    temporary: bool = False
+    artifact: Optional[str] = None  # Intermedio reutilizable del almacén de artefactos
+    needed: bool = False  # Su salida es un destino o la entrada de un paso que se calcula
+    compute: bool = False
+    logs: List[str] = field(default_factory=list)
+
+    @property
+    def hop(self) -> Tuple[str, str]:
+        return self.path[-2], self.path[-1]
+
+
+class FanOutExecutor:
+    """Ejecuta una conversión multi-destino sobre un ConversionEngine"""
+
+    def __init__(self, engine, text_formats: Iterable[str] = (), max_workers: Optional[int] = None,
+                 spool_dir: Optional[str] = None,
+                 on_step: Optional[Callable[[FanOutNode, str, Optional[str]], None]] = None,
+                 is_cancelled: Optional[Callable[[], bool]] = None):
+        self.engine = engine
+        self.text_formats = set(text_formats)
+        self.max_workers = max_workers or DEFAULT_FANOUT_WORKERS
+        self.spool_dir = spool_dir  # Directorio de los intermedios (por defecto el temporal del sistema)
+        self.on_step = on_step  # (nodo, 'processing' | 'completed' | 'failed', mensaje)
+        self.is_cancelled = is_cancelled  # Si devuelve True no se lanzan más pasos
+        self._limits: Dict[Tuple[str, str], threading.BoundedSemaphore] = {}
+        self._limits_lock = threading.Lock()
+
+    def run(self, input_path: str, source: str, targets: Dict[str, str], parameters=None,
+            use_cache: bool = True, file_hash: Optional[str] = None,
+            paths: Optional[Dict[str, List[str]]] = None) -> Dict[str, Tuple[bool, str]]:
+        """
+        Convierte `input_path` a cada formato de `targets` (formato → ruta de salida)
+
+        `paths` fija la ruta de formatos de algunos destinos; el resto se
+        buscan en el motor.
+
+        Returns:
+            {formato: (éxito, mensaje)} en el orden de `targets`
+        """
+        results: Dict[str, Tuple[bool, str]] = {}
+        start_time = time.time()
+        if not file_hash and (use_cache or self.engine.artifact_store_enabled):
+            file_hash = self.engine.result_cache._calculate_file_hash(input_path)
+
+        # La normalización de la entrada se hace una vez para todos los destinos
+        source_logs = []
+        if source in self.text_formats:
+            log_entry = normalize_to_utf8(input_path)
+            source_logs.append(f"normalized:{log_entry.get('from')}->{log_entry.get('to')}")
+
+        chosen_paths, paths = paths or {}, {}
+        for target, output_path in targets.items():
+            path = chosen_paths.get(target) or self._path_for(source, target)
+            if not path or len(path) < 2:
+                results[target] = (False, f"Conversión {source} → {target} no implementada aún")
+                continue
+            if use_cache and file_hash:
+                entry = self.engine.result_cache.lookup(
+                    input_path, source, target, parameters, self.engine.get_converter_version(path), file_hash
+                )
+                if entry:
+                    method = self.engine.result_cache.materialize(entry['cached_file_path'], output_path)
+                    results[target] = (True, f"cache_hit:{entry['cache_key'][:12]} ({method})")
+                    continue
+            paths[target] = path
+
+        root, paths = self._build_tree(source, paths, targets, file_hash)
+        try:
+            self._execute(root, input_path, results, file_hash)
+            for target, path in paths.items():
+                success, message = results[target]
+                results[target] = (success, " | ".join(source_logs + [message]))
+                if success and use_cache and file_hash and os.path.exists(targets[target]):
+                    self.engine.result_cache.cache_conversion(
+                        input_path, targets[target], source, target,
+                        conversion_time=time.time() - start_time,
+                        parameters=parameters,
+                        metadata={'message': message},
+                        converter_version=self.engine.get_converter_version(path),
+                        file_hash=file_hash
+                    )
+        finally:
+            for node in self.walk(root):
+                if node.temporary and node.output_path and os.path.exists(node.output_path):
+                    os.remove(node.output_path)
+
+        return {target: results[target] for target in targets}
+
+    def _path_for(self, source: str, target: str) -> Optional[List[str]]:
+        if (source, target) in self.engine.conversion_methods:
+            return [source, target]
+        return self.engine.find_conversion_path(source, target)
+
+    @staticmethod
+    def plan(source: str, paths: Dict[str, List[str]]) -> Tuple[FanOutNode, Dict[str, List[str]]]:
+        """Árbol de prefijos de las rutas de cada destino, sin tocar archivos
+
+        Si un destino aparece como intermedio de otra ruta no más larga, se
+        reutiliza ese prefijo. `paths` no se modifica: se devuelve el árbol
+        junto con las rutas ajustadas.
+        """
+        paths = {target: list(path) for target, path in paths.items()}
+        for target, path in paths.items():
+            for other in paths.values():
+                if target in other[1:-1] and other.index(target) + 1 <= len(path):
+                    paths[target] = other[:other.index(target) + 1]
+                    break
+
+        root = FanOutNode(path=(source,))
+        nodes = {root.path: root}
+        for target, path in paths.items():
+            for i in range(2, len(path) + 1):
+                prefix = tuple(path[:i])
+                if prefix not in nodes:
+                    node = FanOutNode(path=prefix, parent=nodes[prefix[:-1]])
+                    node.parent.children.append(node)
+                    nodes[prefix] = node
+            nodes[tuple(path)].targets.append(target)
+        return root, paths
+
+    def _build_tree(self, source: str, paths: Dict[str, List[str]], targets: Dict[str, str],
+                    file_hash: Optional[str]) -> Tuple[FanOutNode, Dict[str, List[str]]]:
+        """Construye el árbol de prefijos y decide qué nodos se calculan
+
+        Devuelve también las rutas ajustadas por `plan`.
+        """
+        root, paths = self.plan(source, paths)
+
+        use_artifacts = self.engine.artifact_store_enabled and bool(file_hash)
+        for node in self.walk(root):
+            if node is root:
+                continue
+            if node.targets:
+                node.output_path = targets[node.targets[0]]
+            elif use_artifacts:
+                key = self.engine.artifact_store.prefix_key(file_hash, node.path, self._versions(node.path))
+                node.artifact = self.engine.artifact_store.get(key, node.hop)
+        self._mark_compute(root)
+
+        for node in self.walk(root):
+            if node is not root and not node.targets and node.needed:
+                fd, node.output_path = tempfile.mkstemp(suffix=f'.{node.path[-1]}', dir=self.spool_dir)
+                os.close(fd)
+                node.temporary = True
+        return root, paths
+
+    def _mark_compute(self, node: FanOutNode) -> bool:
+        """Indica si el nodo necesita su entrada: se convierte salvo que haya artefacto"""
+        node.needed = bool(node.targets)
+        for child in node.children:
+            node.needed = self._mark_compute(child) or node.needed
+        node.compute = node.needed and node.artifact is None
+        return node.compute
+
+    def _versions(self, path: Tuple[str, ...]) -> List[str]:
+        return [self.engine.converter_versions.get((path[i], path[i + 1]), '0') for i in range(len(path) - 1)]
+
+    @staticmethod
+    def walk(node: FanOutNode):
+        """Nodos del árbol en preorden (cada paso después de su padre)"""
+        yield node
+        for child in node.children:
+            yield from FanOutExecutor.walk(child)
+
+    def _notify(self, node: FanOutNode, status: str, message: Optional[str] = None):
+        if self.on_step:
+            self.on_step(node, status, message)
+
+    def _execute(self, root: FanOutNode, input_path: str, results: Dict[str, Tuple[bool, str]],
+                 file_hash: Optional[str]):
+        """Planifica cada paso en cuanto su padre ha terminado"""
+        root.output_path = input_path
+        ready = []
+        for node in self.walk(root):
+            if node is not root and node.artifact and node.needed:
+                # Copia de trabajo: los pasos de texto normalizan su entrada en sitio
+                shutil.copyfile(node.artifact, node.output_path)
+                node.logs = [f"reused:{'->'.join(node.path)}"]
+                self._notify(node, 'completed', node.logs[0])
+                ready.extend(self._prepare_children(node))
+        ready.extend(child for child in root.children if child.compute)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='fanout')
+        running = {}
+
+        def submit(nodes):
+            for node in nodes:
+                if self.is_cancelled and self.is_cancelled():
+                    self._fail_branch(node, results, "Conversión cancelada")
+                else:
+                    running[executor.submit(self._run_step, node)] = node
+
+        try:
+            submit(ready)
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    try:
+                        success, message = future.result()
+                    except Exception as e:
+                        success, message = False, f"Error durante la conversión: {str(e)}"
+                    src_fmt, dst_fmt = node.hop
+                    node.logs = node.parent.logs + [f"{src_fmt}->{dst_fmt}: {message}"]
+                    if not success:
+                        self._notify(node, 'failed', message)
+                        self._fail_branch(node, results, f"Fallo en {src_fmt}->{dst_fmt}: {message}",
+                                          include_node=False)
+                        continue
+                    self._notify(node, 'completed', message)
+                    for target in node.targets:
+                        results[target] = (True, " | ".join(node.logs))
+                    self._store_artifact(node, file_hash)
+                    submit(self._prepare_children(node))
+        finally:
+            executor.shutdown(wait=True)
+
+    def _fail_branch(self, node: FanOutNode, results: Dict[str, Tuple[bool, str]], failure: str,
+                     include_node: bool = True):
+        """Marca como fallidos los destinos del nodo y de sus descendientes"""
+        for descendant in self.walk(node):
+            if include_node or descendant is not node:
+                self._notify(descendant, 'failed', failure)
+            for target in descendant.targets:
+                results[target] = (False, failure)
+
+    def _prepare_children(self, node: FanOutNode) -> List[FanOutNode]:
+        """Normaliza una vez la salida de un nodo antes de que la lean sus hijos"""
+        children = [child for child in node.children if child.compute]
+        if children and node.path[-1] in self.text_formats:
+            log_entry = normalize_to_utf8(node.output_path)
+            node.logs = node.logs + [f"normalized:{log_entry.get('from')}->{log_entry.get('to')}"]
+        return children
+
+    def _run_step(self, node: FanOutNode) -> Tuple[bool, str]:
+        method = self.engine.conversion_methods.get(node.hop)
+        if not method:
+            return False, f"Conversión {node.hop[0]} → {node.hop[1]} no implementada"
+        with self._limit_for(node.hop):
+            self._notify(node, 'processing')
+            return method(node.parent.output_path, node.output_path)
+
+    def _limit_for(self, hop: Tuple[str, str]) -> threading.BoundedSemaphore:
+        """Semáforo del conversor según el límite declarado por el plugin"""
+        with self._limits_lock:
+            if hop not in self._limits:
+                _, declared = self.engine.converter_policies.get(hop, (None, None))
+                self._limits[hop] = threading.BoundedSemaphore(declared or self.max_workers)
+            return self._limits[hop]
+
+    def _store_artifact(self, node: FanOutNode, file_hash: Optional[str]):
+        """Guarda los intermedios para que otras peticiones con la misma entrada los reutilicen"""
+        if not node.temporary or not file_hash or not self.engine.artifact_store_enabled:
+            return
+        self.engine.artifact_store.record_miss(node.hop)
+        key = self.engine.artifact_store.prefix_key(file_hash, node.path, self._versions(node.path))
+        self.engine.artifact_store.put(key, node.hop, node.output_path)
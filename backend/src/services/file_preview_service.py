@@ -5,12 +5,25 @@
 
 import os
 import base64
+import hashlib
 import tempfile
+import threading
+from collections import OrderedDict
 from typing import Dict, List, Optional, Any, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from PIL import Image, ImageDraw, ImageFont
 import io
 
+# Versión del formato de preview: cambiarla invalida la caché
+PREVIEW_CACHE_VERSION = '1'
+
+# Tamaños de thumbnail por calidad, de mayor a menor (cadena de reducción)
+THUMBNAIL_SIZES = OrderedDict([
+    ('high', (600, 800)),
+    ('medium', (300, 400)),
+    ('low', (150, 200)),
+])
+
 @dataclass
 class PreviewData:
     """Datos de vista previa de archivo"""
@@ -21,13 +34,65 @@ class PreviewData:
     dimensions: Optional[Tuple[int, int]] = None
     file_info: Optional[Dict[str, Any]] = None
     preview_quality: str = 'medium'  # 'low', 'medium', 'high'
+    cache_key: Optional[str] = None  # Hash del contenido (base del ETag)
+
+class PreviewCache:
+    """Caché LRU en memoria de previews por hash de contenido, acotada en bytes
+
+    Cada entrada guarda las renderizaciones por calidad ('low', 'medium',
+    'high') o una única bajo '*' cuando la preview no depende de la calidad.
+    """
+
+    def __init__(self, max_size_mb: Optional[float] = None):
+        self.max_size_bytes = int((max_size_mb or float(os.environ.get('PREVIEW_CACHE_MB', '64'))) * 1024 * 1024)
+        self._entries: 'OrderedDict[str, Tuple[Dict[str, PreviewData], int]]' = OrderedDict()
+        self._total_size = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    @staticmethod
+    def _entry_size(tiers: Dict[str, PreviewData]) -> int:
+        # Aproximación: el contenido domina; se suma un margen por metadatos
+        return sum(len(preview.content) + 1024 for preview in tiers.values())
+
+    def get(self, key: str, quality: str) -> Optional[PreviewData]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            tiers = entry[0]
+            return tiers.get(quality) or tiers.get('medium') or tiers.get('*')
+
+    def put(self, key: str, tiers: Dict[str, PreviewData]):
+        size = self._entry_size(tiers)
+        if size > self.max_size_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous:
+                self._total_size -= previous[1]
+            self._entries[key] = (tiers, size)
+            self._total_size += size
+            while self._total_size > self.max_size_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total_size -= evicted_size
+                self.stats['evictions'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, 'entries': len(self._entries), 'size_bytes': self._total_size,
+                    'max_size_bytes': self.max_size_bytes}
 
 class FilePreviewService:
     """Servicio de vista previa de archivos"""
     
-    def __init__(self):
+    def __init__(self, preview_cache: Optional[PreviewCache] = None):
         self.max_text_preview = 2000  # Caracteres máximos para preview de texto
-        self.thumbnail_size = (300, 400)  # Tamaño de thumbnail
+        self.thumbnail_size = THUMBNAIL_SIZES['medium']  # Tamaño de thumbnail
+        self.preview_cache = preview_cache or PreviewCache()
         self.supported_formats = {
             'text': ['txt', 'md', 'html', 'rtf', 'csv'],
             'image': ['jpg', 'jpeg', 'png', 'gif', 'webp', 'bmp'],
@@ -35,9 +100,27 @@ class FilePreviewService:
             'code': ['py', 'js', 'ts', 'css', 'json', 'xml', 'yaml']
         }
 
+    def preview_key(self, file_path: str, filename: str) -> str:
+        """Clave de caché: hash del contenido, extensión y versión del formato de preview"""
+        digest = hashlib.sha256(f"{PREVIEW_CACHE_VERSION}:{filename.split('.')[-1].lower()}:".encode())
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def get_cached_preview(self, cache_key: str, preview_quality: str = 'medium') -> Optional[PreviewData]:
+        """Preview ya generada para una clave, sin acceder al archivo
+
+        Las entradas de la caché solo conservan la extensión en `file_info`:
+        el nombre, tamaño y fechas son del primer archivo subido y no se
+        comparten con quien consulte la clave.
+        """
+        cached = self.preview_cache.get(cache_key, preview_quality)
+        return replace(cached, preview_quality=preview_quality) if cached else None
+
     async def generate_preview(self, file_path: str, filename: str, 
-                             preview_quality: str = 'medium') -> PreviewData:
-        """Genera vista previa del archivo"""
+                             preview_quality: str = 'medium', cache_key: Optional[str] = None) -> PreviewData:
+        """Genera vista previa del archivo (o la sirve de la caché por contenido)"""
         
         file_extension = filename.split('.')[-1].lower()
         file_stats = os.stat(file_path)
@@ -52,21 +135,41 @@ class FilePreviewService:
             'modified': file_stats.st_mtime
         }
         
+        cache_key = cache_key or self.preview_key(file_path, filename)
+        cached = self.preview_cache.get(cache_key, preview_quality)
+        if cached is not None:
+            return replace(cached, file_info=file_info, preview_quality=preview_quality)
+        
         # Generar preview según el tipo de archivo
-        if file_extension in self.supported_formats['text']:
-            return await self._generate_text_preview(file_path, filename, file_info, preview_quality)
+        if file_extension in self.supported_formats['image']:
+            # Las tres calidades salen de una sola decodificación
+            tiers = await self._generate_image_tiers(file_path, filename, file_info)
+            if 'error' not in tiers:
+                self.preview_cache.put(cache_key, {
+                    quality: replace(preview, cache_key=cache_key, file_info={'extension': file_extension})
+                    for quality, preview in tiers.items()
+                })
+                preview = tiers.get(preview_quality, tiers['medium'])
+                return replace(preview, preview_quality=preview_quality, cache_key=cache_key)
+            return tiers['error']
         
-        elif file_extension in self.supported_formats['image']:
-            return await self._generate_image_preview(file_path, filename, file_info, preview_quality)
+        if file_extension in self.supported_formats['text']:
+            preview = await self._generate_text_preview(file_path, filename, file_info, preview_quality)
         
         elif file_extension in self.supported_formats['document']:
-            return await self._generate_document_preview(file_path, filename, file_info, preview_quality)
+            preview = await self._generate_document_preview(file_path, filename, file_info, preview_quality)
         
         elif file_extension in self.supported_formats['code']:
-            return await self._generate_code_preview(file_path, filename, file_info, preview_quality)
+            preview = await self._generate_code_preview(file_path, filename, file_info, preview_quality)
         
         else:
-            return await self._generate_generic_preview(file_path, filename, file_info)
+            preview = await self._generate_generic_preview(file_path, filename, file_info)
+        
+        # Estas previews no dependen de la calidad; los errores no se cachean
+        if 'error' not in preview.metadata:
+            preview = replace(preview, cache_key=cache_key)
+            self.preview_cache.put(cache_key, {'*': replace(preview, file_info={'extension': file_extension})})
+        return preview
 
     async def _generate_text_preview(self, file_path: str, filename: str, 
                                    file_info: Dict, quality: str) -> PreviewData:
@@ -110,6 +213,19 @@ class FilePreviewService:
                                     file_info: Dict, quality: str) -> PreviewData:
         """Genera preview para imágenes"""
         
+        tiers = await self._generate_image_tiers(file_path, filename, file_info)
+        if 'error' in tiers:
+            return tiers['error']
+        return replace(tiers.get(quality, tiers['medium']), preview_quality=quality)
+
+    async def _generate_image_tiers(self, file_path: str, filename: str,
+                                    file_info: Dict) -> Dict[str, PreviewData]:
+        """Genera las previews de todas las calidades con una sola decodificación
+
+        Para JPEG se pide al decodificador una escala reducida (draft) apta
+        para la calidad más alta; las demás se obtienen reduciendo la anterior.
+        """
+        
         try:
             with Image.open(file_path) as img:
                 # Información de la imagen
@@ -121,31 +237,30 @@ class FilePreviewService:
                     'has_transparency': img.mode in ('RGBA', 'LA') or 'transparency' in img.info
                 }
                 
-                # Generar thumbnail
-                thumbnail_size = self.thumbnail_size
-                if quality == 'high':
-                    thumbnail_size = (600, 800)
-                elif quality == 'low':
-                    thumbnail_size = (150, 200)
-                
-                img.thumbnail(thumbnail_size, Image.Resampling.LANCZOS)
-                
-                # Convertir a base64
-                buffer = io.BytesIO()
-                img.save(buffer, format='PNG')
-                img_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                
-                return PreviewData(
-                    preview_type='image',
-                    content=img_base64,
-                    metadata=metadata,
-                    dimensions=(img.width, img.height),
-                    file_info=file_info,
-                    preview_quality=quality
-                )
+                img.draft(None, THUMBNAIL_SIZES['high'])
+                current = img
+                tiers = {}
+                for quality, thumbnail_size in THUMBNAIL_SIZES.items():
+                    current = current.copy()
+                    current.thumbnail(thumbnail_size, Image.Resampling.LANCZOS)
+                    
+                    # Convertir a base64
+                    buffer = io.BytesIO()
+                    current.save(buffer, format='PNG')
+                    img_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+                    
+                    tiers[quality] = PreviewData(
+                        preview_type='image',
+                        content=img_base64,
+                        metadata=dict(metadata),
+                        dimensions=(current.width, current.height),
+                        file_info=file_info,
+                        preview_quality=quality
+                    )
+                return tiers
                 
         except Exception as e:
-            return await self._generate_error_thumbnail(filename, str(e), file_info)
+            return {'error': await self._generate_error_thumbnail(filename, str(e), file_info)}
 
     async def _generate_document_preview(self, file_path: str, filename: str, 
                                        file_info: Dict, quality: str) -> PreviewData:
@@ -61,25 +61,34 @@ class FileValidator:
             }
         }
 
-    def validate_file_comprehensive(self, file_path: str, declared_extension: str) -> Tuple[bool, str, Dict]:
-        """Validación completa de archivo con múltiples verificaciones"""
+    def validate_file_comprehensive(self, file_path: str, declared_extension: str,
+                                    file_info=None) -> Tuple[bool, str, Dict]:
+        """Validación completa de archivo con múltiples verificaciones
+
+        `file_info` (IngestedFile) aporta tamaño, cabecera y MD5 ya calculados
+        durante la subida para no volver a leer el archivo.
+        """
         file_path = Path(file_path)
         
         if not file_path.exists():
             return False, "El archivo no existe", {}
         
-        if file_path.stat().st_size == 0:
+        file_size = file_info.size if file_info else file_path.stat().st_size
+        if file_size == 0:
             return False, "El archivo está vacío", {}
         
         # Leer primeros bytes para signature
         try:
-            with open(file_path, 'rb') as f:
-                header = f.read(512)  # Leer primeros 512 bytes
+            if file_info:
+                header = file_info.header[:512]
+            else:
+                with open(file_path, 'rb') as f:
+                    header = f.read(512)  # Leer primeros 512 bytes
         except Exception as e:
             return False, f"No se puede leer el archivo: {str(e)}", {}
         
         validation_results = {
-            'file_size': file_path.stat().st_size,
+            'file_size': file_size,
             'declared_extension': declared_extension.lower(),
             'signature_valid': False,
             'extension_matches_content': False,
@@ -111,7 +120,7 @@ class FileValidator:
             return False, integrity_message, validation_results
         
         # 4. Calcular checksum para integridad
-        validation_results['md5_checksum'] = self._calculate_md5(file_path)
+        validation_results['md5_checksum'] = file_info.md5 if file_info else self._calculate_md5(file_path)
         
         return True, "Archivo válido y verificado", validation_results
 
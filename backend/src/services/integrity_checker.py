@@ -17,8 +17,13 @@ class IntegrityChecker:
         self.temp_dir = Path(tempfile.gettempdir()) / "anclora_integrity_checks"
         self.temp_dir.mkdir(exist_ok=True)
 
-    def pre_conversion_check(self, file_path: str, source_format: str, target_format: str) -> Tuple[bool, str, Dict]:
-        """Verificación completa antes de conversión"""
+    def pre_conversion_check(self, file_path: str, source_format: str, target_format: str,
+                             file_info=None) -> Tuple[bool, str, Dict]:
+        """Verificación completa antes de conversión
+
+        Con `file_info` (IngestedFile) se reutilizan el tamaño, la cabecera, la
+        cola y los checksums calculados durante la subida.
+        """
         file_path = Path(file_path)
         
         check_results = {
@@ -40,7 +45,7 @@ class IntegrityChecker:
         check_results['file_exists'] = True
         
         # 2. Verificar tamaño
-        file_size = file_path.stat().st_size
+        file_size = file_info.size if file_info else file_path.stat().st_size
         if file_size == 0:
             return False, "El archivo está vacío", check_results
         
@@ -52,10 +57,13 @@ class IntegrityChecker:
         
         # 3. Verificar legibilidad
         try:
-            with open(file_path, 'rb') as f:
-                header = f.read(1024)  # Leer header
-                f.seek(-min(1024, file_size), 2)  # Ir al final
-                footer = f.read(1024)  # Leer footer
+            if file_info:
+                header, footer = file_info.header, file_info.footer
+            else:
+                with open(file_path, 'rb') as f:
+                    header = f.read(1024)  # Leer header
+                    f.seek(-min(1024, file_size), 2)  # Ir al final
+                    footer = f.read(1024)  # Leer footer
             check_results['readable'] = True
         except Exception as e:
             return False, f"No se puede leer el archivo: {str(e)}", check_results
@@ -82,7 +90,7 @@ class IntegrityChecker:
         check_results['encoding_message'] = encoding_message
         
         # 7. Calcular checksum para integridad
-        check_results['checksum'] = self._calculate_checksums(file_path)
+        check_results['checksum'] = file_info.checksums if file_info else self._calculate_checksums(file_path)
         
         # 8. Generar advertencias y recomendaciones
         self._generate_warnings_and_recommendations(check_results, source_format, target_format)
@@ -16,6 +16,11 @@ from pathlib import Path
 import sqlite3
 import threading
 
+# Directorio por defecto: carpeta de instancia de la app, no el directorio de trabajo
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parents[2] / 'instance' / 'cache'
+# Segundos entre escrituras de los contadores y accesos acumulados en memoria
+COUNTER_FLUSH_INTERVAL = float(os.environ.get('CONVERSION_CACHE_FLUSH_S', 30))
+
 @dataclass
 class CacheEntry:
     """Entrada del cache de conversiones"""
@@ -35,16 +40,20 @@ class CacheEntry:
 class IntelligentCache:
     """Sistema de cache inteligente para conversiones"""
     
-    def __init__(self, cache_dir: str = "cache", max_size_gb: float = 5.0, 
+    def __init__(self, cache_dir: str = None, max_size_gb: float = 5.0, 
                  max_age_days: int = 30):
-        self.cache_dir = Path(cache_dir)
+        self.cache_dir = Path(cache_dir or DEFAULT_CACHE_DIR)
         self.max_size_bytes = int(max_size_gb * 1024 * 1024 * 1024)
         self.max_age_days = max_age_days
         self.db_path = self.cache_dir / "cache_index.db"
         self._lock = threading.RLock()
+        # Aciertos y fallos pendientes de volcar: las búsquedas no escriben en SQLite
+        self._pending_counters: Dict[Tuple[str, str], List[int]] = {}
+        self._pending_access: Dict[str, List] = {}
+        self._last_flush = time.monotonic()
         
         # Crear directorio de cache
-        self.cache_dir.mkdir(exist_ok=True)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
         
         # Inicializar base de datos
         self._init_database()
@@ -52,7 +61,7 @@ class IntelligentCache:
         # Limpiar cache al inicializar
         self._cleanup_expired_entries()
         
-        logging.info(f"Cache inteligente inicializado: {cache_dir} (max: {max_size_gb}GB, {max_age_days} días)")
+        logging.info(f"Cache inteligente inicializado: {self.cache_dir} (max: {max_size_gb}GB, {max_age_days} días)")
     
     def _init_database(self):
         """Inicializar base de datos SQLite para el índice del cache"""
@@ -79,7 +88,19 @@ class IntelligentCache:
                 conn.execute('CREATE INDEX IF NOT EXISTS idx_file_hash ON cache_entries(file_hash)')
                 conn.execute('CREATE INDEX IF NOT EXISTS idx_formats ON cache_entries(source_format, target_format)')
                 conn.execute('CREATE INDEX IF NOT EXISTS idx_last_accessed ON cache_entries(last_accessed)')
-                
+
+                # Contadores de aciertos/fallos por par de formatos
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS cache_counters (
+                        source_format TEXT NOT NULL,
+                        target_format TEXT NOT NULL,
+                        hits INTEGER DEFAULT 0,
+                        misses INTEGER DEFAULT 0,
+                        bytes_saved INTEGER DEFAULT 0,
+                        PRIMARY KEY (source_format, target_format)
+                    )
+                ''')
+
                 conn.commit()
                 
         except Exception as e:
@@ -98,8 +119,9 @@ class IntelligentCache:
             return ""
     
     def _generate_cache_key(self, file_hash: str, source_format: str, 
-                          target_format: str, parameters: Dict = None) -> str:
-        """Generar clave única para el cache"""
+                          target_format: str, parameters: Dict = None,
+                          converter_version: str = None) -> str:
+        """Generar clave única (direccionada por contenido) para el cache"""
         try:
             # Incluir parámetros de conversión en la clave si existen
             params_str = ""
@@ -108,15 +130,16 @@ class IntelligentCache:
                 sorted_params = sorted(parameters.items())
                 params_str = json.dumps(sorted_params, sort_keys=True)
             
-            cache_data = f"{file_hash}:{source_format}:{target_format}:{params_str}"
-            return hashlib.md5(cache_data.encode()).hexdigest()
+            cache_data = f"{file_hash}:{source_format}:{target_format}:{converter_version or ''}:{params_str}"
+            return hashlib.sha256(cache_data.encode()).hexdigest()
             
         except Exception as e:
             logging.error(f"Error generando clave de cache: {e}")
             return ""
     
     def get_cached_conversion(self, file_path: str, source_format: str, 
-                            target_format: str, parameters: Dict = None) -> Optional[str]:
+                            target_format: str, parameters: Dict = None,
+                            converter_version: str = None, file_hash: str = None) -> Optional[str]:
         """
         Obtener conversión desde el cache si existe
         
@@ -125,50 +148,72 @@ class IntelligentCache:
             source_format: Formato de origen
             target_format: Formato de destino
             parameters: Parámetros de conversión opcionales
+            converter_version: Versión del conversor (o de la cadena de conversores)
+            file_hash: SHA-256 del archivo original si ya se calculó
             
         Returns:
             Ruta del archivo cacheado o None si no existe
         """
+        entry = self.lookup(file_path, source_format, target_format, parameters,
+                            converter_version, file_hash)
+        return entry['cached_file_path'] if entry else None
+    
+    def lookup(self, file_path: str, source_format: str, target_format: str,
+               parameters: Dict = None, converter_version: str = None,
+               file_hash: str = None) -> Optional[Dict[str, Any]]:
+        """Buscar una entrada del cache registrando el acierto o fallo
+
+        La búsqueda solo lee el índice; los accesos y contadores se acumulan en
+        memoria y se vuelcan cada COUNTER_FLUSH_INTERVAL segundos.
+        """
         try:
             with self._lock:
                 # Calcular hash del archivo
-                file_hash = self._calculate_file_hash(file_path)
+                file_hash = file_hash or self._calculate_file_hash(file_path)
                 if not file_hash:
                     return None
                 
                 # Generar clave de cache
-                cache_key = self._generate_cache_key(file_hash, source_format, target_format, parameters)
+                cache_key = self._generate_cache_key(file_hash, source_format, target_format,
+                                                     parameters, converter_version)
                 if not cache_key:
                     return None
                 
                 # Buscar en la base de datos
                 with sqlite3.connect(str(self.db_path)) as conn:
                     cursor = conn.execute(
-                        'SELECT cached_file_path, access_count FROM cache_entries WHERE cache_key = ?',
+                        'SELECT cached_file_path, access_count, metadata FROM cache_entries WHERE cache_key = ?',
                         (cache_key,)
                     )
                     result = cursor.fetchone()
                     
                     if result:
-                        cached_file_path, access_count = result
+                        cached_file_path, access_count, metadata = result
                         
                         # Verificar que el archivo cacheado existe
                         if os.path.exists(cached_file_path):
-                            # Actualizar estadísticas de acceso
-                            now = datetime.now().isoformat()
-                            conn.execute(
-                                'UPDATE cache_entries SET last_accessed = ?, access_count = ? WHERE cache_key = ?',
-                                (now, access_count + 1, cache_key)
-                            )
-                            conn.commit()
+                            # Actualizar estadísticas de acceso (en memoria)
+                            access = self._pending_access.setdefault(cache_key, [0, None])
+                            access[0] += 1
+                            access[1] = datetime.now().isoformat()
+                            self._record_lookup(source_format, target_format, True,
+                                                os.path.getsize(cached_file_path))
+                            self._maybe_flush(conn)
                             
                             logging.info(f"Cache HIT: {source_format}→{target_format} (key: {cache_key[:8]}...)")
-                            return cached_file_path
+                            return {
+                                'cache_key': cache_key,
+                                'cached_file_path': cached_file_path,
+                                'metadata': json.loads(metadata or '{}')
+                            }
                         else:
                             # Archivo cacheado no existe, eliminar entrada
                             conn.execute('DELETE FROM cache_entries WHERE cache_key = ?', (cache_key,))
                             conn.commit()
                             logging.warning(f"Archivo cacheado no encontrado, entrada eliminada: {cached_file_path}")
+                    
+                    self._record_lookup(source_format, target_format, False, 0)
+                    self._maybe_flush(conn)
                 
                 logging.debug(f"Cache MISS: {source_format}→{target_format}")
                 return None
@@ -177,10 +222,113 @@ class IntelligentCache:
             logging.error(f"Error obteniendo conversión cacheada: {e}")
             return None
     
+    def _record_lookup(self, source_format: str, target_format: str,
+                       hit: bool, bytes_saved: int):
+        """Acumular el acierto o fallo en memoria hasta el siguiente volcado"""
+        counters = self._pending_counters.setdefault((source_format, target_format), [0, 0, 0])
+        counters[0] += int(hit)
+        counters[1] += int(not hit)
+        counters[2] += bytes_saved
+    
+    def _maybe_flush(self, conn):
+        if time.monotonic() - self._last_flush >= COUNTER_FLUSH_INTERVAL:
+            self._flush_pending(conn)
+    
+    def _flush_pending(self, conn):
+        """Volcar contadores y accesos pendientes en SQLite para que los compartan todos los procesos"""
+        with self._lock:
+            counters, self._pending_counters = self._pending_counters, {}
+            accesses, self._pending_access = self._pending_access, {}
+            self._last_flush = time.monotonic()
+        if not counters and not accesses:
+            return
+        conn.executemany('''
+            INSERT INTO cache_counters (source_format, target_format, hits, misses, bytes_saved)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(source_format, target_format) DO UPDATE SET
+                hits = hits + excluded.hits,
+                misses = misses + excluded.misses,
+                bytes_saved = bytes_saved + excluded.bytes_saved
+        ''', [(source, target, *values) for (source, target), values in counters.items()])
+        conn.executemany(
+            'UPDATE cache_entries SET access_count = access_count + ?, last_accessed = ? WHERE cache_key = ?',
+            [(count, last_accessed, cache_key) for cache_key, (count, last_accessed) in accesses.items()]
+        )
+        conn.commit()
+    
+    def flush(self):
+        """Escribir ya los contadores y accesos acumulados"""
+        try:
+            with sqlite3.connect(str(self.db_path)) as conn:
+                self._flush_pending(conn)
+        except Exception as e:
+            logging.error(f"Error volcando contadores de cache: {e}")
+    
+    def get_counters(self) -> List[Tuple[str, str, int, int, int]]:
+        """Contadores por par de formatos: (origen, destino, aciertos, fallos, bytes ahorrados)"""
+        try:
+            with sqlite3.connect(str(self.db_path)) as conn:
+                self._flush_pending(conn)
+                return conn.execute(
+                    'SELECT source_format, target_format, hits, misses, bytes_saved FROM cache_counters'
+                ).fetchall()
+        except Exception as e:
+            logging.error(f"Error leyendo contadores de cache: {e}")
+            return []
+    
+    def register_metrics(self, registry):
+        """Exportar los contadores del cache en un registro de Prometheus"""
+        try:
+            registry.register(_CacheMetricsCollector(self))
+        except Exception as e:
+            logging.warning(f"No se pudieron registrar las métricas del cache: {e}")
+    
+    def materialize(self, source_path: str, destination_path: str) -> str:
+        """
+        Colocar un archivo en destino evitando copiar bytes cuando sea posible
+        
+        Intenta copy-on-write (reflink), después un enlace duro y como último
+        recurso una copia completa.
+        
+        Returns:
+            Método utilizado: 'reflink', 'hardlink' o 'copy'
+        """
+        destination_path = str(destination_path)
+        if os.path.exists(destination_path):
+            os.remove(destination_path)
+        
+        if self._reflink(source_path, destination_path):
+            return 'reflink'
+        try:
+            os.link(source_path, destination_path)
+            return 'hardlink'
+        except OSError:
+            pass
+        shutil.copy2(source_path, destination_path)
+        return 'copy'
+    
+    @staticmethod
+    def _reflink(source_path: str, destination_path: str) -> bool:
+        """Clonar con FICLONE (btrfs, XFS...) si el sistema de archivos lo soporta"""
+        try:
+            import fcntl
+        except ImportError:
+            return False
+        ficlone = 0x40049409
+        try:
+            with open(source_path, 'rb') as src, open(destination_path, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), ficlone, src.fileno())
+            return True
+        except OSError:
+            if os.path.exists(destination_path):
+                os.remove(destination_path)
+            return False
+    
     def cache_conversion(self, original_file: str, converted_file: str, 
                         source_format: str, target_format: str,
                         conversion_time: float = 0.0, quality_score: float = 0.8,
-                        parameters: Dict = None, metadata: Dict = None) -> bool:
+                        parameters: Dict = None, metadata: Dict = None,
+                        converter_version: str = None, file_hash: str = None) -> bool:
         """
         Cachear el resultado de una conversión
         
@@ -193,6 +341,8 @@ class IntelligentCache:
             quality_score: Puntuación de calidad (0-1)
             parameters: Parámetros de conversión
             metadata: Metadatos adicionales
+            converter_version: Versión del conversor (o de la cadena de conversores)
+            file_hash: SHA-256 del archivo original si ya se calculó
             
         Returns:
             True si se cacheó exitosamente
@@ -204,12 +354,13 @@ class IntelligentCache:
                     return False
                 
                 # Calcular hash del archivo original
-                file_hash = self._calculate_file_hash(original_file)
+                file_hash = file_hash or self._calculate_file_hash(original_file)
                 if not file_hash:
                     return False
                 
                 # Generar clave de cache
-                cache_key = self._generate_cache_key(file_hash, source_format, target_format, parameters)
+                cache_key = self._generate_cache_key(file_hash, source_format, target_format,
+                                                     parameters, converter_version)
                 if not cache_key:
                     return False
                 
@@ -218,8 +369,8 @@ class IntelligentCache:
                 cached_filename = f"{cache_key}{file_extension}"
                 cached_file_path = self.cache_dir / cached_filename
                 
-                # Copiar archivo convertido al cache
-                shutil.copy2(converted_file, cached_file_path)
+                # Llevar el archivo convertido al cache (reflink, enlace duro o copia)
+                self.materialize(converted_file, cached_file_path)
                 
                 # Obtener información del archivo
                 file_size = os.path.getsize(original_file)
@@ -231,6 +382,7 @@ class IntelligentCache:
                     'cached_size': cached_size,
                     'compression_ratio': cached_size / file_size if file_size > 0 else 1.0,
                     'parameters': parameters or {},
+                    'converter_version': converter_version,
                     'custom_metadata': metadata or {}
                 }
                 
@@ -266,6 +418,8 @@ class IntelligentCache:
         """Aplicar límites de tamaño y edad del cache"""
         try:
             with sqlite3.connect(str(self.db_path)) as conn:
+                # La limpieza por uso necesita los accesos al día
+                self._flush_pending(conn)
                 # Obtener estadísticas del cache
                 cursor = conn.execute('''
                     SELECT SUM(file_size) as total_size, COUNT(*) as total_entries
@@ -273,6 +427,7 @@ class IntelligentCache:
                 ''')
                 result = cursor.fetchone()
                 total_size, total_entries = result if result else (0, 0)
+                total_size = total_size or 0
                 
                 logging.debug(f"Cache stats: {total_entries} entries, {total_size / (1024*1024):.1f} MB")
                 
@@ -352,6 +507,7 @@ class IntelligentCache:
         """Obtener estadísticas del cache"""
         try:
             with sqlite3.connect(str(self.db_path)) as conn:
+                self._flush_pending(conn)
                 # Estadísticas generales
                 cursor = conn.execute('''
                     SELECT 
@@ -435,5 +591,31 @@ class IntelligentCache:
             logging.error(f"Error limpiando cache: {e}")
             return 0
 
+class _CacheMetricsCollector:
+    """Collector de Prometheus que lee los contadores persistidos del cache"""
+    
+    def __init__(self, cache: IntelligentCache):
+        self.cache = cache
+    
+    def collect(self):
+        from prometheus_client.core import CounterMetricFamily
+        
+        labels = ['source_format', 'target_format']
+        hits = CounterMetricFamily('anclora_conversion_cache_hits',
+                                   'Conversiones servidas desde el cache', labels=labels)
+        misses = CounterMetricFamily('anclora_conversion_cache_misses',
+                                     'Conversiones no encontradas en el cache', labels=labels)
+        saved = CounterMetricFamily('anclora_conversion_cache_bytes_saved',
+                                    'Bytes servidos desde el cache sin reconvertir', labels=labels)
+        
+        for source_format, target_format, hit_count, miss_count, bytes_saved in self.cache.get_counters():
+            hits.add_metric([source_format, target_format], hit_count)
+            misses.add_metric([source_format, target_format], miss_count)
+            saved.add_metric([source_format, target_format], bytes_saved)
+        
+        yield hits
+        yield misses
+        yield saved
+
 # Instancia global del cache inteligente
-intelligent_cache = IntelligentCache()
+intelligent_cache = IntelligentCache(cache_dir=os.environ.get('CONVERSION_CACHE_DIR'))
@@ -15,7 +15,7 @@ from dataclasses import dataclass, asdict
 import logging
 from pathlib import Path
 import threading
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
 logger = logging.getLogger(__name__)
 
@@ -39,11 +39,14 @@ class OptimizationMetrics:
     avg_response_time: float = 0.0
     total_conversions: int = 0
 
+# Archivo por defecto en la carpeta de instancia de la app, no en el directorio de trabajo
+DEFAULT_CACHE_FILE = Path(__file__).resolve().parents[2] / 'instance' / 'optimization_cache.json'
+
 class IntelligentOptimizer:
     """Sistema de optimización inteligente"""
     
-    def __init__(self, cache_file: str = "optimization_cache.json"):
-        self.cache_file = cache_file
+    def __init__(self, cache_file: str = None):
+        self.cache_file = str(cache_file or os.environ.get('OPTIMIZATION_CACHE_FILE', DEFAULT_CACHE_FILE))
         self.cache = self._load_cache()
         self.metrics = OptimizationMetrics()
         
@@ -90,6 +93,10 @@ class IntelligentOptimizer:
         # Historial para ajuste de umbrales
         self.performance_history = defaultdict(list)
         
+        # Hashes ya calculados por (ruta, tamaño, mtime)
+        self._hash_memo: "OrderedDict[tuple, str]" = OrderedDict()
+        self._hash_memo_lock = threading.Lock()
+        
         # Iniciar limpieza automática de cache
         self._start_cache_cleanup()
     
@@ -115,25 +122,38 @@ class IntelligentOptimizer:
                 key: asdict(entry) 
                 for key, entry in self.cache.items()
             }
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
             with open(self.cache_file, 'w', encoding='utf-8') as f:
                 json.dump(cache_data, f, indent=2, ensure_ascii=False)
         except Exception as e:
             logger.error(f"Error guardando cache: {e}")
     
     def get_file_hash(self, file_path: str) -> str:
-        """Calcula hash de archivo para cache"""
+        """Calcula hash de archivo para cache
+        
+        El hash es del contenido y se memoriza por (ruta, tamaño, mtime), así
+        que la consulta y el guardado de un mismo archivo lo leen una sola vez.
+        """
         try:
+            stat = os.stat(file_path)
+            signature = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+            with self._hash_memo_lock:
+                if signature in self._hash_memo:
+                    self._hash_memo.move_to_end(signature)
+                    return self._hash_memo[signature]
+            
             hasher = hashlib.md5()
             with open(file_path, 'rb') as f:
                 # Leer en chunks para archivos grandes
-                for chunk in iter(lambda: f.read(4096), b""):
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
                     hasher.update(chunk)
+            digest = hasher.hexdigest()
             
-            # Incluir timestamp de modificación para detectar cambios
-            mtime = os.path.getmtime(file_path)
-            hasher.update(str(mtime).encode())
-            
-            return hasher.hexdigest()
+            with self._hash_memo_lock:
+                self._hash_memo[signature] = digest
+                if len(self._hash_memo) > 1024:
+                    self._hash_memo.popitem(last=False)
+            return digest
         except Exception as e:
             logger.error(f"Error calculando hash: {e}")
             return str(time.time())  # Fallback
@@ -255,59 +275,70 @@ class IntelligentOptimizer:
         logger.info("Limpieza automática de cache iniciada")
     
     async def parallel_conversion(self, conversion_tasks: List[Dict]) -> List[Dict]:
-        """Ejecuta conversiones en paralelo"""
+        """Ejecuta conversiones en paralelo con cualquier conversor registrado"""
         try:
             if not conversion_tasks:
                 return []
             
             logger.info(f"Iniciando {len(conversion_tasks)} conversiones en paralelo")
             
-            # Crear futures para todas las tareas
-            futures = []
-            for task in conversion_tasks:
-                future = self.executor.submit(
-                    self._execute_conversion_task,
-                    task
+            # Importar aquí para evitar dependencias circulares
+            from ..models.conversion import conversion_engine
+            
+            batch = [self._to_batch_task(task) for task in conversion_tasks]
+            parallel_config = self.config["parallel"]
+            
+            # Política automática: hilos o procesos según lo que declare cada conversor
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(
+                self.executor,
+                lambda: conversion_engine.convert_batch(
+                    batch, 'auto',
+                    max_workers=parallel_config["max_workers"],
+                    timeout=parallel_config["timeout_seconds"]
                 )
-                futures.append(future)
-            
-            # Esperar resultados con timeout
-            timeout = self.config["parallel"]["timeout_seconds"]
-            results = []
+            )
             
-            for future in concurrent.futures.as_completed(futures, timeout=timeout):
-                try:
-                    result = future.result()
-                    results.append(result)
+            for result in results:
+                if result["success"]:
                     self.metrics.parallel_conversions += 1
-                except Exception as e:
-                    logger.error(f"Error en conversión paralela: {e}")
-                    results.append({
-                        "success": False,
-                        "error": str(e)
-                    })
+                else:
+                    result["error"] = result["message"]
             
             logger.info(f"Conversiones paralelas completadas: {len(results)} resultados")
             return results
             
-        except concurrent.futures.TimeoutError:
-            logger.error("Timeout en conversiones paralelas")
-            return [{"success": False, "error": "Timeout"} for _ in conversion_tasks]
         except Exception as e:
             logger.error(f"Error en conversiones paralelas: {e}")
             return [{"success": False, "error": str(e)} for _ in conversion_tasks]
     
+    @staticmethod
+    def _to_batch_task(task: Dict) -> Dict:
+        """Completa los formatos de una tarea a partir de las extensiones (HTML→PDF por defecto)"""
+        input_path = task["input_path"]
+        output_path = task["output_path"]
+        return {
+            "task_id": task.get("task_id"),
+            "input_path": input_path,
+            "output_path": output_path,
+            "source_format": task.get("source_format") or Path(input_path).suffix.lstrip(".") or "html",
+            "target_format": task.get("target_format") or Path(output_path).suffix.lstrip(".") or "pdf"
+        }
+    
     def _execute_conversion_task(self, task: Dict) -> Dict:
         """Ejecuta una tarea de conversión individual"""
         try:
             # Importar aquí para evitar dependencias circulares
-            from ..models.conversions.html_to_pdf import convert
+            from ..models.conversion import conversion_engine
             
+            task = self._to_batch_task(task)
             input_path = task["input_path"]
             output_path = task["output_path"]
             
             start_time = time.time()
-            success, message = convert(input_path, output_path)
+            success, message = conversion_engine.convert_file(
+                input_path, output_path, task["source_format"], task["target_format"]
+            )
             duration = time.time() - start_time
             
             return {
@@ -10,6 +10,9 @@ from pathlib import Path
 import networkx as nx
 import json
 import os
+import threading
+
+from src.services.route_index import RouteIndex
 
 @dataclass
 class ConversionRoute:
@@ -44,8 +47,13 @@ class IntelligentRouter:
             'three_step_conversion': 0.6,
             'four_plus_step': 0.4
         }
+        self.route_index = RouteIndex(max_steps=4, k_best=3)
+        self._route_index_dirty = True
+        # Serializa reconstrucciones y recálculos parciales del índice
+        self._route_index_lock = threading.Lock()
         self._initialize_graph()
         self._load_metrics()
+        self._ensure_route_index()
     
     def _initialize_graph(self):
         """Inicializar el grafo de conversiones con todas las conversiones disponibles"""
@@ -162,30 +170,79 @@ class IntelligentRouter:
             if target_format not in self.conversion_graph.nodes:
                 return None
             
-            # Buscar todas las rutas posibles
-            all_routes = self._find_all_routes(source_format, target_format, max_steps)
+            routes = self.find_routes(source_format, target_format, max_steps, prefer_quality, k=1)
+            return routes[0] if routes else None
             
-            if not all_routes:
-                return None
+        except Exception as e:
+            logging.error(f"Error encontrando ruta {source_format}→{target_format}: {e}")
+            return None
+    
+    def find_routes(self, source_format: str, target_format: str, max_steps: int = 4,
+                    prefer_quality: bool = True, k: int = 3) -> List[ConversionRoute]:
+        """
+        Obtener las k mejores rutas entre dos formatos, de mejor a peor
+        
+        Las rutas de hasta `route_index.max_steps` pasos se sirven desde el índice
+        precalculado; solo límites mayores recorren el grafo en la petición.
+        """
+        try:
+            source_format = self._normalize_format(source_format)
+            target_format = self._normalize_format(target_format)
+            
+            if source_format not in self.conversion_graph.nodes:
+                return []
+            if target_format not in self.conversion_graph.nodes:
+                return []
+            
+            if max_steps <= self.route_index.max_steps:
+                self._ensure_route_index()
+                return self.route_index.best_routes(
+                    source_format, target_format, prefer_quality, max_steps, k
+                )
             
-            # Evaluar y clasificar rutas
             evaluated_routes = []
-            for route_steps in all_routes:
+            for route_steps in self._find_all_routes(source_format, target_format, max_steps):
                 route = self._evaluate_route(route_steps, prefer_quality)
                 if route:
                     evaluated_routes.append(route)
             
-            if not evaluated_routes:
-                return None
-            
             # Ordenar por puntuación (mejor primero)
             evaluated_routes.sort(key=lambda r: r.quality_score, reverse=True)
-            
-            return evaluated_routes[0]
+            return evaluated_routes[:k]
             
         except Exception as e:
-            logging.error(f"Error encontrando ruta {source_format}→{target_format}: {e}")
-            return None
+            logging.error(f"Error buscando rutas {source_format}→{target_format}: {e}")
+            return []
+    
+    def _ensure_route_index(self):
+        """Reconstruir el índice de rutas si el grafo o las métricas han cambiado"""
+        if not self._route_index_dirty:
+            return
+        with self._route_index_lock:
+            if not self._route_index_dirty:
+                return
+            # Se limpia antes de construir: una invalidación durante la construcción no se pierde
+            self._route_index_dirty = False
+            adjacency = {node: list(self.conversion_graph.successors(node))
+                         for node in self.conversion_graph.nodes}
+            try:
+                # El índice construye tablas nuevas y las sustituye de una vez
+                self.route_index.build(adjacency, evaluator=self._evaluate_route)
+            except Exception:
+                self._route_index_dirty = True
+                raise
+    
+    def invalidate_route_index(self):
+        """Marcar el índice de rutas para reconstruirlo en la próxima consulta"""
+        self._route_index_dirty = True
+    
+    def _rescore_route_index(self, step: Tuple[str, str]):
+        """Recalcular solo las rutas que pasan por una conversión cuyas métricas cambiaron"""
+        with self._route_index_lock:
+            if self._route_index_dirty:
+                # La próxima reconstrucción completa ya usará las métricas nuevas
+                return
+            self.route_index.rescore(step, self._evaluate_route)
     
     def _find_all_routes(self, source: str, target: str, max_steps: int) -> List[List[Tuple[str, str]]]:
         """Encontrar todas las rutas posibles entre dos formatos"""
@@ -304,9 +361,13 @@ class IntelligentRouter:
             possible_targets = []
             
             # Encontrar todos los nodos alcanzables
-            reachable = nx.single_source_shortest_path_length(
-                self.conversion_graph, source_format, cutoff=max_steps
-            )
+            if max_steps <= self.route_index.max_steps:
+                self._ensure_route_index()
+                reachable = self.route_index.reachable(source_format, max_steps)
+            else:
+                reachable = nx.single_source_shortest_path_length(
+                    self.conversion_graph, source_format, cutoff=max_steps
+                )
             
             for target_format, steps in reachable.items():
                 if target_format != source_format:
@@ -366,6 +427,7 @@ class IntelligentRouter:
             
             # Guardar métricas actualizadas
             self._save_metrics()
+            self._rescore_route_index(key)
             
         except Exception as e:
             logging.error(f"Error actualizando métricas: {e}")
@@ -0,0 +1,130 @@
+"""
+Selector adaptativo de métodos de conversión para Anclora Nexus
+Aprende, por nivel de complejidad, la tasa de éxito y la latencia de cada
+método a partir de los datos de ConversionPerformanceMonitor y reordena la
+prioridad recomendada por el analizador
+"""
+
+import logging
+import os
+import statistics
+import threading
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.services.conversion_performance_monitor import ConversionMetrics, ConversionPerformanceMonitor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METRICS_FILE = Path(__file__).resolve().parents[2] / 'data' / 'html_pdf_attempts.db'
+
+# Ventana de intentos recientes por método y nivel
+HISTORY_WINDOW = 200
+
+
+class AdaptiveMethodSelector:
+    """Reordena métodos según el tiempo esperado hasta obtener un resultado válido
+
+    Cada intento (con éxito o no) se registra en el monitor. El coste de un
+    método es su latencia media más la probabilidad de fallo (suavizada)
+    por una penalización que representa pasar al siguiente método; los
+    métodos sin suficientes muestras conservan la posición que les dio el
+    analizador para que sigan explorándose.
+    """
+
+    def __init__(self, monitor: Optional[ConversionPerformanceMonitor] = None, min_samples: int = 5,
+                 prior_success: float = 0.5, prior_weight: float = 2.0, failure_penalty: float = 10.0):
+        self._monitor = monitor
+        self.min_samples = min_samples
+        self.failure_penalty = failure_penalty
+        self.prior_success = prior_success
+        self.prior_weight = prior_weight
+        self._lock = threading.Lock()
+        self._history: Optional[Dict[str, Dict[str, List]]] = None
+
+    @property
+    def monitor(self) -> ConversionPerformanceMonitor:
+        if self._monitor is None:
+            metrics_file = Path(os.environ.get('HTML_PDF_ATTEMPTS_FILE', DEFAULT_METRICS_FILE))
+            metrics_file.parent.mkdir(parents=True, exist_ok=True)
+            self._monitor = ConversionPerformanceMonitor(str(metrics_file))
+        return self._monitor
+
+    def _ensure_history(self) -> Dict[str, Dict[str, List]]:
+        # Se construye una vez desde el monitor y después se actualiza en memoria
+        if self._history is None:
+            history = defaultdict(lambda: defaultdict(list))
+            for level, method, success, duration in self.monitor.recent_attempts(HISTORY_WINDOW):
+                history[level or 'DESCONOCIDA'][method].append((success, duration))
+            self._history = history
+        return self._history
+
+    def record_attempt(self, method: str, complexity_level: str, complexity_score: int,
+                       recommended_method: str, input_path: str, output_path: str,
+                       duration: float, success: bool, error_message: Optional[str] = None):
+        """Registra un intento individual en el monitor y en las estadísticas en memoria"""
+        try:
+            input_size = os.path.getsize(input_path)
+        except OSError:
+            input_size = 0
+        try:
+            output_size = os.path.getsize(output_path) if success else 0
+        except OSError:
+            output_size = 0
+
+        with self._lock:
+            attempts = self._ensure_history()[complexity_level][method]
+            attempts.append((success, duration))
+            del attempts[:-HISTORY_WINDOW]
+            try:
+                self.monitor.record_conversion(ConversionMetrics(
+                    timestamp=datetime.now().isoformat(),
+                    input_file=input_path,
+                    output_file=output_path,
+                    html_complexity_score=complexity_score,
+                    html_complexity_level=complexity_level,
+                    recommended_method=recommended_method,
+                    actual_method_used=method,
+                    conversion_duration=duration,
+                    input_file_size=input_size,
+                    output_file_size=output_size,
+                    success=success,
+                    error_message=error_message
+                ))
+            except Exception as e:
+                logger.warning(f"No se pudo registrar el intento de {method}: {e}")
+
+    def get_bucket_stats(self, complexity_level: str) -> Dict[str, Dict]:
+        """Estadísticas por método para un nivel de complejidad"""
+        with self._lock:
+            bucket = self._ensure_history().get(complexity_level, {})
+            stats = {}
+            for method, attempts in bucket.items():
+                if not attempts:
+                    continue
+                successes = sum(1 for ok, _ in attempts if ok)
+                durations = [d for _, d in attempts]
+                smoothed = (successes + self.prior_success * self.prior_weight) / \
+                    (len(attempts) + self.prior_weight)
+                stats[method] = {
+                    'attempts': len(attempts),
+                    'success_rate': successes / len(attempts),
+                    'mean_duration': statistics.fmean(durations),
+                    'p50_duration': statistics.median(durations),
+                    'expected_cost': statistics.fmean(durations) + (1 - smoothed) * self.failure_penalty
+                }
+            return stats
+
+    def order_methods(self, complexity_level: str, default_priority: List[str]) -> List[str]:
+        """Prioridad aprendida para un nivel; respeta el orden por defecto donde faltan datos"""
+        stats = self.get_bucket_stats(complexity_level)
+        known = [m for m in default_priority
+                 if m in stats and stats[m]['attempts'] >= self.min_samples]
+        ranked = iter(sorted(known, key=lambda m: stats[m]['expected_cost']))
+        return [next(ranked) if m in known else m for m in default_priority]
+
+
+# Instancia global del selector de métodos
+method_selector = AdaptiveMethodSelector()
@@ -12,8 +12,11 @@ from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, asdict
 from pathlib import Path
 import threading
+import atexit
 from collections import defaultdict, deque
 
+from .rolling_metrics import RollingAggregator
+
 # Email imports (optional)
 try:
     import smtplib
@@ -62,26 +65,63 @@ class SystemMetrics:
     queue_size: int
     response_time_avg: float
 
+FSYNC_POLICIES = ("none", "batch", "interval")
+
 class ProductionMonitor:
-    """Monitor de producción para Anclora Nexus"""
+    """Monitor de producción para Anclora Nexus
+
+    Registrar un evento solo lo añade a una cola en memoria acotada; un hilo
+    de volcado escribe los eventos por lotes y evalúa las alertas fuera del
+    camino de la conversión. Si la cola está llena el evento se descarta y
+    se cuenta, de modo que el monitoreo nunca añade latencia.
+    """
     
-    def __init__(self, config_file: str = "monitoring_config.json"):
+    def __init__(self, config_file: str = "monitoring_config.json", log_dir: str = "logs"):
         self.config = self._load_config(config_file)
-        self.metrics_file = "logs/production_metrics.json"
-        self.events_file = "logs/conversion_events.json"
+        self.log_dir = log_dir
+        self.metrics_file = os.path.join(log_dir, "production_metrics.json")
+        self.events_file = os.path.join(log_dir, "conversion_events.json")
+        self.system_metrics_file = os.path.join(log_dir, "system_metrics.json")
+        self.satisfaction_file = os.path.join(log_dir, "user_satisfaction.json")
+        self.alerts_file = os.path.join(log_dir, "alerts.json")
         
         # Buffers en memoria para análisis rápido
         self.recent_events = deque(maxlen=1000)  # Últimos 1000 eventos
         self.system_metrics = deque(maxlen=288)  # 24 horas (cada 5 min)
         self.error_counts = defaultdict(int)
         
+        # Cubetas por minuto/hora/día para los dashboards
+        self.aggregator = RollingAggregator()
+        
         # Contadores de alertas para evitar spam
         self.alert_cooldowns = {}
         
+        # Cola de eventos pendientes de volcar (append/popleft de deque son atómicos)
+        pipeline = self.config["monitoring"]
+        self.queue_capacity = pipeline.get("queue_capacity", 10000)
+        self.batch_size = pipeline.get("batch_size", 500)
+        self.flush_interval = pipeline.get("flush_interval_seconds", 1.0)
+        self.fsync_policy = os.environ.get("MONITORING_FSYNC", pipeline.get("fsync", "none"))
+        self.fsync_interval = pipeline.get("fsync_interval_seconds", 5.0)
+        if self.fsync_policy not in FSYNC_POLICIES:
+            logger.warning(f"Política de fsync desconocida '{self.fsync_policy}', usando 'none'")
+            self.fsync_policy = "none"
+        self._pending = deque()
+        self._wakeup = threading.Event()
+        self._drop_lock = threading.Lock()
+        self._flushing = False
+        self._stopping = False
+        self._handles = {}
+        self._batch_lines = defaultdict(list)
+        self._last_fsync = time.monotonic()
+        self.pipeline_stats = {"written": 0, "dropped": 0, "batches": 0, "write_errors": 0}
+        
         # Crear directorio de logs si no existe
-        os.makedirs("logs", exist_ok=True)
+        os.makedirs(log_dir, exist_ok=True)
         
-        # Iniciar monitoreo en background
+        # Iniciar volcado y monitoreo en background
+        self._flusher = threading.Thread(target=self._flush_loop, name="monitoring-flusher", daemon=True)
+        self._flusher.start()
         self._start_background_monitoring()
     
     def _load_config(self, config_file: str) -> Dict:
@@ -107,7 +147,12 @@ class ProductionMonitor:
             "monitoring": {
                 "metrics_interval_seconds": 300,  # 5 minutos
                 "cleanup_days": 30,  # Limpiar logs > 30 días
-                "performance_window_hours": 24  # Ventana de análisis
+                "performance_window_hours": 24,  # Ventana de análisis
+                "queue_capacity": 10000,  # Eventos pendientes antes de descartar
+                "batch_size": 500,  # Eventos por lote de escritura
+                "flush_interval_seconds": 1.0,
+                "fsync": "none",  # none | batch | interval
+                "fsync_interval_seconds": 5.0
             }
         }
         
@@ -123,14 +168,32 @@ class ProductionMonitor:
         return default_config
     
     def log_conversion_event(self, event: ConversionEvent):
-        """Registra evento de conversión"""
+        """Registra evento de conversión (sin bloquear: se procesa en el hilo de volcado)"""
+        # Añadir a buffer en memoria
+        self.recent_events.append(event)
+        self._enqueue("conversion", event)
+    
+    def log_system_metrics(self, metrics: SystemMetrics):
+        """Registra métricas del sistema"""
+        self.system_metrics.append(metrics)
+        self._enqueue("system", metrics)
+    
+    def _process_conversion_event(self, event: ConversionEvent):
+        """Persiste y analiza un evento de conversión (hilo de volcado)"""
         try:
-            # Añadir a buffer en memoria
-            self.recent_events.append(event)
-            
             # Guardar a archivo
             self._append_to_file(self.events_file, asdict(event))
             
+            # Actualizar agregados de los dashboards
+            self.aggregator.record(
+                f"{event.input_format}→{event.output_format}",
+                event.method_used,
+                event.duration_seconds,
+                event.success,
+                int(event.file_size_mb * 1024 * 1024),
+                timestamp=datetime.fromisoformat(event.timestamp).timestamp()
+            )
+            
             # Analizar para alertas
             self._analyze_conversion_event(event)
             
@@ -147,14 +210,11 @@ class ProductionMonitor:
         except Exception as e:
             logger.error(f"Error logging conversion event: {e}")
     
-    def log_system_metrics(self, metrics: SystemMetrics):
-        """Registra métricas del sistema"""
+    def _process_system_metrics(self, metrics: SystemMetrics):
+        """Persiste y analiza métricas del sistema (hilo de volcado)"""
         try:
-            # Añadir a buffer en memoria
-            self.system_metrics.append(metrics)
-            
             # Guardar a archivo
-            self._append_to_file("logs/system_metrics.json", asdict(metrics))
+            self._append_to_file(self.system_metrics_file, asdict(metrics))
             
             # Analizar para alertas
             self._analyze_system_metrics(metrics)
@@ -182,7 +242,7 @@ class ProductionMonitor:
                 "feedback": feedback
             }
             
-            self._append_to_file("logs/user_satisfaction.json", satisfaction_data)
+            self._enqueue("write", (self.satisfaction_file, satisfaction_data))
             
             logger.info(f"USER_SATISFACTION: {conversion_id} | Rating: {rating}/5")
             
@@ -190,6 +250,9 @@ class ProductionMonitor:
             for event in reversed(self.recent_events):
                 if event.conversion_id == conversion_id:
                     event.user_satisfaction = rating
+                    self.aggregator.record_rating(
+                        f"{event.input_format}→{event.output_format}", event.method_used, rating
+                    )
                     break
                     
         except Exception as e:
@@ -287,7 +350,7 @@ class ProductionMonitor:
             "data": data or {}
         }
         
-        self._append_to_file("logs/alerts.json", alert_data)
+        self._append_to_file(self.alerts_file, alert_data)
         
         # Log de alerta
         logger.warning(f"ALERT [{alert_type}]: {message}")
@@ -337,12 +400,114 @@ Sistema de Monitoreo Anclora Nexus
             logger.error(f"Error sending email alert: {e}")
     
     def _append_to_file(self, filename: str, data: Dict):
-        """Añade datos a archivo JSON línea por línea"""
+        """Añade datos a archivo JSON línea por línea (se escribe al cerrar el lote)"""
+        self._batch_lines[filename].append(json.dumps(data, ensure_ascii=False) + '\n')
+    
+    # ------------------------------------------------------------------
+    # Cola de eventos y volcado por lotes
+    
+    def _enqueue(self, kind: str, payload: Any) -> bool:
+        """Encola un elemento; lo descarta y cuenta si la cola está llena"""
+        if len(self._pending) >= self.queue_capacity:
+            with self._drop_lock:
+                self.pipeline_stats["dropped"] += 1
+            return False
+        self._pending.append((kind, payload))
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return True
+    
+    def _flush_loop(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._drain()
+    
+    def _drain(self):
+        """Procesa todo lo pendiente en lotes de `batch_size`"""
+        self._flushing = True
         try:
-            with open(filename, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(data, ensure_ascii=False) + '\n')
-        except Exception as e:
-            logger.error(f"Error writing to {filename}: {e}")
+            while self._pending:
+                self._batch_lines = defaultdict(list)
+                count = 0
+                while count < self.batch_size and self._pending:
+                    kind, payload = self._pending.popleft()
+                    count += 1
+                    try:
+                        if kind == "conversion":
+                            self._process_conversion_event(payload)
+                        elif kind == "system":
+                            self._process_system_metrics(payload)
+                        else:
+                            self._append_to_file(*payload)
+                    except Exception as e:
+                        logger.error(f"Error processing monitoring event: {e}")
+                self._write_batch(self._batch_lines)
+                self.pipeline_stats["batches"] += 1
+                self.pipeline_stats["written"] += count
+        finally:
+            self._flushing = False
+    
+    def _write_batch(self, batch_lines: Dict[str, List[str]]):
+        """Escribe un lote por archivo y aplica la política de fsync"""
+        for filename, lines in batch_lines.items():
+            try:
+                handle = self._handles.get(filename)
+                if handle is None:
+                    handle = self._handles[filename] = open(filename, 'a', encoding='utf-8')
+                handle.write(''.join(lines))
+                handle.flush()
+                if self.fsync_policy == "batch":
+                    os.fsync(handle.fileno())
+            except Exception as e:
+                self.pipeline_stats["write_errors"] += 1
+                logger.error(f"Error writing to {filename}: {e}")
+        
+        if self.fsync_policy == "interval" and time.monotonic() - self._last_fsync >= self.fsync_interval:
+            self._last_fsync = time.monotonic()
+            for handle in self._handles.values():
+                try:
+                    os.fsync(handle.fileno())
+                except Exception as e:
+                    logger.error(f"Error in fsync of {handle.name}: {e}")
+    
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Espera a que se vuelque todo lo encolado; True si se vació a tiempo"""
+        if not self._flusher.is_alive():
+            # Sin hilo de volcado (detenido): se vacía en el hilo actual
+            self._drain()
+            return True
+        deadline = time.monotonic() + timeout
+        while self._pending or self._flushing:
+            if time.monotonic() >= deadline:
+                return False
+            self._wakeup.set()
+            time.sleep(0.01)
+        return True
+    
+    def shutdown(self, timeout: float = 10.0):
+        """Vuelca lo pendiente, detiene el hilo de volcado y cierra los archivos"""
+        self.flush(timeout)
+        self._stopping = True
+        self._wakeup.set()
+        self._flusher.join(timeout)
+        for handle in self._handles.values():
+            try:
+                if self.fsync_policy != "none":
+                    os.fsync(handle.fileno())
+                handle.close()
+            except Exception:
+                pass
+        self._handles = {}
+    
+    def get_pipeline_stats(self) -> Dict[str, Any]:
+        """Estado de la cola de monitoreo"""
+        return {
+            **self.pipeline_stats,
+            "queued": len(self._pending),
+            "capacity": self.queue_capacity,
+            "fsync": self.fsync_policy
+        }
     
     def _start_background_monitoring(self):
         """Inicia monitoreo en background"""
@@ -417,57 +582,38 @@ Sistema de Monitoreo Anclora Nexus
             logger.error(f"Error in log cleanup: {e}")
     
     def get_performance_report(self, hours: int = 24) -> Dict:
-        """Genera reporte de rendimiento"""
+        """Genera reporte de rendimiento a partir de las cubetas agregadas"""
         try:
-            cutoff_time = datetime.now() - timedelta(hours=hours)
+            window = self.aggregator.summary(hours * 3600)
+            total = window["total"]
             
-            # Filtrar eventos recientes
-            recent_events = [
-                e for e in self.recent_events 
-                if datetime.fromisoformat(e.timestamp) >= cutoff_time
-            ]
-            
-            if not recent_events:
+            if not total["count"]:
                 return {"error": "No hay datos suficientes"}
             
-            # Calcular estadísticas
-            total_conversions = len(recent_events)
-            successful_conversions = sum(1 for e in recent_events if e.success)
-            success_rate = (successful_conversions / total_conversions) * 100
-            
-            avg_duration = sum(e.duration_seconds for e in recent_events) / total_conversions
-            avg_file_size = sum(e.file_size_mb for e in recent_events) / total_conversions
-            
-            # Estadísticas por método
-            method_stats = defaultdict(lambda: {"count": 0, "success": 0, "avg_time": 0})
-            for event in recent_events:
-                stats = method_stats[event.method_used]
-                stats["count"] += 1
-                if event.success:
-                    stats["success"] += 1
-                stats["avg_time"] += event.duration_seconds
-            
-            # Finalizar cálculos por método
-            for method, stats in method_stats.items():
-                stats["success_rate"] = (stats["success"] / stats["count"]) * 100
-                stats["avg_time"] /= stats["count"]
-            
-            # Satisfacción del usuario
-            satisfaction_ratings = [e.user_satisfaction for e in recent_events if e.user_satisfaction]
-            avg_satisfaction = sum(satisfaction_ratings) / len(satisfaction_ratings) if satisfaction_ratings else None
+            success_rate = total["success_rate"]
+            avg_satisfaction = total["avg_user_satisfaction"]
             
             return {
                 "period_hours": hours,
                 "generated_at": datetime.now().isoformat(),
                 "summary": {
-                    "total_conversions": total_conversions,
+                    "total_conversions": total["count"],
                     "success_rate": round(success_rate, 2),
-                    "avg_duration_seconds": round(avg_duration, 2),
-                    "avg_file_size_mb": round(avg_file_size, 2),
+                    "avg_duration_seconds": round(total["avg_time"], 2),
+                    "p50_duration_seconds": total["p50"],
+                    "p95_duration_seconds": total["p95"],
+                    "p99_duration_seconds": total["p99"],
+                    "avg_file_size_mb": round(total["bytes"] / total["count"] / (1024 * 1024), 2),
                     "avg_user_satisfaction": round(avg_satisfaction, 2) if avg_satisfaction else None
                 },
-                "method_performance": dict(method_stats),
+                "method_performance": {
+                    method: {key: stats[key] for key in
+                             ("count", "success", "success_rate", "avg_time", "p50", "p95", "p99")}
+                    for method, stats in window["by_method"].items()
+                },
+                "format_pairs": window["by_format_pair"],
                 "top_errors": dict(self.error_counts),
+                "monitoring_pipeline": self.get_pipeline_stats(),
                 "system_health": "good" if success_rate > 95 else "warning" if success_rate > 90 else "critical"
             }
             
@@ -483,6 +629,7 @@ def get_monitor() -> ProductionMonitor:
     global _monitor_instance
     if _monitor_instance is None:
         _monitor_instance = ProductionMonitor()
+        atexit.register(_monitor_instance.shutdown)
     return _monitor_instance
 
 # Funciones de conveniencia
@@ -0,0 +1,252 @@
+"""
+Agregación de métricas en ventanas deslizantes para Anclora Nexus
+Mantiene cubetas por minuto, hora y día agrupadas por par de formatos y
+método, de modo que los dashboards leen cubetas en lugar de eventos
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# (nombre, ancho en segundos, cubetas retenidas)
+RESOLUTIONS = (
+    ('minute', 60, 180),     # 3 horas
+    ('hour', 3600, 72),      # 3 días
+    ('day', 86400, 90),      # 90 días
+)
+
+PERCENTILES = (0.5, 0.95, 0.99)
+
+# Latencias mínimas representables y precisión relativa del histograma
+MIN_LATENCY = 1e-4
+RELATIVE_ACCURACY = 0.01
+
+# Clases de tamaño y de tiempo de respuesta usadas por los dashboards
+SIZE_CLASSES = (('small', 1.0), ('medium', 10.0), ('large', math.inf))  # MB
+TIME_CLASSES = (('fast', 5.0), ('normal', 30.0), ('slow', math.inf))    # segundos
+
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+
+def _bucket_index(value: float) -> int:
+    return math.ceil(math.log(max(value, MIN_LATENCY) / MIN_LATENCY) / _LOG_GAMMA)
+
+
+def _bucket_value(index: int) -> float:
+    # Punto medio relativo de la cubeta: error relativo <= RELATIVE_ACCURACY
+    return MIN_LATENCY * _GAMMA ** index * 2 / (1 + _GAMMA)
+
+
+class LatencyHistogram:
+    """Histograma logarítmico disperso (estilo HDR) con error relativo acotado
+
+    Los cuantiles devueltos están a menos de RELATIVE_ACCURACY del valor
+    real y dos histogramas se combinan sumando cubetas.
+    """
+
+    __slots__ = ('counts', 'count')
+
+    def __init__(self):
+        self.counts: Dict[int, int] = defaultdict(int)
+        self.count = 0
+
+    def add(self, value: float, count: int = 1):
+        self.counts[_bucket_index(value)] += count
+        self.count += count
+
+    def merge(self, other: 'LatencyHistogram'):
+        for index, count in other.counts.items():
+            self.counts[index] += count
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen > rank:
+                return _bucket_value(index)
+        return _bucket_value(max(self.counts))
+
+    def count_below(self, limit: float) -> int:
+        """Número de valores por debajo de `limit` (con la precisión del histograma)"""
+        edge = _bucket_index(limit)
+        return sum(count for index, count in self.counts.items() if index < edge)
+
+
+@dataclass
+class WindowStats:
+    """Contadores de una cubeta (o de la combinación de varias)"""
+    count: int = 0
+    errors: int = 0
+    bytes: int = 0
+    total_duration: float = 0.0
+    rating_sum: int = 0
+    rating_count: int = 0
+    size_classes: Dict[str, int] = field(default_factory=lambda: {name: 0 for name, _ in SIZE_CLASSES})
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def add(self, duration: float, success: bool, size_bytes: int):
+        self.count += 1
+        if not success:
+            self.errors += 1
+        self.bytes += size_bytes
+        self.total_duration += duration
+        size_mb = size_bytes / (1024 * 1024)
+        for name, upper in SIZE_CLASSES:
+            if size_mb < upper:
+                self.size_classes[name] += 1
+                break
+        self.latency.add(duration)
+
+    def merge(self, other: 'WindowStats'):
+        self.count += other.count
+        self.errors += other.errors
+        self.bytes += other.bytes
+        self.total_duration += other.total_duration
+        self.rating_sum += other.rating_sum
+        self.rating_count += other.rating_count
+        for name, value in other.size_classes.items():
+            self.size_classes[name] += value
+        self.latency.merge(other.latency)
+
+    def to_dict(self) -> Dict:
+        if not self.count:
+            return {'count': 0}
+        time_classes, below = {}, 0
+        for name, upper in TIME_CLASSES:
+            under = self.count if math.isinf(upper) else self.latency.count_below(upper)
+            time_classes[name] = under - below
+            below = under
+        return {
+            'count': self.count,
+            'success': self.count - self.errors,
+            'errors': self.errors,
+            'success_rate': (self.count - self.errors) / self.count * 100,
+            'error_rate': self.errors / self.count,
+            'bytes': self.bytes,
+            'avg_time': self.total_duration / self.count,
+            **{f'p{int(q * 100)}': round(self.latency.quantile(q), 4) for q in PERCENTILES},
+            'size_distribution': dict(self.size_classes),
+            'time_distribution': time_classes,
+            'avg_user_satisfaction': self.rating_sum / self.rating_count if self.rating_count else None
+        }
+
+
+# Clave de agrupación: (par de formatos "html→pdf", método)
+Key = Tuple[str, str]
+
+
+class RollingAggregator:
+    """Agregador incremental de eventos de conversión
+
+    Cada evento actualiza la cubeta actual de cada resolución (O(1)); una
+    consulta combina solo las cubetas de la resolución más fina cuya
+    retención cubre la ventana, redondeando la ventana a esa resolución
+    (la cubeta en curso cuenta entera, la más antigua parcial no cuenta).
+    """
+
+    def __init__(self, resolutions: Iterable[Tuple[str, int, int]] = RESOLUTIONS):
+        self.resolutions = list(resolutions)
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, 'OrderedDict[int, Dict[Key, WindowStats]]'] = {
+            name: OrderedDict() for name, _, _ in self.resolutions
+        }
+
+    def record(self, format_pair: str, method: str, duration: float, success: bool,
+               size_bytes: int = 0, timestamp: Optional[float] = None):
+        """Añade un evento a las cubetas de todas las resoluciones"""
+        timestamp = time.time() if timestamp is None else timestamp
+        key = (format_pair, method)
+        with self._lock:
+            for name, width, _ in self.resolutions:
+                self._bucket(name, width, timestamp, key).add(duration, success, size_bytes)
+
+    def record_rating(self, format_pair: str, method: str, rating: int, timestamp: Optional[float] = None):
+        """Añade una valoración de usuario a la cubeta actual"""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            for name, width, _ in self.resolutions:
+                stats = self._bucket(name, width, timestamp, (format_pair, method))
+                stats.rating_sum += rating
+                stats.rating_count += 1
+
+    def _bucket(self, name: str, width: int, timestamp: float, key: Key) -> WindowStats:
+        buckets = self._buckets[name]
+        start = int(timestamp // width * width)
+        slot = buckets.get(start)
+        if slot is None:
+            late = bool(buckets) and next(reversed(buckets)) > start
+            slot = buckets[start] = {}
+            if late:
+                # Evento tardío: mantener el orden cronológico
+                for later in [s for s in buckets if s > start]:
+                    buckets.move_to_end(later)
+            retention = next(r for n, _, r in self.resolutions if n == name)
+            while len(buckets) > retention:
+                buckets.popitem(last=False)
+        stats = slot.get(key)
+        if stats is None:
+            stats = slot[key] = WindowStats()
+        return stats
+
+    def _resolution_for(self, window_seconds: float) -> Tuple[str, int]:
+        for name, width, retention in self.resolutions:
+            if window_seconds <= width * retention:
+                return name, width
+        name, width, _ = self.resolutions[-1]
+        return name, width
+
+    def query(self, window_seconds: float, end: Optional[float] = None,
+              format_pair: Optional[str] = None, method: Optional[str] = None) -> Dict[Key, WindowStats]:
+        """Estadísticas combinadas por (par de formatos, método) para la ventana [end - window, end)"""
+        end = time.time() if end is None else end
+        name, width = self._resolution_for(window_seconds)
+        # Primera cubeta que empieza dentro de la ventana: ventanas contiguas no se solapan
+        first = math.ceil((end - window_seconds) / width) * width
+        merged: Dict[Key, WindowStats] = defaultdict(WindowStats)
+        with self._lock:
+            for start in reversed(self._buckets[name]):
+                if start < first:
+                    break
+                if start >= end:
+                    continue
+                for key, stats in self._buckets[name][start].items():
+                    if format_pair is not None and key[0] != format_pair:
+                        continue
+                    if method is not None and key[1] != method:
+                        continue
+                    merged[key].merge(stats)
+        return dict(merged)
+
+    def summary(self, window_seconds: float, end: Optional[float] = None,
+                format_pair: Optional[str] = None, method: Optional[str] = None) -> Dict:
+        """Totales y desglose por método y por par de formatos para una ventana"""
+        groups = self.query(window_seconds, end, format_pair, method)
+        total = WindowStats()
+        by_method: Dict[str, WindowStats] = defaultdict(WindowStats)
+        by_pair: Dict[str, WindowStats] = defaultdict(WindowStats)
+        for (pair, method_used), stats in groups.items():
+            total.merge(stats)
+            if not stats.count:
+                continue  # Solo valoraciones
+            by_method[method_used].merge(stats)
+            by_pair[pair].merge(stats)
+        return {
+            'window_seconds': window_seconds,
+            'total': total.to_dict(),
+            'by_method': {m: s.to_dict() for m, s in by_method.items()},
+            'by_format_pair': {p: s.to_dict() for p, s in by_pair.items()}
+        }
+
+    def top_format_pairs(self, window_seconds: float, limit: int = 10, end: Optional[float] = None) -> List[Dict]:
+        """Pares de formatos con más conversiones en la ventana"""
+        pairs = self.summary(window_seconds, end)['by_format_pair']
+        ranked = sorted(pairs.items(), key=lambda item: item[1]['count'], reverse=True)
+        return [{'type': pair, **stats} for pair, stats in ranked[:limit]]
@@ -0,0 +1,215 @@
+"""
+Índice de rutas de conversión para Anclora Nexus
+Precalcula las rutas más cortas y las k mejores rutas ponderadas entre todos los
+pares de formatos para que las consultas no recorran el grafo en cada petición
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+Step = Tuple[str, str]
+# Evalúa una ruta (lista de pasos) con una preferencia y devuelve un objeto con `quality_score`
+RouteEvaluator = Callable[[List[Step], bool], Optional[Any]]
+
+
+class RouteIndex:
+    """Tabla de rutas para todos los pares de formatos de un grafo de conversiones"""
+
+    def __init__(self, max_steps: int = 3, k_best: int = 3):
+        self.max_steps = max_steps
+        self.k_best = k_best
+        self._shortest: Dict[Step, List[str]] = {}
+        self._distances: Dict[str, Dict[str, int]] = {}
+        # (origen, destino, prefer_quality) -> {nº de pasos: [(orden, ruta)]}
+        self._ranked: Dict[Tuple[str, str, bool], Dict[int, List[Tuple[int, Any]]]] = {}
+        self._nodes: set = set()
+        self._graph: Dict[str, List[str]] = {}
+        self._lock = threading.RLock()
+        self.version = 0
+        self.build_time = 0.0
+        self.route_count = 0
+
+    def build(self, adjacency: Mapping[str, Iterable[str]],
+              evaluator: Optional[RouteEvaluator] = None):
+        """
+        Reconstruye el índice a partir de la lista de adyacencia
+
+        Args:
+            adjacency: Formato origen -> formatos destino directos (el orden se respeta)
+            evaluator: Función de puntuación para las k mejores rutas (opcional)
+        """
+        start = time.time()
+        graph = {source: list(targets) for source, targets in adjacency.items()}
+        nodes = set(graph)
+        for targets in graph.values():
+            nodes.update(targets)
+
+        shortest: Dict[Step, List[str]] = {}
+        distances: Dict[str, Dict[str, int]] = {}
+        ranked: Dict[Tuple[str, str, bool], Dict[int, List[Tuple[int, Any]]]] = {}
+        route_count = 0
+
+        for source in graph:
+            paths = self._bfs(graph, source)
+            distances[source] = {target: len(path) - 1 for target, path in paths.items()}
+            for target, path in paths.items():
+                shortest[(source, target)] = path
+
+            if evaluator is None:
+                continue
+            route_count += self._rank_routes(
+                enumerate(self._simple_paths(graph, source)), evaluator, ranked
+            )
+
+        with self._lock:
+            self._shortest = shortest
+            self._distances = distances
+            self._ranked = ranked
+            self._nodes = nodes
+            self._graph = graph
+            self.route_count = route_count
+            self.version += 1
+            self.build_time = time.time() - start
+
+        logging.info(
+            f"Índice de rutas v{self.version}: {len(shortest)} pares, "
+            f"{route_count} rutas evaluadas en {self.build_time * 1000:.1f} ms"
+        )
+
+    def rescore(self, step: Step, evaluator: RouteEvaluator) -> int:
+        """
+        Recalcula las k mejores rutas solo de los pares con alguna ruta que pasa por `step`
+
+        Se usa cuando cambian las métricas de una conversión: el grafo es el mismo,
+        así que las rutas más cortas no varían. El resultado es idéntico al de `build`.
+
+        Returns:
+            Número de pares (origen, destino) recalculados
+        """
+        start = time.time()
+        with self._lock:
+            graph, distances = self._graph, self._distances
+        updates: Dict[Tuple[str, str, bool], Dict[int, List[Tuple[int, Any]]]] = {}
+        stale = set()
+
+        for source in graph:
+            # Solo los formatos que llegan al origen del paso con margen para recorrerlo
+            if source != step[0] and distances.get(source, {}).get(step[0], self.max_steps) >= self.max_steps:
+                continue
+            paths = list(enumerate(self._simple_paths(graph, source)))
+            targets = {steps[-1][1] for _, steps in paths if step in steps}
+            if not targets:
+                continue
+            stale.update((source, target) for target in targets)
+            self._rank_routes(
+                ((order, steps) for order, steps in paths if steps[-1][1] in targets), evaluator, updates
+            )
+
+        with self._lock:
+            ranked = {key: bucket for key, bucket in self._ranked.items() if key[:2] not in stale}
+            ranked.update(updates)
+            self._ranked = ranked
+            self.version += 1
+
+        logging.debug(
+            f"Índice de rutas v{self.version}: {len(stale)} pares recalculados por {step[0]}→{step[1]} "
+            f"en {(time.time() - start) * 1000:.1f} ms"
+        )
+        return len(stale)
+
+    def _rank_routes(self, paths: Iterable[Tuple[int, List[Step]]], evaluator: RouteEvaluator,
+                     ranked: Dict[Tuple[str, str, bool], Dict[int, List[Tuple[int, Any]]]]) -> int:
+        """Evalúa rutas (orden, pasos) y conserva las k mejores por par, preferencia y nº de pasos"""
+        count = 0
+        for order, steps in paths:
+            source, target = steps[0][0], steps[-1][1]
+            for prefer_quality in (True, False):
+                route = evaluator(steps, prefer_quality)
+                if route is None:
+                    continue
+                bucket = ranked.setdefault((source, target, prefer_quality), {})
+                candidates = bucket.setdefault(len(steps), [])
+                candidates.append((order, route))
+                # Orden estable: puntuación descendente y, a igualdad, orden de descubrimiento
+                candidates.sort(key=lambda item: (-item[1].quality_score, item[0]))
+                del candidates[self.k_best:]
+            count += 1
+        return count
+
+    def _bfs(self, graph: Dict[str, List[str]], source: str) -> Dict[str, List[str]]:
+        """Ruta más corta desde `source` a cada formato alcanzable (primer descubrimiento)"""
+        paths: Dict[str, List[str]] = {}
+        queue = deque([(source, [source])])
+        visited = {source}
+
+        while queue:
+            current, path = queue.popleft()
+            if len(path) - 1 >= self.max_steps:
+                continue
+            for neighbor in graph.get(current, []):
+                if neighbor in visited:
+                    continue
+                new_path = path + [neighbor]
+                paths[neighbor] = new_path
+                visited.add(neighbor)
+                queue.append((neighbor, new_path))
+        return paths
+
+    def _simple_paths(self, graph: Dict[str, List[str]], source: str):
+        """Todas las rutas simples desde `source` hasta `max_steps` pasos, en orden DFS"""
+        stack = [(source, [source])]
+        while stack:
+            current, path = stack.pop()
+            if len(path) > 1:
+                yield [(path[i], path[i + 1]) for i in range(len(path) - 1)]
+            if len(path) - 1 >= self.max_steps:
+                continue
+            # Se apilan en orden inverso para visitar los vecinos en su orden original
+            for neighbor in reversed(graph.get(current, [])):
+                if neighbor not in path:
+                    stack.append((neighbor, path + [neighbor]))
+
+    def has_format(self, fmt: str) -> bool:
+        return fmt in self._nodes
+
+    def shortest_path(self, source: str, target: str) -> Optional[List[str]]:
+        """Ruta más corta como lista de formatos, o None si no existe"""
+        if source == target:
+            return [source]
+        path = self._shortest.get((source, target))
+        return list(path) if path else None
+
+    def reachable(self, source: str, max_steps: Optional[int] = None) -> Dict[str, int]:
+        """Formatos alcanzables desde `source` con su número mínimo de pasos"""
+        distances = self._distances.get(source, {})
+        if max_steps is None:
+            return dict(distances)
+        return {target: steps for target, steps in distances.items() if steps <= max_steps}
+
+    def best_routes(self, source: str, target: str, prefer_quality: bool = True,
+                    max_steps: Optional[int] = None, k: int = 1) -> List[Any]:
+        """Las k mejores rutas ponderadas con como máximo `max_steps` pasos"""
+        bucket = self._ranked.get((source, target, prefer_quality))
+        if not bucket:
+            return []
+        limit = self.max_steps if max_steps is None else max_steps
+        candidates = [
+            item for steps, items in bucket.items() if steps <= limit for item in items
+        ]
+        candidates.sort(key=lambda item: (-item[1].quality_score, item[0]))
+        return [route for _, route in candidates[:k]]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Información del índice actual"""
+        return {
+            'version': self.version,
+            'formats': len(self._nodes),
+            'pairs': len(self._shortest),
+            'routes_evaluated': self.route_count,
+            'max_steps': self.max_steps,
+            'k_best': self.k_best,
+            'build_time_ms': self.build_time * 1000
+        }
@@ -6,10 +6,12 @@ Ejecuta conversiones complejas de múltiples pasos automáticamente
 import logging
 import os
 import tempfile
+import threading
 import time
 import uuid
-from typing import List, Dict, Optional, Tuple, Any
-from dataclasses import dataclass, asdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator, List, Dict, Optional, Tuple, Any
+from dataclasses import dataclass, asdict, field
 from pathlib import Path
 import json
 from datetime import datetime
@@ -17,6 +19,13 @@ from datetime import datetime
 from .intelligent_routing import intelligent_router, ConversionRoute
 from .intelligent_cache import intelligent_cache
 from .ai_file_analyzer import ai_file_analyzer
+from .fanout_executor import FanOutExecutor, FanOutNode
+
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+# Directorio en memoria para los archivos intermedios (tmpfs) y tamaño máximo de entrada para usarlo
+MEMORY_SPOOL_DIR = os.environ.get('SEQUENCE_SPOOL_DIR', '/dev/shm')
+MEMORY_SPOOL_MAX_MB = float(os.environ.get('SEQUENCE_MEMORY_SPOOL_MAX_MB', '64'))
 
 @dataclass
 class SequenceStep:
@@ -32,6 +41,8 @@ class SequenceStep:
     error_message: Optional[str] = None
     file_size_before: Optional[int] = None
     file_size_after: Optional[int] = None
+    depends_on: Optional[int] = None  # Paso cuya salida es la entrada de este
+    path: Tuple[str, ...] = ()  # Formatos desde el origen hasta la salida de este paso
 
 @dataclass
 class ConversionSequence:
@@ -50,23 +61,60 @@ class ConversionSequence:
     total_time: Optional[float] = None
     success_rate: float = 0.0
     metadata: Dict[str, Any] = None
+    outputs: Dict[str, str] = field(default_factory=dict)  # formato destino -> archivo final
+    paths: Dict[str, List[str]] = field(default_factory=dict)  # formato destino -> ruta de formatos
+    version: int = 0  # Se incrementa con cada cambio de estado
 
 class SequenceProcessor:
     """Procesador de secuencias de conversión inteligentes"""
     
-    def __init__(self):
+    def __init__(self, max_concurrent_sequences: int = 5, max_step_workers: Optional[int] = None):
         self.active_sequences: Dict[str, ConversionSequence] = {}
         self.temp_dir = tempfile.mkdtemp(prefix="anclora_sequences_")
-        self.max_concurrent_sequences = 5
+        self.memory_dir = self._create_memory_dir()
+        self.max_concurrent_sequences = max_concurrent_sequences
+        self.max_step_workers = max_step_workers or int(os.environ.get('SEQUENCE_STEP_WORKERS', '4'))
         
         # Crear directorio para archivos temporales de secuencias
         os.makedirs(self.temp_dir, exist_ok=True)
         
-        logging.info(f"SequenceProcessor inicializado con temp_dir: {self.temp_dir}")
+        # Secuencias en segundo plano; sus pasos los ejecuta un FanOutExecutor
+        self._sequence_executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+        self._changed = threading.Condition()
+        
+        logging.info(f"SequenceProcessor inicializado con temp_dir: {self.temp_dir}"
+                     f" (intermedios en memoria: {self.memory_dir or 'no'})")
+    
+    @staticmethod
+    def _create_memory_dir() -> Optional[str]:
+        """Directorio en tmpfs para pasar intermedios entre pasos sin tocar disco"""
+        try:
+            if os.path.isdir(MEMORY_SPOOL_DIR) and os.access(MEMORY_SPOOL_DIR, os.W_OK):
+                return tempfile.mkdtemp(prefix="anclora_sequences_", dir=MEMORY_SPOOL_DIR)
+        except OSError as e:
+            logging.warning(f"No se pudo crear el directorio en memoria: {e}")
+        return None
+    
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._sequence_executor is None:
+                self._sequence_executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrent_sequences, thread_name_prefix='sequence'
+                )
+            return self._sequence_executor
+    
+    def _touch(self, sequence: ConversionSequence):
+        """Registra un cambio de estado y despierta a quien espera novedades"""
+        with self._changed:
+            sequence.version += 1
+            self._changed.notify_all()
     
     def create_sequence(self, source_format: str, target_format: str, 
                        input_file: str, output_file: str, 
-                       prefer_quality: bool = True, max_steps: int = 4) -> Optional[ConversionSequence]:
+                       prefer_quality: bool = True, max_steps: int = 4,
+                       extra_targets: Optional[Dict[str, str]] = None) -> Optional[ConversionSequence]:
         """
         Crear una nueva secuencia de conversión
         
@@ -77,25 +125,45 @@ class SequenceProcessor:
             output_file: Ruta del archivo de salida final
             prefer_quality: Si priorizar calidad sobre velocidad
             max_steps: Máximo número de pasos permitidos
+            extra_targets: Destinos adicionales {formato: archivo de salida}; las
+                ramas comparten los pasos comunes (árbol de FanOutExecutor) y se
+                ejecutan en paralelo
             
         Returns:
             ConversionSequence creada o None si no es posible
         """
         try:
-            # Encontrar la mejor ruta
-            route = intelligent_router.find_best_route(
+            # Mejores rutas desde el índice precalculado del router
+            routes = intelligent_router.find_routes(
                 source_format, target_format, max_steps, prefer_quality
             )
+            route = routes[0] if routes else None
             
             if not route:
                 logging.error(f"No se encontró ruta para {source_format}→{target_format}")
                 return None
             
+            outputs = {target_format: output_file}
+            paths = {target_format: self._route_path(route)}
+            for extra_format, extra_output in (extra_targets or {}).items():
+                if extra_format in outputs:
+                    continue
+                extra_routes = intelligent_router.find_routes(
+                    source_format, extra_format, max_steps, prefer_quality
+                )
+                if not extra_routes:
+                    logging.error(f"No se encontró ruta para {source_format}→{extra_format}")
+                    return None
+                outputs[extra_format] = extra_output
+                paths[extra_format] = self._route_path(extra_routes[0])
+            
             # Generar ID único para la secuencia
             sequence_id = str(uuid.uuid4())
             
             # Crear pasos de la secuencia
-            steps = self._create_sequence_steps(route, input_file, output_file, sequence_id)
+            spool_dir = self._spool_dir(input_file)
+            root, paths = FanOutExecutor.plan(source_format, paths)
+            steps = self._create_sequence_steps(root, outputs, input_file)
             
             # Crear secuencia
             sequence = ConversionSequence(
@@ -112,8 +180,12 @@ class SequenceProcessor:
                     'prefer_quality': prefer_quality,
                     'max_steps': max_steps,
                     'estimated_time': route.estimated_time,
-                    'complexity': route.complexity
-                }
+                    'complexity': route.complexity,
+                    'alternative_routes': [alternative.description for alternative in routes[1:]],
+                    'intermediates_in_memory': spool_dir == self.memory_dir
+                },
+                outputs=outputs,
+                paths=paths
             )
             
             # Registrar secuencia activa
@@ -126,46 +198,75 @@ class SequenceProcessor:
             logging.error(f"Error creando secuencia: {e}")
             return None
     
-    def _create_sequence_steps(self, route: ConversionRoute, input_file: str, 
-                             output_file: str, sequence_id: str) -> List[SequenceStep]:
-        """Crear los pasos individuales de la secuencia"""
+    def _spool_dir(self, input_file: str) -> str:
+        """Intermedios en memoria salvo que la entrada sea demasiado grande"""
+        try:
+            small = os.path.getsize(input_file) <= MEMORY_SPOOL_MAX_MB * 1024 * 1024
+        except OSError:
+            small = False
+        return self.memory_dir if self.memory_dir and small else self.temp_dir
+    
+    @staticmethod
+    def _route_path(route: ConversionRoute) -> List[str]:
+        return [route.steps[0][0]] + [target_fmt for _, target_fmt in route.steps]
+    
+    def _create_sequence_steps(self, root: FanOutNode, outputs: Dict[str, str],
+                               input_file: str) -> List[SequenceStep]:
+        """Un paso por nodo del árbol de FanOutExecutor: las ramas comparten los prefijos comunes
+
+        Los intermedios se crean al ejecutar; hasta entonces su archivo queda vacío.
+        """
         try:
             steps = []
-            current_input = input_file
-            
-            for i, (source_fmt, target_fmt) in enumerate(route.steps):
-                step_number = i + 1
-                
-                # Determinar archivo de salida para este paso
-                if step_number == len(route.steps):
-                    # Último paso - usar archivo de salida final
-                    step_output = output_file
-                else:
-                    # Paso intermedio - crear archivo temporal
-                    temp_filename = f"{sequence_id}_step_{step_number}.{target_fmt}"
-                    step_output = os.path.join(self.temp_dir, temp_filename)
-                
+            produced: Dict[Tuple[str, ...], SequenceStep] = {}
+            for node in FanOutExecutor.walk(root):
+                if node is root:
+                    continue
+                parent = produced.get(node.parent.path)
                 step = SequenceStep(
-                    step_number=step_number,
-                    source_format=source_fmt,
-                    target_format=target_fmt,
-                    input_file=current_input,
-                    output_file=step_output,
-                    status='pending'
+                    step_number=len(steps) + 1,
+                    source_format=node.hop[0],
+                    target_format=node.hop[1],
+                    input_file=parent.output_file if parent else input_file,
+                    output_file=outputs[node.targets[0]] if node.targets else '',
+                    status='pending',
+                    depends_on=parent.step_number if parent else None,
+                    path=node.path
                 )
-                
                 steps.append(step)
-                current_input = step_output  # La salida de este paso es la entrada del siguiente
-            
+                produced[node.path] = step
             return steps
             
         except Exception as e:
             logging.error(f"Error creando pasos de secuencia: {e}")
             return []
     
+    def start_sequence(self, sequence_id: str) -> bool:
+        """
+        Lanzar una secuencia en segundo plano
+        
+        Returns:
+            True si la secuencia se aceptó para ejecución
+        """
+        sequence = self.active_sequences.get(sequence_id)
+        if not sequence:
+            logging.error(f"Secuencia no encontrada: {sequence_id}")
+            return False
+        
+        with self._changed:
+            if sequence.status != 'pending':
+                logging.warning(f"Secuencia {sequence_id} ya está en estado: {sequence.status}")
+                return False
+            sequence.status = 'processing'
+            sequence.started_at = datetime.now()
+        self._touch(sequence)
+        
+        self._futures[sequence_id] = self._executor().submit(self._run_sequence, sequence)
+        return True
+    
     def execute_sequence(self, sequence_id: str) -> bool:
         """
-        Ejecutar una secuencia de conversión
+        Ejecutar una secuencia de conversión y esperar a que termine
         
         Args:
             sequence_id: ID de la secuencia a ejecutar
@@ -174,120 +275,110 @@ class SequenceProcessor:
             True si la secuencia se completó exitosamente
         """
         try:
-            sequence = self.active_sequences.get(sequence_id)
-            if not sequence:
-                logging.error(f"Secuencia no encontrada: {sequence_id}")
+            if not self.start_sequence(sequence_id):
                 return False
+            return self._futures.pop(sequence_id).result()
+        except Exception as e:
+            logging.error(f"Error ejecutando secuencia {sequence_id}: {e}")
+            if sequence_id in self.active_sequences:
+                self.active_sequences[sequence_id].status = 'failed'
+            return False
+    
+    def _run_sequence(self, sequence: ConversionSequence) -> bool:
+        """Ejecuta el árbol de pasos con FanOutExecutor; las ramas independientes en paralelo"""
+        sequence_id = sequence.sequence_id
+        try:
+            logging.info(f"Iniciando secuencia {sequence_id}: {sequence.route.description}")
             
-            if sequence.status != 'pending':
-                logging.warning(f"Secuencia {sequence_id} ya está en estado: {sequence.status}")
-                return False
+            from src.models.conversion import conversion_engine, TEXT_EXTENSIONS
             
-            # Iniciar secuencia
-            sequence.status = 'processing'
-            sequence.started_at = datetime.now()
+            steps_by_path = {step.path: step for step in sequence.steps}
             
-            logging.info(f"Iniciando secuencia {sequence_id}: {sequence.route.description}")
+            def on_step(node: FanOutNode, status: str, message: Optional[str]):
+                step = steps_by_path.get(node.path)
+                if step is None:
+                    return
+                self._record_step(step, node, status, message)
+                self._touch(sequence)
             
-            # Ejecutar cada paso
-            completed_steps = 0
-            total_steps = len(sequence.steps)
+            executor = FanOutExecutor(
+                conversion_engine, TEXT_EXTENSIONS, self.max_step_workers,
+                spool_dir=self._spool_dir(sequence.original_file),
+                on_step=on_step,
+                is_cancelled=lambda: sequence.status == 'cancelled'
+            )
+            results = executor.run(
+                sequence.original_file, sequence.source_format, dict(sequence.outputs),
+                use_cache=conversion_engine.result_cache_enabled,
+                paths={fmt: list(path) for fmt, path in sequence.paths.items()}
+            )
             
+            # Pasos sin ejecutar: destinos servidos desde el cache o ramas interrumpidas
             for step in sequence.steps:
-                success = self._execute_step(step, sequence)
-                
-                if success:
-                    completed_steps += 1
-                    logging.info(f"Paso {step.step_number}/{total_steps} completado: {step.source_format}→{step.target_format}")
-                else:
-                    # Fallo en el paso - marcar secuencia como fallida
-                    sequence.status = 'failed'
-                    logging.error(f"Fallo en paso {step.step_number}: {step.error_message}")
-                    break
+                if step.status in ('pending', 'processing'):
+                    served = [results[fmt] for fmt, path in sequence.paths.items()
+                              if tuple(path[:len(step.path)]) == step.path]
+                    step.status = 'completed' if served and all(ok for ok, _ in served) else 'failed'
             
             # Finalizar secuencia
+            total_steps = len(sequence.steps)
+            completed_steps = sum(1 for step in sequence.steps if step.status == 'completed')
             sequence.completed_at = datetime.now()
             sequence.total_time = (sequence.completed_at - sequence.started_at).total_seconds()
-            sequence.success_rate = completed_steps / total_steps
+            sequence.success_rate = completed_steps / total_steps if total_steps else 0.0
             
-            if completed_steps == total_steps:
+            if sequence.status == 'cancelled':
+                self._touch(sequence)
+                return False
+            
+            if all(success for success, _ in results.values()):
                 sequence.status = 'completed'
                 logging.info(f"Secuencia {sequence_id} completada exitosamente en {sequence.total_time:.2f}s")
                 
-                # Limpiar archivos temporales
-                self._cleanup_temp_files(sequence)
-                
                 # Actualizar métricas del router
                 self._update_router_metrics(sequence)
-                
+                self._touch(sequence)
                 return True
             else:
+                sequence.status = 'failed'
                 logging.error(f"Secuencia {sequence_id} falló. Completados: {completed_steps}/{total_steps}")
+                self._touch(sequence)
                 return False
             
         except Exception as e:
             logging.error(f"Error ejecutando secuencia {sequence_id}: {e}")
-            if sequence_id in self.active_sequences:
-                self.active_sequences[sequence_id].status = 'failed'
+            sequence.status = 'failed'
+            self._touch(sequence)
             return False
     
-    def _execute_step(self, step: SequenceStep, sequence: ConversionSequence) -> bool:
-        """Ejecutar un paso individual de la secuencia"""
-        try:
-            # Verificar que el archivo de entrada existe
-            if not os.path.exists(step.input_file):
-                step.status = 'failed'
-                step.error_message = f"Archivo de entrada no encontrado: {step.input_file}"
-                return False
-            
-            # Marcar paso como en proceso
-            step.status = 'processing'
+    @staticmethod
+    def _record_step(step: SequenceStep, node: FanOutNode, status: str, message: Optional[str]):
+        """Refleja en el paso el avance de su nodo en el FanOutExecutor"""
+        if status == 'processing':
+            step.input_file = node.parent.output_path
+            step.output_file = node.output_path
             step.start_time = datetime.now()
-            step.file_size_before = os.path.getsize(step.input_file)
-            
-            # Importar motor de conversiones
-            from src.models.conversion import conversion_engine
-            
-            # Ejecutar conversión
-            success, message = conversion_engine.convert_file(
-                step.input_file,
-                step.output_file,
-                step.source_format,
-                step.target_format
-            )
-            
-            # Finalizar paso
-            step.end_time = datetime.now()
-            
-            if success:
-                step.status = 'completed'
-                
-                # Verificar que el archivo de salida se creó
-                if os.path.exists(step.output_file):
-                    step.file_size_after = os.path.getsize(step.output_file)
-                    logging.debug(f"Paso completado: {step.source_format}→{step.target_format} ({step.file_size_before}→{step.file_size_after} bytes)")
-                    return True
-                else:
-                    step.status = 'failed'
-                    step.error_message = "Archivo de salida no se generó"
-                    return False
-            else:
-                step.status = 'failed'
+            if os.path.exists(step.input_file):
+                step.file_size_before = os.path.getsize(step.input_file)
+        else:
+            step.end_time = datetime.now() if step.start_time else None
+            if status == 'completed' and step.output_file and os.path.exists(step.output_file):
+                step.file_size_after = os.path.getsize(step.output_file)
+                logging.debug(f"Paso completado: {step.source_format}→{step.target_format} "
+                              f"({step.file_size_before}→{step.file_size_after} bytes)")
+            if status == 'failed':
                 step.error_message = message
-                return False
-            
-        except Exception as e:
-            step.status = 'failed'
-            step.error_message = f"Error ejecutando paso: {str(e)}"
-            step.end_time = datetime.now()
-            logging.error(f"Error en paso {step.step_number}: {e}")
-            return False
+        step.status = status
     
     def _cleanup_temp_files(self, sequence: ConversionSequence):
         """Limpiar archivos temporales de la secuencia"""
         try:
-            for step in sequence.steps[:-1]:  # No limpiar el archivo final
-                if step.output_file.startswith(self.temp_dir) and os.path.exists(step.output_file):
+            spool_dirs = tuple(d for d in (self.temp_dir, self.memory_dir) if d)
+            final_outputs = set(sequence.outputs.values())
+            for step in sequence.steps:
+                if step.output_file in final_outputs:  # No limpiar los archivos finales
+                    continue
+                if step.output_file.startswith(spool_dirs) and os.path.exists(step.output_file):
                     os.remove(step.output_file)
                     logging.debug(f"Archivo temporal eliminado: {step.output_file}")
         except Exception as e:
@@ -343,17 +434,20 @@ class SequenceProcessor:
             return {
                 'sequence_id': sequence_id,
                 'status': sequence.status,
+                'version': sequence.version,
                 'progress': progress,
                 'completed_steps': completed_steps,
                 'total_steps': total_steps,
                 'elapsed_time': elapsed_time,
                 'estimated_time': sequence.route.estimated_time,
                 'route_description': sequence.route.description,
+                'outputs': {fmt: os.path.basename(path) for fmt, path in sequence.outputs.items()},
                 'steps': [
                     {
                         'step_number': step.step_number,
                         'conversion': f"{step.source_format}→{step.target_format}",
                         'status': step.status,
+                        'depends_on': step.depends_on,
                         'error_message': step.error_message
                     }
                     for step in sequence.steps
@@ -371,14 +465,17 @@ class SequenceProcessor:
             if not sequence:
                 return False
             
-            if sequence.status in ['completed', 'failed', 'cancelled']:
-                return False
-            
-            sequence.status = 'cancelled'
-            sequence.completed_at = datetime.now()
+            with self._changed:
+                if sequence.status in TERMINAL_STATUSES:
+                    return False
+                was_running = sequence.status == 'processing'
+                sequence.status = 'cancelled'
+                sequence.completed_at = datetime.now()
+            self._touch(sequence)
             
-            # Limpiar archivos temporales
-            self._cleanup_temp_files(sequence)
+            # Si está en ejecución, los pasos en curso terminan y el ejecutor limpia
+            if not was_running:
+                self._cleanup_temp_files(sequence)
             
             logging.info(f"Secuencia {sequence_id} cancelada")
             return True
@@ -387,6 +484,35 @@ class SequenceProcessor:
             logging.error(f"Error cancelando secuencia: {e}")
             return False
     
+    def iter_status(self, sequence_id: str, timeout: float = 300.0,
+                    heartbeat: float = 15.0) -> Iterator[Optional[Dict]]:
+        """Genera el estado cada vez que cambia hasta que la secuencia termina
+
+        Produce None como latido si no hay cambios en `heartbeat` segundos.
+        """
+        sequence = self.active_sequences.get(sequence_id)
+        if not sequence:
+            return
+        deadline = time.monotonic() + timeout
+        last_version = -1
+        while True:
+            with self._changed:
+                self._changed.wait_for(
+                    lambda: sequence.version != last_version,
+                    timeout=max(0.0, min(heartbeat, deadline - time.monotonic()))
+                )
+                changed = sequence.version != last_version
+                last_version = sequence.version
+            if changed:
+                status = self.get_sequence_status(sequence_id)
+                yield status
+                if status is None or status['status'] in TERMINAL_STATUSES:
+                    return
+            else:
+                yield None
+            if time.monotonic() >= deadline:
+                return
+    
     def get_popular_sequences(self, limit: int = 10) -> List[Dict]:
         """Obtener las secuencias más populares/útiles"""
         try:
@@ -0,0 +1,117 @@
+"""
+Ingesta de archivos subidos para Anclora Nexus
+Escribe la subida a disco por bloques y calcula en la misma pasada todo lo que
+necesitan las etapas posteriores (SHA-256, MD5, tamaño, cabecera y cola), de
+modo que validación, cache y registro no vuelvan a leer el archivo
+"""
+
+import hashlib
+import os
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Dict, Optional
+
+HEADER_SIZE = 1024  # Bytes de cabecera conservados (firmas / magic numbers)
+FOOTER_SIZE = 1024  # Bytes finales conservados (p. ej. %%EOF de PDF)
+
+
+class UploadTooLargeError(ValueError):
+    """La subida supera el tamaño máximo permitido"""
+
+
+@dataclass
+class IngestedFile:
+    """Metadatos de un archivo calculados durante su ingesta"""
+    path: str
+    filename: str
+    size: int
+    sha256: str
+    md5: str
+    header: bytes = field(repr=False)
+    footer: bytes = field(repr=False)
+
+    @property
+    def checksums(self) -> Dict[str, str]:
+        """Checksums en el formato que usa IntegrityChecker"""
+        return {'md5': self.md5, 'sha256': self.sha256}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'filename': self.filename,
+            'size': self.size,
+            'sha256': self.sha256,
+            'md5': self.md5,
+            'header_hex': self.header[:16].hex()
+        }
+
+
+class UploadIngestor:
+    """Escritura en streaming de subidas con cálculo de digests en una sola pasada"""
+
+    def __init__(self, chunk_size: int = 1024 * 1024):
+        self.chunk_size = chunk_size
+
+    def ingest(self, file_storage, destination_path: str,
+               max_size: Optional[int] = None) -> IngestedFile:
+        """
+        Guarda un archivo subido (werkzeug FileStorage) calculando sus metadatos
+
+        Args:
+            file_storage: Archivo recibido en `request.files`
+            destination_path: Ruta donde se escribirá
+            max_size: Tamaño máximo en bytes; si se supera se borra lo escrito
+
+        Returns:
+            IngestedFile con digests, tamaño, cabecera y cola
+        """
+        stream = getattr(file_storage, 'stream', file_storage)
+        filename = getattr(file_storage, 'filename', None) or os.path.basename(destination_path)
+        try:
+            with open(destination_path, 'wb') as out:
+                info = self._consume(stream, out, destination_path, filename, max_size)
+        except Exception:
+            if os.path.exists(destination_path):
+                os.remove(destination_path)
+            raise
+        return info
+
+    def describe(self, file_path: str) -> IngestedFile:
+        """Calcula los mismos metadatos para un archivo que ya está en disco (una lectura)"""
+        with open(file_path, 'rb') as f:
+            return self._consume(f, None, file_path, os.path.basename(file_path), None)
+
+    def _consume(self, stream: BinaryIO, out: Optional[BinaryIO], path: str,
+                 filename: str, max_size: Optional[int]) -> IngestedFile:
+        sha256 = hashlib.sha256()
+        md5 = hashlib.md5()
+        header = b''
+        footer = b''
+        size = 0
+
+        while True:
+            chunk = stream.read(self.chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if max_size is not None and size > max_size:
+                raise UploadTooLargeError(f"El archivo supera el máximo de {max_size} bytes")
+            sha256.update(chunk)
+            md5.update(chunk)
+            if len(header) < HEADER_SIZE:
+                header += chunk[:HEADER_SIZE - len(header)]
+            footer = (footer + chunk[-FOOTER_SIZE:])[-FOOTER_SIZE:]
+            if out is not None:
+                out.write(chunk)
+
+        return IngestedFile(
+            path=path,
+            filename=filename,
+            size=size,
+            sha256=sha256.hexdigest(),
+            md5=md5.hexdigest(),
+            header=header,
+            footer=footer
+        )
+
+
+# Instancia global del ingestor de subidas
+upload_ingestor = UploadIngestor()
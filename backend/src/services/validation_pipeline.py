@@ -0,0 +1,385 @@
+"""
+Pipeline de validación unificado para Anclora Nexus
+Combina las verificaciones de FileValidator e IntegrityChecker en una sola
+pasada: un único descriptor (y un mmap sobre él) compartido por todas las
+comprobaciones, validadores por formato enchufables que analizan la estructura
+una sola vez, corte en el primer fallo y tiempos por comprobación
+"""
+
+import codecs
+import csv
+import io
+import json
+import mmap
+import time
+import zipfile
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.services.file_validator import file_validator
+from src.services.integrity_checker import integrity_checker
+from src.services.upload_ingest import upload_ingestor
+
+BINARY_FORMATS = {'pdf', 'jpg', 'jpeg', 'png', 'gif', 'webp', 'tiff', 'bmp', 'docx', 'epub', 'odt'}
+IMAGE_FORMATS = {'jpg', 'jpeg', 'png', 'gif', 'webp', 'tiff', 'bmp'}
+
+
+@dataclass
+class CheckResult:
+    """Resultado de una comprobación individual"""
+    name: str
+    stage: str  # 'validation' (FileValidator) o 'integrity' (IntegrityChecker)
+    passed: bool
+    message: str
+    duration_ms: float
+
+
+@dataclass
+class ValidationReport:
+    """Resultado agregado del pipeline"""
+    valid: bool
+    message: str
+    failed_stage: Optional[str] = None
+    checks: List[CheckResult] = field(default_factory=list)
+    validation_details: Dict[str, Any] = field(default_factory=dict)
+    integrity_details: Dict[str, Any] = field(default_factory=dict)
+    total_ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'valid': self.valid,
+            'message': self.message,
+            'failed_stage': self.failed_stage,
+            'checks': [asdict(check) for check in self.checks],
+            'total_ms': round(self.total_ms, 3)
+        }
+
+
+class ValidationContext:
+    """Archivo abierto una vez y estructuras ya analizadas, compartidos entre comprobaciones"""
+
+    def __init__(self, path: Path, source_format: str, target_format: Optional[str], file_info):
+        self.path = path
+        self.source_format = source_format
+        self.target_format = target_format
+        self.file_info = file_info
+        self.handle = open(path, 'rb')
+        self.buffer = mmap.mmap(self.handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self.parsed: Dict[str, Any] = {}
+
+    @property
+    def header(self) -> bytes:
+        return self.file_info.header
+
+    @property
+    def footer(self) -> bytes:
+        return self.file_info.footer
+
+    def rewind(self):
+        """Devuelve el descriptor compartido al inicio para el siguiente analizador"""
+        self.handle.seek(0)
+        return self.handle
+
+    def text(self) -> Tuple[Optional[str], Optional[str]]:
+        """Decodifica el contenido una sola vez: (texto, encoding) o (None, None)"""
+        if 'text' not in self.parsed:
+            self.parsed['text'] = (None, None)
+            for encoding in ['utf-8', 'latin-1', 'windows-1252', 'iso-8859-1']:
+                decoder = codecs.getincrementaldecoder(encoding)()
+                parts = []
+                try:
+                    view = memoryview(self.buffer)
+                    for offset in range(0, len(view), 1024 * 1024):
+                        parts.append(decoder.decode(view[offset:offset + 1024 * 1024]))
+                    parts.append(decoder.decode(b'', final=True))
+                    view.release()
+                    self.parsed['text'] = (''.join(parts), encoding)
+                    break
+                except UnicodeDecodeError:
+                    view.release()
+                    continue
+        return self.parsed['text']
+
+    def close(self):
+        self.parsed.clear()
+        self.buffer.close()
+        self.handle.close()
+
+
+# Validadores por formato: reciben el contexto y devuelven (válido, mensaje)
+FormatValidator = Callable[[ValidationContext], Tuple[bool, str]]
+
+
+def _validate_zip(ctx: ValidationContext) -> Tuple[bool, str]:
+    """ZIP (DOCX, EPUB, ODT): cada miembro se descomprime una vez y se comprueba su CRC"""
+    extension = ctx.source_format
+    try:
+        with zipfile.ZipFile(ctx.rewind(), 'r') as zf:
+            for info in zf.infolist():
+                try:
+                    zf.read(info.filename)
+                except Exception:
+                    return False, f"Archivo ZIP corrupto: {info.filename}"
+            required = file_validator.zip_validations.get(extension, {}).get('required_files', [])
+            names = set(zf.namelist())
+            for required_file in required:
+                if required_file not in names:
+                    return False, f"Archivo {extension.upper()} incompleto: falta {required_file}"
+        return True, f"Archivo {extension.upper()} válido"
+    except zipfile.BadZipFile:
+        return False, f"El archivo no es un ZIP válido (requerido para {extension.upper()})"
+    except Exception as e:
+        return False, f"Error verificando {extension.upper()}: {str(e)}"
+
+
+def _validate_pdf(ctx: ValidationContext) -> Tuple[bool, str]:
+    """PDF: un solo lector para contar páginas y extraer el texto de todas ellas"""
+    try:
+        from pypdf import PdfReader
+        reader = PdfReader(ctx.rewind())
+        if len(reader.pages) == 0:
+            return False, "El archivo PDF no contiene páginas"
+        for i, page in enumerate(reader.pages):
+            try:
+                page.extract_text()
+            except Exception:
+                return False, f"Página {i + 1} del PDF corrupta"
+        return True, f"PDF válido con {len(reader.pages)} páginas"
+    except Exception as e:
+        return False, f"PDF corrupto o inválido: {str(e)}"
+
+
+def _validate_image(ctx: ValidationContext) -> Tuple[bool, str]:
+    """Imagen: verify() de la estructura y una única decodificación completa"""
+    try:
+        from PIL import Image
+        with Image.open(ctx.rewind()) as img:
+            img.verify()
+        with Image.open(ctx.rewind()) as img:
+            img.load()
+            width, height = img.size
+            if width == 0 or height == 0:
+                return False, "Imagen con dimensiones inválidas"
+            return True, f"Imagen válida: {width}x{height}, modo {img.mode}"
+    except Exception as e:
+        return False, f"Imagen corrupta o inválida: {str(e)}"
+
+
+def _validate_csv(ctx: ValidationContext) -> Tuple[bool, str]:
+    """CSV: dialecto y consistencia de columnas sobre el texto ya decodificado"""
+    text, _ = ctx.text()
+    if text is None:
+        return False, "CSV inválido: encoding no reconocido"
+    try:
+        delimiter = csv.Sniffer().sniff(text[:1024]).delimiter
+        rows = []
+        for i, row in enumerate(csv.reader(io.StringIO(text), delimiter=delimiter)):
+            rows.append(row)
+            if i >= 10:  # Solo primeras filas
+                break
+        if not rows:
+            return False, "Archivo CSV vacío"
+        if len(rows) > 1:
+            first_row_cols = len(rows[0])
+            inconsistent_rows = [i + 1 for i, row in enumerate(rows[1:], 1) if len(row) != first_row_cols]
+            if inconsistent_rows and len(inconsistent_rows) > len(rows) * 0.3:
+                return False, f"CSV con estructura inconsistente en filas: {inconsistent_rows[:5]}"
+        return True, f"CSV válido: {len(rows)} filas, {len(rows[0])} columnas, delimitador '{delimiter}'"
+    except Exception as e:
+        return False, f"CSV inválido: {str(e)}"
+
+
+def _validate_json(ctx: ValidationContext) -> Tuple[bool, str]:
+    """JSON: un único parseo del texto decodificado"""
+    text, encoding = ctx.text()
+    if encoding != 'utf-8':
+        return False, "Error leyendo JSON: el archivo no está en UTF-8"
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        return False, f"JSON inválido: {str(e)}"
+    ctx.parsed['json'] = data
+    if isinstance(data, dict):
+        return True, f"JSON válido: objeto con {len(data)} propiedades"
+    if isinstance(data, list):
+        return True, f"JSON válido: array con {len(data)} elementos"
+    return True, f"JSON válido: {type(data).__name__}"
+
+
+class ValidationPipeline:
+    """Validación en una pasada con validadores por formato enchufables"""
+
+    def __init__(self):
+        self.format_validators: Dict[str, FormatValidator] = {}
+        for fmt in file_validator.zip_validations:
+            self.register_validator(fmt, _validate_zip)
+        self.register_validator('pdf', _validate_pdf)
+        for fmt in IMAGE_FORMATS:
+            self.register_validator(fmt, _validate_image)
+        self.register_validator('csv', _validate_csv)
+        self.register_validator('json', _validate_json)
+
+    def register_validator(self, format_type: str, validator: FormatValidator):
+        """Registra (o sustituye) el validador estructural de un formato"""
+        self.format_validators[format_type.lower()] = validator
+
+    def validate(self, file_path: str, source_format: str, target_format: Optional[str] = None,
+                 file_info=None) -> ValidationReport:
+        """
+        Valida un archivo antes de convertirlo
+
+        Args:
+            file_path: Ruta del archivo
+            source_format: Extensión declarada
+            target_format: Formato de destino (para advertencias y recomendaciones)
+            file_info: IngestedFile de la subida; si falta se calcula con una lectura
+
+        Returns:
+            ValidationReport; `failed_stage` indica qué validador original habría fallado
+        """
+        start = time.perf_counter()
+        path = Path(file_path)
+        source_format = source_format.lower()
+        report = ValidationReport(valid=False, message='')
+        validation = report.validation_details
+        integrity = report.integrity_details
+        integrity.update({
+            'file_exists': False, 'size_valid': False, 'readable': False,
+            'format_valid': False, 'integrity_valid': False, 'encoding_safe': False,
+            'checksum': None, 'warnings': [], 'recommendations': []
+        })
+
+        def run(name: str, stage: str, check: Callable[[], Tuple[bool, str]]) -> bool:
+            check_start = time.perf_counter()
+            try:
+                passed, message = check()
+            except Exception as e:
+                passed, message = False, f"Error en {name}: {str(e)}"
+            report.checks.append(CheckResult(
+                name, stage, passed, message, (time.perf_counter() - check_start) * 1000
+            ))
+            if not passed:
+                report.message = message
+                report.failed_stage = stage
+            return passed
+
+        def finish() -> ValidationReport:
+            report.total_ms = (time.perf_counter() - start) * 1000
+            return report
+
+        if not path.exists():
+            report.message, report.failed_stage = "El archivo no existe", 'validation'
+            return finish()
+        integrity['file_exists'] = True
+
+        if file_info is None:
+            file_info = upload_ingestor.describe(str(path))
+        if file_info.size == 0:
+            report.message, report.failed_stage = "El archivo está vacío", 'validation'
+            return finish()
+
+        validation.update({
+            'file_size': file_info.size,
+            'declared_extension': source_format,
+            'signature_valid': False,
+            'extension_matches_content': False,
+            'integrity_check': False,
+            'additional_info': {}
+        })
+
+        def check_size():
+            if file_info.size > integrity_checker.max_file_size:
+                return False, "El archivo es demasiado grande (máximo 1GB)"
+            integrity['size_valid'] = True
+            integrity['file_size_mb'] = round(file_info.size / (1024 * 1024), 2)
+            return True, f"{file_info.size} bytes"
+
+        def check_signature():
+            valid, detected = file_validator._verify_signature(file_info.header[:512], source_format)
+            validation['signature_valid'] = valid
+            validation['detected_type'] = detected
+            if not valid:
+                return False, f"El archivo no es un {source_format.upper()} válido. Detectado como: {detected}"
+            return True, detected
+
+        def check_extension():
+            matches = file_validator._verify_extension_consistency(file_info.header[:512], source_format)
+            validation['extension_matches_content'] = matches
+            if not matches:
+                return False, f"La extensión .{source_format} no coincide con el contenido del archivo"
+            return True, "Extensión coherente con el contenido"
+
+        if not (run('size', 'integrity', check_size)
+                and run('signature', 'validation', check_signature)
+                and run('extension', 'validation', check_extension)):
+            return finish()
+
+        try:
+            ctx = ValidationContext(path, source_format, target_format, file_info)
+        except Exception as e:
+            report.message, report.failed_stage = f"No se puede leer el archivo: {str(e)}", 'validation'
+            return finish()
+        integrity['readable'] = True
+
+        try:
+            def check_structure():
+                valid, message = integrity_checker._verify_format_specific(
+                    path, source_format, ctx.header, ctx.footer
+                )
+                integrity['format_valid'] = valid
+                integrity['format_message'] = message
+                return valid, message
+
+            def check_format():
+                validator = self.format_validators.get(source_format)
+                if validator:
+                    valid, message = validator(ctx)
+                elif source_format in BINARY_FORMATS:
+                    valid, message = True, "Verificación básica exitosa"
+                else:
+                    # Texto sin validador propio: basta con poder decodificarlo
+                    text, _ = ctx.text()
+                    valid = text is not None
+                    message = "Verificación básica exitosa" if valid else "Encoding no reconocido o archivo corrupto"
+                validation['integrity_check'] = valid
+                validation['integrity_message'] = message
+                integrity['integrity_valid'] = valid
+                integrity['integrity_message'] = message
+                return valid, message
+
+            def check_encoding():
+                if source_format in BINARY_FORMATS:
+                    safe, message = True, "Archivo binario: encoding no aplicable"
+                else:
+                    _, encoding = ctx.text()
+                    if encoding == 'utf-8':
+                        safe, message = True, "Encoding UTF-8 válido"
+                    elif encoding:
+                        safe, message = True, f"Encoding {encoding} detectado (se normalizará a UTF-8)"
+                    else:
+                        safe, message = False, "Encoding no reconocido o archivo corrupto"
+                integrity['encoding_safe'] = safe
+                integrity['encoding_message'] = message
+                # Como en IntegrityChecker, un encoding dudoso no bloquea la conversión
+                return True, message
+
+            if not (run('structure', 'integrity', check_structure)
+                    and run('format', 'validation', check_format)
+                    and run('encoding', 'integrity', check_encoding)):
+                return finish()
+        finally:
+            ctx.close()
+
+        validation['md5_checksum'] = file_info.md5
+        integrity['checksum'] = file_info.checksums
+        if target_format:
+            integrity_checker._generate_warnings_and_recommendations(integrity, source_format, target_format)
+
+        report.valid = True
+        report.message = "Archivo verificado y listo para conversión"
+        return finish()
+
+
+# Instancia global del pipeline de validación
+validation_pipeline = ValidationPipeline()
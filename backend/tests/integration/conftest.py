@@ -1,6 +1,7 @@
 import pytest
 import sys
 import os
+import tempfile
 from pathlib import Path
 
 # Add backend src to Python path
@@ -11,13 +12,29 @@ sys.path.insert(0, str(backend_src))
 parent_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(parent_dir))
 
+# Caches de la suite fuera del árbol del repositorio
+_cache_root = tempfile.mkdtemp(prefix='anclora-tests-')
+os.environ.setdefault('CONVERSION_CACHE_DIR', os.path.join(_cache_root, 'cache'))
+os.environ.setdefault('OPTIMIZATION_CACHE_FILE', os.path.join(_cache_root, 'optimization_cache.json'))
+os.environ.setdefault('CONVERSION_QUEUE_DB', os.path.join(_cache_root, 'conversion_queue.db'))
+os.environ.setdefault('PLUGIN_MANIFEST_CACHE', os.path.join(_cache_root, 'plugin_manifest.json'))
+
 from src.models.user import db, User
 from src.models.conversion import Conversion, CreditTransaction
 from src.encoding_normalizer import normalize_to_utf8
-import tempfile
 import shutil
 
 
+@pytest.fixture(autouse=True)
+def result_cache(tmp_path, monkeypatch):
+    """Cache de resultados vacío por test: un acierto no reconvierte ni normaliza la entrada."""
+    from src.models.conversion import conversion_engine
+    from src.services.intelligent_cache import IntelligentCache
+    cache = IntelligentCache(cache_dir=str(tmp_path / 'result-cache'))
+    monkeypatch.setattr(conversion_engine, 'result_cache', cache)
+    return cache
+
+
 @pytest.fixture
 def app():
     """Create application for testing."""
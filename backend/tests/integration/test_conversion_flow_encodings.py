@@ -19,7 +19,7 @@ def test_full_conversion_flow_multiple_encodings(client, auth_headers, monkeypat
 
     monkeypatch.setattr(conversion_module, "normalize_to_utf8", tracker)
 
-    content = "Ã¡Ã©Ã­Ã³Ãº".encode(encoding)
+    content = "áéíóú".encode(encoding)
     data = {
         "file": (io.BytesIO(content), "acentos.txt"),
         "target_format": "html",
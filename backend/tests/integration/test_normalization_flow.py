@@ -20,7 +20,7 @@ def test_upload_normalize_convert(client, auth_headers, monkeypatch):
 
     monkeypatch.setattr(conversion_module, "normalize_to_utf8", tracker)
 
-    content = "Ã¡Ã©Ã­Ã³Ãº".encode("latin1")
+    content = "áéíóú".encode("latin1")
     data = {
         "file": (io.BytesIO(content), "acentos.txt"),
         "target_format": "html",
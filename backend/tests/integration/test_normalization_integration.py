@@ -5,7 +5,7 @@ from src.models.conversion import conversion_engine
 
 
 def test_text_file_normalized_before_conversion(tmp_path):
-    content = "Ã¡Ã©Ã­Ã³Ãº"
+    content = "áéíóú"
     input_path = tmp_path / "sample.txt"
     input_path.write_bytes(content.encode("latin-1"))
     output_path = tmp_path / "sample.html"
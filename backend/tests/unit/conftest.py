@@ -1,6 +1,7 @@
 import pytest
 import sys
 import os
+import tempfile
 from pathlib import Path
 
 # Add backend src to Python path
@@ -11,9 +12,15 @@ sys.path.insert(0, str(backend_src))
 parent_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(parent_dir))
 
+# Caches de la suite fuera del árbol del repositorio
+_cache_root = tempfile.mkdtemp(prefix='anclora-tests-')
+os.environ.setdefault('CONVERSION_CACHE_DIR', os.path.join(_cache_root, 'cache'))
+os.environ.setdefault('OPTIMIZATION_CACHE_FILE', os.path.join(_cache_root, 'optimization_cache.json'))
+os.environ.setdefault('CONVERSION_QUEUE_DB', os.path.join(_cache_root, 'conversion_queue.db'))
+os.environ.setdefault('PLUGIN_MANIFEST_CACHE', os.path.join(_cache_root, 'plugin_manifest.json'))
+
 from src.models.user import db, User, Conversion, CreditTransaction
 from src.encoding_normalizer import normalize_to_utf8
-import tempfile
 import shutil
 
 
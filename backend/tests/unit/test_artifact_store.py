@@ -0,0 +1,71 @@
+import shutil
+
+import pytest
+
+from src.models.conversion import conversion_engine
+from src.services.artifact_store import IntermediateArtifactStore
+
+
+ROUTES = {
+    ('raw', 'fin1'): ['raw', 'mid', 'fin1'],
+    ('raw', 'fin2'): ['raw', 'mid', 'fin2'],
+}
+
+
+@pytest.fixture
+def chained_engine(tmp_path, monkeypatch):
+    store = IntermediateArtifactStore(store_dir=str(tmp_path / 'artifacts'))
+    calls = []
+
+    def step(name):
+        def convert(input_path, output_path):
+            calls.append(name)
+            shutil.copyfile(input_path, output_path)
+            with open(output_path, 'a', encoding='utf-8') as f:
+                f.write(f'|{name}')
+            return True, name
+        return convert
+
+    monkeypatch.setattr(conversion_engine, 'artifact_store', store)
+    monkeypatch.setattr(conversion_engine, 'artifact_store_enabled', True)
+    monkeypatch.setattr(conversion_engine, 'find_conversion_path', lambda s, d: ROUTES.get((s, d)))
+    for hop in [('raw', 'mid'), ('mid', 'fin1'), ('mid', 'fin2')]:
+        monkeypatch.setitem(conversion_engine.conversion_methods, hop, step('->'.join(hop)))
+    return store, calls
+
+
+def test_shared_prefix_is_reused_across_chains(tmp_path, chained_engine):
+    """Una segunda ruta con el mismo prefijo arranca desde el artefacto intermedio."""
+    store, calls = chained_engine
+    input_path = tmp_path / 'in.raw'
+    input_path.write_text('datos', encoding='utf-8')
+
+    ok, msg = conversion_engine.convert_file(str(input_path), str(tmp_path / 'a.fin1'),
+                                             'raw', 'fin1', use_cache=False)
+    assert ok, msg
+    ok, msg = conversion_engine.convert_file(str(input_path), str(tmp_path / 'b.fin2'),
+                                             'raw', 'fin2', use_cache=False)
+    assert ok, msg
+
+    assert calls == ['raw->mid', 'mid->fin1', 'mid->fin2']
+    assert 'reused:raw->mid' in msg
+    assert (tmp_path / 'b.fin2').read_text(encoding='utf-8') == 'datos|raw->mid|mid->fin2'
+
+    hop, = store.get_stats()['hops']
+    assert (hop['reused'], hop['computed'], hop['stored']) == (1, 1, 1)
+
+
+def test_store_evicts_least_recently_used(tmp_path):
+    """El almacén respeta el límite de entradas expulsando la menos usada."""
+    store = IntermediateArtifactStore(store_dir=str(tmp_path / 'artifacts'), max_entries=2)
+    source = tmp_path / 'x.bin'
+    source.write_bytes(b'x' * 10)
+
+    store.put('k1', ('a', 'b'), str(source))
+    store.put('k2', ('a', 'b'), str(source))
+    assert store.get('k1', ('a', 'b'))
+    store.put('k3', ('a', 'b'), str(source))
+
+    assert store.get('k2', ('a', 'b')) is None
+    assert store.get('k1', ('a', 'b')) and store.get('k3', ('a', 'b'))
+    assert store.get_stats()['entries'] == 2
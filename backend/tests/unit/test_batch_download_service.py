@@ -0,0 +1,47 @@
+import io
+import json
+import zipfile
+
+from src.services.batch_download_service import BatchDownloadService, batch_download_service
+
+
+def _batch(service, tmp_path):
+    batch_id = service.create_batch()
+    image = tmp_path / 'foto.png'
+    image.write_bytes(b'\x89PNG\r\n\x1a\n' + b'\x00' * 4000)
+    for i, name in enumerate(['a.txt', 'b.txt', 'c.txt']):
+        path = tmp_path / name
+        path.write_text(f'contenido {i}\n' * 500, encoding='utf-8')
+        assert service.add_file_to_batch(batch_id, str(path), name, 'salida.txt', {'n': i})
+    assert service.add_file_to_batch(batch_id, str(image), 'foto.jpg', 'foto.png', {})
+    return batch_id
+
+
+def test_zip_is_streamed_with_unique_names_and_stored_media(tmp_path):
+    service = BatchDownloadService()
+    batch_id = _batch(service, tmp_path)
+
+    chunks = list(service.iter_batch_zip(batch_id, chunk_size=1024))
+    assert len(chunks) > 5
+
+    with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == ['salida.txt', 'salida_1.txt', 'salida_2.txt', 'foto.png',
+                                 'ANCLORA_BATCH_INFO.json']
+        assert zf.getinfo('foto.png').compress_type == zipfile.ZIP_STORED
+        assert zf.getinfo('salida.txt').compress_type == zipfile.ZIP_DEFLATED
+        assert zf.read('salida_2.txt').decode('utf-8').startswith('contenido 2')
+        assert json.loads(zf.read('ANCLORA_BATCH_INFO.json'))['total_files'] == 4
+
+
+def test_download_route_streams_unprepared_batch(client, tmp_path):
+    batch_id = _batch(batch_download_service, tmp_path)
+    try:
+        resp = client.get(f'/api/conversion/batch/{batch_id}/download')
+        assert resp.status_code == 200
+        assert resp.is_streamed
+        assert resp.mimetype == 'application/zip'
+        with zipfile.ZipFile(io.BytesIO(resp.get_data())) as zf:
+            assert len(zf.namelist()) == 5
+    finally:
+        batch_download_service.clear_batch(batch_id)
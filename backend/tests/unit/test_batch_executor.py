@@ -0,0 +1,85 @@
+import threading
+import time
+
+from src.services.batch_executor import BatchExecutor, BatchPolicy
+
+
+class FakeEngine:
+    """Motor mínimo: cada conversión duerme el tiempo indicado en el nombre de entrada."""
+
+    def __init__(self, policies=None):
+        self.policies = policies or {}
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def get_converter_policy(self, source, target):
+        return self.policies.get((source, target), ('threads', None))
+
+    def convert_file(self, input_path, output_path, source, target):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(float(input_path.split('_')[1].rsplit('.', 1)[0]))
+        with self._lock:
+            self.active -= 1
+        return True, f'{input_path} convertido'
+
+
+def _tasks(*delays, target='pdf'):
+    return [{'task_id': i, 'input_path': f'in_{d}.html', 'output_path': f'out{i}.{target}',
+             'target_format': target} for i, d in enumerate(delays)]
+
+
+def test_results_keep_task_order_with_threads():
+    engine = FakeEngine()
+    results = list(BatchExecutor(engine, BatchPolicy(mode='threads', max_workers=3)).run(_tasks(0.2, 0.0, 0.1)))
+
+    assert [r['task_id'] for r in results] == [0, 1, 2]
+    assert all(r['success'] and r['mode'] == 'threads' for r in results)
+    assert engine.peak > 1
+
+
+def test_declared_converter_limit_is_respected():
+    engine = FakeEngine({('html', 'pdf'): ('threads', 1)})
+    results = list(BatchExecutor(engine, BatchPolicy(mode='auto', max_workers=4)).run(_tasks(0.05, 0.05, 0.05)))
+
+    assert all(r['success'] for r in results)
+    assert engine.peak == 1
+
+
+def test_slow_task_is_flagged_as_timed_out():
+    engine = FakeEngine()
+    policy = BatchPolicy(mode='threads', max_workers=2, timeout=0.1)
+    slow, fast = BatchExecutor(engine, policy).run(_tasks(0.5, 0.0))
+
+    assert slow['timed_out'] and not slow['success']
+    assert fast['success'] and not fast['timed_out']
+
+
+def test_sequential_policy_keeps_legacy_result_shape():
+    results = list(BatchExecutor(FakeEngine(), BatchPolicy()).run(_tasks(0.0)))
+    assert set(results[0]) == {'input_path', 'output_path', 'success', 'message'}
+
+
+class WritingEngine(FakeEngine):
+    """Escribe la salida después de dormir, como un conversor real."""
+
+    def convert_file(self, input_path, output_path, source, target):
+        result = super().convert_file(input_path, output_path, source, target)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(input_path)
+        return result
+
+
+def test_abandoned_thread_does_not_leave_output(tmp_path):
+    tasks = _tasks(0.3, 0.0)
+    for task in tasks:
+        task['output_path'] = str(tmp_path / task['output_path'])
+    policy = BatchPolicy(mode='threads', max_workers=2, timeout=0.1)
+
+    slow, fast = BatchExecutor(WritingEngine(), policy).run(tasks)
+    time.sleep(0.4)
+
+    assert slow['timed_out'] and fast['success']
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['out1.pdf']
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.services.browser_pool import BrowserPool
+
+
+class FakePage:
+    def __init__(self, tracker):
+        self.tracker = tracker
+
+    async def goto(self, url):
+        self.url = url
+
+    async def wait_for_load_state(self, state):
+        pass
+
+    async def pdf(self, path, **options):
+        with self.tracker['lock']:
+            self.tracker['active'] += 1
+            self.tracker['peak'] = max(self.tracker['peak'], self.tracker['active'])
+        await asyncio.sleep(0.05)
+        with self.tracker['lock']:
+            self.tracker['active'] -= 1
+        with open(path, 'wb') as f:
+            f.write(b'%PDF-1.4\n%%EOF')
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+
+    async def new_page(self):
+        return FakePage(self.browser.tracker)
+
+    async def close(self):
+        self.browser.open_contexts -= 1
+
+
+class FakeBrowser:
+    def __init__(self, tracker):
+        self.tracker = tracker
+        self.connected = True
+        self.open_contexts = 0
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **kwargs):
+        self.open_contexts += 1
+        return FakeContext(self)
+
+    async def close(self):
+        self.connected = False
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    tracker = {'active': 0, 'peak': 0, 'lock': threading.Lock(), 'browsers': []}
+    pool = BrowserPool(size=1, max_pages_per_browser=3, max_concurrency=4)
+
+    async def launch():
+        browser = FakeBrowser(tracker)
+        tracker['browsers'].append(browser)
+        return browser
+
+    monkeypatch.setattr(pool, '_launch_browser', launch)
+    yield pool, tracker
+    pool.shutdown()
+
+
+def test_browser_is_reused_and_recycled_after_page_limit(pool, tmp_path):
+    pool, tracker = pool
+    html = tmp_path / 'doc.html'
+    html.write_text('<p>hola</p>', encoding='utf-8')
+
+    for i in range(4):
+        pool.render_pdf(str(html), str(tmp_path / f'out{i}.pdf'))
+
+    assert (tmp_path / 'out3.pdf').read_bytes().startswith(b'%PDF')
+    assert pool.stats['launches'] == 2 and pool.stats['recycled'] == 1
+    assert all(b.open_contexts == 0 for b in tracker['browsers'])
+
+
+def test_documents_render_concurrently_on_one_browser(pool, tmp_path):
+    pool, tracker = pool
+    html = tmp_path / 'doc.html'
+    html.write_text('<p>hola</p>', encoding='utf-8')
+
+    threads = [threading.Thread(target=pool.render_pdf, args=(str(html), str(tmp_path / f'o{i}.pdf')))
+               for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert tracker['peak'] > 1
+    assert pool.stats['launches'] == 1
+
+
+def test_disconnected_browser_is_replaced(pool, tmp_path):
+    pool, tracker = pool
+    html = tmp_path / 'doc.html'
+    html.write_text('<p>hola</p>', encoding='utf-8')
+    pool.render_pdf(str(html), str(tmp_path / 'a.pdf'))
+
+    tracker['browsers'][0].connected = False
+    assert pool.health_check()['browsers'] == [{'healthy': False, 'pages_served': 1}]
+    pool.render_pdf(str(html), str(tmp_path / 'b.pdf'))
+
+    assert pool.stats['launches'] == 2 and pool.stats['unhealthy'] == 1
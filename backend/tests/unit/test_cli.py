@@ -43,8 +43,8 @@ def test_bom(tmp_path):
 
 def test_undo(tmp_path):
     sample = tmp_path / "sample.txt"
-    original = "data"
-    sample.write_text(original, encoding="utf-8")
+    original = "dató"
+    sample.write_text(original, encoding="latin-1")
 
     run_cli([str(sample)])  # create backup
     backup = sample.with_suffix(sample.suffix + ".bak")
@@ -53,5 +53,14 @@ def test_undo(tmp_path):
     result = run_cli(["--undo", str(sample)])
     assert "Restored" in result.stdout
     assert not backup.exists()
-    assert sample.read_text(encoding="utf-8") == original
+    assert sample.read_text(encoding="latin-1") == original
+
+
+def test_clean_utf8_is_left_unchanged(tmp_path):
+    sample = tmp_path / "sample.txt"
+    sample.write_text("data", encoding="utf-8")
+
+    result = run_cli([str(sample)])
+    assert "Unchanged" in result.stdout
+    assert not sample.with_suffix(sample.suffix + ".bak").exists()
 
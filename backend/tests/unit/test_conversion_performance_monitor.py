@@ -0,0 +1,71 @@
+import json
+from dataclasses import asdict
+from datetime import datetime, timedelta
+
+from src.services.conversion_performance_monitor import ConversionMetrics, ConversionPerformanceMonitor
+
+
+def _metric(when, method='weasyprint', level='MODERADA', score=40, duration=1.0, success=True, size=1000):
+    return ConversionMetrics(
+        timestamp=when.isoformat(),
+        input_file='in.html',
+        output_file='out.pdf',
+        html_complexity_score=score,
+        html_complexity_level=level,
+        recommended_method='weasyprint',
+        actual_method_used=method,
+        conversion_duration=duration,
+        input_file_size=500,
+        output_file_size=size,
+        success=success
+    )
+
+
+def test_report_aggregates_daily_rollups(tmp_path):
+    monitor = ConversionPerformanceMonitor(str(tmp_path / 'metrics.json'))
+    now = datetime.now()
+    monitor.record_conversion(_metric(now - timedelta(days=30), duration=50.0))
+    monitor.record_conversion(_metric(now - timedelta(days=2), duration=1.0))
+    monitor.record_conversion(_metric(now - timedelta(days=1), 'playwright', 'COMPLEJA', 90, 3.0, size=3000))
+    monitor.record_conversion(_metric(now, 'playwright', 'COMPLEJA', 100, 2.0, success=False, size=0))
+
+    report = monitor.get_performance_report(days=7)
+
+    assert report['summary']['total_conversions'] == 3
+    assert report['summary']['successful_conversions'] == 2
+    assert report['summary']['avg_duration'] == 2.0
+    assert report['method_performance']['playwright'] == {
+        'count': 2, 'success_rate': 50.0, 'avg_duration': 2.5, 'avg_output_size': 1500, 'avg_complexity': 95.0
+    }
+    assert report['complexity_analysis']['COMPLEJA']['preferred_method'] == 'playwright'
+    assert sum(day['conversions'] for day in report['daily_trends'].values()) == 3
+
+
+def test_legacy_json_is_migrated_and_old_partitions_compacted(tmp_path):
+    metrics_file = tmp_path / 'metrics.json'
+    now = datetime.now()
+    legacy = [asdict(_metric(now - timedelta(days=d))) for d in (200, 100, 1)]
+    metrics_file.write_text(json.dumps(legacy), encoding='utf-8')
+
+    monitor = ConversionPerformanceMonitor(str(metrics_file), retention_days=90, rollup_retention_days=150)
+    assert len(monitor.metrics_data) == 3
+
+    assert monitor.compact() == {'metrics_removed': 2, 'rollups_removed': 1}
+    assert [m['timestamp'] for m in monitor.metrics_data] == [legacy[2]['timestamp']]
+    # El resumen del día compactado sigue disponible para los informes
+    assert monitor.get_performance_report(days=120)['summary']['total_conversions'] == 2
+
+
+def test_recent_attempts_keeps_last_per_group(tmp_path):
+    monitor = ConversionPerformanceMonitor(str(tmp_path / 'metrics.db'))
+    now = datetime.now()
+    for i in range(5):
+        monitor.record_conversion(_metric(now, duration=float(i), success=i % 2 == 0))
+    monitor.record_conversion(_metric(now, 'fpdf', 'SIMPLE', 10, 0.5))
+
+    attempts = monitor.recent_attempts(2)
+    assert attempts == [
+        ('MODERADA', 'weasyprint', False, 3.0),
+        ('MODERADA', 'weasyprint', True, 4.0),
+        ('SIMPLE', 'fpdf', True, 0.5),
+    ]
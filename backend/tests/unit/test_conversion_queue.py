@@ -0,0 +1,171 @@
+import io
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+
+from src.services.conversion_queue import ConversionJob, ConversionQueue
+
+
+def test_queue_runs_job_in_worker_pool(tmp_path):
+    """Un trabajo encolado se ejecuta en el pool y notifica su finalización."""
+    input_path = tmp_path / 'in.txt'
+    input_path.write_text('hola mundo', encoding='utf-8')
+    output_path = tmp_path / 'out.html'
+
+    finished = threading.Event()
+    completed = []
+
+    def handler(job):
+        completed.append(job)
+        finished.set()
+
+    queue = ConversionQueue(db_path=str(tmp_path / 'jobs.db'), max_workers=1, poll_interval=0.05)
+    queue.register_completion_handler(handler)
+    try:
+        job_id = queue.submit(str(input_path), str(output_path), 'txt', 'html',
+                              payload={'output_filename': 'out.html'})
+        assert queue.get_job(job_id).status in ('queued', 'running', 'completed')
+        assert finished.wait(60)
+    finally:
+        queue.shutdown()
+
+    job = queue.get_job(job_id)
+    assert job.status == 'completed', job.message
+    assert job.attempts == 1
+    assert completed[0].payload == {'output_filename': 'out.html'}
+    assert output_path.exists()
+    assert queue.get_queue_stats()['completed'] == 1
+
+
+def test_queue_survives_a_crashed_worker(tmp_path):
+    """Si muere un proceso trabajador, el pool se recrea y el siguiente trabajo se ejecuta."""
+    input_path = tmp_path / 'in.txt'
+    input_path.write_text('hola mundo', encoding='utf-8')
+    finished = threading.Event()
+    completed = []
+
+    def handler(job):
+        completed.append(job)
+        finished.set()
+
+    queue = ConversionQueue(db_path=str(tmp_path / 'jobs.db'), max_workers=1, poll_interval=0.05)
+    queue.register_completion_handler(handler)
+    try:
+        queue.submit(str(input_path), str(tmp_path / 'first.html'), 'txt', 'html')
+        assert finished.wait(60)
+        finished.clear()
+
+        broken = queue._executor
+        for process in list(broken._processes.values()):
+            process.kill()
+        deadline = time.monotonic() + 30
+        while not broken._broken and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert broken._broken
+
+        job_id = queue.submit(str(input_path), str(tmp_path / 'second.html'), 'txt', 'html')
+        assert finished.wait(60)
+    finally:
+        queue.shutdown()
+
+    assert queue.get_job(job_id).status == 'completed', queue.get_job(job_id).message
+    assert (tmp_path / 'second.html').exists()
+
+
+def test_queue_requeues_interrupted_jobs(tmp_path):
+    """Los trabajos que quedaron 'running' vuelven a la cola al arrancar."""
+    queue = ConversionQueue(db_path=str(tmp_path / 'jobs.db'), max_workers=1)
+    claimed_id = 'interrupted'
+    with queue._connect() as conn:
+        conn.execute(
+            "INSERT INTO conversion_jobs (job_id, input_path, output_path, source_format, "
+            "target_format, status, created_at) VALUES (?, 'a', 'b', 'txt', 'html', 'running', '2025-01-01')",
+            (claimed_id,)
+        )
+        conn.commit()
+
+    queue._requeue_interrupted_jobs()
+    assert queue.get_job(claimed_id).status == 'queued'
+
+
+def test_running_jobs_of_live_processes_are_not_requeued(tmp_path):
+    """Un trabajo con latido reciente y dueño vivo sigue en ejecución."""
+    queue = ConversionQueue(db_path=str(tmp_path / 'jobs.db'), max_workers=1)
+    now = datetime.utcnow().isoformat()
+    with queue._connect() as conn:
+        conn.execute(
+            "INSERT INTO conversion_jobs (job_id, input_path, output_path, source_format, target_format, "
+            "status, created_at, started_at, heartbeat_at, owner) "
+            "VALUES ('vivo', 'a', 'b', 'txt', 'html', 'running', ?, ?, ?, ?)",
+            (now, now, now, f"{socket.gethostname()}:{os.getpid()}")
+        )
+        conn.commit()
+
+    queue._requeue_interrupted_jobs()
+    assert queue.get_job('vivo').status == 'running'
+
+
+def test_each_job_is_claimed_by_a_single_process(tmp_path):
+    """Si otro proceso reclama el trabajo entre la lectura y el UPDATE, no se lanza dos veces."""
+    db_path = str(tmp_path / 'jobs.db')
+    first, second = ConversionQueue(db_path=db_path), ConversionQueue(db_path=db_path)
+    first.owner_id, second.owner_id = 'host:1', 'host:2'
+    with first._connect() as conn:
+        conn.execute(
+            "INSERT INTO conversion_jobs (job_id, input_path, output_path, source_format, target_format, "
+            "status, created_at) VALUES ('unico', 'a', 'b', 'txt', 'html', 'queued', ?)",
+            (datetime.utcnow().isoformat(),)
+        )
+        conn.commit()
+
+    claimed_by_first = []
+
+    def row_to_job_after_race(row):
+        claimed_by_first.extend(first._claim_jobs(1))
+        return ConversionQueue._row_to_job(row)
+
+    second._row_to_job = row_to_job_after_race
+    assert second._claim_jobs(1) == []
+    assert [job.job_id for job in claimed_by_first] == ['unico']
+    with first._connect() as conn:
+        assert conn.execute("SELECT owner, attempts FROM conversion_jobs").fetchone() == ('host:1', 1)
+
+
+def test_queued_conversions_reserve_credits(app, client, auth_headers, monkeypatch):
+    """Los créditos se cobran al encolar y se devuelven si el trabajo falla."""
+    from src.models.conversion import conversion_engine
+    from src.models.user import CreditTransaction, User
+    from src.routes import conversion as conversion_routes
+
+    jobs = []
+    monkeypatch.setattr(conversion_routes.conversion_queue, 'submit',
+                        lambda *args, **kwargs: jobs.append((args, kwargs)) or f'job-{len(jobs)}')
+    app.config['CONVERSION_QUEUE_ENABLED'] = True
+    cost = conversion_engine.get_conversion_cost('txt', 'html')
+
+    def enqueue():
+        return client.post('/api/conversion/convert', headers=auth_headers, content_type='multipart/form-data',
+                           data={'file': (io.BytesIO(b'hola'), 'nota.txt'), 'target_format': 'html'})
+
+    statuses = [enqueue().status_code for _ in range(10 // cost + 1)]
+    assert statuses == [202] * (10 // cost) + [402]
+    user = User.query.first()
+    assert user.credits == 10 % cost
+
+    args, kwargs = jobs[0]
+    job = ConversionJob(job_id='job-1', conversion_id=kwargs['conversion_id'], input_path=args[0],
+                        output_path=args[1], source_format='txt', target_format='html',
+                        status='failed', created_at='', message='fallo', payload=kwargs['payload'])
+    conversion_routes._complete_queued_conversion(job)
+
+    assert User.query.first().credits == 10 % cost + cost
+    assert CreditTransaction.query.filter_by(transaction_type='refund').count() == 1
+
+
+def test_async_flag_needs_the_queue_enabled(client, auth_headers):
+    resp = client.post('/api/conversion/convert', headers=auth_headers, content_type='multipart/form-data',
+                       data={'file': (io.BytesIO(b'hola'), 'nota.txt'), 'target_format': 'html', 'async': 'true'})
+
+    assert resp.status_code == 200, resp.get_json()
@@ -0,0 +1,65 @@
+import json
+
+from src.models.conversions import csv_to_json
+
+
+def _csv(path, rows):
+    lines = ['id,nombre,importe'] + [f"{i},Cliente ñ {i},{'' if i % 3 == 0 else i * 1.5}" for i in range(rows)]
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+
+def test_streaming_matches_in_memory_output(tmp_path, monkeypatch):
+    source = tmp_path / 'datos.csv'
+    _csv(source, 25)
+    success, _ = csv_to_json.convert(str(source), str(tmp_path / 'memoria.json'))
+    assert success
+    monkeypatch.setattr(csv_to_json, 'STREAMING_THRESHOLD_MB', 0)
+    monkeypatch.setattr(csv_to_json, 'CHUNK_ROWS', 4)
+
+    success, message = csv_to_json.convert(str(source), str(tmp_path / 'streaming.json'))
+
+    assert success and 'streaming' in message and 'records' in message, message
+    streamed = json.loads((tmp_path / 'streaming.json').read_text(encoding='utf-8'))
+    assert streamed == json.loads((tmp_path / 'memoria.json').read_text(encoding='utf-8'))
+    assert streamed[1] == {'id': 1, 'nombre': 'Cliente ñ 1', 'importe': 1.5}
+
+
+def test_many_columns_are_streamed_as_column_arrays(tmp_path):
+    source = tmp_path / 'ancho.csv'
+    header = ','.join(f'c{j}' for j in range(12))
+    source.write_text(header + '\n' + ''.join(','.join(str(i * j) for j in range(12)) + '\n' for i in range(7)),
+                      encoding='utf-8')
+
+    success, message = csv_to_json.convert_streaming(str(source), str(tmp_path / 'ancho.json'), chunk_rows=3)
+
+    assert success and 'columns' in message, message
+    data = json.loads((tmp_path / 'ancho.json').read_text(encoding='utf-8'))
+    assert list(data) == [f'c{j}' for j in range(12)]
+    assert data['c2'] == [0, 2, 4, 6, 8, 10, 12]
+
+
+def test_jsonl_output_writes_one_record_per_line(tmp_path):
+    source = tmp_path / 'datos.csv'
+    _csv(source, 5)
+
+    success, message = csv_to_json.convert(str(source), str(tmp_path / 'datos.jsonl'))
+
+    assert success and 'JSON Lines' in message, message
+    lines = (tmp_path / 'datos.jsonl').read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line)['id'] for line in lines] == [0, 1, 2, 3, 4]
+    assert json.loads(lines[0])['importe'] is None
+
+
+def test_engine_converts_csv_to_jsonl(tmp_path):
+    from src.models.conversion import conversion_engine
+
+    source = tmp_path / 'datos.csv'
+    _csv(source, 3)
+    assert 'jsonl' in conversion_engine.get_supported_formats('csv')
+
+    success, message = conversion_engine.convert_file(str(source), str(tmp_path / 'datos.jsonl'), 'csv', 'jsonl',
+                                                      use_cache=False)
+
+    assert success and 'JSON Lines' in message, message
+    lines = (tmp_path / 'datos.jsonl').read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line)['id'] for line in lines] == [0, 1, 2]
@@ -0,0 +1,41 @@
+import openpyxl
+
+from src.models.conversions import csv_to_xlsx
+
+
+def _csv(path, rows):
+    lines = ['id,nombre,importe'] + [f"{i},Cliente ñ {i},{'' if i % 3 == 0 else i * 1.5}" for i in range(rows)]
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+
+def test_streaming_writes_shared_styles_in_chunks(tmp_path, monkeypatch):
+    source = tmp_path / 'datos.csv'
+    _csv(source, 25)
+    output = tmp_path / 'datos.xlsx'
+    monkeypatch.setattr(csv_to_xlsx, 'STREAMING_THRESHOLD_MB', 0)
+    monkeypatch.setattr(csv_to_xlsx, 'CHUNK_ROWS', 4)
+
+    success, message = csv_to_xlsx.convert(str(source), str(output))
+
+    assert success and 'write_only' in message, message
+    ws = openpyxl.load_workbook(output)['Datos CSV']
+    assert [c.value for c in ws[1]] == ['id', 'nombre', 'importe']
+    assert [c.value for c in ws[3]] == [1, 'Cliente ñ 1', 1.5]
+    assert ws['C2'].value is None and ws['C2'].style == 'anclora_data'
+    assert ws['A1'].style == 'anclora_header' and ws['A1'].font.b
+    assert ws.max_row == 26 and ws.freeze_panes == 'A2'
+
+
+def test_rows_beyond_the_sheet_limit_continue_on_a_new_sheet(tmp_path, monkeypatch):
+    source = tmp_path / 'datos.csv'
+    _csv(source, 10)
+    output = tmp_path / 'datos.xlsx'
+    monkeypatch.setattr(csv_to_xlsx, 'MAX_DATA_ROWS_PER_SHEET', 4)
+
+    success, message = csv_to_xlsx.convert_streaming_with_openpyxl(str(source), str(output), chunk_rows=3)
+
+    assert success and '3 hoja(s)' in message
+    wb = openpyxl.load_workbook(output)
+    assert wb.sheetnames == ['Datos CSV', 'Datos CSV (2)', 'Datos CSV (3)']
+    assert [ws.max_row for ws in wb] == [5, 5, 3]
+    assert wb['Datos CSV (3)']['A2'].value == 8
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from src.models.conversions import dataframe_cleaning as cleaning
+
+
+def _by_cell(series, cell, **options):
+    return [cell(v, **options) for v in series.astype(object)]
+
+
+def test_json_column_matches_cell_rules():
+    series = pd.Series(['  12 ', '-3', '2.50', '4.0', '1e3', 'Sí', 'no', '', None, 'texto', ' inf '])
+
+    result = cleaning.json_column(series).tolist()
+
+    assert result == _by_cell(series, cleaning.json_cell)
+    assert result[:6] == [12, -3, 2.5, 4, 1000, True]
+    assert result[7:10] == [None, None, 'texto']
+
+
+def test_json_column_numeric_and_datetime_dtypes():
+    floats = pd.Series([1.0, 2.5, np.nan])
+    dates = pd.Series(pd.to_datetime(['2025-01-02 03:04:05', None]))
+
+    assert cleaning.json_column(floats).tolist() == [1, 2.5, None]
+    assert cleaning.json_column(dates, timestamps_iso=True).tolist() == ['2025-01-02T03:04:05', None]
+
+
+def test_excel_column_removes_breaks_and_control_characters():
+    series = pd.Series(['a\nb\r', 'x\x01y', None, ' ' + 'z' * 40000])
+
+    result = cleaning.excel_column(series).tolist()
+
+    assert result == _by_cell(series, cleaning.excel_cell)
+    assert result[:3] == ['a b', 'xy', '']
+    assert len(result[3]) == cleaning.EXCEL_MAX_CELL_CHARS - 1 and result[3].endswith('...')
+
+
+def test_csv_column_trims_integral_floats_and_quotes():
+    floats = pd.Series([3.0, -0.0, 2.5, 1e20, np.nan])
+    text = pd.Series(['di "hola"', '7.00', '1.2.3', None])
+
+    assert cleaning.csv_column(floats, trim_integral_floats=True).tolist() == \
+        _by_cell(floats, cleaning.csv_cell, trim_integral_floats=True)
+    assert cleaning.csv_column(text, trim_integral_floats=True).tolist() == ["di 'hola'", '7', '1.2.3', '']
+
+
+def test_mixed_columns_fall_back_to_cells():
+    series = pd.Series([{'a': 1}, [1, 2], 'b', None], dtype=object)
+
+    assert cleaning.csv_column(series, nested_as_json=True).tolist() == ['{"a":1}', '[1,2]', 'b', '']
+
+
+def test_clean_frame_keeps_duplicate_column_names():
+    df = pd.DataFrame([[1, 'a'], [2, None]], columns=['x', 'x'])
+
+    cleaned = cleaning.clean_frame(df, cleaning.excel_column)
+
+    assert list(cleaned.columns) == ['x', 'x']
+    assert cleaned.values.tolist() == [['1', 'a'], ['2', '']]
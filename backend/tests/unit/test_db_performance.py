@@ -0,0 +1,50 @@
+import sqlite3
+
+from sqlalchemy import text
+
+from src import create_app
+from src.models import db_performance
+from src.models.user import Conversion, User, db
+
+
+def test_file_database_uses_wal_and_tuned_pool(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.db'}"})
+    with app.app_context():
+        db.create_all()
+        assert db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert db.session.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+        assert db.engine.pool.size() == db_performance.DB_POOL_SIZE
+
+
+def test_missing_indexes_are_created_on_existing_database(tmp_path):
+    path = tmp_path / 'legacy.db'
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    with app.app_context():
+        db.create_all()
+        db.session.execute(text('DROP INDEX ix_conversions_user_status_type'))
+        db.session.commit()
+
+        assert db_performance.ensure_indexes(db) == ['ix_conversions_user_status_type']
+
+    with sqlite3.connect(path) as conn:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT status, conversion_type, count(*) FROM conversions "
+            "WHERE user_id = 1 GROUP BY status, conversion_type"
+        ).fetchall()
+    assert 'COVERING INDEX ix_conversions_user_status_type' in str(plan)
+
+
+def test_stats_come_from_one_grouped_query(client, auth_headers, app):
+    with app.app_context():
+        user = User.query.filter_by(email='integration@example.com').first()
+        for status, conv_type in [('completed', 'txt-html'), ('completed', 'txt-html'),
+                                  ('completed', 'md-pdf'), ('failed', 'md-pdf'), ('pending', 'txt-pdf')]:
+            db.session.add(Conversion(user_id=user.id, original_filename='a', original_format='x',
+                                      target_format='y', file_size=1, conversion_type=conv_type,
+                                      credits_used=1, status=status))
+        db.session.commit()
+
+    stats = client.get('/api/conversion/stats', headers=auth_headers).get_json()
+
+    assert stats['conversion_stats'] == {'total': 5, 'successful': 3, 'failed': 1, 'success_rate': 60.0}
+    assert sorted((s['conversion_type'], s['count']) for s in stats['format_stats']) == [('md-pdf', 1), ('txt-html', 2)]
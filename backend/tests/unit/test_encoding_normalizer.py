@@ -72,3 +72,24 @@ def test_normalize_to_utf8_multiple(tmp_path, encoding, text):
     assert Path(entry["backup"]).exists()
 
 
+def test_clean_utf8_is_not_rewritten(tmp_path):
+    file_path = tmp_path / "clean.txt"
+    file_path.write_bytes("canción número\n".encode("utf-8") * 1000)
+    mtime = file_path.stat().st_mtime_ns
+
+    entry = normalize_to_utf8(file_path, chunk_size=512)
+
+    assert entry["action"] == "unchanged" and entry["backup"] is None
+    assert file_path.stat().st_mtime_ns == mtime
+    assert not file_path.with_suffix(".txt.bak").exists()
+
+
+def test_normalize_transcodes_in_chunks(tmp_path):
+    text = "línea con acentos: áéíóú ñ\n" * 5000
+    file_path = tmp_path / "latin.txt"
+    file_path.write_bytes(text.encode("windows-1252"))
+
+    entry = normalize_to_utf8(file_path, chunk_size=100)
+
+    assert file_path.read_text(encoding="utf-8") == text
+    assert Path(entry["backup"]).read_bytes() == text.encode("windows-1252")
@@ -0,0 +1,108 @@
+import io
+import shutil
+import threading
+import time
+
+import pytest
+
+from src.models.conversion import conversion_engine
+from src.services.artifact_store import IntermediateArtifactStore
+
+ROUTES = {
+    ('raw', 'fin1'): ['raw', 'mid', 'fin1'],
+    ('raw', 'fin2'): ['raw', 'mid', 'fin2'],
+    ('raw', 'mid'): ['raw', 'mid'],
+}
+
+
+@pytest.fixture
+def chained_engine(tmp_path, monkeypatch):
+    store = IntermediateArtifactStore(store_dir=str(tmp_path / 'artifacts'))
+    calls = []
+    lock = threading.Lock()
+
+    def step(name):
+        def convert(input_path, output_path):
+            with lock:
+                calls.append(name)
+            time.sleep(0.2)
+            shutil.copyfile(input_path, output_path)
+            with open(output_path, 'a', encoding='utf-8') as f:
+                f.write(f'|{name}')
+            return True, name
+        return convert
+
+    monkeypatch.setattr(conversion_engine, 'artifact_store', store)
+    monkeypatch.setattr(conversion_engine, 'artifact_store_enabled', True)
+    monkeypatch.setattr(conversion_engine, 'find_conversion_path', lambda s, d: ROUTES.get((s, d)))
+    for hop in [('raw', 'mid'), ('mid', 'fin1'), ('mid', 'fin2'), ('raw', 'fin3')]:
+        monkeypatch.setitem(conversion_engine.conversion_methods, hop, step('->'.join(hop)))
+    source = tmp_path / 'in.raw'
+    source.write_text('datos', encoding='utf-8')
+    return str(source), calls
+
+
+def test_shared_hops_run_once_and_leaves_in_parallel(tmp_path, chained_engine):
+    source, calls = chained_engine
+    outputs = {fmt: str(tmp_path / f'out.{fmt}') for fmt in ('fin1', 'fin2', 'fin3', 'nope')}
+
+    start = time.perf_counter()
+    results = conversion_engine.convert_multi(source, outputs, 'raw', use_cache=False)
+    elapsed = time.perf_counter() - start
+
+    assert list(results) == ['fin1', 'fin2', 'fin3', 'nope']
+    assert all(results[fmt][0] for fmt in ('fin1', 'fin2', 'fin3')), results
+    assert not results['nope'][0]
+    assert sorted(calls) == ['mid->fin1', 'mid->fin2', 'raw->fin3', 'raw->mid']
+    assert elapsed < 0.6  # dos niveles de 0.2s, no cuatro pasos en serie
+    assert (tmp_path / 'out.fin2').read_text(encoding='utf-8') == 'datos|raw->mid|mid->fin2'
+
+
+def test_target_that_is_an_intermediate_is_written_once(tmp_path, chained_engine):
+    source, calls = chained_engine
+    outputs = {'fin1': str(tmp_path / 'out.fin1'), 'mid': str(tmp_path / 'out.mid')}
+
+    results = conversion_engine.convert_multi(source, outputs, 'raw', use_cache=False)
+
+    assert all(ok for ok, _ in results.values()), results
+    assert calls == ['raw->mid', 'mid->fin1']
+    assert (tmp_path / 'out.mid').read_text(encoding='utf-8') == 'datos|raw->mid'
+
+
+def test_plan_returns_adjusted_paths_without_touching_its_input():
+    from src.services.fanout_executor import FanOutExecutor
+
+    paths = {'mid': ['raw', 'otro', 'mid'], 'fin1': ['raw', 'mid', 'fin1']}
+    root, planned = FanOutExecutor.plan('raw', paths)
+
+    assert paths == {'mid': ['raw', 'otro', 'mid'], 'fin1': ['raw', 'mid', 'fin1']}
+    assert planned == {'mid': ['raw', 'mid'], 'fin1': ['raw', 'mid', 'fin1']}
+    assert [node.path for node in FanOutExecutor.walk(root)] == [('raw',), ('raw', 'mid'), ('raw', 'mid', 'fin1')]
+
+
+def test_intermediate_artifact_is_reused_by_later_requests(tmp_path, chained_engine):
+    source, calls = chained_engine
+    conversion_engine.convert_multi(source, {'fin1': str(tmp_path / 'a.fin1')}, 'raw', use_cache=False)
+    calls.clear()
+
+    results = conversion_engine.convert_multi(source, {'fin2': str(tmp_path / 'b.fin2')}, 'raw', use_cache=False)
+
+    assert calls == ['mid->fin2']
+    assert 'reused:raw->mid' in results['fin2'][1]
+
+
+def test_convert_multi_route_creates_one_conversion_per_target(client, auth_headers):
+    data = {'file': (io.BytesIO(b'hola mundo'), 'nota.txt'), 'target_formats': 'html,md'}
+    resp = client.post('/api/conversion/convert-multi', data=data, headers=auth_headers,
+                       content_type='multipart/form-data')
+
+    assert resp.status_code == 200, resp.get_json()
+    body = resp.get_json()
+    assert [r['target_format'] for r in body['results']] == ['html', 'md']
+    assert all(r['conversion']['status'] == 'completed' for r in body['results'])
+    assert body['user_credits_remaining'] == 8
+
+    resp = client.post('/api/conversion/convert-multi',
+                       data={'file': (io.BytesIO(b'x'), 'nota.txt'), 'target_formats': 'html,mp4'},
+                       headers=auth_headers, content_type='multipart/form-data')
+    assert resp.status_code == 400
@@ -0,0 +1,62 @@
+import asyncio
+import io
+
+from PIL import Image
+
+from src.services import file_preview_service as preview_module
+from src.services.file_preview_service import FilePreviewService, PreviewCache
+
+
+def _jpeg(path, size=(2400, 3200)):
+    Image.new('RGB', size, color=(200, 120, 40)).save(path, format='JPEG')
+
+
+def test_image_tiers_come_from_one_decode_and_are_cached(tmp_path, monkeypatch):
+    image_path = tmp_path / 'photo.jpg'
+    _jpeg(image_path)
+    service = FilePreviewService(PreviewCache(max_size_mb=8))
+
+    opened = []
+    original_open = preview_module.Image.open
+    monkeypatch.setattr(preview_module.Image, 'open', lambda *a, **k: opened.append(a) or original_open(*a, **k))
+
+    high = asyncio.run(service.generate_preview(str(image_path), 'photo.jpg', 'high'))
+    low = asyncio.run(service.generate_preview(str(image_path), 'photo.jpg', 'low'))
+
+    assert len(opened) == 1
+    assert high.dimensions == (600, 800) and low.dimensions == (150, 200)
+    assert high.metadata['width'] == 2400 and low.preview_quality == 'low'
+    assert high.cache_key == low.cache_key
+    assert service.preview_cache.get_stats()['hits'] == 1
+
+
+def test_cache_evicts_least_recently_used_by_size():
+    cache = PreviewCache(max_size_mb=0.01)
+    preview = preview_module.PreviewData('text', 'x' * 4000, {})
+    for key in ('a', 'b', 'c'):
+        cache.put(key, {'*': preview})
+
+    assert cache.get('a', 'medium') is None
+    assert cache.get('c', 'medium') is not None
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_preview_route_serves_conditional_get(client):
+    buffer = io.BytesIO()
+    Image.new('RGB', (800, 600), color='blue').save(buffer, format='PNG')
+    buffer.seek(0)
+
+    resp = client.post('/api/conversion/preview', data={'file': (buffer, 'blue.png'), 'quality': 'low'},
+                       content_type='multipart/form-data')
+    assert resp.status_code == 200
+    key = resp.get_json()['preview_key']
+    etag = resp.headers['ETag']
+
+    cached = client.get(f'/api/conversion/preview/{key}?quality=low')
+    assert cached.status_code == 200 and cached.headers['ETag'] == etag
+    assert cached.get_json()['file_info'] == {'extension': 'png'}
+
+    not_modified = client.get(f'/api/conversion/preview/{key}?quality=low', headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+
+    assert client.get('/api/conversion/preview/unknown').status_code == 404
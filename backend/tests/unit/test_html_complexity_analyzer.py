@@ -0,0 +1,45 @@
+import pytest
+
+from src.models.conversions.html_complexity_analyzer import HTMLComplexityAnalyzer, scan_html
+from src.services.intelligent_optimization import IntelligentOptimizer
+
+DOCUMENTS = [
+    '',
+    '<p>Hola mundo</p>',
+    '''<html><head>
+    <link href="https://fonts.googleapis.com/css?family=Roboto" rel="stylesheet">
+    <style>@font-face { font-family: "Mi Fuente"; } .a { backdrop-filter: blur(2px); }
+    .b { background: -moz-linear-gradient(top, #fff, #000); } @keyframes giro {} @media  print {}</style>
+    </head><body>
+    <div class="Col-6" style="display: grid"><svg><circle/></svg></div>
+    <div style="position: absolute"></div><div STYLE="Position: FIXED; background-image: url(a.png)"></div>
+    <script>var s = "<svg></svg><img>";</script><script src="app.js"></script>
+    <!-- <svg></svg> --> ''' + '<img src="x.png">' * 7 + '</body></html>',
+    '<style>@import url(theme.css); h1 { text-transform: uppercase }</style>',
+]
+
+
+@pytest.mark.parametrize('html', DOCUMENTS)
+def test_single_pass_matches_soup_analysis(html):
+    soup = HTMLComplexityAnalyzer('soup').analyze_html_content(html)
+    single = HTMLComplexityAnalyzer('single_pass').analyze_html_content(html)
+    assert single == soup
+
+
+def test_scan_reports_overlapping_css_tokens():
+    scan = scan_html('<style>.a { backdrop-filter: blur(1px) }</style>')
+    assert scan.advanced_css == {'backdrop-filter:', 'filter:'}
+
+
+def test_file_hash_is_computed_once_per_file_version(tmp_path, monkeypatch):
+    path = tmp_path / 'doc.html'
+    path.write_text('<p>a</p>', encoding='utf-8')
+    optimizer = IntelligentOptimizer()
+
+    opened = []
+    real_open = open
+    monkeypatch.setattr('builtins.open', lambda *a, **k: opened.append(a[0]) or real_open(*a, **k))
+
+    first = optimizer.get_file_hash(str(path))
+    assert optimizer.get_file_hash(str(path)) == first
+    assert opened.count(str(path)) == 1
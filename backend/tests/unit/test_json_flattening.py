@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from src.models.conversions import json_flattening, json_to_csv
+
+
+def test_schema_grows_with_keys_outside_the_sample():
+    records = [{'a': 1, 'b': {'c': 2, 'd': {'e': 3}}, 'l': [1, 2]}, {'b': {'f': 5}, 'a': {'q': 1}}]
+    schema = json_flattening.FlatSchema().infer(records[:1])
+
+    frame, grew = schema.flatten(records)
+
+    assert grew
+    assert list(frame.columns) == ['a', 'b.c', 'b.d.e', 'l', 'b.f', 'a.q']
+    assert frame.iloc[0].tolist() == [1, 2, 3, [1, 2], None, None]
+    assert frame.iloc[1].tolist() == [None, None, None, None, 5, 1]
+
+
+def test_deep_nesting_does_not_recurse():
+    deep = value = {}
+    for _ in range(5000):
+        value['k'] = {}
+        value = value['k']
+    value['v'] = 1
+
+    flat = json_to_csv.flatten_nested_json(deep)
+
+    assert list(flat.values()) == [1]
+    assert json_to_csv.flatten_nested_json({'x': [{'y': 1}, []]}, sep='.') == {'x.0.y': 1, 'x.1': []}
+
+
+@pytest.mark.parametrize('read_size', [1, 2, 5, 64])
+def test_array_items_are_read_across_buffer_boundaries(tmp_path, monkeypatch, read_size):
+    monkeypatch.setattr(json_flattening, 'IJSON_AVAILABLE', False)
+    text = ' [ 1 , 22.5e3,"x]y" , {"a":[1,2]}, true ,null, -0.5E-2 ] '
+    path = tmp_path / 'datos.json'
+    path.write_text(text, encoding='utf-8')
+
+    assert list(json_flattening.iter_array_items(str(path), read_size=read_size)) == json.loads(text)
+
+    path.write_text('[1, 2', encoding='utf-8')
+    with pytest.raises(ValueError):
+        list(json_flattening.iter_array_items(str(path), read_size=read_size))
+
+
+def test_streaming_csv_matches_in_memory_output(tmp_path, monkeypatch):
+    records = [{'id': i, 'cliente': {'nombre': f'n"{i}', 'tags': ['a', 'b']}, **({'tarde': i} if i > 30 else {})}
+               for i in range(50)]
+    source = tmp_path / 'datos.json'
+    source.write_text(json.dumps(records), encoding='utf-8')
+    assert json_to_csv.convert(str(source), str(tmp_path / 'memoria.csv'))[0]
+    monkeypatch.setattr(json_to_csv, 'STREAMING_THRESHOLD_MB', 0)
+    monkeypatch.setattr(json_to_csv, 'CHUNK_RECORDS', 7)
+    monkeypatch.setattr(json_flattening, 'SCHEMA_SAMPLE_RECORDS', 5)
+
+    success, message = json_to_csv.convert(str(source), str(tmp_path / 'streaming.csv'))
+
+    assert success and 'streaming' in message, message
+    streamed = (tmp_path / 'streaming.csv').read_text(encoding='utf-8-sig')
+    assert streamed == (tmp_path / 'memoria.csv').read_text(encoding='utf-8-sig')
+    assert streamed.splitlines()[:2] == ['id,cliente_nombre,cliente_tags,tarde', '0,n\'0,"[""a"",""b""]",']
@@ -0,0 +1,71 @@
+import time
+
+from src.models.conversions import html_to_pdf
+from src.services.conversion_performance_monitor import ConversionPerformanceMonitor
+from src.services.method_selector import AdaptiveMethodSelector
+
+
+def _selector(tmp_path):
+    monitor = ConversionPerformanceMonitor(str(tmp_path / 'metrics.json'))
+    return AdaptiveMethodSelector(monitor, min_samples=3)
+
+
+def _record(selector, method, duration, success, times=3, level='MODERADA'):
+    for _ in range(times):
+        selector.record_attempt(method, level, 40, 'weasyprint', 'in.html', 'out.pdf', duration, success)
+
+
+def test_methods_are_reordered_by_learned_cost(tmp_path):
+    selector = _selector(tmp_path)
+    _record(selector, 'weasyprint', 0.01, False)
+    _record(selector, 'playwright', 0.3, True)
+
+    order = selector.order_methods('MODERADA', ['weasyprint', 'wkhtmltopdf', 'playwright', 'fpdf'])
+    assert order == ['playwright', 'wkhtmltopdf', 'weasyprint', 'fpdf']
+    assert selector.order_methods('SIMPLE', ['fpdf', 'weasyprint']) == ['fpdf', 'weasyprint']
+
+    # Las estadísticas se reconstruyen desde el archivo del monitor
+    reloaded = _selector(tmp_path)
+    assert reloaded.get_bucket_stats('MODERADA')['playwright']['success_rate'] == 1.0
+
+
+def _fake_methods(monkeypatch, behaviours):
+    def fake(method, input_path, output_path):
+        delay, ok = behaviours[method]
+        time.sleep(delay)
+        if ok:
+            with open(output_path, 'wb') as f:
+                f.write(b'%PDF-1.4 ' + method.encode())
+            return True, f'ok {method}'
+        return False, f'fallo {method}'
+    monkeypatch.setattr(html_to_pdf, 'try_conversion_method', fake)
+
+
+def test_slow_method_is_cut_at_its_deadline(tmp_path, monkeypatch):
+    _fake_methods(monkeypatch, {'weasyprint': (1.0, True), 'fpdf': (0.0, True)})
+    monkeypatch.setitem(html_to_pdf.METHOD_DEADLINES, 'weasyprint', 0.1)
+    attempts = []
+    output = tmp_path / 'out.pdf'
+
+    start = time.time()
+    ok, _, method = html_to_pdf.convert_with_methods(
+        ['weasyprint', 'fpdf'], 'in.html', str(output), mode='sequential',
+        on_attempt=lambda *args: attempts.append(args[:3])
+    )
+
+    assert ok and method == 'fpdf' and time.time() - start < 0.8
+    assert output.read_bytes().endswith(b'fpdf')
+    assert [(a[0], a[2]) for a in attempts] == [('weasyprint', False), ('fpdf', True)]
+
+
+def test_race_takes_first_valid_pdf(tmp_path, monkeypatch):
+    _fake_methods(monkeypatch, {'playwright': (0.3, True), 'wkhtmltopdf': (0.0, True)})
+    output = tmp_path / 'out.pdf'
+
+    ok, _, method = html_to_pdf.convert_with_methods(['playwright', 'wkhtmltopdf'], 'in.html',
+                                                     str(output), mode='race')
+
+    assert ok and method == 'wkhtmltopdf'
+    assert output.read_bytes().endswith(b'wkhtmltopdf')
+    time.sleep(0.4)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['out.pdf']
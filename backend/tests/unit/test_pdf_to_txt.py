@@ -0,0 +1,77 @@
+import pytest
+from fpdf import FPDF
+
+from src.models.conversions import pdf_to_txt
+
+
+@pytest.fixture
+def numbered_pdf(tmp_path):
+    pdf = FPDF()
+    pdf.set_font('Helvetica', size=12)
+    for number in range(1, 41):
+        pdf.add_page()
+        pdf.cell(0, 10, f'Pagina {number:03d}')
+    path = tmp_path / 'paginas.pdf'
+    pdf.output(str(path))
+    return str(path)
+
+
+def _page_markers(path):
+    with open(path, encoding='utf-8') as f:
+        return [int(word) for word in f.read().split() if word.isdigit()]
+
+
+@pytest.mark.parametrize('pymupdf', [True, False])
+def test_single_process_writes_pages_in_order(tmp_path, monkeypatch, numbered_pdf, pymupdf):
+    if pymupdf and not pdf_to_txt.PYMUPDF_AVAILABLE:
+        pytest.skip('PyMuPDF no instalado')
+    monkeypatch.setattr(pdf_to_txt, 'PYMUPDF_AVAILABLE', pymupdf)
+    monkeypatch.setattr(pdf_to_txt, 'PDF_TEXT_WORKERS', 1)
+    output = tmp_path / 'paginas.txt'
+
+    success, message = pdf_to_txt.convert(numbered_pdf, str(output))
+
+    assert success and '40 páginas' in message and ('PyMuPDF' if pymupdf else 'pypdf') in message, message
+    assert _page_markers(output) == list(range(1, 41))
+
+
+def test_page_ranges_are_split_across_processes(tmp_path, monkeypatch, numbered_pdf):
+    monkeypatch.setattr(pdf_to_txt, 'PAGES_PER_TASK', 3)
+    output = tmp_path / 'paginas.txt'
+    try:
+        engine, workers, timings = pdf_to_txt.extract_text(numbered_pdf, str(output), workers=2)
+    finally:
+        pdf_to_txt._reset_pool()
+
+    assert workers == 2 and len(timings) == 40
+    assert _page_markers(output) == list(range(1, 41))
+
+
+def test_short_documents_stay_in_process(tmp_path, monkeypatch, numbered_pdf):
+    monkeypatch.setattr(pdf_to_txt, 'PDF_TEXT_WORKERS', 4)
+    monkeypatch.setattr(pdf_to_txt, 'PARALLEL_MIN_PAGES', 41)
+    pdf_to_txt._reset_pool()
+
+    engine, workers, timings = pdf_to_txt.extract_text(numbered_pdf, str(tmp_path / 'x.txt'))
+
+    assert workers == 1 and len(timings) == 40 and pdf_to_txt._pool is None
+
+
+def test_worker_processes_extract_in_process(tmp_path, monkeypatch, numbered_pdf):
+    monkeypatch.setattr(pdf_to_txt, 'PDF_TEXT_WORKERS', 4)
+    monkeypatch.setattr(pdf_to_txt.multiprocessing, 'parent_process', lambda: object())
+
+    engine, workers, timings = pdf_to_txt.extract_text(numbered_pdf, str(tmp_path / 'x.txt'))
+
+    assert workers == 1 and len(timings) == 40 and pdf_to_txt._pool is None
+
+
+def test_reset_only_discards_the_failing_pool():
+    pool = pdf_to_txt._get_pool(2)
+    try:
+        pdf_to_txt._reset_pool(object())
+        assert pdf_to_txt._pool is pool
+        pdf_to_txt._reset_pool(pool)
+        assert pdf_to_txt._pool is None
+    finally:
+        pdf_to_txt._reset_pool()
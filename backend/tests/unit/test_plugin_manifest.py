@@ -0,0 +1,46 @@
+import sys
+
+from src.models.conversion import conversion_engine
+from src.models.plugin_manifest import PluginManifest, LazyConverter, get_import_profile
+
+
+PLUGIN = '''
+VERSION = "2"
+CONVERSION = ('AAA', 'bbb')
+
+
+def convert(input_path, output_path):
+    return True, 'ok'
+'''
+
+
+def test_manifest_is_parsed_statically_and_cached(tmp_path):
+    plugin_dir = tmp_path / 'plugins'
+    plugin_dir.mkdir()
+    (plugin_dir / 'aaa_to_bbb.py').write_text(PLUGIN, encoding='utf-8')
+    (plugin_dir / 'helper.py').write_text('def util():\n    pass\n', encoding='utf-8')
+    cache = tmp_path / 'manifest.json'
+
+    manifest = PluginManifest(plugin_dir, cache_path=str(cache))
+    entries = manifest.load()
+    assert entries == [{'module': 'aaa_to_bbb', 'conversion': ['aaa', 'bbb'], 'version': '2',
+                        'concurrency': None, 'max_concurrency': None}]
+    assert manifest.from_cache == 0 and cache.exists()
+
+    again = PluginManifest(plugin_dir, cache_path=str(cache))
+    assert again.load() == entries
+    assert again.from_cache == 2
+
+
+def test_converters_are_imported_on_first_use(tmp_path):
+    converter = conversion_engine.conversion_methods[('md', 'html')]
+    assert isinstance(converter, LazyConverter)
+    assert 'src.models.conversions.gif_to_mp4' not in sys.modules or \
+        conversion_engine.conversion_methods[('gif', 'mp4')].loaded
+
+    input_path = tmp_path / 'in.md'
+    input_path.write_text('# Hola', encoding='utf-8')
+    ok, _ = converter(str(input_path), str(tmp_path / 'out.html'))
+    assert ok and converter.loaded
+    assert 'md_to_html' in {item['module'] for item in get_import_profile()}
+    assert conversion_engine.get_plugin_report()['loaded'] >= 1
@@ -0,0 +1,72 @@
+import json
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from src.services.production_monitoring import ConversionEvent, ProductionMonitor
+
+
+@pytest.fixture
+def monitor(tmp_path, monkeypatch):
+    monkeypatch.setattr(ProductionMonitor, '_start_background_monitoring', lambda self: None)
+    instance = ProductionMonitor(str(tmp_path / 'missing_config.json'), log_dir=str(tmp_path))
+    yield instance
+    instance.shutdown()
+
+
+def _event(i, success=True, duration=0.5):
+    return ConversionEvent(
+        timestamp=datetime.now().isoformat(),
+        conversion_id=f'conv-{i}',
+        input_format='html',
+        output_format='pdf',
+        file_size_mb=0.1,
+        duration_seconds=duration,
+        method_used='weasyprint',
+        success=success,
+        error_message=None if success else 'fallo'
+    )
+
+
+def test_events_are_written_in_batches_off_the_caller(monitor, monkeypatch):
+    release = threading.Event()
+    original = monitor._process_conversion_event
+    # El análisis lento bloquea al hilo de volcado, no al que registra
+    monkeypatch.setattr(monitor, '_process_conversion_event', lambda e: (release.wait(5), original(e)))
+
+    start = time.perf_counter()
+    for i in range(200):
+        monitor.log_conversion_event(_event(i, success=i % 50, duration=40.0 if i == 3 else 0.5))
+    assert time.perf_counter() - start < 0.5
+
+    release.set()
+    assert monitor.flush()
+    with open(monitor.events_file, encoding='utf-8') as f:
+        ids = [json.loads(line)['conversion_id'] for line in f]
+    assert ids == [f'conv-{i}' for i in range(200)]
+
+    with open(monitor.alerts_file, encoding='utf-8') as f:
+        alert_types = {json.loads(line)['type'] for line in f}
+    assert {'HIGH_RESPONSE_TIME', 'CONVERSION_FAILED'} <= alert_types
+
+    report = monitor.get_performance_report(hours=1)
+    assert report['summary']['total_conversions'] == 200
+    assert report['summary']['p99_duration_seconds'] < 1
+
+    stats = monitor.get_pipeline_stats()
+    assert stats['written'] == 200 and stats['dropped'] == 0 and stats['queued'] == 0
+
+
+def test_full_queue_drops_and_counts(monitor):
+    monitor.shutdown()
+    monitor.queue_capacity = 3
+
+    for i in range(5):
+        monitor.log_conversion_event(_event(i))
+
+    stats = monitor.get_pipeline_stats()
+    assert stats['queued'] == 3 and stats['dropped'] == 2
+    # El buffer en memoria para el dashboard no se ve afectado
+    assert len(monitor.recent_events) == 5
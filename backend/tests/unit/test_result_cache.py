@@ -0,0 +1,81 @@
+import os
+
+import pytest
+from prometheus_client import CollectorRegistry
+
+from src.models.conversion import conversion_engine
+from src.services.intelligent_cache import IntelligentCache
+
+
+@pytest.fixture
+def result_cache(tmp_path, monkeypatch):
+    cache = IntelligentCache(cache_dir=str(tmp_path / 'cache'))
+    monkeypatch.setattr(conversion_engine, 'result_cache', cache)
+    return cache
+
+
+def test_second_conversion_is_served_from_cache(tmp_path, result_cache):
+    """La misma entrada y el mismo par de formatos se sirven desde el cache."""
+    input_path = tmp_path / 'in.md'
+    input_path.write_text('# Factura\n\nTotal: 10', encoding='utf-8')
+
+    first_out = tmp_path / 'first.html'
+    ok, msg = conversion_engine.convert_file(str(input_path), str(first_out), 'md', 'html')
+    assert ok, msg
+    assert not msg.startswith('cache_hit')
+
+    second_out = tmp_path / 'second.html'
+    ok, msg = conversion_engine.convert_file(str(input_path), str(second_out), 'md', 'html')
+    assert ok, msg
+    assert msg.startswith('cache_hit')
+    assert 'md->html' in msg
+    assert second_out.read_bytes() == first_out.read_bytes()
+
+    (_, _, hits, misses, saved), = result_cache.get_counters()
+    assert (hits, misses) == (1, 1)
+    assert saved == os.path.getsize(second_out)
+
+
+def test_cache_key_depends_on_parameters_and_version(tmp_path, result_cache):
+    """Cambiar parámetros o versión del conversor invalida la entrada."""
+    input_path = tmp_path / 'in.txt'
+    input_path.write_text('hola', encoding='utf-8')
+    output_path = tmp_path / 'out.html'
+    result_cache.cache_conversion(str(input_path), str(input_path), 'txt', 'html',
+                                  converter_version='v1')
+
+    assert result_cache.get_cached_conversion(str(input_path), 'txt', 'html', converter_version='v1')
+    assert not result_cache.get_cached_conversion(str(input_path), 'txt', 'html', converter_version='v2')
+    assert not result_cache.get_cached_conversion(str(input_path), 'txt', 'html',
+                                                  parameters={'quality': 'high'},
+                                                  converter_version='v1')
+    assert not output_path.exists()
+
+
+def test_cache_metrics_are_exported(tmp_path, result_cache):
+    """Los contadores se publican en el registro de Prometheus."""
+    input_path = tmp_path / 'in.txt'
+    input_path.write_text('hola', encoding='utf-8')
+    result_cache.get_cached_conversion(str(input_path), 'txt', 'pdf')
+
+    registry = CollectorRegistry()
+    result_cache.register_metrics(registry)
+    labels = {'source_format': 'txt', 'target_format': 'pdf'}
+    assert registry.get_sample_value('anclora_conversion_cache_misses_total', labels) == 1
+    assert registry.get_sample_value('anclora_conversion_cache_hits_total', labels) == 0
+
+
+def test_cache_hits_do_not_write_the_index(tmp_path, result_cache):
+    """Los aciertos solo leen el índice; los accesos se vuelcan en bloque."""
+    input_path = tmp_path / 'in.txt'
+    input_path.write_text('hola', encoding='utf-8')
+    result_cache.cache_conversion(str(input_path), str(input_path), 'txt', 'html', converter_version='v1')
+    mtime = os.stat(result_cache.db_path).st_mtime_ns
+
+    for _ in range(3):
+        assert result_cache.get_cached_conversion(str(input_path), 'txt', 'html', converter_version='v1')
+
+    assert os.stat(result_cache.db_path).st_mtime_ns == mtime
+    (_, _, hits, misses, _), = result_cache.get_counters()
+    assert (hits, misses) == (3, 0)
+    assert result_cache.get_cache_stats()['total_accesses'] == 3
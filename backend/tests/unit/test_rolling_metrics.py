@@ -0,0 +1,50 @@
+import random
+
+from src.services.rolling_metrics import RELATIVE_ACCURACY, LatencyHistogram, RollingAggregator
+
+
+def test_histogram_quantiles_within_relative_accuracy():
+    rng = random.Random(7)
+    values = sorted(rng.lognormvariate(0, 1.2) for _ in range(20000))
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.add(value)
+
+    for q in (0.5, 0.95, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(histogram.quantile(q) - exact) <= exact * RELATIVE_ACCURACY
+
+
+def test_windows_group_by_pair_and_method():
+    aggregator = RollingAggregator()
+    now = 1_700_000_000.0
+    for i in range(100):
+        aggregator.record('html→pdf', 'playwright', 1.0 + i / 100, i % 10 != 0, 2 * 1024 * 1024, now - 30)
+    aggregator.record('csv→json', 'pandas', 40.0, True, 100, now - 30)
+    # Fuera de la última hora pero dentro del día
+    aggregator.record('html→pdf', 'weasyprint', 2.0, False, 100, now - 5 * 3600)
+
+    hour = aggregator.summary(3600, end=now)
+    assert hour['total']['count'] == 101
+    playwright = hour['by_method']['playwright']
+    assert playwright['errors'] == 10 and playwright['size_distribution']['medium'] == 100
+    assert abs(playwright['p50'] - 1.5) <= 1.5 * RELATIVE_ACCURACY
+    assert hour['total']['time_distribution'] == {'fast': 100, 'normal': 0, 'slow': 1}
+
+    day = aggregator.summary(86400, end=now, format_pair='html→pdf')
+    assert set(day['by_method']) == {'playwright', 'weasyprint'}
+    assert day['total']['count'] == 101
+
+    assert [entry['type'] for entry in aggregator.top_format_pairs(86400, end=now)][:1] == ['html→pdf']
+
+
+def test_adjacent_windows_do_not_overlap_and_late_events_are_ordered():
+    aggregator = RollingAggregator()
+    now = 1_700_000_000.0
+    aggregator.record('a→b', 'm', 1.0, True, timestamp=now - 100)
+    aggregator.record('a→b', 'm', 1.0, True, timestamp=now - 7200)  # tardío
+    aggregator.record('a→b', 'm', 1.0, True, timestamp=now - 3 * 3600)
+
+    recent = aggregator.summary(2 * 3600, end=now)['total']['count']
+    previous = aggregator.summary(2 * 3600, end=now - 2 * 3600)['total']['count']
+    assert recent + previous == 3
@@ -0,0 +1,72 @@
+from dataclasses import dataclass
+
+from src.models.conversion import conversion_engine
+from src.services.route_index import RouteIndex
+
+
+@dataclass
+class Route:
+    steps: list
+    quality_score: float
+
+
+GRAPH = {
+    'a': ['b', 'c'],
+    'b': ['d'],
+    'c': ['d'],
+    'd': ['e'],
+}
+
+
+def score(steps, prefer_quality):
+    # Las rutas que pasan por "c" son mejores en calidad y peores en velocidad
+    bonus = 1.0 if any('c' in step for step in steps) else 0.0
+    base = 1.0 / len(steps)
+    return Route(steps, base + (bonus if prefer_quality else -bonus))
+
+
+def test_shortest_paths_and_reachability():
+    index = RouteIndex(max_steps=3)
+    index.build(GRAPH)
+
+    assert index.shortest_path('a', 'd') == ['a', 'b', 'd']
+    assert index.shortest_path('a', 'e') == ['a', 'b', 'd', 'e']
+    assert index.shortest_path('e', 'a') is None
+    assert index.reachable('a', max_steps=2) == {'b': 1, 'c': 1, 'd': 2}
+
+
+def test_k_best_routes_respect_preference_and_step_limit():
+    index = RouteIndex(max_steps=3, k_best=2)
+    index.build(GRAPH, evaluator=score)
+
+    best_quality = index.best_routes('a', 'e', prefer_quality=True, k=2)
+    assert [r.steps[0] for r in best_quality] == [('a', 'c'), ('a', 'b')]
+    best_speed = index.best_routes('a', 'e', prefer_quality=False)
+    assert best_speed[0].steps[0] == ('a', 'b')
+    assert index.best_routes('a', 'e', max_steps=2) == []
+
+
+def test_rescore_matches_a_full_rebuild():
+    weights = {}
+
+    def weighted(steps, prefer_quality):
+        return Route(steps, sum(weights.get(step, 1.0) for step in steps) / len(steps))
+
+    index = RouteIndex(max_steps=3, k_best=1)
+    index.build(GRAPH, evaluator=weighted)
+    assert index.best_routes('a', 'e')[0].steps[0] == ('a', 'b')
+
+    weights[('c', 'd')] = 5.0
+    assert index.rescore(('c', 'd'), weighted) == 4  # a→d, a→e, c→d y c→e
+    rebuilt = RouteIndex(max_steps=3, k_best=1)
+    rebuilt.build(GRAPH, evaluator=weighted)
+
+    assert index._ranked == rebuilt._ranked
+    assert index.best_routes('a', 'e')[0].steps[0] == ('a', 'c')
+
+
+def test_engine_paths_come_from_index():
+    assert conversion_engine.route_index.version >= 1
+    assert conversion_engine.find_conversion_path('md', 'md') == ['md']
+    path = conversion_engine.find_conversion_path('CSV', 'docx')
+    assert path[0] == 'csv' and path[-1] == 'docx' and len(path) <= 4
@@ -0,0 +1,104 @@
+import io
+import os
+import threading
+import time
+
+import pytest
+
+from src.models.conversion import conversion_engine
+from src.services import sequence_processor as sequence_module
+from src.services.intelligent_routing import ConversionRoute
+from src.services.sequence_processor import SequenceProcessor
+
+ROUTES = {
+    'pdf': [('docx', 'html'), ('html', 'pdf')],
+    'html': [('docx', 'html')],
+    'txt': [('docx', 'txt')],
+}
+
+
+@pytest.fixture
+def processor(monkeypatch, tmp_path):
+    def find_routes(source, target, max_steps, prefer_quality):
+        steps = ROUTES[target]
+        return [ConversionRoute(source, target, steps, 1.0, 0.9, len(steps), f"{source}→{target}")]
+
+    calls = []
+    lock = threading.Lock()
+
+    def converter(source_format, target_format):
+        def convert(input_path, output_path):
+            with lock:
+                calls.append((source_format, target_format))
+            time.sleep(0.2)
+            with open(input_path) as src, open(output_path, 'w') as dst:
+                dst.write(src.read() + f'>{target_format}')
+            return True, 'ok'
+        return convert
+
+    monkeypatch.setattr(sequence_module.intelligent_router, 'find_routes', find_routes)
+    monkeypatch.setattr(sequence_module.intelligent_router, 'update_conversion_metrics', lambda *a, **k: None)
+    monkeypatch.setattr(conversion_engine, 'conversion_methods',
+                        {hop: converter(*hop) for steps in ROUTES.values() for hop in steps})
+    monkeypatch.setattr(conversion_engine, 'result_cache_enabled', False)
+    monkeypatch.setattr(conversion_engine, 'artifact_store_enabled', False)
+
+    instance = SequenceProcessor(max_step_workers=4)
+    instance.calls = calls
+    source = tmp_path / 'doc.docx'
+    source.write_text('docx')
+    instance.source = str(source)
+    return instance
+
+
+def test_fan_out_shares_common_steps_and_runs_branches_concurrently(processor, tmp_path):
+    outputs = {fmt: str(tmp_path / f'out.{fmt}') for fmt in ('html', 'txt')}
+    sequence = processor.create_sequence('docx', 'pdf', processor.source, str(tmp_path / 'out.pdf'),
+                                         extra_targets=outputs)
+    # docx→html se planifica una vez y escribe directamente el destino html
+    assert [(s.source_format, s.target_format, s.depends_on) for s in sequence.steps] == [
+        ('docx', 'html', None), ('html', 'pdf', 1), ('docx', 'txt', None)
+    ]
+
+    start = time.perf_counter()
+    assert processor.execute_sequence(sequence.sequence_id)
+    elapsed = time.perf_counter() - start
+
+    assert sorted(processor.calls) == [('docx', 'html'), ('docx', 'txt'), ('html', 'pdf')]
+    assert elapsed < 0.55  # docx→txt en paralelo con docx→html→pdf
+    with open(tmp_path / 'out.pdf') as f:
+        assert f.read() == 'docx>html>pdf'
+    assert os.path.exists(outputs['html']) and os.path.exists(outputs['txt'])
+
+
+def test_background_execution_streams_status(processor, tmp_path):
+    sequence = processor.create_sequence('docx', 'pdf', processor.source, str(tmp_path / 'out.pdf'))
+
+    start = time.perf_counter()
+    assert processor.start_sequence(sequence.sequence_id)
+    assert time.perf_counter() - start < 0.1
+    assert not processor.start_sequence(sequence.sequence_id)
+
+    statuses = [status for status in processor.iter_status(sequence.sequence_id, timeout=5) if status]
+    assert statuses[-1]['status'] == 'completed'
+    assert any(s['steps'][0]['status'] == 'processing' for s in statuses)
+    assert [s['version'] for s in statuses] == sorted(s['version'] for s in statuses)
+    intermediate = sequence.steps[0].output_file
+    assert intermediate and not os.path.exists(intermediate)
+
+
+def test_create_route_accepts_extra_formats(client, auth_headers, processor, monkeypatch):
+    from src.routes import conversion as conversion_routes
+    monkeypatch.setattr(conversion_routes, 'sequence_processor', processor)
+
+    resp = client.post('/api/conversion/sequence/create', headers=auth_headers,
+                       data={'file': (io.BytesIO(b'docx'), 'doc.docx'), 'target_format': 'pdf',
+                             'extra_formats': 'html, txt,pdf'},
+                       content_type='multipart/form-data')
+
+    assert resp.status_code == 200, resp.get_json()
+    body = resp.get_json()
+    assert body['outputs'] == ['pdf', 'html', 'txt'] and body['route']['steps'] == 3
+    assert processor.execute_sequence(body['sequence_id'])
+    status = processor.get_sequence_status(body['sequence_id'])
+    assert status['outputs'] == {'pdf': 'doc.pdf', 'html': 'doc.html', 'txt': 'doc.txt'}
@@ -0,0 +1,53 @@
+import hashlib
+import io
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from src.services.file_validator import FileValidator
+from src.services.integrity_checker import IntegrityChecker
+from src.services.upload_ingest import UploadIngestor, UploadTooLargeError
+
+
+def _upload(data, name='doc.pdf'):
+    return FileStorage(stream=io.BytesIO(data), filename=name)
+
+
+def test_ingest_computes_all_digests_in_one_pass(tmp_path):
+    data = b'%PDF-1.4\n' + b'x' * 5000 + b'\n%%EOF'
+    destination = tmp_path / 'doc.pdf'
+
+    info = UploadIngestor(chunk_size=1000).ingest(_upload(data), str(destination))
+
+    assert destination.read_bytes() == data
+    assert info.size == len(data)
+    assert info.sha256 == hashlib.sha256(data).hexdigest()
+    assert info.md5 == hashlib.md5(data).hexdigest()
+    assert info.header == data[:1024]
+    assert info.footer == data[-1024:]
+
+
+def test_ingest_rejects_oversized_uploads(tmp_path):
+    destination = tmp_path / 'big.txt'
+    with pytest.raises(UploadTooLargeError):
+        UploadIngestor(chunk_size=10).ingest(_upload(b'a' * 100, 'big.txt'), str(destination), max_size=50)
+    assert not destination.exists()
+
+
+def test_validators_reuse_ingest_metadata(tmp_path, monkeypatch):
+    data = b'{"a": 1}'
+    destination = tmp_path / 'data.json'
+    info = UploadIngestor().ingest(_upload(data, 'data.json'), str(destination))
+
+    validator, checker = FileValidator(), IntegrityChecker()
+
+    def no_reread(*args):
+        raise AssertionError('el archivo no debe volver a hashearse')
+
+    monkeypatch.setattr(validator, '_calculate_md5', no_reread)
+    monkeypatch.setattr(checker, '_calculate_checksums', no_reread)
+
+    ok, _, details = validator.validate_file_comprehensive(str(destination), 'json', file_info=info)
+    assert ok and details['md5_checksum'] == info.md5
+    ok, _, checks = checker.pre_conversion_check(str(destination), 'json', 'csv', file_info=info)
+    assert ok and checks['checksum'] == {'md5': info.md5, 'sha256': info.sha256}
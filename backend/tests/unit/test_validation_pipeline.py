@@ -0,0 +1,43 @@
+import zipfile
+
+from src.services.validation_pipeline import ValidationPipeline
+
+
+def test_valid_csv_reports_per_check_timings(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_text('a,b\n1,2\n3,4\n', encoding='utf-8')
+
+    report = ValidationPipeline().validate(str(path), 'csv', 'json')
+
+    assert report.valid, report.message
+    assert [c.name for c in report.checks] == ['size', 'signature', 'extension', 'structure', 'format', 'encoding']
+    assert all(c.duration_ms >= 0 for c in report.checks)
+    assert report.validation_details['md5_checksum']
+    assert report.integrity_details['encoding_safe']
+
+
+def test_pipeline_short_circuits_on_first_failure(tmp_path):
+    path = tmp_path / 'broken.pdf'
+    path.write_bytes(b'%PDF-1.4\n1 0 obj\n<<>>\nendobj\n')  # sin %%EOF
+
+    pipeline = ValidationPipeline()
+    parsed = []
+    pipeline.register_validator('pdf', lambda ctx: parsed.append(ctx) or (True, 'ok'))
+    report = pipeline.validate(str(path), 'pdf', 'txt')
+
+    assert not report.valid
+    assert report.failed_stage == 'integrity'
+    assert report.checks[-1].name == 'structure'
+    assert parsed == []
+
+
+def test_zip_based_formats_require_their_members(tmp_path):
+    path = tmp_path / 'doc.docx'
+    with zipfile.ZipFile(path, 'w') as zf:
+        zf.writestr('[Content_Types].xml', '<Types/>')
+
+    report = ValidationPipeline().validate(str(path), 'docx')
+
+    assert not report.valid
+    assert report.failed_stage == 'validation'
+    assert 'word/document.xml' in report.message